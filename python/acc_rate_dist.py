@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Joint (energy, acceleration rate) distributions built directly from particle
+or tracer data.
+
+The distributions have the same layout as the acc_rate_dist_<s>_<t>.gda
+files: for each variable and energy bin, there are (nalpha+1)*2 symmetric
+acceleration-rate bins of the particle number, followed by the same bins of
+the energization rate and of its square. The variables are the parallel
+and perpendicular electric field terms and the curvature and gradient drift
+terms, with the magnetic field gradients from the field frames. All the
+time frames are stored in one HDF5 file, and only the frames that are not
+yet in the file are calculated, so the file can be updated while new dumps
+appear.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import os
+
+import h5py
+import numpy as np
+
+import drift_decomposition
+from field_io import read_field_frame
+from tracer_tag_index import get_tracer_frames
+
+# The parallel and perpendicular electric field terms keep the indices 0 and
+# 1 of the acc_rate_dist_<s>_<t>.gda files. The other terms should be
+# selected by name.
+VAR_NAMES = ['jpara_dote', 'jperp_dote', 'curv_dote', 'grad_dote']
+
+
+def symmetric_alpha_index(alpha, alpha_bins):
+    """Index of the symmetric acceleration-rate bins
+
+    With nalpha0 = nalpha + 1, the bins [nalpha0, 2*nalpha0) are for
+    alpha >= 0: [0, alpha_bins[0]), [alpha_bins[0], alpha_bins[1]), ...,
+    [alpha_bins[-1], inf). The bins for alpha < 0 are their mirror images.
+
+    Args:
+        alpha: acceleration rates
+        alpha_bins: positive bin edges of the acceleration rates
+    """
+    nalpha0 = len(alpha_bins) + 1
+    ialpha = np.searchsorted(alpha_bins, np.abs(alpha), side='right')
+    return np.where(alpha >= 0, nalpha0 + ialpha, nalpha0 - 1 - ialpha)
+
+
+def energy_index(ene, ebins):
+    """Index of the logarithmic energy bins, -1 when out of range
+
+    Args:
+        ene: particle energies
+        ebins: logarithmic energy bins
+    """
+    nbins = len(ebins)
+    dloge = math.log10(ebins[1]) - math.log10(ebins[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iene = np.floor((np.log10(ene) - math.log10(ebins[0])) / dloge)
+    iene[~np.isfinite(iene)] = -1
+    iene[iene >= nbins] = -1
+    return iene.astype(np.int64)
+
+
+def acc_rate_dist_chunk(ene, rates, ebins, alpha_bins):
+    """Joint distributions of one chunk of particles
+
+    All the variables and bins are flattened into one index, so that the
+    particle number, energization rate and its square each need only one
+    bincount.
+
+    Args:
+        ene: (nptl, ) particle energies
+        rates: (nvar, nptl) energization rates of all variables
+        ebins: energy bins
+        alpha_bins: positive bin edges of the acceleration rates
+    Returns:
+        fdist: (nvar, nbins, (nalpha+1)*6) distributions
+    """
+    nvar = rates.shape[0]
+    nbins = len(ebins)
+    nalpha_sym = (len(alpha_bins) + 1) * 2
+    iene = energy_index(ene, ebins)
+    valid = iene >= 0
+    iene = iene[valid]
+    rates = rates[:, valid]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = rates / ene[valid]
+    alpha = np.nan_to_num(alpha)
+    ialpha = symmetric_alpha_index(alpha, alpha_bins)
+    ivar = np.arange(nvar)[:, None]
+    iflat = ((ivar * nbins + iene[None, :]) * nalpha_sym + ialpha).ravel()
+    ntot = nvar * nbins * nalpha_sym
+    weights = np.nan_to_num(rates).ravel()
+    fdist = np.zeros((nvar, nbins, nalpha_sym * 3))
+    fdist[:, :, :nalpha_sym] = \
+        np.bincount(iflat, minlength=ntot).reshape(nvar, nbins, nalpha_sym)
+    fdist[:, :, nalpha_sym:nalpha_sym*2] = \
+        np.bincount(iflat, weights=weights,
+                    minlength=ntot).reshape(nvar, nbins, nalpha_sym)
+    fdist[:, :, nalpha_sym*2:] = \
+        np.bincount(iflat, weights=weights**2,
+                    minlength=ntot).reshape(nvar, nbins, nalpha_sym)
+    return fdist
+
+
+def tracer_grid(pic_info, ndim):
+    """Grid coordinates of the field frames along each of their axes
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        ndim: number of dimensions of the field frames
+    Returns:
+        coords: for each axis of the frames, the grid coordinates in de,
+            the name of the tracer position along it and the component
+    """
+    smime = math.sqrt(pic_info.mime)
+    coords = [(np.asarray(pic_info.z_di) * smime, 'dZ', 'z'),
+              (np.asarray(pic_info.x_di) * smime, 'dX', 'x')]
+    if ndim == 3:
+        coords.insert(1, (np.asarray(pic_info.y_di) * smime, 'dY', 'y'))
+    return coords
+
+
+def bfield_gradients(bfield, coords, ptl):
+    """Magnetic field gradients at the grid points nearest to the particles
+
+    The gradients are the central differences of the field frames, and
+    one-sided differences at the boundaries. Only the grid points next to
+    the particles are read, so the frames can be memory-mapped.
+
+    Args:
+        bfield: dictionary of the bx, by and bz frames
+        coords: grid coordinates from tracer_grid
+        ptl: dictionary of the particle positions in de
+    Returns:
+        grads: dictionary of the dB<j>_d<i> at the particles
+    """
+    index = []
+    for grid, pos, _ in coords:
+        if len(grid) > 1:
+            igrid = np.rint((ptl[pos] - grid[0]) / (grid[1] - grid[0]))
+            igrid = np.clip(igrid.astype(np.int64), 0, len(grid) - 1)
+        else:
+            igrid = np.zeros(len(ptl[pos]), dtype=np.int64)
+        index.append(igrid)
+    nptl = len(index[0])
+    grads = {}
+    for keys in drift_decomposition.gradient_keys():
+        for key in keys:
+            grads[key] = np.zeros(nptl)
+    for iaxis, (grid, _, ci) in enumerate(coords):
+        if len(grid) < 2:
+            continue
+        ilow = np.maximum(index[iaxis] - 1, 0)
+        ihigh = np.minimum(index[iaxis] + 1, len(grid) - 1)
+        dist = (ihigh - ilow) * (grid[1] - grid[0])
+        index_low = list(index)
+        index_low[iaxis] = ilow
+        index_high = list(index)
+        index_high[iaxis] = ihigh
+        for cj in drift_decomposition.COMPONENTS:
+            fdata = bfield[cj]
+            grads['dB' + cj + '_d' + ci] = \
+                (fdata[tuple(index_high)] - fdata[tuple(index_low)]) / dist
+    return grads
+
+
+def tracer_rates(fname, tindex, species, pic_info, data_dir,
+                 chunk_size=2**22):
+    """Energies and energization rates from a tracer file, chunk by chunk
+
+    The tracer file should include the fields at the particle positions.
+    The magnetic field gradients are calculated from the field frame at
+    the same time.
+
+    Args:
+        fname: tracer file name
+        tindex: time index
+        species: particle species
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the field .gda files
+        chunk_size: number of particles in each chunk
+    Yields:
+        ene: (nptl, ) particle kinetic energies (gamma - 1) * m/m_e, in
+            m_e c^2 as the rates
+        rates: (nvar, nptl) rates of VAR_NAMES
+    """
+    if species in ["e", "electron"]:
+        pmass, pcharge = 1.0, -1.0
+    else:
+        pmass, pcharge = pic_info.mime, 1.0
+    tframe = tindex // pic_info.fields_interval
+    bfield = {}
+    for comp in drift_decomposition.COMPONENTS:
+        bfield[comp] = read_field_frame(pic_info, data_dir, 'b' + comp,
+                                        tframe)
+    coords = tracer_grid(pic_info, bfield['x'].ndim)
+    dset_names = ['Ux', 'Uy', 'Uz', 'Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz']
+    dset_names += [pos for _, pos, _ in coords]
+    dt = pic_info.dtwpe * pic_info.tracer_interval
+    with h5py.File(fname, 'r') as fh:
+        group = fh['Step#' + str(tindex)]
+        nptl, = group['Ux'].shape
+        for istart in range(0, nptl, chunk_size):
+            iend = min(istart + chunk_size, nptl)
+            ptl = {}
+            for dname in dset_names:
+                ptl[dname] = group[dname][istart:iend]
+            ptl.update(bfield_gradients(bfield, coords, ptl))
+            for dname in ptl:
+                ptl[dname] = ptl[dname][None, :]
+            rates, gamma = drift_decomposition.drift_rates_chunk(ptl, dt, pmass,
+                                                                 pcharge)
+            rates = np.stack([rates['jpara_dote'][0],
+                              rates['jdote'][0] - rates['jpara_dote'][0],
+                              rates['curv_dote'][0],
+                              rates['grad_dote'][0]])
+            yield (gamma[0] - 1) * pmass, rates
+
+
+class AccRateDistFile(object):
+    """All frames of the joint distributions in one HDF5 file
+    """
+    def __init__(self, fname, ebins=None, alpha_bins=None, var_names=None):
+        """
+        Args:
+            fname: HDF5 file name
+            ebins: energy bins. Only needed when creating the file.
+            alpha_bins: positive bin edges of the acceleration rates.
+                Only needed when creating the file.
+            var_names: names of the variables. Only needed when creating
+                the file.
+        """
+        self.fname = fname
+        if not os.path.isfile(fname):
+            nvar = len(var_names)
+            nbins = len(ebins)
+            nalpha_sym = (len(alpha_bins) + 1) * 2
+            with h5py.File(fname, 'w') as fh:
+                fh.create_dataset('ebins', data=ebins)
+                fh.create_dataset('alpha_bins', data=alpha_bins)
+                fh.create_dataset('tindex', (0, ), maxshape=(None, ),
+                                  dtype=np.int64)
+                fh.create_dataset('fdist', (0, nvar, nbins, nalpha_sym * 3),
+                                  maxshape=(None, nvar, nbins, nalpha_sym * 3),
+                                  chunks=(1, nvar, nbins, nalpha_sym * 3),
+                                  dtype=np.float64)
+                fh.attrs['var_names'] = np.bytes_(','.join(var_names))
+        with h5py.File(fname, 'r') as fh:
+            self.ebins = fh['ebins'][:]
+            self.alpha_bins = fh['alpha_bins'][:]
+            self.tindices = list(fh['tindex'][:])
+            self.var_names = fh.attrs['var_names'].decode().split(',')
+
+    def has_frame(self, tindex):
+        """Whether a time frame is already in the file
+        """
+        return tindex in self.tindices
+
+    def append_frame(self, tindex, fdist):
+        """Append one time frame
+        """
+        with h5py.File(self.fname, 'a') as fh:
+            nframe = len(self.tindices)
+            fh['tindex'].resize((nframe + 1, ))
+            fh['tindex'][nframe] = tindex
+            fh['fdist'].resize(nframe + 1, axis=0)
+            fh['fdist'][nframe] = fdist
+        self.tindices.append(tindex)
+
+    def read_frame(self, tindex):
+        """Read one time frame
+
+        Returns:
+            (nalpha, nbins, nvar, ebins, alpha_bins, fdist) as in the
+            acc_rate_dist_<s>_<t>.gda files
+        """
+        iframe = self.tindices.index(tindex)
+        with h5py.File(self.fname, 'r') as fh:
+            fdist = fh['fdist'][iframe]
+        nvar, nbins, _ = fdist.shape
+        return (len(self.alpha_bins), nbins, nvar, self.ebins,
+                self.alpha_bins, fdist)
+
+
+def build_frame(rates_chunks, ebins, alpha_bins, nvar):
+    """Joint distributions of one frame from chunks of energies and rates
+    """
+    nalpha_sym = (len(alpha_bins) + 1) * 2
+    fdist = np.zeros((nvar, len(ebins), nalpha_sym * 3))
+    for ene, rates in rates_chunks:
+        fdist += acc_rate_dist_chunk(ene, rates, ebins, alpha_bins)
+    return fdist
+
+
+def update_acc_rate_dist(pic_info, species, tracer_dir, data_dir, fname,
+                         ebins, alpha_bins, chunk_size=2**22):
+    """Add the frames of new tracer dumps to the distribution file
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        species: particle species
+        tracer_dir: tracer directory with T.<tindex> sub-directories
+        data_dir: directory of the field .gda files
+        fname: file name of the distributions
+        ebins: energy bins
+        alpha_bins: positive bin edges of the acceleration rates
+        chunk_size: number of particles in each chunk
+    """
+    sname = "electron" if species in ["e", "electron"] else "H"
+    var_names = VAR_NAMES
+    dist_file = AccRateDistFile(fname, ebins, alpha_bins, var_names)
+    for tindex in get_tracer_frames(tracer_dir):
+        if dist_file.has_frame(tindex):
+            continue
+        fname_tracer = (tracer_dir + 'T.' + str(tindex) + '/' + sname +
+                        '_tracer_qtag_sorted.h5p')
+        if not os.path.isfile(fname_tracer):
+            continue
+        print("Time index: %d" % tindex)
+        rates_chunks = tracer_rates(fname_tracer, tindex, species,
+                                    pic_info, data_dir, chunk_size)
+        fdist = build_frame(rates_chunks, dist_file.ebins,
+                            dist_file.alpha_bins, len(var_names))
+        dist_file.append_frame(tindex, fdist)
+    return dist_file
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Acceleration rate distributions')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--species', action="store", default="e",
+                        help='particle species')
+    parser.add_argument('--emin', action="store", default=1E-4, type=float,
+                        help='minimum energy (gamma - 1)')
+    parser.add_argument('--emax', action="store", default=1E4, type=float,
+                        help='maximum energy (gamma - 1)')
+    parser.add_argument('--nbins', action="store", default=80, type=int,
+                        help='number of energy bins')
+    parser.add_argument('--alpha_min', action="store", default=1E-6,
+                        type=float, help='minimum acceleration rate')
+    parser.add_argument('--alpha_max', action="store", default=1E0,
+                        type=float, help='maximum acceleration rate')
+    parser.add_argument('--nalpha', action="store", default=60, type=int,
+                        help='number of acceleration rate bins')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    from shell_functions import mkdir_p
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    ebins = np.logspace(math.log10(args.emin), math.log10(args.emax),
+                        args.nbins)
+    alpha_bins = np.logspace(math.log10(args.alpha_min),
+                             math.log10(args.alpha_max), args.nalpha)
+    fpath = "../data/particle_interp/" + args.pic_run + "/"
+    mkdir_p(fpath)
+    fname = fpath + "acc_rate_dist_" + args.species + ".h5"
+    pic_run_dir = os.path.join(args.pic_run_dir, '')
+    tracer_dir = pic_run_dir + 'tracer/tracer1/'
+    data_dir = pic_run_dir + 'data/'
+    update_acc_rate_dist(pic_info, args.species, tracer_dir, data_dir, fname,
+                         ebins, alpha_bins)
+
+
+if __name__ == "__main__":
+    main()
@@ -738,6 +738,8 @@ def plot_epara_eperp(pic_info, ct, root_dir='../../'):
         'x': x,
         'z': z,
         'Ay': Ay_data,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -909,6 +911,8 @@ def plot_jpara_dote(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -1039,6 +1043,8 @@ def plot_jdotes_fields(run_name, root_dir, pic_info, species, ct, srange,
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -4301,6 +4307,8 @@ def plot_velocity_fields(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
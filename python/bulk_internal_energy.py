@@ -22,7 +22,7 @@ from scipy.interpolate import interp1d
 from scipy.ndimage.filters import generic_filter as gf
 
 import pic_information
-from contour_plots import plot_2d_contour, read_2d_fields
+from contour_plots import plot_2d_contour, plot_ay_contours, read_2d_fields
 from energy_conversion import read_jdote_data
 from runs_name_path import ApJ_long_paper_runs
 from serialize_json import data_to_json, json_to_data
@@ -69,7 +69,6 @@ def bulk_energy(pic_info, species, current_time):
     x, z, pyy = read_2d_fields(pic_info, fname, **kwargs)
     fname = "../../data/p" + species + "-zz.gda"
     x, z, pzz = read_2d_fields(pic_info, fname, **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
 
     if species == 'e':
         ptl_mass = 1.0
@@ -99,17 +98,12 @@ def bulk_energy(pic_info, species, current_time):
         "vmin": 0.1,
         "vmax": 10.0
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, bulk_ene / internal_ene, ax1, fig,
                                 **kwargs_plot)
     p1.set_cmap(plt.cm.seismic)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     # ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(axis='x', labelbottom='off')
@@ -128,16 +122,11 @@ def bulk_energy(pic_info, species, current_time):
     else:
         vmax = 0.8
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": 0, "vmax": vmax}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p2, cbar2 = plot_2d_contour(x, z, bulk_ene, ax2, fig, **kwargs_plot)
     p2.set_cmap(plt.cm.nipy_spectral)
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax2.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax2.tick_params(axis='x', labelbottom='off')
     ax2.tick_params(labelsize=20)
@@ -151,16 +140,11 @@ def bulk_energy(pic_info, species, current_time):
     ys -= height + 0.05
     ax3 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": 0, "vmax": 0.8}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p3, cbar3 = plot_2d_contour(x, z, internal_ene, ax3, fig, **kwargs_plot)
     p3.set_cmap(plt.cm.nipy_spectral)
-    ax3.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax3, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax3.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax3.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax3.tick_params(labelsize=20)
@@ -237,7 +221,6 @@ def bulk_energy_change_rate(pic_info, species, current_time):
         "zb": -15,
         "zt": 15
     }
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
 
     bulk_ene_rate = bulk_ene2 - bulk_ene1
 
@@ -250,16 +233,11 @@ def bulk_energy_change_rate(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": 0.1, "vmax": -0.1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, bulk_ene_rate, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.seismic)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -3,12 +3,11 @@ Analysis procedures for combining particle energy spectrum
 """
 import argparse
 import math
-import multiprocessing
 
 import numpy as np
-from joblib import Parallel, delayed
 
 from json_functions import read_data_from_json
+from memory_scheduler import run_tasks
 from shell_functions import mkdir_p
 
 # define some spectrum parameters here
@@ -17,7 +16,8 @@ EMIN = 1E-5
 EMAX = 1E3
 INCLUDE_BFIELDS = False
 
-def combine_energy_spectrum(run_dir, run_name, tframe, species='e'):
+def combine_energy_spectrum(run_dir, run_name, tframe, species='e',
+                            tindex=None):
     """Combine particle energy spectrum from different mpi_rank
 
     Args:
@@ -25,6 +25,8 @@ def combine_energy_spectrum(run_dir, run_name, tframe, species='e'):
         run_name: PIC simulation run name
         tframe: time frame
         species: 'e' for electrons, 'H' for ions
+        tindex: time index of the spectrum dump. Default is
+            tframe * fields_interval.
     """
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
@@ -32,7 +34,8 @@ def combine_energy_spectrum(run_dir, run_name, tframe, species='e'):
     mpi_size = pic_info.topology_x * pic_info.topology_y * pic_info.topology_z
     rank = 0
     ndata = (NBINS + 3) if INCLUDE_BFIELDS else NBINS
-    tindex = tframe * interval
+    if tindex is None:
+        tindex = tframe * interval
     fname_pre = run_dir + 'hydro/T.' + str(tindex)
     if species == 'h':
         species = 'H'
@@ -97,12 +100,10 @@ def main():
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
     if args.multi_frames:
-        ncores = multiprocessing.cpu_count()
         tframes = range(pic_info.ntf)
-        Parallel(n_jobs=ncores)(delayed(process_input)(run_dir,
-                                                       run_name,
-                                                       tframe)
-                                for tframe in tframes)
+        run_tasks(process_input,
+                  [(run_dir, run_name, tframe) for tframe in tframes],
+                  labels=list(tframes))
     else:
         combine_energy_spectrum(run_dir, run_name,
                                 args.tframe, species=args.species)
@@ -13,6 +13,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 from joblib import Parallel, delayed
 from matplotlib import rc
+from matplotlib.collections import LineCollection
 from matplotlib.colors import LogNorm
 from matplotlib.ticker import MaxNLocator
 from mpl_toolkits.axes_grid1 import make_axes_locatable
@@ -21,13 +22,17 @@ from scipy import signal
 from scipy.fftpack import fft2, fftshift, ifft2
 from scipy.ndimage.filters import generic_filter as gf
 
-import color_maps as cm
-import colormap.colormaps as cmaps
 import pic_information
 from energy_conversion import read_data_from_json
+from field_io import read_2d_fields
+from flux_function import ay_contours, read_2d_ay
+from lazy_import import lazy_import
 from runs_name_path import ApJ_long_paper_runs
 from shell_functions import mkdir_p
 
+cm = lazy_import('color_maps')
+cmaps = lazy_import('colormap.colormaps')
+
 rc('font', **{'family': 'serif', 'serif': ['Computer Modern']})
 mpl.rc('text', usetex=True)
 mpl.rcParams['text.latex.preamble'] = [r"\usepackage{amsmath}"]
@@ -42,58 +47,6 @@ font = {
 mpl.rcParams['contour.negative_linestyle'] = 'solid'
 
 
-def read_2d_fields(pic_info, fname, current_time, xl, xr, zb, zt):
-    """Read 2D fields data from file.
-    
-    Args:
-        pic_info: namedtuple for the PIC simulation information.
-        fname: the filename.
-        current_time: current time frame.
-        xl, xr: left and right x position in di (ion skin length).
-        zb, zt: top and bottom z position in di.
-    """
-    print("Reading data from %s" % fname)
-    print("xrange: (%f, %f)" % (xl, xr))
-    print("zrange: (%f, %f)" % (zb, zt))
-    nx = pic_info.nx
-    nz = pic_info.nz
-    x_di = np.copy(pic_info.x_di)
-    z_di = np.copy(pic_info.z_di)
-    dx_di = pic_info.dx_di
-    dz_di = pic_info.dz_di
-    xmin = np.min(x_di)
-    xmax = np.max(x_di)
-    zmin = np.min(z_di)
-    zmax = np.max(z_di)
-    if (xl <= xmin):
-        xl_index = 0
-    else:
-        xl_index = int(math.floor((xl - xmin) / dx_di))
-    if (xr >= xmax):
-        xr_index = nx - 1
-    else:
-        xr_index = int(math.ceil((xr - xmin) / dx_di))
-    if (zb <= zmin):
-        zb_index = 0
-    else:
-        zb_index = int(math.floor((zb - zmin) / dz_di))
-    if (zt >= zmax):
-        zt_index = nz - 1
-    else:
-        zt_index = int(math.ceil((zt - zmin) / dz_di))
-    nx1 = xr_index - xl_index + 1
-    nz1 = zt_index - zb_index + 1
-    fp = np.zeros((nz1, nx1), dtype=np.float32)
-    offset = nx * nz * current_time * 4
-    fdata = np.memmap(fname, dtype='float32',
-                      mode='r', offset=offset,
-                      shape=(nz, nx), order='C')
-    xc = x_di[xl_index:xr_index + 1]
-    zc = z_di[zb_index:zt_index + 1]
-    fp = fdata[zb_index:zt_index + 1, xl_index:xr_index + 1]
-    return (xc, zc, fp)
-
-
 def plot_2d_contour(x, z, field_data, ax, fig, is_cbar=1, **kwargs):
     """Plot contour of 2D fields.
 
@@ -156,6 +109,27 @@ def plot_2d_contour(x, z, field_data, ax, fig, is_cbar=1, **kwargs):
         return p1
 
 
+def plot_ay_contours(ax, pic_info, data_dir, current_time, nlevels=10,
+                     levels=None, **kwargs):
+    """Overlay the contour lines of Ay, which are calculated only once
+
+    Args:
+        ax: axes of the plot
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        current_time: current time frame.
+        nlevels: number of contour levels
+        levels: contour levels, instead of nlevels evenly spaced ones
+        kwargs: LineCollection arguments, e.g. colors and linewidths
+    """
+    levels, lines = ay_contours(pic_info, data_dir, current_time, nlevels,
+                                levels=levels)
+    segments = [line for level_lines in lines for line in level_lines]
+    collection = LineCollection(segments, **kwargs)
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
 def plot_jy(pic_info, species, current_time):
     """Plot out-of-plane current density.
 
@@ -173,7 +147,6 @@ def plot_jy(pic_info, species, current_time):
         "zt": 20
     }
     x, z, jy = read_2d_fields(pic_info, "../../data/jy.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -183,17 +156,12 @@ def plot_jy(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.5, "vmax": 0.5}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, jy, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -235,7 +203,6 @@ def plot_absB_jy(pic_info, species, current_time):
     }
     x, z, jy = read_2d_fields(pic_info, "../../data/jy.gda", **kwargs)
     x, z, absB = read_2d_fields(pic_info, "../../data/absB.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.8
@@ -246,17 +213,12 @@ def plot_absB_jy(pic_info, species, current_time):
     fig = plt.figure(figsize=[7, 5])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": 0, "vmax": 2.0}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, absB, ax1, fig, **kwargs_plot)
     # p1.set_cmap(plt.cm.get_cmap('seismic'))
     p1.set_cmap(cmaps.plasma)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax1.tick_params(labelsize=16)
     ax1.tick_params(axis='x', labelbottom='off')
@@ -277,16 +239,11 @@ def plot_absB_jy(pic_info, species, current_time):
     ys -= height + gap
     ax2 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.5, "vmax": 0.5}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p2, cbar2 = plot_2d_contour(x, z, jy, ax2, fig, **kwargs_plot)
     p2.set_cmap(plt.cm.get_cmap('seismic'))
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax2.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax2.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax2.tick_params(labelsize=16)
@@ -334,7 +291,7 @@ def plot_by_multi():
     fname1 = base_dir + 'data/jy.gda'
     fname2 = base_dir + 'data/Ay.gda'
     x, z, by1 = read_2d_fields(pic_info, fname1, **kwargs)
-    x, z, Ay1 = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay1 = read_2d_ay(pic_info, fname2, **kwargs)
     kwargs["current_time"] = ct2
     base_dir = base_dirs[5]
     run_name = run_names[5]
@@ -343,7 +300,7 @@ def plot_by_multi():
     fname1 = base_dir + 'data/by.gda'
     fname2 = base_dir + 'data/Ay.gda'
     x, z, by2 = read_2d_fields(pic_info, fname1, **kwargs)
-    x, z, Ay2 = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay2 = read_2d_ay(pic_info, fname2, **kwargs)
     kwargs["current_time"] = ct3
     base_dir = base_dirs[6]
     run_name = run_names[6]
@@ -352,7 +309,7 @@ def plot_by_multi():
     fname1 = base_dir + 'data/by.gda'
     fname2 = base_dir + 'data/Ay.gda'
     x, z, by3 = read_2d_fields(pic_info, fname1, **kwargs)
-    x, z, Ay3 = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay3 = read_2d_ay(pic_info, fname2, **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -480,13 +437,10 @@ def plot_by(pic_info):
     ct1, ct2, ct3 = 10, 20, 35
     kwargs = {"current_time": ct1, "xl": 0, "xr": 200, "zb": -10, "zt": 10}
     x, z, by1 = read_2d_fields(pic_info, "../../data/by.gda", **kwargs)
-    x, z, Ay1 = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     kwargs["current_time"] = ct2
     x, z, by2 = read_2d_fields(pic_info, "../../data/by.gda", **kwargs)
-    x, z, Ay2 = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     kwargs["current_time"] = ct3
     x, z, by3 = read_2d_fields(pic_info, "../../data/by.gda", **kwargs)
-    x, z, Ay3 = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -499,8 +453,6 @@ def plot_by(pic_info):
 
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -1.0, "vmax": 1.0}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1 = plot_2d_contour(x, z, by1, ax1, fig, is_cbar=0, **kwargs_plot)
     xs1 = xs + width * 1.02
     ys1 = ys - 2 * (height + gap)
@@ -510,12 +462,9 @@ def plot_by(pic_info):
     cbar1 = fig.colorbar(p1, cax=cax)
     cbar1.ax.tick_params(labelsize=16)
     p1.set_cmap(plt.cm.get_cmap('bwr'))
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay1[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", ct1,
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax1.tick_params(labelsize=16)
     ax1.tick_params(axis='x', labelbottom='off')
@@ -539,12 +488,9 @@ def plot_by(pic_info):
     ax2 = fig.add_axes([xs, ys, width, height])
     p2 = plot_2d_contour(x, z, by2, ax2, fig, is_cbar=0, **kwargs_plot)
     p2.set_cmap(plt.cm.get_cmap('bwr'))
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay2[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", ct2,
+        colors='black', linewidths=0.5)
     ax2.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax2.tick_params(labelsize=16)
     ax2.tick_params(axis='x', labelbottom='off')
@@ -566,12 +512,9 @@ def plot_by(pic_info):
     ax3 = fig.add_axes([xs, ys, width, height])
     p3 = plot_2d_contour(x, z, by3, ax3, fig, is_cbar=0, **kwargs_plot)
     p3.set_cmap(plt.cm.get_cmap('bwr'))
-    ax3.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay3[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax3, pic_info, "../../data/", ct3,
+        colors='black', linewidths=0.5)
     ax3.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax3.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax3.tick_params(labelsize=16)
@@ -730,7 +673,7 @@ def plot_vx(pic_info, species, ct, run_name, shock_pos, base_dir='../../'):
     fname = base_dir + 'data1/v' + species + 'x.gda'
     x, z, vx = read_2d_fields(pic_info, fname, **kwargs)
     fname = base_dir + 'data1/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     nx, = x.shape
     nz, = z.shape
     vx_cum = np.sum(vx, axis=0) / nz
@@ -745,19 +688,13 @@ def plot_vx(pic_info, species, ct, run_name, shock_pos, base_dir='../../'):
     fig = plt.figure(figsize=[10, 12])
     ax1 = fig.add_axes([xs, ys, w1, h1])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -0.1, "vmax": 0.1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, vx, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.jet)
     nlevels = 20
     levels = np.linspace(np.min(Ay), np.max(Ay), nlevels)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax1, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax1.set_xlim([xmin, xmax])
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -816,7 +753,7 @@ def get_anisotropy_data(pic_info, species, ct, rootpath='../../'):
     x, z, by = read_2d_fields(pic_info, rootpath + "data/by.gda", **kwargs)
     x, z, bz = read_2d_fields(pic_info, rootpath + "data/bz.gda", **kwargs)
     x, z, absB = read_2d_fields(pic_info, rootpath + "data/absB.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, rootpath + "data/Ay.gda", **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, rootpath + "data/Ay.gda", **kwargs)
     ppara = pxx*bx*bx + pyy*by*by + pzz*bz*bz + \
             pxy*bx*by*2.0 + pxz*bx*bz*2.0 + pyz*by*bz*2.0
     ppara /= absB * absB
@@ -974,7 +911,6 @@ def plot_beta_rho(pic_info):
     x, z, pezz = read_2d_fields(pic_info, "../../data/pe-zz.gda", **kwargs)
     x, z, absB = read_2d_fields(pic_info, "../../data/absB.gda", **kwargs)
     x, z, eEB05 = read_2d_fields(pic_info, "../../data/eEB05.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     beta_e = (pexx + peyy + pezz) * 2 / (3 * absB**2)
@@ -991,16 +927,11 @@ def plot_beta_rho(pic_info):
         "vmin": 0.01,
         "vmax": 10
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, beta_e, ax1, fig, **kwargs_plot)
     p1.set_cmap(cmaps.plasma)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax1.tick_params(axis='x', labelbottom='off')
     ax1.set_title(r'$\beta_e$', fontsize=24)
 
@@ -1012,12 +943,9 @@ def plot_beta_rho(pic_info):
     # p2.set_cmap(cmaps.inferno)
     p2.set_cmap(cmaps.plasma)
     # p2.set_cmap(cmaps.viridis)
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax2.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax2.set_title(r'$n_{acc}/n_e$', fontsize=24)
     cbar2.set_ticks(np.arange(0.2, 1.0, 0.2))
@@ -1039,7 +967,6 @@ def plot_jdote_2d(pic_info):
                                       **kwargs)
     x, z, agyp = read_2d_fields(pic_info, "../data1/agyrotropy00_e.gda",
                                 **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../data/Ay.gda", **kwargs)
     jdote_norm = 1E3
     jcpara_dote *= jdote_norm
     jgrad_dote *= jdote_norm
@@ -1053,16 +980,11 @@ def plot_jdote_2d(pic_info):
     fig = plt.figure(figsize=(7, 5))
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -1, "vmax": 1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, jcpara_dote, ax1, fig, **kwargs_plot)
     p1.set_cmap(cmaps.viridis)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     cbar1.set_ticks(np.arange(-0.8, 1.0, 0.4))
     ax1.tick_params(axis='x', labelbottom='off')
     ax1.text(
@@ -1079,12 +1001,9 @@ def plot_jdote_2d(pic_info):
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -1, "vmax": 1}
     p2, cbar2 = plot_2d_contour(x, z, jcpara_dote, ax2, fig, **kwargs_plot)
     p2.set_cmap(cmaps.viridis)
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     cbar2.set_ticks(np.arange(-0.8, 1.0, 0.4))
     ax2.tick_params(axis='x', labelbottom='off')
     ax2.text(
@@ -1101,12 +1020,9 @@ def plot_jdote_2d(pic_info):
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": 0, "vmax": 1.5}
     p3, cbar3 = plot_2d_contour(x, z, agyp, ax3, fig, **kwargs_plot)
     p3.set_cmap(cmaps.viridis)
-    ax3.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax3, pic_info, "../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     cbar3.set_ticks(np.arange(0, 1.6, 0.4))
     ax3.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax3.text(
@@ -1130,7 +1046,7 @@ def plot_phi_parallel(ct, pic_info):
     kwargs = {"current_time": ct, "xl": 0, "xr": 200, "zb": -20, "zt": 20}
     x, z, phi_para = read_2d_fields(pic_info, "../../data1/phi_para.gda",
                                     **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, "../../data/Ay.gda", **kwargs)
 
     # phi_para_new = phi_para
     nk = 7
@@ -1172,18 +1088,13 @@ def plot_phi_parallel(ct, pic_info):
     fig = plt.figure(figsize=(10, 5))
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.05, "vmax": 0.05}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     im1, cbar1 = plot_2d_contour(x, z, phi_para_new, ax1, fig, **kwargs_plot)
     #im1 = plt.imshow(data.real, vmin=-0.1, vmax=0.1)
     im1.set_cmap(plt.cm.seismic)
 
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5,
         levels=np.arange(np.min(Ay), np.max(Ay), 15))
     # cbar1.set_ticks(np.arange(-0.2, 0.2, 0.05))
     #ax1.tick_params(axis='x', labelbottom='off')
@@ -1211,7 +1122,6 @@ def plot_Ey(pic_info, species, current_time):
         "zt": 50
     }
     x, z, ey = read_2d_fields(pic_info, "../../data/ey.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -1221,16 +1131,11 @@ def plot_Ey(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.1, "vmax": 0.1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, ey, ax1, fig, **kwargs_plot)
     p1.set_cmap(cmaps.plasma)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -1271,7 +1176,6 @@ def plot_jy_Ey(pic_info, species, current_time):
     }
     x, z, ey = read_2d_fields(pic_info, "../data/ey.gda", **kwargs)
     x, z, jy = read_2d_fields(pic_info, "../data/jy.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -1281,16 +1185,11 @@ def plot_jy_Ey(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.01, "vmax": 0.01}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, jy * ey, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.seismic)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -1342,8 +1241,6 @@ def plot_jpolar_dote(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -1, "vmax": 1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, jpolar_dote, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.seismic)
     # ax1.contour(x[0:nx:xstep], z[0:nz:zstep], Ay[0:nz:zstep, 0:nx:xstep], 
@@ -1372,7 +1269,7 @@ def plot_epara(pic_info, species, current_time):
     x, z, ex = read_2d_fields(pic_info, "../../data/ex.gda", **kwargs)
     x, z, ey = read_2d_fields(pic_info, "../../data/ey.gda", **kwargs)
     x, z, ez = read_2d_fields(pic_info, "../../data/ez.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, "../../data/Ay.gda", **kwargs)
 
     absE = np.sqrt(ex * ex + ey * ey + ez * ez)
     epara = (ex * bx + ey * by + ez * bz) / absB
@@ -1393,20 +1290,15 @@ def plot_epara(pic_info, species, current_time):
     fig = plt.figure(figsize=[7, 5])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": 0, "vmax": 0.1}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, eperp, ax1, fig, **kwargs_plot)
     # p1.set_cmap(cmaps.inferno)
     p1.set_cmap(plt.cm.get_cmap('hot'))
     Ay_min = np.min(Ay)
     Ay_max = np.max(Ay)
     levels = np.linspace(Ay_min, Ay_max, 10)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='white',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='white', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     # ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(axis='x', labelbottom='off')
@@ -1432,12 +1324,9 @@ def plot_epara(pic_info, species, current_time):
     p2, cbar2 = plot_2d_contour(x, z, epara, ax2, fig, **kwargs_plot)
     p2.set_cmap(plt.cm.seismic)
     # p2.set_cmap(cmaps.plasma)
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax2.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax2.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax2.tick_params(labelsize=16)
@@ -1491,7 +1380,6 @@ def plot_diff_fields(pic_info, species, current_time):
         "zt": 20
     }
     x, z, data = read_2d_fields(pic_info, "../../data/absB.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -1501,8 +1389,6 @@ def plot_diff_fields(pic_info, species, current_time):
     fig = plt.figure(figsize=[10, 4])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.01, "vmax": 0.01}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     data_new = np.zeros((nz, nx))
     # data_new[:, 0:nx-1] = data[:, 1:nx] - data[:, 0:nx-1]
     data_new[0:nz - 1, :] = data[1:nz, :] - data[0:nz - 1, :]
@@ -1512,12 +1398,9 @@ def plot_diff_fields(pic_info, species, current_time):
     p1, cbar1 = plot_2d_contour(x, z, data_new, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -1550,7 +1433,6 @@ def plot_jpara_perp(pic_info, species, current_time):
     }
     x, z, data = read_2d_fields(pic_info, "../../data1/jqnvperp_dote00_e.gda",
                                 **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     nx, = x.shape
     nz, = z.shape
     width = 0.75
@@ -1561,8 +1443,6 @@ def plot_jpara_perp(pic_info, species, current_time):
     ax1 = fig.add_axes([xs, ys, width, height])
     dmax = -0.0005
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -dmax, "vmax": dmax}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     data_new = np.zeros((nz, nx))
     ng = 5
     kernel = np.ones((ng, ng)) / float(ng * ng)
@@ -1570,12 +1450,9 @@ def plot_jpara_perp(pic_info, species, current_time):
     p1, cbar1 = plot_2d_contour(x, z, data_new, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -1616,7 +1493,6 @@ def plot_ux(pic_info, species, current_time):
         fname = "../../data/uix.gda"
     x, z, uix = read_2d_fields(pic_info, fname, **kwargs)
     x, z, ni = read_2d_fields(pic_info, "../../data/ni.gda", **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     wpe_wce = pic_info.dtwce / pic_info.dtwpe
     va = wpe_wce / math.sqrt(pic_info.mime)  # Alfven speed of inflow region
     ux = (uex * ne + uix * ni * pic_info.mime) / (ne + ni * pic_info.mime)
@@ -1635,17 +1511,12 @@ def plot_ux(pic_info, species, current_time):
     fig = plt.figure(figsize=[7, 5])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -1.0, "vmax": 1.0}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, ux, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax1.tick_params(axis='x', labelbottom='off')
     ax1.tick_params(labelsize=16)
@@ -1717,7 +1588,6 @@ def plot_uy(pic_info, current_time):
     if not os.path.isfile(fname):
         fname = "../../data/uiy.gda"
     x, z, uiy = read_2d_fields(pic_info, fname, **kwargs)
-    x, z, Ay = read_2d_fields(pic_info, "../../data/Ay.gda", **kwargs)
     wpe_wce = pic_info.dtwce / pic_info.dtwpe
     va = wpe_wce / math.sqrt(pic_info.mime)  # Alfven speed of inflow region
     uey /= va
@@ -1732,17 +1602,12 @@ def plot_uy(pic_info, current_time):
     fig = plt.figure(figsize=[7, 5])
     ax1 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": -0.5, "vmax": 0.5}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, uey, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax1, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax1.tick_params(axis='x', labelbottom='off')
     ax1.tick_params(labelsize=16)
@@ -1763,17 +1628,12 @@ def plot_uy(pic_info, current_time):
     ys -= height + gap
     ax2 = fig.add_axes([xs, ys, width, height])
     kwargs_plot = {"xstep": 1, "zstep": 1, "vmin": -0.5, "vmax": 0.5}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p2, cbar2 = plot_2d_contour(x, z, uiy, ax2, fig, **kwargs_plot)
     p2.set_cmap(plt.cm.get_cmap('seismic'))
     # p1.set_cmap(cmaps.inferno)
-    ax2.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5)
+    plot_ay_contours(
+        ax2, pic_info, "../../data/", kwargs["current_time"],
+        colors='black', linewidths=0.5)
     ax2.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
     ax2.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
     ax2.tick_params(labelsize=16)
@@ -2015,7 +1875,7 @@ def plot_pressure(pic_info, species, ct, run_name, xm, base_dir='../../'):
     # fname = base_dir + 'data1/absB.gda'
     # x, z, absB = read_2d_fields(pic_info, fname, **kwargs) 
     fname = base_dir + 'data1/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     # ppara = pxx*bx*bx + pyy*by*by + pzz*bz*bz + \
     #         pxy*bx*by*2.0 + pxz*bx*bz*2.0 + pyz*by*bz*2.0
     # ppara /= absB * absB
@@ -2049,19 +1909,13 @@ def plot_pressure(pic_info, species, ct, run_name, xm, base_dir='../../'):
         "vmin": cbar_min,
         "vmax": cbar_max
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1 = plot_2d_contour(x, z, fdata, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.jet)
     nlevels = 15
     levels = np.linspace(np.min(Ay), np.max(Ay), nlevels)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax1, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax1.set_xlim([xmin, xmax])
     ax1.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
@@ -2127,7 +1981,7 @@ def plot_magnetic_field(pic_info, ct, run_name, xm, base_dir='../../'):
     fname = base_dir + 'data1/bz.gda'
     x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
     fname = base_dir + 'data1/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     nx, = x.shape
     nz, = z.shape
 
@@ -2159,19 +2013,13 @@ def plot_magnetic_field(pic_info, ct, run_name, xm, base_dir='../../'):
         "vmin": cbar_min,
         "vmax": cbar_max
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1 = plot_2d_contour(x, z, bx, ax11, fig, **kwargs_plot)
     p1.set_cmap(cmap)
     nlevels = 15
     levels = np.linspace(np.min(Ay), np.max(Ay), nlevels)
-    ax11.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax11, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax11.set_xlim([xmin, xmax])
     ax11.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax11.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
@@ -2181,13 +2029,9 @@ def plot_magnetic_field(pic_info, ct, run_name, xm, base_dir='../../'):
     ax12 = fig.add_axes([xs, ys, w1, h1])
     p2 = plot_2d_contour(x, z, by, ax12, fig, **kwargs_plot)
     p2.set_cmap(cmap)
-    ax12.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax12, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax12.set_xlim([xmin, xmax])
     ax12.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax12.set_ylabel('')
@@ -2198,13 +2042,9 @@ def plot_magnetic_field(pic_info, ct, run_name, xm, base_dir='../../'):
     ax13 = fig.add_axes([xs, ys, w1, h1])
     p3 = plot_2d_contour(x, z, bz, ax13, fig, **kwargs_plot)
     p3.set_cmap(cmap)
-    ax13.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax13, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax13.set_xlim([xmin, xmax])
     ax13.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax13.set_ylabel('')
@@ -2340,7 +2180,7 @@ def plot_electric_field(pic_info, ct, run_name, xm, base_dir='../../'):
     fname = base_dir + 'data1/ez.gda'
     x, z, ez = read_2d_fields(pic_info, fname, **kwargs)
     fname = base_dir + 'data1/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     nx, = x.shape
     nz, = z.shape
 
@@ -2378,19 +2218,13 @@ def plot_electric_field(pic_info, ct, run_name, xm, base_dir='../../'):
         "vmin": cbar_min,
         "vmax": cbar_max
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1 = plot_2d_contour(x, z, ex, ax11, fig, **kwargs_plot)
     p1.set_cmap(cmap)
     nlevels = 15
     levels = np.linspace(np.min(Ay), np.max(Ay), nlevels)
-    ax11.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax11, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax11.set_xlim([xmin, xmax])
     ax11.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax11.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
@@ -2400,13 +2234,9 @@ def plot_electric_field(pic_info, ct, run_name, xm, base_dir='../../'):
     ax12 = fig.add_axes([xs, ys, w1, h1])
     p2 = plot_2d_contour(x, z, ey, ax12, fig, **kwargs_plot)
     p2.set_cmap(cmap)
-    ax12.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax12, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax12.set_xlim([xmin, xmax])
     ax12.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax12.set_ylabel('')
@@ -2417,13 +2247,9 @@ def plot_electric_field(pic_info, ct, run_name, xm, base_dir='../../'):
     ax13 = fig.add_axes([xs, ys, w1, h1])
     p3 = plot_2d_contour(x, z, ez, ax13, fig, **kwargs_plot)
     p3.set_cmap(cmap)
-    ax13.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax13, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax13.set_xlim([xmin, xmax])
     ax13.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=24)
     ax13.set_ylabel('')
@@ -2568,7 +2394,7 @@ def plot_velocity_field(pic_info,
         fname = base_dir + 'data1/v' + species + 'z.gda'
         x, z, vz = read_2d_fields(pic_info, fname, **kwargs)
         fname = base_dir + 'data1/Ay.gda'
-        x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     else:
         kwargs = {
             "current_time": 0,
@@ -2618,8 +2444,6 @@ def plot_velocity_field(pic_info,
         "vmin": cbar_min,
         "vmax": cbar_max
     }
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1 = plot_2d_contour(x, z, vx, ax11, fig, **kwargs_plot)
     p1.set_cmap(cmap)
     nlevels = 15
@@ -2802,7 +2626,7 @@ def plot_energy_band(pic_info,
     fname = base_dir + 'data1/' + species + 'EB05.gda'
     x, z, eband = read_2d_fields(pic_info, fname, **kwargs)
     fname = base_dir + 'data1/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname, **kwargs)
     nx, = x.shape
     nz, = z.shape
     num_rho *= eband
@@ -2818,19 +2642,13 @@ def plot_energy_band(pic_info,
     ax1 = fig.add_axes([xs, ys, w1, h1])
     # kwargs_plot = {"xstep":2, "zstep":2, "is_log":True, "vmin":0.1, "vmax":10}
     kwargs_plot = {"xstep": 2, "zstep": 2, "vmin": 0.5, "vmax": 5}
-    xstep = kwargs_plot["xstep"]
-    zstep = kwargs_plot["zstep"]
     p1, cbar1 = plot_2d_contour(x, z, num_rho, ax1, fig, **kwargs_plot)
     p1.set_cmap(plt.cm.jet)
     nlevels = 15
     levels = np.linspace(np.min(Ay), np.max(Ay), nlevels)
-    ax1.contour(
-        x[0:nx:xstep],
-        z[0:nz:zstep],
-        Ay[0:nz:zstep, 0:nx:xstep],
-        colors='black',
-        linewidths=0.5,
-        levels=levels)
+    plot_ay_contours(
+        ax1, pic_info, base_dir + 'data1/', kwargs["current_time"],
+        colors='black', linewidths=0.5, levels=levels)
     ax1.set_xlim([xmin, xmax])
     ax1.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=24)
     ax1.tick_params(labelsize=24)
@@ -7,7 +7,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 
 import h5py
 import matplotlib as mpl
@@ -22,7 +21,8 @@ from scipy.interpolate import interp1d
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from energy_bands import load_band_densities
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
 
@@ -897,12 +897,11 @@ def energetic_rho(plot_config):
     nbands = 7
     ntot = np.zeros((nzr, nyr, nxr))
     nhigh = np.zeros((nzr, nyr, nxr))
-    for iband in range(nbands):
+    nrhos = load_band_densities(pic_info, pic_run_dir, species, tindex,
+                                nreduce=4, nbands=nbands,
+                                nworkers=plot_config.get("nworkers"))
+    for iband, nrho in enumerate(nrhos):
         print("Energy band: %d" % iband)
-        fname = (pic_run_dir + "data-smooth2/n" + species + "_" +
-                 str(iband) + "_" + str(tindex) + ".gda")
-        nrho = np.fromfile(fname, dtype=np.float32)
-        nrho = nrho.reshape((nzr, nyr, nxr))
         if iband >= 2:
             nhigh += nrho
         ntot += nrho
@@ -1125,7 +1124,10 @@ def rho_bands_2d(plot_config, show_plot=True):
         rect[1] -= rect[3] + vgap
 
     band_break = 4
-    for iband in range(nbands):
+    nrhos = load_band_densities(pic_info, pic_run_dir, species, tindex,
+                                nbands=nbands,
+                                nworkers=plot_config.get("nworkers"))
+    for iband, nrho in enumerate(nrhos):
         print("Energy band: %d" % iband)
         if iband < band_break:
             ax = axs[iband]
@@ -1133,10 +1135,6 @@ def rho_bands_2d(plot_config, show_plot=True):
         else:
             ax = axs[iband+1]
             rect = rects[iband+1]
-        fname = (pic_run_dir + "data-smooth2/n" + species + "_" +
-                 str(iband) + "_" + str(tindex) + ".gda")
-        nrho = np.fromfile(fname, dtype=np.float32)
-        nrho = nrho.reshape((nz, nx))
         if iband >= 5:
             nhigh += nrho
         ntot += nrho
@@ -1248,20 +1246,16 @@ def rho_bands_3d(plot_config, show_plot=True):
     zmin, zmax = -pic_info.lz_di * 0.5, pic_info.lz_di * 0.5
     nx, ny, nz = pic_info.nx, pic_info.ny, pic_info.nz
     nxr2, nyr2, nzr2 = nx // 2, ny // 2, nz // 2
-    nxr4, nyr4, nzr4 = nx // 4, ny // 4, nz // 4
     smime = math.sqrt(pic_info.mime)
     fname = pic_run_dir + "data-smooth/vkappa_" + str(tindex) + ".gda"
     vdot_kappa = np.fromfile(fname, dtype=np.float32)
     vdot_kappa = vdot_kappa.reshape((nzr2, nyr2, nxr2))
 
-    nrhos = []
     nbands = 7
-    for iband in range(nbands):
-        fname = (pic_run_dir + "data-smooth2/n" + species + "_" +
-                 str(iband) + "_" + str(tindex) + ".gda")
-        nrho = np.fromfile(fname, dtype=np.float32)
-        nrho = nrho.reshape((nzr4, nyr4, nxr4)) * stride_particle_dump
-        nrhos.append(nrho)
+    nrhos = load_band_densities(pic_info, pic_run_dir, species, tindex,
+                                nreduce=4, nbands=nbands,
+                                nworkers=plot_config.get("nworkers"))
+    nrhos = [nrho * stride_particle_dump for nrho in nrhos]
 
     for yslice in range(0, nyr2, 4):
         fig = plt.figure(figsize=[14, 7])
@@ -1485,10 +1479,9 @@ def analysis_multi_frames(plot_config, args):
             elif args.rho_bands_3d:
                 rho_bands_3d(plot_config, show_plot=False)
     else:
-        ncores = multiprocessing.cpu_count()
-        ncores = 8
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        # the frames run in daemonic workers, which cannot have a pool
+        plot_config["nworkers"] = 1
+        run_frames(process_input, tframes, (plot_config, args), max_workers=8)
 
 
 def main():
@@ -8,7 +8,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 import os
 
 import h5py
@@ -27,8 +26,9 @@ import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
 from dolointerpolation import MultilinearInterpolator
-from joblib import Parallel, delayed
+from frame_runner import run_frames
 from json_functions import read_data_from_json
+from magnetic_curvature import curvature_frame
 from shell_functions import mkdir_p
 
 plt.style.use("seaborn-deep")
@@ -755,59 +755,10 @@ def calc_vexb_kappa_2d(plot_config):
     pic_run = "2D-Lx150-bg" + str(bg) + "-150ppc-16KNL"
     root_dir = "/net/scratch3/xiaocanli/reconnection/Cori_runs/"
     pic_run_dir = root_dir + pic_run + "/"
-    species = plot_config["species"]
     picinfo_fname = '../data/pic_info/pic_info_' + pic_run + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    tindex = tframe * pic_info.fields_interval
-    pic_topox = pic_info.topology_x
-    pic_topoy = pic_info.topology_y
-    pic_topoz = pic_info.topology_z
-    nx, ny, nz = pic_info.nx, pic_info.ny, pic_info.nz
-    xmin, xmax = 0, pic_info.lx_di
-    ymin, ymax = -pic_info.ly_di * 0.5, pic_info.ly_di * 0.5
-    zmin, zmax = -pic_info.lz_di * 0.5, pic_info.lz_di * 0.5
-    smime = math.sqrt(pic_info.mime)
-    dx_de = pic_info.dx_di * smime
-    dy_de = pic_info.dy_di * smime
-    dz_de = pic_info.dz_di * smime
-    kwargs = {"current_time": tframe,
-              "xl": 0, "xr": pic_info.lx_di,
-              "zb": -pic_info.lz_di, "zt": pic_info.lz_di}
-    fname = pic_run_dir + "data/bx.gda"
-    x, z, bx = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/by.gda"
-    x, z, by = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/bz.gda"
-    x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ex.gda"
-    x, z, ex = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ey.gda"
-    x, z, ey = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ez.gda"
-    x, z, ez = read_2d_fields(pic_info, fname, **kwargs)
-    ib = 1.0/np.sqrt(bx**2 + by**2 + bz**2)
-    bx = bx * ib
-    by = by * ib
-    bz = bz * ib
-    kappax = (bx * np.gradient(bx, axis=1) / dx_de +
-              bz * np.gradient(bx, axis=0) / dz_de)
-    kappay = (bx * np.gradient(by, axis=1) / dx_de +
-              bz * np.gradient(by, axis=0) / dz_de)
-    kappaz = (bx * np.gradient(bz, axis=1) / dx_de +
-              bz * np.gradient(bz, axis=0) / dz_de)
-    vexb_x = (ey * bz - ez * by) * ib
-    vexb_y = (ez * bx - ex * bz) * ib
-    vexb_z = (ex * by - ey * bx) * ib
-
-    vexb_kappa = vexb_x * kappax + vexb_y * kappay + vexb_z * kappaz
-
-    fdir = pic_run_dir + "data/"
-    fname = fdir + 'vexb_kappa.gda'
-    size_one_frame = pic_info.nx * pic_info.nz * 4
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        vexb_kappa.tofile(f)
+    curvature_frame(pic_info, pic_run, pic_run_dir, ['vexb_kappa'],
+                    pic_run_dir + "data/", [], None, tframe)
 
 
 def vkappa_dist_2d(plot_config):
@@ -2945,10 +2896,7 @@ def analysis_multi_frames(plot_config, args):
             elif args.calc_vexb_kappa_2d:
                 calc_vexb_kappa_2d(plot_config)
     else:
-        # ncores = multiprocessing.cpu_count()
-        ncores = 4
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (plot_config, args), max_workers=4)
 
 
 def main():
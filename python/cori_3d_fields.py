@@ -8,7 +8,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 
 import h5py
 import matplotlib as mpl
@@ -26,7 +25,8 @@ from scipy.interpolate import interp1d, interp2d, RectBivariateSpline
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from field_stats import Histogram, chunk_slices
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
 
@@ -1213,15 +1213,13 @@ def calc_absj_dist(plot_config):
     pic_info = read_data_from_json(picinfo_fname)
     jmin, jmax = 0.0, 2.0
     nbins = 200
-    jbins = np.linspace(jmin, jmax, nbins + 1)
-    jbins_mid = (jbins[:-1] + jbins[1:]) * 0.5
+    jdist = Histogram('linear', jmin, jmax, nbins)
 
     tindex = pic_info.particle_interval * tframe
     fname = pic_run_dir + "data-smooth/absJ_" + str(tindex) + ".gda"
-    absj = np.fromfile(fname, dtype=np.float32)
-    jdist, bin_edges = np.histogram(absj, bins=jbins)
+    jdist.add(np.memmap(fname, dtype=np.float32, mode='r'))
 
-    jarray = np.vstack((jbins_mid, jdist))
+    jarray = np.vstack((jdist.centers(), jdist.counts))
 
     fdir = '../data/cori_3d/absj_dist/' + pic_run + '/'
     mkdir_p(fdir)
@@ -1409,19 +1407,18 @@ def calc_abse_dist(plot_config):
 
     tindex = pic_info.particle_interval * tframe
     fname = pic_run_dir + "data-smooth/ex_" + str(tindex) + ".gda"
-    ex = np.fromfile(fname, dtype=np.float32)
+    ex = np.memmap(fname, dtype=np.float32, mode='r')
     fname = pic_run_dir + "data-smooth/ey_" + str(tindex) + ".gda"
-    ey = np.fromfile(fname, dtype=np.float32)
+    ey = np.memmap(fname, dtype=np.float32, mode='r')
     fname = pic_run_dir + "data-smooth/ez_" + str(tindex) + ".gda"
-    ez = np.fromfile(fname, dtype=np.float32)
-    abse = np.sqrt(ex**2 + ey**2 + ez**2)
+    ez = np.memmap(fname, dtype=np.float32, mode='r')
     emin, emax = 0.0, 0.3
     nbins = 300
-    ebins = np.linspace(emin, emax, nbins + 1)
-    ebins_mid = (ebins[:-1] + ebins[1:]) * 0.5
-    edist, bin_edges = np.histogram(abse, bins=ebins)
+    edist = Histogram('linear', emin, emax, nbins)
+    for sl in chunk_slices(ex.size):
+        edist.add(np.sqrt(ex[sl]**2 + ey[sl]**2 + ez[sl]**2))
 
-    earray = np.vstack((ebins_mid, edist))
+    earray = np.vstack((edist.centers(), edist.counts))
 
     fdir = '../data/cori_3d/abse_dist/' + pic_run + '/'
     mkdir_p(fdir)
@@ -2826,10 +2823,7 @@ def analysis_multi_frames(plot_config, args):
             elif args.plot_reconnection_layer:
                 plot_reconnection_layer(plot_config, show_plot=False)
     else:
-        ncores = multiprocessing.cpu_count()
-        ncores = 8
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (plot_config, args), max_workers=8)
 
 
 def main():
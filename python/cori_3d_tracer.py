@@ -8,7 +8,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 
 import h5py
 import matplotlib as mpl
@@ -27,7 +26,7 @@ from scipy.optimize import curve_fit
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
 
@@ -1507,10 +1506,7 @@ def analysis_multi_frames(plot_config, args):
             plot_config["tframe"] = tframe
             pass
     else:
-        ncores = multiprocessing.cpu_count()
-        ncores = 8
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (plot_config, args), max_workers=8)
 
 
 def main():
@@ -97,6 +97,8 @@ def plot_vx_frame(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -183,6 +185,8 @@ def plot_anisotropy(run_name, root_dir, pic_info, species, ct):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -300,6 +304,8 @@ def plot_compression_fields_single(run_name, root_dir, pic_info, species, ct):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -489,6 +495,8 @@ def plot_thermal_temperature_single(run_name, root_dir, pic_info, ct):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
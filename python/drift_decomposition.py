@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Guiding-center drift decomposition of the particle energization for whole
+ensembles of tracer particles.
+
+The input is a dictionary of (nframes, nptl) arrays with the particle
+momentum (Ux, Uy, Uz), the electric and magnetic fields (Ex, Ey, Ez, Bx, By,
+Bz) interpolated to the particle positions, and the gradients of the magnetic
+field (dBx_dx, dBx_dy, ..., dBz_dz). The energization rates due to the
+curvature drift, gradient drift, polarization drift and parallel electric
+field are calculated as batched array operations, chunk by chunk along the
+particle axis.
+"""
+from __future__ import print_function
+
+import numpy as np
+
+TERMS = ['jdote', 'jpara_dote', 'curv_dote', 'grad_dote', 'polar_dote']
+COMPONENTS = ['x', 'y', 'z']
+
+
+def gradient_keys():
+    """Dataset names of the magnetic field gradients, dB<j>_d<i>
+    """
+    return [['dB' + cj + '_d' + ci for cj in COMPONENTS] for ci in COMPONENTS]
+
+
+def cross(ax, ay, az, bx, by, bz):
+    """Cross product of two vectors given by components
+    """
+    return (ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx)
+
+
+def drift_rates_chunk(ptl, dt, pmass, pcharge):
+    """Energization rates of a chunk of particles
+
+    Args:
+        ptl: dictionary of (nframes, nptl) arrays
+        dt: time interval between frames (in 1/wpe)
+        pmass: particle mass
+        pcharge: particle charge
+    Returns:
+        rates: dictionary of (nframes, nptl) arrays for all terms
+        gamma: (nframes, nptl) Lorentz factor
+    """
+    ux, uy, uz = ptl['Ux'], ptl['Uy'], ptl['Uz']
+    ex, ey, ez = ptl['Ex'], ptl['Ey'], ptl['Ez']
+    bx, by, bz = ptl['Bx'], ptl['By'], ptl['Bz']
+    gamma = np.sqrt(1.0 + ux**2 + uy**2 + uz**2)
+    igamma = 1.0 / gamma
+    absb = np.sqrt(bx**2 + by**2 + bz**2)
+    ib = 1.0 / absb
+    ib2 = ib * ib
+    bhat = [bx * ib, by * ib, bz * ib]
+
+    # Parallel and perpendicular momentum
+    upara = ux * bhat[0] + uy * bhat[1] + uz * bhat[2]
+    uperp2 = np.maximum(ux**2 + uy**2 + uz**2 - upara**2, 0.0)
+
+    # grad|B| and the curvature vector kappa = (b.grad)b, using
+    # d_i b_j = (d_i B_j - b_j d_i|B|) / |B|
+    dbdx = [[ptl[key] for key in keys] for keys in gradient_keys()]
+    grad_absb = [bhat[0] * dbdx[i][0] + bhat[1] * dbdx[i][1] +
+                 bhat[2] * dbdx[i][2] for i in range(3)]
+    kappa = []
+    for j in range(3):
+        kj = 0.0
+        for i in range(3):
+            kj = kj + bhat[i] * (dbdx[i][j] - bhat[j] * grad_absb[i])
+        kappa.append(kj * ib)
+
+    rates = {}
+    rates['jdote'] = pcharge * (ux * ex + uy * ey + uz * ez) * igamma
+    epara = ex * bhat[0] + ey * bhat[1] + ez * bhat[2]
+    rates['jpara_dote'] = pcharge * upara * epara * igamma
+
+    # Curvature drift: p_par v_par (b x kappa).E / B
+    bxk = cross(bhat[0], bhat[1], bhat[2], kappa[0], kappa[1], kappa[2])
+    rates['curv_dote'] = (pmass * upara**2 * igamma * ib *
+                          (bxk[0] * ex + bxk[1] * ey + bxk[2] * ez))
+
+    # Gradient drift: p_perp v_perp (b x grad|B|).E / (2 B^2)
+    bxg = cross(bhat[0], bhat[1], bhat[2],
+                grad_absb[0], grad_absb[1], grad_absb[2])
+    rates['grad_dote'] = (0.5 * pmass * uperp2 * igamma * ib2 *
+                          (bxg[0] * ex + bxg[1] * ey + bxg[2] * ez))
+
+    # Polarization drift: gamma m (b x dv_E/dt).E / B, with the time
+    # derivative of the ExB drift taken along the particle orbits
+    vexb = cross(ex, ey, ez, bx, by, bz)
+    nframes = ux.shape[0]
+    dvexb = []
+    for vcomp in vexb:
+        vcomp = vcomp * ib2
+        if nframes > 1:
+            dvexb.append(np.gradient(vcomp, dt, axis=0))
+        else:
+            dvexb.append(np.zeros(vcomp.shape))
+    bxdv = cross(bhat[0], bhat[1], bhat[2], dvexb[0], dvexb[1], dvexb[2])
+    rates['polar_dote'] = (pmass * gamma * ib *
+                           (bxdv[0] * ex + bxdv[1] * ey + bxdv[2] * ez))
+    return rates, gamma
+
+
+def energy_bins(emin=1E-3, emax=1E3, nbins=60):
+    """Logarithmic bins of particle kinetic energy (gamma - 1)
+    """
+    return np.logspace(np.log10(emin), np.log10(emax), nbins + 1)
+
+
+def bin_statistics(rates, gamma, ebins, stats=None):
+    """Accumulate the energy-binned sums of the rates
+
+    Args:
+        rates: dictionary of (nframes, nptl) arrays
+        gamma: (nframes, nptl) Lorentz factor
+        ebins: energy bin edges
+        stats: statistics to update. A new one is created when None.
+    Returns:
+        stats: dictionary with the particle counts ('nptl') and the rate
+            sums of all terms, each of shape (nframes, nbins)
+    """
+    nframes, nptl = gamma.shape
+    nbins = len(ebins) - 1
+    if stats is None:
+        stats = {'nptl': np.zeros((nframes, nbins))}
+        for term in rates:
+            stats[term] = np.zeros((nframes, nbins))
+    ibin = np.searchsorted(ebins, gamma - 1, side='right') - 1
+    valid = np.logical_and(ibin >= 0, ibin < nbins)
+    valid = np.logical_and(valid, np.isfinite(gamma))
+    # One flat index for (frame, bin) so each term needs only one bincount
+    iflat = (ibin + np.arange(nframes)[:, None] * nbins)[valid]
+    nflat = nframes * nbins
+    stats['nptl'] += np.bincount(iflat, minlength=nflat).reshape(nframes, nbins)
+    for term in rates:
+        weights = np.nan_to_num(rates[term][valid])
+        stats[term] += np.bincount(iflat, weights=weights,
+                                   minlength=nflat).reshape(nframes, nbins)
+    return stats
+
+
+def drift_decomposition(ptls, dt, pmass, pcharge, ebins=None,
+                        chunk_size=10000, save_rates=True):
+    """Drift decomposition of the energization for an ensemble of tracers
+
+    Args:
+        ptls: dictionary of (nframes, nptl) arrays
+        dt: time interval between frames (in 1/wpe)
+        pmass: particle mass
+        pcharge: particle charge
+        ebins: energy bin edges. Default is from energy_bins.
+        chunk_size: number of particles in each chunk
+        save_rates: whether to return the per-particle time series
+    Returns:
+        rates: dictionary of (nframes, nptl) arrays when save_rates is True
+        stats: energy-binned statistics from bin_statistics
+    """
+    if ebins is None:
+        ebins = energy_bins()
+    nframes, nptl = ptls['Ux'].shape
+    rates = None
+    if save_rates:
+        rates = {}
+        for term in TERMS:
+            rates[term] = np.zeros((nframes, nptl), dtype=np.float32)
+    stats = None
+    for istart in range(0, nptl, chunk_size):
+        iend = min(istart + chunk_size, nptl)
+        ptl = {}
+        for key in ptls:
+            ptl[key] = np.asarray(ptls[key][:, istart:iend], dtype=np.float64)
+        rates_chunk, gamma = drift_rates_chunk(ptl, dt, pmass, pcharge)
+        stats = bin_statistics(rates_chunk, gamma, ebins, stats)
+        if save_rates:
+            for term in TERMS:
+                rates[term][:, istart:iend] = rates_chunk[term]
+    return rates, stats
+
+
+def drift_decomposition_tracers(tag_index, tags, pic_info, species,
+                                tframes=None, **kwargs):
+    """Drift decomposition for a list of tracers in tag-sorted tracer files
+
+    The tracer files should include the fields and the magnetic field
+    gradients at the particle positions.
+
+    Args:
+        tag_index: tracer_tag_index.TracerTagIndex of the tracers
+        tags: tags of the particles
+        pic_info: namedtuple for the PIC simulation information.
+        species: particle species
+        tframes: time indices. Default is all the indexed ones.
+        kwargs: other arguments of drift_decomposition
+    """
+    dset_names = ['Ux', 'Uy', 'Uz', 'Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz']
+    for keys in gradient_keys():
+        dset_names += keys
+    ptls, tframes = tag_index.read_trajectories(tags, tframes, dset_names)
+    if species in ["e", "electron"]:
+        pmass, pcharge = 1.0, -1.0
+    else:
+        pmass, pcharge = pic_info.mime, 1.0
+    if len(tframes) > 1:
+        dt = (tframes[1] - tframes[0]) * pic_info.dtwpe
+    else:
+        dt = pic_info.dtwpe * pic_info.tracer_interval
+    return drift_decomposition(ptls, dt, pmass, pcharge, **kwargs)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Number densities of the particles in energy bands, deposited directly from
+the particle dumps particle/T.<tindex>/<s>particle.<tindex>.<rank>.
+
+The bands are in units of the thermal energy eth: band 0 is below 10 eth,
+band i is between 2^(i-1)*10 eth and 2^i*10 eth, and the last band is above
+2^(nbands-2)*10 eth. The densities are saved on a grid that is coarser than
+the PIC grid by nreduce, with the layout of field_io.field_shape, to
+n<species>_<band>_<tindex>.gda.
+
+The MPI ranks are split into groups. A worker deposits the particles of a
+group into a partial grid that only covers the domains of the group, with one
+bincount over (band, cell) for each chunk of particles, and the partial grids
+are added to the full grid at the end.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from field_io import field_shape
+from particle_io import (DECODE_CHUNK, cell_indices, decode_particles,
+                         particle_file_name, particle_ranks,
+                         read_particle_header, read_particles)
+
+NBANDS = 7
+
+
+def thermal_energy(pic_info, species):
+    """Thermal energy gamma_th - 1 of a species
+    """
+    vth = pic_info.vthe if species in ['e', 'electron'] else pic_info.vthi
+    gama = 1.0 / math.sqrt(1.0 - 3 * vth**2)
+    return gama - 1.0
+
+
+def band_edges(eth, nbands=NBANDS):
+    """Energy edges between the bands
+    """
+    return 10 * eth * 2.0**np.arange(nbands - 1)
+
+
+def band_file_name(data_dir, species, iband, tindex):
+    """File name of the density of one energy band
+    """
+    return (data_dir + 'n' + species + '_' + str(iband) + '_' +
+            str(tindex) + '.gda')
+
+
+def reduce_factors(pic_info, nreduce):
+    """Reduction factors along x, y, z. The directions with one cell are not
+    reduced.
+    """
+    return np.asarray([nreduce if ncell > 1 else 1 for ncell in
+                       [pic_info.nx, pic_info.ny, pic_info.nz]])
+
+
+def rank_layout(run_dir, tindex, species):
+    """Positions of the MPI domains in the global grid
+
+    Returns:
+        ranks: (nranks, ) MPI ranks
+        starts: (nranks, 3) global x, y, z index of the first cell of the
+            domains
+        cell_volume: volume of one PIC cell in de^3
+    """
+    ranks = particle_ranks(run_dir, tindex, species)
+    origins = np.zeros((len(ranks), 3))
+    for i, rank in enumerate(ranks):
+        fname = particle_file_name(run_dir, tindex, species, rank)
+        header = read_particle_header(fname)
+        origins[i] = [header['x0'], header['y0'], header['z0']]
+    dxyz = np.asarray([header['dx'], header['dy'], header['dz']], dtype=float)
+    starts = np.rint((origins - origins.min(axis=0)) / dxyz).astype(int)
+    return np.asarray(ranks), starts, float(np.prod(dxyz))
+
+
+def coarse_range(start, ncells, reduce, cshape):
+    """Range of the coarse cells that cover the cells of a domain
+
+    Args:
+        start: (3, ) global x, y, z index of the first cell of the domain
+        ncells: (3, ) number of cells of the domain along x, y, z
+        reduce: (3, ) reduction factors
+        cshape: (3, ) number of coarse cells along x, y, z
+    Returns:
+        lo, hi: (3, ) coarse x, y, z indices of the range [lo, hi)
+    """
+    lo = np.minimum(start // reduce, cshape - 1)
+    hi = np.minimum((start + ncells - 1) // reduce, cshape - 1) + 1
+    return lo, hi
+
+
+def deposit_rank(fname, start, edges, reduce, cshape, chunk=DECODE_CHUNK):
+    """Band densities of the particles of one file, in particle weights
+
+    Args:
+        fname: particle file name
+        start: (3, ) global x, y, z index of the first cell of the domain
+        edges: energy edges between the bands
+        reduce: (3, ) reduction factors
+        cshape: (3, ) number of coarse cells along x, y, z
+        chunk: number of particles in one chunk
+    Returns:
+        lo: (3, ) coarse x, y, z index of the first cell of the block
+        block: (nbands, nz, ny, nx) summed weights
+    """
+    header, ptl = read_particles(fname)
+    ncells = np.asarray([header['nx'], header['ny'], header['nz']], dtype=int)
+    lo, hi = coarse_range(start, ncells, reduce, cshape)
+    lx, ly, lz = hi - lo
+    nbands = len(edges) + 1
+    nbins = nbands * lz * ly * lx
+    block = np.zeros(nbins)
+    for istart in range(0, ptl.shape[0], chunk):
+        cptl = ptl[istart:istart + chunk]
+        dptl = decode_particles(header, cptl, ['ene', 'q'])
+        icells = cell_indices(cptl['icell'], ncells[0] + 2, ncells[1] + 2)
+        ibin = np.searchsorted(edges, dptl['ene'])
+        for i, ncoarse in reversed(list(enumerate([lx, ly, lz]))):
+            icell = np.clip(icells[i], 1, ncells[i]) - 1
+            icell += start[i]
+            icell //= reduce[i]
+            icell -= lo[i]
+            ibin *= ncoarse
+            ibin += np.clip(icell, 0, ncoarse - 1)
+        block += np.bincount(ibin, weights=np.abs(dptl['q']),
+                             minlength=nbins)
+    return lo, block.reshape((nbands, lz, ly, lx))
+
+
+def deposit_group(run_dir, tindex, species, ranks, starts, edges, reduce,
+                  cshape, chunk=DECODE_CHUNK):
+    """Band densities of the particles of a group of MPI ranks
+
+    Returns:
+        lo: (3, ) coarse x, y, z index of the first cell of the block
+        block: (nbands, nz, ny, nx) summed weights of the domains of the group
+    """
+    ncells = np.zeros((len(ranks), 3), dtype=int)
+    for i, rank in enumerate(ranks):
+        fname = particle_file_name(run_dir, tindex, species, rank)
+        header = read_particle_header(fname)
+        ncells[i] = [header['nx'], header['ny'], header['nz']]
+    los, his = zip(*[coarse_range(start, ncell, reduce, cshape)
+                     for start, ncell in zip(starts, ncells)])
+    glo = np.min(los, axis=0)
+    ghi = np.max(his, axis=0)
+    lx, ly, lz = ghi - glo
+    group = np.zeros((len(edges) + 1, lz, ly, lx))
+    for rank, start in zip(ranks, starts):
+        fname = particle_file_name(run_dir, tindex, species, rank)
+        lo, block = deposit_rank(fname, start, edges, reduce, cshape, chunk)
+        ix, iy, iz = lo - glo
+        _, bz, by, bx = block.shape
+        group[:, iz:iz+bz, iy:iy+by, ix:ix+bx] += block
+    return glo, group
+
+
+def deposit_group_args(args):
+    """deposit_group with packed arguments, for Pool.imap_unordered
+    """
+    return deposit_group(*args)
+
+
+def band_densities(pic_info, run_dir, species, tindex, nreduce=1,
+                   nbands=NBANDS, nworkers=None, chunk=DECODE_CHUNK):
+    """Number densities of the particles in energy bands
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        run_dir: PIC run directory
+        species: 'e' or 'h'
+        tindex: time index of the particle dump
+        nreduce: reduction factor of the grid
+        nbands: number of energy bands
+        nworkers: number of worker processes. Default is the number of
+            cores, at most 16. 1 deposits in this process, which is needed
+            in the daemonic workers of frame_runner.run_frames.
+        chunk: number of particles in one chunk
+    Returns:
+        nrho: (nbands, ) + field_shape(pic_info, nreduce) float32 densities
+    """
+    ranks, starts, cell_volume = rank_layout(run_dir, tindex, species)
+    reduce = reduce_factors(pic_info, nreduce)
+    cshape = np.maximum(np.asarray([pic_info.nx, pic_info.ny,
+                                    pic_info.nz]) // reduce, 1)
+    edges = band_edges(thermal_energy(pic_info, species), nbands)
+    if not nworkers:
+        nworkers = min(multiprocessing.cpu_count(), 16)
+    nrho = np.zeros((nbands, cshape[2], cshape[1], cshape[0]),
+                    dtype=np.float32)
+    ngroups = min(len(ranks), nworkers * 4)
+    tasks = [(run_dir, tindex, species, ranks[igroup], starts[igroup],
+              edges, reduce, cshape, chunk)
+             for igroup in np.array_split(np.arange(len(ranks)), ngroups)]
+    if nworkers == 1:
+        groups = (deposit_group_args(task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(nworkers)
+        groups = pool.imap_unordered(deposit_group_args, tasks)
+    for lo, group in groups:
+        ix, iy, iz = lo
+        _, bz, by, bx = group.shape
+        nrho[:, iz:iz+bz, iy:iy+by, ix:ix+bx] += group
+    if nworkers != 1:
+        pool.close()
+        pool.join()
+    nrho /= cell_volume * np.prod(reduce)
+    return nrho.reshape((nbands, ) + field_shape(pic_info, nreduce))
+
+
+def save_band_densities(data_dir, species, tindex, nrho):
+    """Save the densities of the energy bands
+    """
+    if not os.path.isdir(data_dir):
+        os.makedirs(data_dir)
+    for iband, nband in enumerate(nrho):
+        nband.tofile(band_file_name(data_dir, species, iband, tindex))
+
+
+def load_band_densities(pic_info, run_dir, species, tindex, nreduce=1,
+                        data_dir=None, nbands=NBANDS, nworkers=None):
+    """Densities of the energy bands, deposited in memory when the files are
+    missing
+
+    Nothing is written here, so this can be used while plotting. The files
+    are saved by the command line of this module.
+
+    Args:
+        data_dir: directory of the .gda files. Default is
+            run_dir + 'data-smooth2/'.
+        nworkers: number of worker processes of band_densities when the
+            files are missing. Default is 1, in this process.
+    Returns:
+        nrho: list of the densities of the bands
+    """
+    if data_dir is None:
+        data_dir = run_dir + 'data-smooth2/'
+    fnames = [band_file_name(data_dir, species, iband, tindex)
+              for iband in range(nbands)]
+    if not all(os.path.isfile(fname) for fname in fnames):
+        nrho = band_densities(pic_info, run_dir, species, tindex, nreduce,
+                              nbands, nworkers or 1)
+        return list(nrho)
+    shape = field_shape(pic_info, nreduce)
+    return [np.fromfile(fname, dtype=np.float32).reshape(shape)
+            for fname in fnames]
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Densities of the particles in energy bands')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--species', action="store", default='e',
+                        help='particle species')
+    parser.add_argument('--nreduce', action="store", default='1', type=int,
+                        help='reduction factor of the grid')
+    parser.add_argument('--nbands', action="store", default=NBANDS, type=int,
+                        help='number of energy bands')
+    parser.add_argument('--data_sub_dir', action="store",
+                        default='data-smooth2',
+                        help='sub-directory of the output .gda files')
+    parser.add_argument('--nworkers', action="store", default='0', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    run_dir = os.path.join(args.pic_run_dir, '')
+    data_dir = os.path.join(run_dir, args.data_sub_dir, '')
+    for tframe in range(args.tstart, args.tend + 1):
+        print("Time frame: %d" % tframe)
+        tindex = pic_info.particle_interval * tframe
+        nrho = band_densities(pic_info, run_dir, args.species, tindex,
+                              args.nreduce, args.nbands, args.nworkers)
+        save_band_densities(data_dir, args.species, tindex, nrho)
+
+
+if __name__ == "__main__":
+    main()
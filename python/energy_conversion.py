@@ -5,7 +5,6 @@ import collections
 import math
 import os.path
 import re
-import struct
 import sys
 
 import matplotlib as mpl
@@ -222,77 +221,48 @@ def plot_particle_energy_gain():
     plt.show()
 
 
+JDOTE_NAMES = ['jcpara_dote', 'jcperp_dote', 'jmag_dote', 'jgrad_dote',
+               'jdiagm_dote', 'jpolar_dote', 'jexb_dote', 'jpara_dote',
+               'jperp_dote', 'jperp1_dote', 'jperp2_dote', 'jqnupara_dote',
+               'jqnuperp_dote', 'jtot_dote', 'jagy_dote', 'jdivu_dote']
+
+jdote_collection = collections.namedtuple('jdote_collection', [
+    'jcpara_dote', 'jcperp_dote', 'jmag_dote', 'jgrad_dote', 'jdiagm_dote',
+    'jpolar_dote', 'jexb_dote', 'jpara_dote', 'jperp_dote', 'jperp1_dote',
+    'jperp2_dote', 'jqnupara_dote', 'jqnuperp_dote', 'jagy_dote',
+    'jtot_dote', 'jdivu_dote', 'jcpara_dote_int', 'jcperp_dote_int',
+    'jmag_dote_int', 'jgrad_dote_int', 'jdiagm_dote_int',
+    'jpolar_dote_int', 'jexb_dote_int', 'jpara_dote_int', 'jperp_dote_int',
+    'jperp1_dote_int', 'jperp2_dote_int', 'jqnupara_dote_int',
+    'jqnuperp_dote_int', 'jagy_dote_int', 'jtot_dote_int', 'jdivu_dote_int'
+])
+
+
 def read_jdote(pic_info, fname):
-    """
+    """Read the time evolution of the energy conversion terms
+
+    The file has ntf records of 16 float32 values, one for each term in
+    JDOTE_NAMES. It is read as one (ntf, 16) array, and the time
+    integrals of all terms are calculated together.
+
+    Args:
+        pic_info: PIC simulation information
+        fname: file name of the jdote data
+    Returns:
+        jdote: jdote_collection, whose fields are views into the arrays
     """
     ntf = pic_info.ntf
     dt_fields = pic_info.dt_fields
     dtf_wpe = dt_fields * pic_info.dtwpe / pic_info.dtwci
-    fh = open(fname, 'r')
-    data = fh.read()
-    fh.close()
-    njote = 16  # different kind of data.
-    jdote_data = np.zeros((ntf, njote))
-    index_start = 0
-    index_end = 4
-    for current_time in range(ntf):
-        for i in range(njote):
-            jdote_data[current_time, i], = \
-                    struct.unpack('f', data[index_start:index_end])
-            index_start = index_end
-            index_end += 4
-    jcpara_dote = jdote_data[:, 0]
-    jcperp_dote = jdote_data[:, 1]
-    jmag_dote = jdote_data[:, 2]
-    jgrad_dote = jdote_data[:, 3]
-    jdiagm_dote = jdote_data[:, 4]
-    jpolar_dote = jdote_data[:, 5]
-    jexb_dote = jdote_data[:, 6]
-    jpara_dote = jdote_data[:, 7]
-    jperp_dote = jdote_data[:, 8]
-    jperp1_dote = jdote_data[:, 9]
-    jperp2_dote = jdote_data[:, 10]
-    jqnupara_dote = jdote_data[:, 11]
-    jqnuperp_dote = jdote_data[:, 12]
-    jagy_dote = jdote_data[:, 14]
-    jtot_dote = jdote_data[:, 13]
-    jdivu_dote = jdote_data[:, 15]
-    jcpara_dote_int = cumulate_with_time(jcpara_dote, dtf_wpe, ntf)
-    jcperp_dote_int = cumulate_with_time(jcperp_dote, dtf_wpe, ntf)
-    jmag_dote_int = cumulate_with_time(jmag_dote, dtf_wpe, ntf)
-    jgrad_dote_int = cumulate_with_time(jgrad_dote, dtf_wpe, ntf)
-    jdiagm_dote_int = cumulate_with_time(jdiagm_dote, dtf_wpe, ntf)
-    jpolar_dote_int = cumulate_with_time(jpolar_dote, dtf_wpe, ntf)
-    jexb_dote_int = cumulate_with_time(jexb_dote, dtf_wpe, ntf)
-    jpara_dote_int = cumulate_with_time(jpara_dote, dtf_wpe, ntf)
-    jperp_dote_int = cumulate_with_time(jperp_dote, dtf_wpe, ntf)
-    jperp1_dote_int = cumulate_with_time(jperp1_dote, dtf_wpe, ntf)
-    jperp2_dote_int = cumulate_with_time(jperp2_dote, dtf_wpe, ntf)
-    jqnupara_dote_int = cumulate_with_time(jqnupara_dote, dtf_wpe, ntf)
-    jqnuperp_dote_int = cumulate_with_time(jqnuperp_dote, dtf_wpe, ntf)
-    jagy_dote_int = cumulate_with_time(jagy_dote, dtf_wpe, ntf)
-    jtot_dote_int = cumulate_with_time(jtot_dote, dtf_wpe, ntf)
-    jdivu_dote_int = cumulate_with_time(jdivu_dote, dtf_wpe, ntf)
-    jdote_collection = collections.namedtuple('jdote_collection', [
-        'jcpara_dote', 'jcperp_dote', 'jmag_dote', 'jgrad_dote', 'jdiagm_dote',
-        'jpolar_dote', 'jexb_dote', 'jpara_dote', 'jperp_dote', 'jperp1_dote',
-        'jperp2_dote', 'jqnupara_dote', 'jqnuperp_dote', 'jagy_dote',
-        'jtot_dote', 'jdivu_dote', 'jcpara_dote_int', 'jcperp_dote_int',
-        'jmag_dote_int', 'jgrad_dote_int', 'jdiagm_dote_int',
-        'jpolar_dote_int', 'jexb_dote_int', 'jpara_dote_int', 'jperp_dote_int',
-        'jperp1_dote_int', 'jperp2_dote_int', 'jqnupara_dote_int',
-        'jqnuperp_dote_int', 'jagy_dote_int', 'jtot_dote_int', 'jdivu_dote_int'
-    ])
-    jdote = jdote_collection(
-        jcpara_dote, jcperp_dote, jmag_dote, jgrad_dote, jdiagm_dote,
-        jpolar_dote, jexb_dote, jpara_dote, jperp_dote, jperp1_dote,
-        jperp2_dote, jqnupara_dote, jqnuperp_dote, jagy_dote, jtot_dote,
-        jdivu_dote, jcpara_dote_int, jcperp_dote_int, jmag_dote_int,
-        jgrad_dote_int, jdiagm_dote_int, jpolar_dote_int, jexb_dote_int,
-        jpara_dote_int, jperp_dote_int, jperp1_dote_int, jperp2_dote_int,
-        jqnupara_dote_int, jqnuperp_dote_int, jagy_dote_int, jtot_dote_int,
-        jdivu_dote_int)
-    return jdote
+    njote = len(JDOTE_NAMES)  # different kind of data.
+    jdote_data = np.fromfile(fname, dtype=np.float32, count=ntf * njote)
+    jdote_data = jdote_data.reshape((ntf, njote)).astype(np.float64)
+    jdote_int = cumulate_with_time(jdote_data, dtf_wpe, ntf)
+    columns = {}
+    for i, name in enumerate(JDOTE_NAMES):
+        columns[name] = jdote_data[:, i]
+        columns[name + '_int'] = jdote_int[:, i]
+    return jdote_collection(**columns)
 
 
 def read_jdote_data(species, pic_info, rootpath='../../', is_inductive=False):
@@ -332,16 +302,35 @@ def read_jdote_run_name(species, pic_info, run_name, is_inductive=False):
     return jdote
 
 
+def load_jdote_run(species, pic_info, run_name):
+    """Load j.E data of a run, from the binary file when it exists
+
+    The binary file is read much faster than the JSON file, so it is
+    preferred when comparing many runs.
+
+    Args:
+        species: particle species. 'e' for electron, 'h' for ion.
+        pic_info: PIC simulation information
+        run_name: name for this run
+    """
+    fname = '../data/jdote_data/' + run_name + '/jdote00_' + species + '.gda'
+    if os.path.isfile(fname):
+        return read_jdote(pic_info, fname)
+    jdote_fname = '../data/jdote_data/jdote_' + run_name + '_' + species + '.json'
+    return read_data_from_json(jdote_fname)
+
+
 def cumulate_with_time(f, dt, ntf):
     """
     Args:
-        f: the time evolution of one field.
+        f: the time evolution of one field, or of multiple fields with
+           time along the first axis.
         dt: the time step.
         ntf: number of time frames for fields.
     """
-    f_cumulative = np.zeros(ntf)  # originally 0
-    for i in range(1, ntf):
-        f_cumulative[i] = f_cumulative[i - 1] + 0.5 * (f[i] + f[i - 1]) * dt
+    f = np.asarray(f)[:ntf]
+    f_cumulative = np.zeros(f.shape)  # originally 0
+    np.cumsum(0.5 * (f[1:] + f[:-1]) * dt, axis=0, out=f_cumulative[1:])
     return f_cumulative
 
 
@@ -890,10 +879,8 @@ def plot_jdotes_evolution_multi(species):
     # base_dirs, run_names = shock_sheet_runs()
     for run_name in run_names[2:3]:
         picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
-        jdote_fname = '../data/jdote_data/jdote_' + \
-                run_name + '_' + species + '.json'
         pic_info = read_data_from_json(picinfo_fname)
-        jdote = read_data_from_json(jdote_fname)
+        jdote = load_jdote_run(species, pic_info, run_name)
         plot_jdotes_evolution(pic_info, jdote, species)
         suffix = 'no_jpolar'
         oname = odir + 'jdrifts_dote_' + run_name + '_' + \
@@ -1083,12 +1070,11 @@ def calc_jdotes_fraction_multi(species):
     for irun in range(nruns):
         run_name = run_names[irun]
         picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
-        jdote_fname = dir + 'jdote_' + run_name + '_' + species + '.json'
         pic_info = read_data_from_json(picinfo_fname)
         tenergy = pic_info.tenergy
         tfields = pic_info.tfields
         tmax = min(tenergy[-1], tfields[-1])
-        jdote_data = read_data_from_json(jdote_fname)
+        jdote_data = load_jdote_run(species, pic_info, run_name)
         kene = pic_info.kene_e if species == 'e' else pic_info.kene_i
         nf = len(jdote_data)
         jdote_names = jdote_data._fields
@@ -4,7 +4,6 @@ Calculate ExB drift velocity
 import argparse
 import math
 import multiprocessing
-import os
 
 import numpy as np
 from joblib import Parallel, delayed
@@ -13,6 +12,7 @@ from scipy.ndimage.filters import gaussian_filter
 from contour_plots import read_2d_fields
 from dolointerpolation import MultilinearInterpolator
 from energy_conversion import read_data_from_json
+from frame_writer import pending_frames, write_frame
 
 
 def calc_exb(run_dir, run_name, tframe, coords):
@@ -30,7 +30,6 @@ def calc_exb(run_dir, run_name, tframe, coords):
     nz = pic_info.nz
     kwargs = {"current_time": tframe, "xl": 0, "xr": pic_info.lx_di,
               "zb": -0.5 * pic_info.lz_di, "zt": 0.5 * pic_info.lz_di}
-    size_one_frame = pic_info.nx * pic_info.nz * 4
     sigma = 3
     fname = run_dir + "data/bx.gda"
     _, _, bx = read_2d_fields(pic_info, fname, **kwargs)
@@ -94,23 +93,9 @@ def calc_exb(run_dir, run_name, tframe, coords):
     exb_y = (ez * bx - ex * bz) * ib2
     exb_z = (ex * by - ey * bx) * ib2
 
-    fname = run_dir + "data/exb_x.gda"
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        exb_x.tofile(f)
-
-    fname = run_dir + "data/exb_y.gda"
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        exb_y.tofile(f)
-
-    fname = run_dir + "data/exb_z.gda"
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        exb_z.tofile(f)
+    for var, fdata in [("exb_x", exb_x), ("exb_y", exb_y), ("exb_z", exb_z)]:
+        fname = run_dir + "data/" + var + ".gda"
+        write_frame(fname, (nz, nx), pic_info.ntf, tframe, fdata)
 
 
 def get_coordinates(pic_info):
@@ -172,8 +157,10 @@ def process_input(runs_root_dir, run_name, coords):
     """process one PIC run"""
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    tframes = range(pic_info.ntf)
     run_dir = runs_root_dir + run_name + '/'
+    # exb_z is written last, so its frames are complete for all components
+    fname = run_dir + "data/exb_z.gda"
+    tframes = pending_frames(fname, pic_info.ntf, range(pic_info.ntf))
     for tframe in tframes:
         calc_exb(run_dir, run_name, tframe, coords)
 
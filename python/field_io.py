@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Plotting-free reading of the field and hydro data in .gda files.
+
+Two layouts are supported: one file for all time frames (data/ex.gda, with
+frame tframe at offset tframe * frame_size) and one file for each time step
+(data/ex_<tindex>.gda), which is used in the 3D runs.
+"""
+from __future__ import print_function
+
+import math
+import os
+
+import numpy as np
+
+
+def field_shape(pic_info, nreduce=1):
+    """Shape of one frame of a field, (nz, ny, nx) with ny dropped in 2D
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        nreduce: reduction factor of the data
+    """
+    nx = pic_info.nx // nreduce
+    ny = max(pic_info.ny // nreduce, 1)
+    nz = pic_info.nz // nreduce
+    if ny == 1:
+        return (nz, nx)
+    return (nz, ny, nx)
+
+
+def gda_file_name(data_dir, var, tindex):
+    """Name of the .gda file that has the data of var at tindex
+
+    Returns:
+        fname: file name
+        per_step: whether the file only has this time step
+    """
+    fname = data_dir + var + '_' + str(tindex) + '.gda'
+    if os.path.isfile(fname):
+        return fname, True
+    return data_dir + var + '.gda', False
+
+
+def read_field_frame(pic_info, data_dir, var, tframe, nreduce=1,
+                     dtype=np.float32):
+    """Read one time frame of a field
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        var: variable name
+        tframe: time frame
+        nreduce: reduction factor of the data
+        dtype: data type in the file
+    Returns:
+        fdata: memory-mapped array with shape from field_shape
+    """
+    shape = field_shape(pic_info, nreduce)
+    tindex = tframe * pic_info.fields_interval
+    fname, per_step = gda_file_name(data_dir, var, tindex)
+    frame_size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    offset = 0 if per_step else tframe * frame_size
+    return np.memmap(fname, dtype=dtype, mode='r', offset=offset,
+                     shape=shape, order='C')
+
+
+def read_2d_fields(pic_info, fname, current_time, xl, xr, zb, zt):
+    """Read 2D fields data from file.
+    
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        fname: the filename.
+        current_time: current time frame.
+        xl, xr: left and right x position in di (ion skin length).
+        zb, zt: top and bottom z position in di.
+    """
+    print("Reading data from %s" % fname)
+    print("xrange: (%f, %f)" % (xl, xr))
+    print("zrange: (%f, %f)" % (zb, zt))
+    offset = pic_info.nx * pic_info.nz * current_time * 4
+    fdata = np.memmap(fname, dtype='float32',
+                      mode='r', offset=offset,
+                      shape=(pic_info.nz, pic_info.nx), order='C')
+    return subregion_2d(pic_info, fdata, xl, xr, zb, zt)
+
+
+def subregion_2d(pic_info, fdata, xl, xr, zb, zt):
+    """The part of 2D fields data in a box
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        fdata: (nz, nx) data of the whole domain
+        xl, xr: left and right x position in di (ion skin length).
+        zb, zt: top and bottom z position in di.
+    """
+    nx = pic_info.nx
+    nz = pic_info.nz
+    x_di = np.copy(pic_info.x_di)
+    z_di = np.copy(pic_info.z_di)
+    dx_di = pic_info.dx_di
+    dz_di = pic_info.dz_di
+    xmin = np.min(x_di)
+    xmax = np.max(x_di)
+    zmin = np.min(z_di)
+    zmax = np.max(z_di)
+    if (xl <= xmin):
+        xl_index = 0
+    else:
+        xl_index = int(math.floor((xl - xmin) / dx_di))
+    if (xr >= xmax):
+        xr_index = nx - 1
+    else:
+        xr_index = int(math.ceil((xr - xmin) / dx_di))
+    if (zb <= zmin):
+        zb_index = 0
+    else:
+        zb_index = int(math.floor((zb - zmin) / dz_di))
+    if (zt >= zmax):
+        zt_index = nz - 1
+    else:
+        zt_index = int(math.ceil((zt - zmin) / dz_di))
+    xc = x_di[xl_index:xr_index + 1]
+    zc = z_di[zb_index:zt_index + 1]
+    fp = fdata[zb_index:zt_index + 1, xl_index:xr_index + 1]
+    return (xc, zc, fp)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Multi-resolution pyramids of the fields for fast quick-look plots.
+
+Each level is the field reduced by a factor (2, 4, 8, ...) along every
+direction, either by block averaging ('mean') or by block maximum ('max').
+All the levels of one field are built in one streaming pass over the
+full-resolution data, slab by slab along z, so the memory usage is bounded by
+one slab. The levels are saved in the same .gda format as the reduced data in
+data-smooth/ and data-smooth2/:
+
+    <pyramid_dir>/r<level>/<var>_<tindex>.gda        (mean)
+    <pyramid_dir>/r<level>_max/<var>_<tindex>.gda    (max)
+
+The reader picks the coarsest level that still meets the requested output
+resolution, so quick-look plots of 3D runs read megabytes instead of
+gigabytes.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+
+import numpy as np
+
+from field_io import field_shape, read_field_frame
+from shell_functions import mkdir_p
+
+LEVELS = [2, 4, 8]
+MODES = ['mean', 'max']
+
+
+def level_file_name(pyramid_dir, var, tindex, level, mode='mean'):
+    """File name of one level of the pyramid
+    """
+    sub_dir = 'r' + str(level) + ('_max' if mode == 'max' else '')
+    return pyramid_dir + sub_dir + '/' + var + '_' + str(tindex) + '.gda'
+
+
+def level_shape(pic_info, level):
+    """Shape of one level, with the directions shorter than level kept
+    """
+    shape = field_shape(pic_info)
+    return tuple(n // level if n >= level else n for n in shape)
+
+
+def block_reduce(fdata, level, mode='mean'):
+    """Reduce the data by a factor along every direction
+
+    Directions of size 1 are kept, and the remainders are dropped.
+
+    Args:
+        fdata: 2D or 3D data
+        level: reduction factor
+        mode: 'mean' or 'max'
+    """
+    factors = [level if n >= level else 1 for n in fdata.shape]
+    sizes = [n // f for n, f in zip(fdata.shape, factors)]
+    fdata = fdata[tuple(slice(0, s * f) for s, f in zip(sizes, factors))]
+    new_shape = []
+    for size, factor in zip(sizes, factors):
+        new_shape += [size, factor]
+    blocks = fdata.reshape(new_shape)
+    axes = tuple(range(1, 2 * fdata.ndim, 2))
+    if mode == 'max':
+        return blocks.max(axis=axes)
+    return blocks.mean(axis=axes, dtype=np.float64).astype(np.float32)
+
+
+def build_pyramid(pic_info, data_dir, var, tframe, pyramid_dir,
+                  levels=LEVELS, modes=MODES):
+    """Build all levels of one field at one frame in one pass
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the full-resolution .gda files
+        var: variable name
+        tframe: time frame
+        pyramid_dir: directory of the pyramid
+        levels: reduction factors
+        modes: 'mean' and/or 'max'
+    """
+    tindex = tframe * pic_info.fields_interval
+    fdata = read_field_frame(pic_info, data_dir, var, tframe)
+    nz = fdata.shape[0]
+    levels = [level for level in levels if level <= nz]
+    slab = int(np.lcm.reduce(levels))
+    outputs = {}
+    for level in levels:
+        for mode in modes:
+            fname = level_file_name(pyramid_dir, var, tindex, level, mode)
+            mkdir_p(os.path.dirname(fname))
+            outputs[(level, mode)] = np.memmap(fname, dtype=np.float32,
+                                               mode='w+',
+                                               shape=level_shape(pic_info,
+                                                                 level))
+    for zstart in range(0, nz, slab):
+        fslab = np.asarray(fdata[zstart:zstart+slab], dtype=np.float32)
+        for level in levels:
+            nrows = (fslab.shape[0] // level) * level
+            if nrows == 0:
+                continue
+            iz = zstart // level
+            for mode in modes:
+                reduced = block_reduce(fslab[:nrows], level, mode)
+                outputs[(level, mode)][iz:iz+reduced.shape[0]] = reduced
+    for fout in outputs.values():
+        fout.flush()
+
+
+def available_levels(pyramid_dir, var, tindex, mode='mean'):
+    """Levels of a field that exist in the pyramid, in increasing order
+    """
+    levels = []
+    if pyramid_dir and os.path.isdir(pyramid_dir):
+        for entry in os.scandir(pyramid_dir):
+            name = entry.name
+            if mode == 'max':
+                if not name.endswith('_max'):
+                    continue
+                name = name[:-4]
+            if not name.startswith('r') or not name[1:].isdigit():
+                continue
+            level = int(name[1:])
+            if os.path.isfile(level_file_name(pyramid_dir, var, tindex,
+                                              level, mode)):
+                levels.append(level)
+    return sorted(levels)
+
+
+def choose_level(pic_info, levels, out_shape):
+    """The coarsest level that still has at least the output resolution
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        levels: available levels
+        out_shape: requested (nz, nx) of the output
+    Returns:
+        level: reduction factor, 1 for the full-resolution data
+    """
+    nz_out, nx_out = out_shape
+    best = 1
+    for level in levels:
+        if (pic_info.nz // level >= nz_out and
+                pic_info.nx // level >= nx_out and level > best):
+            best = level
+    return best
+
+
+def read_field_quicklook(pic_info, data_dir, var, tframe, out_shape,
+                         pyramid_dir, mode='mean'):
+    """Read a field at the coarsest resolution that meets out_shape
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the full-resolution .gda files
+        var: variable name
+        tframe: time frame
+        out_shape: requested (nz, nx) of the output
+        pyramid_dir: directory of the pyramid
+        mode: 'mean' or 'max'
+    Returns:
+        fdata: memory-mapped data
+        level: reduction factor of the data
+    """
+    tindex = tframe * pic_info.fields_interval
+    levels = available_levels(pyramid_dir, var, tindex, mode)
+    level = choose_level(pic_info, levels, out_shape)
+    if level == 1:
+        return read_field_frame(pic_info, data_dir, var, tframe), level
+    fname = level_file_name(pyramid_dir, var, tindex, level, mode)
+    fdata = np.memmap(fname, dtype=np.float32, mode='r',
+                      shape=level_shape(pic_info, level))
+    return fdata, level
+
+
+def build_pyramids(pic_info, data_dir, var_names, pyramid_dir, levels,
+                   tframe):
+    """Build the pyramids of multiple fields at one frame
+
+    The time frame is the last argument, as for frame_runner.run_frames.
+    """
+    print("Time frame: %d" % tframe)
+    for var in var_names:
+        build_pyramid(pic_info, data_dir, var, tframe, pyramid_dir, levels)
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Build field pyramids')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--var_names', action="store",
+                        default='absJ,bx,by,bz,ne,ni',
+                        help='comma-separated names of the fields')
+    parser.add_argument('--levels', action="store", default='2,4,8',
+                        help='comma-separated reduction factors')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from frame_runner import run_frames
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    pic_run_dir = os.path.join(args.pic_run_dir, '')
+    levels = [int(level) for level in args.levels.split(',')]
+    config = (pic_info, pic_run_dir + 'data/', args.var_names.split(','),
+              pic_run_dir + 'data-pyramid/', levels)
+    run_frames(build_pyramids, range(args.tstart, args.tend + 1), config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Headless batch rendering of multi-panel field figures.
+
+The figure, axes, colorbars and labels are built once in each worker process.
+For each frame, only the image data (set_data) and the Ay contours are
+updated before the figure is drawn with the Agg backend. The contour lines
+come from the cache of flux_function, with the levels of the first frame.
+The labels use matplotlib mathtext instead of an external LaTeX run, and
+mathtext caches the parsed labels, so they are laid out only once. The
+rendered RGB frames are written into a movie by movie_writer, in frame order
+and without intermediate image files.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm, Normalize
+
+from field_io import read_field_frame
+from field_pyramid import read_field_quicklook
+from flux_function import ay_contours
+from movie_writer import write_movie
+
+LABELS = {'absJ': r'$|j|$', 'jy': r'$j_y$',
+          'ne': r'$n_e$', 'ni': r'$n_i$',
+          'bx': r'$B_x$', 'by': r'$B_y$', 'bz': r'$B_z$',
+          'ex': r'$E_x$', 'ey': r'$E_y$', 'ez': r'$E_z$'}
+WORKER = {}
+
+
+def default_layout(var_names):
+    """Layout of one column of panels, one for each variable
+
+    Returns:
+        layout: dictionary that describes the figure
+    """
+    npanels = len(var_names)
+    height = 0.85 / npanels
+    layout = {'var_names': var_names,
+              'labels': [LABELS.get(var, var) for var in var_names],
+              'cmaps': ['coolwarm'] * npanels,
+              'vmin': [None] * npanels,
+              'vmax': [None] * npanels,
+              'is_log': [False] * npanels,
+              'axis_pos': [0.1, 0.93 - height, 0.75, height * 0.9],
+              'gaps': [0.02, height * 0.1],
+              'nxp': 1,
+              'nzp': npanels,
+              'fig_size': [8, 2 * npanels + 1],
+              'dpi': 100,
+              'contour_color': 'k',
+              'nlevels_contour': 20,
+              'contour_levels': None,
+              'xstep': 1,
+              'zstep': 1,
+              'pyramid_dir': None}
+    return layout
+
+
+def midplane(fdata):
+    """The central x-z plane of 3D data, or the data itself in 2D
+    """
+    if fdata.ndim == 3:
+        return fdata[:, fdata.shape[1]//2, :]
+    return fdata
+
+
+class FieldFigure(object):
+    """A multi-panel figure that is built once and updated for each frame
+    """
+    def __init__(self, pic_info, layout, data_dir=None):
+        """
+        Args:
+            pic_info: namedtuple for the PIC simulation information.
+            layout: dictionary that describes the figure (see default_layout)
+            data_dir: directory of the .gda files for the Ay contours. No
+                contours when None or in 3D runs.
+        """
+        self.pic_info = pic_info
+        self.layout = layout
+        self.data_dir = data_dir
+        self.extent = [np.min(pic_info.x_di), np.max(pic_info.x_di),
+                       np.min(pic_info.z_di), np.max(pic_info.z_di)]
+        self.fig = plt.figure(figsize=layout['fig_size'], dpi=layout['dpi'])
+        self.axes = []
+        self.images = []
+        self.contours = [None] * len(layout['var_names'])
+        # Levels without a given value get them from the first frame
+        self.levels = layout.get('contour_levels')
+        # Panels without color ranges get them from the first frame
+        self.autoscale = [vmin is None or vmax is None for vmin, vmax in
+                          zip(layout['vmin'], layout['vmax'])]
+        xs0, ys0, w1, h1 = layout['axis_pos']
+        nz = pic_info.nz // layout['zstep']
+        nx = pic_info.nx // layout['xstep']
+        for ip in range(len(layout['var_names'])):
+            i = ip % layout['nxp']
+            j = ip // layout['nxp']
+            xs = xs0 + (w1 + layout['gaps'][0]) * i
+            ys = ys0 - (h1 + layout['gaps'][1]) * j
+            ax = self.fig.add_axes([xs, ys, w1, h1])
+            vmin, vmax = layout['vmin'][ip], layout['vmax'][ip]
+            if layout['is_log'][ip]:
+                norm = LogNorm(vmin=vmin, vmax=vmax)
+            else:
+                norm = Normalize(vmin=vmin, vmax=vmax)
+            img = ax.imshow(np.ones((nz, nx)), extent=self.extent,
+                            aspect='auto', origin='lower', norm=norm,
+                            cmap=plt.get_cmap(layout['cmaps'][ip]),
+                            interpolation='bicubic')
+            cax = self.fig.add_axes([xs + w1 + 0.01, ys, 0.02, h1])
+            self.fig.colorbar(img, cax=cax)
+            ax.text(0.02, 0.85, layout['labels'][ip], color='k', fontsize=16,
+                    transform=ax.transAxes)
+            ax.tick_params(labelsize=12)
+            if j < layout['nzp'] - 1:
+                ax.tick_params(axis='x', labelbottom=False)
+            else:
+                ax.set_xlabel(r'$x/d_i$', fontsize=16)
+            ax.set_ylabel(r'$z/d_i$', fontsize=16)
+            self.axes.append(ax)
+            self.images.append(img)
+        self.title = self.axes[0].set_title('', fontsize=16)
+
+    def update(self, fdata, tframe=None, title=''):
+        """Update the images and contours for a new frame
+
+        Args:
+            fdata: list of the 2D data of all panels
+            tframe: time frame for the Ay contours. No contours when None.
+            title: title of the figure
+        """
+        layout = self.layout
+        for ip, img in enumerate(self.images):
+            img.set_data(fdata[ip])
+            if self.autoscale[ip]:
+                self.autoscale[ip] = False
+                if layout['is_log'][ip]:
+                    positive = fdata[ip][fdata[ip] > 0]
+                    img.norm.vmin = np.percentile(positive, 1)
+                    img.norm.vmax = np.percentile(positive, 99)
+                else:
+                    vmax = np.percentile(np.abs(fdata[ip]), 99)
+                    img.norm.vmin, img.norm.vmax = -vmax, vmax
+        if (tframe is not None and self.data_dir is not None and
+                layout['nlevels_contour'] > 0 and self.pic_info.ny <= 1):
+            levels, lines = ay_contours(self.pic_info, self.data_dir, tframe,
+                                        layout['nlevels_contour'],
+                                        levels=self.levels)
+            if self.levels is None:
+                self.levels = levels
+            segments = [line for level_lines in lines for line in level_lines]
+            for ip, ax in enumerate(self.axes):
+                if self.contours[ip] is not None:
+                    self.contours[ip].remove()
+                self.contours[ip] = LineCollection(
+                    segments, colors=layout['contour_color'], linewidths=0.5)
+                ax.add_collection(self.contours[ip], autolim=False)
+        self.title.set_text(title)
+
+    def render(self):
+        """Draw the figure and return the (height, width, 3) RGB frame
+        """
+        self.fig.canvas.draw()
+        rgba = np.asarray(self.fig.canvas.buffer_rgba())
+        return np.ascontiguousarray(rgba[:, :, :3])
+
+
+def read_panels(pic_info, data_dir, layout, tframe):
+    """Read the data of all panels at one frame
+    """
+    xstep, zstep = layout['xstep'], layout['zstep']
+    fdata = []
+    for var in layout['var_names']:
+        if layout.get('pyramid_dir'):
+            # The coarsest pyramid level that has the output resolution
+            out_shape = (pic_info.nz // zstep, pic_info.nx // xstep)
+            fvar, level = read_field_quicklook(pic_info, data_dir, var, tframe,
+                                               out_shape, layout['pyramid_dir'])
+            fvar = midplane(fvar)[::max(zstep // level, 1),
+                                  ::max(xstep // level, 1)]
+        else:
+            fvar = midplane(read_field_frame(pic_info, data_dir, var,
+                                             tframe))[::zstep, ::xstep]
+        fdata.append(fvar)
+    return fdata
+
+
+def init_renderer(pic_info, data_dir, layout):
+    """Build the figure once in a worker process
+    """
+    WORKER['pic_info'] = pic_info
+    WORKER['data_dir'] = data_dir
+    WORKER['figure'] = FieldFigure(pic_info, layout, data_dir)
+
+
+def render_frame(tframe):
+    """Render one frame in a worker process
+
+    Returns:
+        frame: (height, width, 3) RGB frame
+    """
+    pic_info = WORKER['pic_info']
+    figure = WORKER['figure']
+    fdata = read_panels(pic_info, WORKER['data_dir'], figure.layout, tframe)
+    title = r'$t\Omega_{ci} = %0.1f$' % (tframe * pic_info.dt_fields)
+    figure.update(fdata, tframe, title)
+    return figure.render()
+
+
+def render_movie(pic_info, data_dir, layout, tframes, fname, nworkers=4,
+                 fps=10):
+    """Render the frames on a process pool and encode them into a movie
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        layout: dictionary that describes the figure (see default_layout)
+        tframes: time frames
+        fname: movie file name
+        nworkers: number of worker processes
+        fps: frames per second of the movie
+    """
+    tframes = list(tframes)
+    if (layout['vmin'].count(None) or layout['vmax'].count(None) or
+            (layout['nlevels_contour'] > 0 and
+             layout.get('contour_levels') is None)):
+        # Fix the color ranges and the contour levels from the first frame
+        # for all workers
+        figure = FieldFigure(pic_info, layout, data_dir)
+        fdata = read_panels(pic_info, data_dir, layout, tframes[0])
+        figure.update(fdata, tframes[0])
+        layout = dict(layout)
+        layout['vmin'] = [img.norm.vmin for img in figure.images]
+        layout['vmax'] = [img.norm.vmax for img in figure.images]
+        layout['contour_levels'] = figure.levels
+        plt.close(figure.fig)
+    write_movie(render_frame, tframes, fname, nworkers,
+                initializer=init_renderer,
+                initargs=(pic_info, data_dir, layout), fps=fps)
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Render field movies')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--var_names', action="store", default='absJ,ne,by',
+                        help='comma-separated names of the fields')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    parser.add_argument('--xstep', action="store", default='1', type=int,
+                        help='step along x for subsampling')
+    parser.add_argument('--zstep', action="store", default='1', type=int,
+                        help='step along z for subsampling')
+    parser.add_argument('--use_pyramid', action="store_true", default=False,
+                        help='whether to read from the pyramid in data-pyramid/')
+    parser.add_argument('--nworkers', action="store", default='4', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--fps', action="store", default='10', type=int,
+                        help='frames per second')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    from shell_functions import mkdir_p
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    layout = default_layout(args.var_names.split(','))
+    layout['xstep'] = args.xstep
+    layout['zstep'] = args.zstep
+    data_dir = os.path.join(args.pic_run_dir, '') + 'data/'
+    if args.use_pyramid:
+        layout['pyramid_dir'] = os.path.join(args.pic_run_dir, '') + 'data-pyramid/'
+    fdir = '../img/movies/' + args.pic_run + '/'
+    mkdir_p(fdir)
+    fname = fdir + args.var_names.replace(',', '_') + '.mp4'
+    render_movie(pic_info, data_dir, layout,
+                 range(args.tstart, args.tend + 1), fname,
+                 args.nworkers, args.fps)
+
+
+if __name__ == "__main__":
+    main()
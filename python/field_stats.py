@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Streaming statistics of the field distributions.
+
+For each field, one pass over a frame accumulates histograms (linear, log or
+symmetric-log bins), the moments and a quantile sketch. The data is processed
+in chunks, and all the accumulators are mergeable, so partial results from
+chunks of a frame, from MPI ranks or from separate runs over parts of the
+domain can be combined exactly (the quantiles within the relative accuracy of
+the sketch). The statistics of all frames are saved in one HDF5 file, with
+one group for each time step:
+
+    /Timestep_<tindex>/<var>/hists/<name>/{edges,counts}
+    /Timestep_<tindex>/<var>/sketch_{pos,neg}_{keys,counts}
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import os
+
+import h5py
+import numpy as np
+
+from field_io import field_shape, read_field_frame
+from shell_functions import mkdir_p
+
+BIN_TYPES = ['linear', 'log', 'symlog']
+CHUNK = 1 << 22
+# fields calculated from their components when there is no file for them
+DERIVED = {'absb': ['bx', 'by', 'bz'],
+           'abse': ['ex', 'ey', 'ez'],
+           'absj': ['jx', 'jy', 'jz']}
+
+
+def bin_edges(btype, vmin, vmax, nbins):
+    """Bin edges of a histogram
+
+    Args:
+        btype: 'linear', 'log' or 'symlog'
+        vmin, vmax: range of the bins. For 'symlog', the range of the
+            absolute values of the log bins.
+        nbins: number of bins. For 'symlog', the number of log bins on each
+            side of zero, with two more bins from -vmin to 0 and 0 to vmin.
+    """
+    if btype == 'linear':
+        return np.linspace(vmin, vmax, nbins + 1)
+    fbins = np.logspace(math.log10(vmin), math.log10(vmax), nbins + 1)
+    if btype == 'log':
+        return fbins
+    edges = np.zeros(2 * nbins + 3)
+    edges[:nbins+1] = -fbins[::-1]
+    edges[nbins+2:] = fbins
+    return edges
+
+
+def chunk_slices(size, chunk=CHUNK):
+    """Slices of chunks of flattened data
+    """
+    for start in range(0, size, chunk):
+        yield slice(start, min(start + chunk, size))
+
+
+def finite_values(data):
+    """Flattened data with the nan and inf removed
+    """
+    data = np.ravel(data)
+    finite = np.isfinite(data)
+    return data if finite.all() else data[finite]
+
+
+class Histogram(object):
+    """Histogram with linear, log or symmetric-log bins
+    """
+    def __init__(self, btype, vmin, vmax, nbins):
+        if btype not in BIN_TYPES:
+            raise ValueError("Unknown bin type: " + btype)
+        self.btype = btype
+        self.vmin = vmin
+        self.vmax = vmax
+        self.nbins = nbins
+        self.edges = bin_edges(btype, vmin, vmax, nbins)
+        self.counts = np.zeros(len(self.edges) - 1)
+
+    def log_counts(self, data):
+        """Counts of positive data in the log bins
+
+        The bins are uniform in log10, so the fast path of np.histogram with
+        a range is used instead of searching the edges.
+        """
+        data = data[data > 0]
+        lrange = (math.log10(self.vmin), math.log10(self.vmax))
+        counts, _ = np.histogram(np.log10(data), bins=self.nbins, range=lrange)
+        return counts
+
+    def add(self, data):
+        """Add data to the histogram
+        """
+        data = np.ravel(data)
+        for sl in chunk_slices(data.size):
+            chunk = data[sl]
+            if self.btype == 'linear':
+                counts, _ = np.histogram(chunk, bins=self.nbins,
+                                         range=(self.vmin, self.vmax))
+                self.counts += counts
+            elif self.btype == 'log':
+                self.counts += self.log_counts(chunk)
+            else:
+                nbins = self.nbins
+                self.counts[:nbins] += self.log_counts(-chunk)[::-1]
+                self.counts[nbins] += np.count_nonzero(
+                    np.logical_and(chunk >= -self.vmin, chunk < 0))
+                self.counts[nbins+1] += np.count_nonzero(
+                    np.logical_and(chunk >= 0, chunk < self.vmin))
+                self.counts[nbins+2:] += self.log_counts(chunk)
+
+    def merge(self, other):
+        """Add the counts of a histogram with the same bins
+        """
+        if (other.btype, other.vmin, other.vmax, other.nbins) != \
+                (self.btype, self.vmin, self.vmax, self.nbins):
+            raise ValueError("Histograms with different bins")
+        self.counts += other.counts
+
+    def centers(self):
+        """Centers of the bins
+        """
+        return 0.5 * (self.edges[1:] + self.edges[:-1])
+
+
+class Moments(object):
+    """Count, mean, variance, minimum and maximum, merged with Chan's formula
+    """
+    def __init__(self, count=0, mean=0.0, m2=0.0, vmin=np.inf, vmax=-np.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.vmin = vmin
+        self.vmax = vmax
+
+    def add(self, data):
+        """Add data, which should not have nan or inf
+        """
+        data = np.ravel(data)
+        for sl in chunk_slices(data.size):
+            chunk = data[sl]
+            if chunk.size == 0:
+                continue
+            mean = np.mean(chunk, dtype=np.float64)
+            m2 = np.var(chunk, dtype=np.float64) * chunk.size
+            self.merge(Moments(chunk.size, mean, m2,
+                               float(np.min(chunk)), float(np.max(chunk))))
+
+    def merge(self, other):
+        """Merge the moments of other data
+        """
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / float(count)
+        self.m2 += other.m2 + delta**2 * self.count * other.count / float(count)
+        self.count = count
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+
+    def variance(self):
+        """Population variance
+        """
+        return self.m2 / self.count if self.count else 0.0
+
+
+class QuantileSketch(object):
+    """Mergeable quantile sketch with a relative accuracy
+
+    The absolute values are counted in logarithmic buckets with ratio
+    gamma = (1 + alpha) / (1 - alpha), so that any quantile is estimated
+    within a relative error alpha. Merging adds the bucket counts.
+    """
+    def __init__(self, alpha=0.01, min_value=1E-30):
+        self.alpha = alpha
+        self.min_value = min_value
+        self.gamma = (1.0 + alpha) / (1.0 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+
+    def count(self):
+        """Number of values in the sketch
+        """
+        return (sum(self.positive.values()) + sum(self.negative.values()) +
+                self.zero_count)
+
+    def add_buckets(self, buckets, data):
+        """Count the absolute values in data into buckets
+        """
+        keys = np.ceil(np.log(data) / self.log_gamma).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            buckets[key] = buckets.get(key, 0) + count
+
+    def add(self, data):
+        """Add data, which should not have nan or inf
+        """
+        data = np.ravel(data)
+        for sl in chunk_slices(data.size):
+            chunk = data[sl]
+            self.add_buckets(self.positive, chunk[chunk > self.min_value])
+            self.add_buckets(self.negative, -chunk[chunk < -self.min_value])
+            self.zero_count += int(np.count_nonzero(
+                np.abs(chunk) <= self.min_value))
+
+    def merge(self, other):
+        """Merge a sketch with the same accuracy
+        """
+        if other.alpha != self.alpha:
+            raise ValueError("Sketches with different accuracy")
+        for buckets, other_buckets in [(self.positive, other.positive),
+                                       (self.negative, other.negative)]:
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+
+    def bucket_value(self, key):
+        """Value that represents a bucket
+        """
+        return 2.0 * self.gamma**key / (self.gamma + 1.0)
+
+    def quantile(self, q):
+        """Estimated value at quantile q in [0, 1]
+        """
+        ntot = self.count()
+        if ntot == 0:
+            return np.nan
+        rank = q * (ntot - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self.bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self.bucket_value(key)
+        return self.bucket_value(max(self.positive))
+
+
+class FieldStats(object):
+    """Histograms, moments and quantile sketch of one field
+    """
+    def __init__(self, hist_specs=(), alpha=0.01):
+        """
+        Args:
+            hist_specs: list of (name, btype, vmin, vmax, nbins)
+            alpha: relative accuracy of the quantiles
+        """
+        self.hists = {spec[0]: Histogram(*spec[1:]) for spec in hist_specs}
+        self.moments = Moments()
+        self.sketch = QuantileSketch(alpha)
+
+    def add(self, data):
+        """Add data to all the statistics
+        """
+        data = np.ravel(data)
+        for sl in chunk_slices(data.size):
+            chunk = finite_values(data[sl])
+            for hist in self.hists.values():
+                hist.add(chunk)
+            self.moments.add(chunk)
+            self.sketch.add(chunk)
+
+    def merge(self, other):
+        """Merge the statistics of other data
+        """
+        for name, hist in other.hists.items():
+            if name in self.hists:
+                self.hists[name].merge(hist)
+            else:
+                self.hists[name] = hist
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def quantiles(self, qs):
+        """Estimated values at quantiles qs
+        """
+        return np.asarray([self.sketch.quantile(q) for q in qs])
+
+    def save(self, grp):
+        """Save the statistics in an HDF5 group
+        """
+        for name, hist in self.hists.items():
+            hgrp = grp.create_group('hists/' + name)
+            hgrp.attrs['btype'] = hist.btype
+            hgrp.attrs['vmin'] = hist.vmin
+            hgrp.attrs['vmax'] = hist.vmax
+            hgrp.attrs['nbins'] = hist.nbins
+            hgrp.create_dataset('edges', data=hist.edges)
+            hgrp.create_dataset('counts', data=hist.counts)
+        moments = self.moments
+        for key in ['count', 'mean', 'm2', 'vmin', 'vmax']:
+            grp.attrs[key] = getattr(moments, key)
+        sketch = self.sketch
+        grp.attrs['alpha'] = sketch.alpha
+        grp.attrs['min_value'] = sketch.min_value
+        grp.attrs['zero_count'] = sketch.zero_count
+        for sign, buckets in [('pos', sketch.positive),
+                              ('neg', sketch.negative)]:
+            keys = sorted(buckets)
+            grp.create_dataset('sketch_' + sign + '_keys',
+                               data=np.asarray(keys, dtype=np.int64))
+            grp.create_dataset('sketch_' + sign + '_counts',
+                               data=np.asarray([buckets[key] for key in keys],
+                                               dtype=np.int64))
+
+    @classmethod
+    def load(cls, grp):
+        """Load the statistics from an HDF5 group
+        """
+        stats = cls(alpha=float(grp.attrs['alpha']))
+        if 'hists' in grp:
+            for name, hgrp in grp['hists'].items():
+                btype = hgrp.attrs['btype']
+                if isinstance(btype, bytes):
+                    btype = btype.decode()
+                hist = Histogram(btype, float(hgrp.attrs['vmin']),
+                                 float(hgrp.attrs['vmax']),
+                                 int(hgrp.attrs['nbins']))
+                hist.counts[:] = hgrp['counts'][:]
+                stats.hists[name] = hist
+        stats.moments = Moments(int(grp.attrs['count']),
+                                float(grp.attrs['mean']),
+                                float(grp.attrs['m2']),
+                                float(grp.attrs['vmin']),
+                                float(grp.attrs['vmax']))
+        sketch = stats.sketch
+        sketch.min_value = float(grp.attrs['min_value'])
+        sketch.zero_count = int(grp.attrs['zero_count'])
+        for sign, buckets in [('pos', sketch.positive),
+                              ('neg', sketch.negative)]:
+            keys = grp['sketch_' + sign + '_keys'][:]
+            counts = grp['sketch_' + sign + '_counts'][:]
+            buckets.update(zip(keys.tolist(), counts.tolist()))
+        return stats
+
+
+def read_stats_field(pic_info, data_dir, var, tframe):
+    """Field for the statistics, with the derived fields calculated
+    """
+    tindex = tframe * pic_info.fields_interval
+    if var in DERIVED and not (
+            os.path.isfile(data_dir + var + '.gda') or
+            os.path.isfile(data_dir + var + '_' + str(tindex) + '.gda')):
+        comps = [read_field_frame(pic_info, data_dir, comp, tframe)
+                 for comp in DERIVED[var]]
+        return comps, True
+    return read_field_frame(pic_info, data_dir, var, tframe), False
+
+
+def frame_stats(pic_info, data_dir, specs, zrange, alpha, tframe):
+    """Statistics of fields at one frame in one pass
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        specs: dictionary of the histogram specs of each field, as for
+            FieldStats
+        zrange: range of the z indices, or None for the whole frame. The
+            statistics of parts of a frame can be merged.
+        alpha: relative accuracy of the quantiles
+        tframe: time frame
+    Returns:
+        stats: dictionary of FieldStats of the fields
+    """
+    nz = field_shape(pic_info)[0]
+    zstart, zend = zrange if zrange else (0, nz)
+    shape = field_shape(pic_info)
+    zslab = max(1, CHUNK // int(np.prod(shape[1:])))
+    stats = {}
+    for var, hist_specs in specs.items():
+        stats[var] = FieldStats(hist_specs, alpha)
+        fdata, derived = read_stats_field(pic_info, data_dir, var, tframe)
+        for iz in range(zstart, zend, zslab):
+            izend = min(iz + zslab, zend)
+            if derived:
+                slab = np.zeros((izend - iz, ) + shape[1:], dtype=np.float32)
+                for comp in fdata:
+                    slab += np.square(comp[iz:izend])
+                np.sqrt(slab, out=slab)
+            else:
+                slab = fdata[iz:izend]
+            stats[var].add(slab)
+    return stats
+
+
+def save_frame_stats(fname, tindex, stats):
+    """Save the statistics of one frame, replacing the old ones
+    """
+    mkdir_p(os.path.dirname(fname) or '.')
+    with h5py.File(fname, 'a') as fh:
+        gname = "Timestep_" + str(tindex)
+        if gname in fh:
+            del fh[gname]
+        grp = fh.create_group(gname)
+        for var, fstats in stats.items():
+            fstats.save(grp.create_group(var))
+
+
+def load_frame_stats(fname, tindex):
+    """Load the statistics of one frame
+
+    Returns:
+        stats: dictionary of FieldStats of the fields
+    """
+    with h5py.File(fname, 'r') as fh:
+        grp = fh["Timestep_" + str(tindex)]
+        return {var: FieldStats.load(grp[var]) for var in grp}
+
+
+def stats_time_steps(fname):
+    """Time steps in a statistics file, in increasing order
+    """
+    with h5py.File(fname, 'r') as fh:
+        return sorted(int(gname.split('_')[-1]) for gname in fh)
+
+
+def merge_stats_files(fnames, fname_out):
+    """Merge the statistics of parts of the data, e.g. from MPI ranks
+
+    Args:
+        fnames: statistics files
+        fname_out: file for the merged statistics
+    """
+    tindices = set()
+    for fname in fnames:
+        tindices.update(stats_time_steps(fname))
+    for tindex in sorted(tindices):
+        merged = {}
+        for fname in fnames:
+            if tindex not in stats_time_steps(fname):
+                continue
+            for var, fstats in load_frame_stats(fname, tindex).items():
+                if var in merged:
+                    merged[var].merge(fstats)
+                else:
+                    merged[var] = fstats
+        save_frame_stats(fname_out, tindex, merged)
+
+
+def parse_hist_specs(spec_str):
+    """Parse histogram specs var:btype:vmin:vmax:nbins[,...]
+
+    Returns:
+        specs: dictionary of the histogram specs of each field. Each
+            histogram is named <var>_<btype>_<index>, where index counts the
+            histograms of the field, so several histograms of one field with
+            the same bin type are all kept.
+    """
+    specs = {}
+    for item in spec_str.split(','):
+        if not item:
+            continue
+        var, btype, vmin, vmax, nbins = item.split(':')
+        var_specs = specs.setdefault(var, [])
+        name = '%s_%s_%d' % (var, btype, len(var_specs))
+        var_specs.append((name, btype, float(vmin), float(vmax), int(nbins)))
+    return specs
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Field statistics')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--data_sub_dir', action="store", default='data',
+                        help='sub-directory of the .gda files')
+    parser.add_argument('--hists', action="store",
+                        default='absj:linear:0:2:200,abse:linear:0:0.3:300',
+                        help='histograms as var:btype:vmin:vmax:nbins, ' +
+                        'comma-separated')
+    parser.add_argument('--alpha', action="store", default=0.01, type=float,
+                        help='relative accuracy of the quantiles')
+    parser.add_argument('--zrange', action="store", default='',
+                        help='range of z indices as zstart:zend')
+    parser.add_argument('--fname', action="store", default='',
+                        help='output file (default: ' +
+                        '../data/field_stats/<pic_run>.h5)')
+    parser.add_argument('--merge', action="store", default='',
+                        help='comma-separated files to merge into --fname')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from frame_runner import run_frames
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    fname = args.fname or '../data/field_stats/' + args.pic_run + '.h5'
+    if args.merge:
+        merge_stats_files(args.merge.split(','), fname)
+        return
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    data_dir = os.path.join(args.pic_run_dir, args.data_sub_dir, '')
+    specs = parse_hist_specs(args.hists)
+    zrange = None
+    if args.zrange:
+        zrange = [int(iz) for iz in args.zrange.split(':')]
+    config = (pic_info, data_dir, specs, zrange, args.alpha)
+    results, failed = run_frames(frame_stats,
+                                 range(args.tstart, args.tend + 1), config,
+                                 raise_on_failure=False)
+    for tframe in sorted(results):
+        tindex = tframe * pic_info.fields_interval
+        save_frame_stats(fname, tindex, results[tframe])
+    if failed:
+        raise RuntimeError("Failed frames: %s" % sorted(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,8 @@ import color_maps as cm
 import colormap.colormaps as cmaps
 import palettable
 import pic_information
-from contour_plots import plot_2d_contour, read_2d_fields
+from contour_plots import (plot_2d_contour, plot_ay_contours, read_2d_ay,
+                           read_2d_fields)
 from energy_conversion import read_data_from_json
 from plasma_params import calc_plasma_parameters
 from runs_name_path import ApJ_long_paper_runs
@@ -89,6 +90,13 @@ class PlotMultiplePanels(object):
         else:
             self.is_multi_Ay = False
 
+        # Whether to draw the cached contour lines of Ay in data_dir
+        if "data_dir" in kwargs:
+            self.pic_info = kwargs["pic_info"]
+            self.data_dir = kwargs["data_dir"]
+        else:
+            self.data_dir = None
+
         self.fig = plt.figure(figsize=self.fig_sizes)
         self.ax = []
         self.im = []
@@ -116,7 +124,9 @@ class PlotMultiplePanels(object):
                 self.im.append(im1)
                 self.cbar.append(cbar1)
                 im1.set_cmap(plt.cm.get_cmap(self.colormaps[ip]))
-                if not self.is_multi_Ay:
+                if self.data_dir and not self.is_multi_Ay:
+                    co1 = self.plot_ay_contours(ip)
+                elif not self.is_multi_Ay:
                     if self.nlevels_contour == 0:
                         co1 = self.ax1.contour(
                             self.x[0:self.nx:self.xstep],
@@ -237,6 +247,10 @@ class PlotMultiplePanels(object):
             for i in range(self.nxp):
                 np = self.nxp * j + i
                 self.im[np].set_data(self.fdata[np])
+                if self.data_dir and not self.is_multi_Ay:
+                    self.co[np].remove()
+                    self.co[np] = self.plot_ay_contours(np)
+                    continue
                 for coll in self.co[np].collections:
                     coll.remove()
                 self.co[np] = self.ax[np].contour(
@@ -248,6 +262,14 @@ class PlotMultiplePanels(object):
         self.fig.canvas.draw_idle()
         self.save_figures()
 
+    def plot_ay_contours(self, ip):
+        """Overlay the cached contour lines of Ay of the current time frame
+        """
+        nlevels = self.nlevels_contour or 10
+        return plot_ay_contours(self.ax[ip], self.pic_info, self.data_dir,
+                                self.ct, nlevels,
+                                colors=self.contour_color[ip], linewidths=0.5)
+
     def update_plot_1d(self, fdata_1d):
         """Update 1D plots
         """
@@ -311,7 +333,7 @@ def plot_magnetic_fields(run_name, root_dir, pic_info):
     fname4 = root_dir + 'data/bz.gda'
     x, z, bz = read_2d_fields(pic_info, fname4, **kwargs)
     fname5 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
     fdata = [absB, bx, by, bz]
     # Change with different runs
     b0 = pic_info.b0
@@ -323,6 +345,8 @@ def plot_magnetic_fields(run_name, root_dir, pic_info):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -348,7 +372,7 @@ def plot_magnetic_fields(run_name, root_dir, pic_info):
         x, z, bx = read_2d_fields(pic_info, fname2, **kwargs)
         x, z, by = read_2d_fields(pic_info, fname3, **kwargs)
         x, z, bz = read_2d_fields(pic_info, fname4, **kwargs)
-        x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
         fdata = [absB, bx, by, bz]
         bfields_plot.update_fields(ct, fdata, Ay)
 
@@ -396,7 +420,7 @@ def plot_electric_fields(run_name, root_dir, pic_info):
     fname4 = root_dir + 'data/ez.gda'
     x, z, ez = read_2d_fields(pic_info, fname4, **kwargs)
     fname5 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
     ex = signal.convolve2d(ex, kernel, 'same')
     ey = signal.convolve2d(ey, kernel, 'same')
     ez = signal.convolve2d(ez, kernel, 'same')
@@ -413,6 +437,8 @@ def plot_electric_fields(run_name, root_dir, pic_info):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -437,7 +463,7 @@ def plot_electric_fields(run_name, root_dir, pic_info):
         x, z, ex = read_2d_fields(pic_info, fname2, **kwargs)
         x, z, ey = read_2d_fields(pic_info, fname3, **kwargs)
         x, z, ez = read_2d_fields(pic_info, fname4, **kwargs)
-        x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
         ex = signal.convolve2d(ex, kernel, 'same')
         ey = signal.convolve2d(ey, kernel, 'same')
         ez = signal.convolve2d(ez, kernel, 'same')
@@ -488,7 +514,7 @@ def plot_current_densities(run_name, root_dir, pic_info):
     fname4 = root_dir + 'data/jz.gda'
     x, z, jz = read_2d_fields(pic_info, fname4, **kwargs)
     fname5 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
     fdata = [absJ, jx, jy, jz]
     # Change with different runs
     b0 = pic_info.b0
@@ -502,6 +528,8 @@ def plot_current_densities(run_name, root_dir, pic_info):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -527,7 +555,7 @@ def plot_current_densities(run_name, root_dir, pic_info):
         x, z, jx = read_2d_fields(pic_info, fname2, **kwargs)
         x, z, jy = read_2d_fields(pic_info, fname3, **kwargs)
         x, z, jz = read_2d_fields(pic_info, fname4, **kwargs)
-        x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
         fdata = [absJ, jx, jy, jz]
         jfields_plot.update_fields(ct, fdata, Ay)
 
@@ -572,7 +600,7 @@ def plot_number_densities(run_name, root_dir, pic_info):
     fname2 = root_dir + 'data/ni.gda'
     x, z, ni = read_2d_fields(pic_info, fname2, **kwargs)
     fname3 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname3, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname3, **kwargs)
     fdata = [ne, ni]
     fname = 'nrho'
     kwargs_plots = {
@@ -580,6 +608,8 @@ def plot_number_densities(run_name, root_dir, pic_info):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -663,13 +693,15 @@ def plot_energy_band(run_name, root_dir, pic_info, species):
         x, z, data = read_2d_fields(pic_info, fname1, **kwargs)
         fdata.append(data)
     fname2 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
     fname = species + 'EB'
     kwargs_plots = {
         'current_time': ct,
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -695,7 +727,7 @@ def plot_energy_band(run_name, root_dir, pic_info, species):
         for i in range(0, nbands):
             x, z, data = read_2d_fields(pic_info, fnames[i], **kwargs)
             fdata.append(data)
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         ebfields_plot.update_fields(ct, fdata, Ay)
 
     # plt.show()
@@ -765,13 +797,15 @@ def plot_pressure_tensor(run_name, root_dir, pic_info, species):
         x, z, data = read_2d_fields(pic_info, fname, **kwargs)
         fdata.append(data)
     fname2 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
     fname = 'p' + species
     kwargs_plots = {
         'current_time': ct,
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -797,7 +831,7 @@ def plot_pressure_tensor(run_name, root_dir, pic_info, species):
         for fname in fnames:
             x, z, data = read_2d_fields(pic_info, fname, **kwargs)
             fdata.append(data)
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         pfields_plot.update_fields(ct, fdata, Ay)
 
     # plt.show()
@@ -857,7 +891,7 @@ def plot_velocity_fields(run_name, root_dir, pic_info, species):
     x, z, vy = read_2d_fields(pic_info, fname3, **kwargs)
     x, z, vz = read_2d_fields(pic_info, fname4, **kwargs)
     fname5 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname5, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname5, **kwargs)
     # fdata = [vx/va, vy/va, vz/va]
     fdata = [vx, vy, vz]
     fname = 'v' + species
@@ -866,6 +900,8 @@ def plot_velocity_fields(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -958,13 +994,15 @@ def plot_thermal_temperature(run_name, root_dir, pic_info):
     ti = pi / nrho / 3.0
     fdata = [te, ti]
     fname2 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
     fname = 'temp'
     kwargs_plots = {
         'current_time': ct,
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -1003,7 +1041,7 @@ def plot_thermal_temperature(run_name, root_dir, pic_info):
         x, z, nrho = read_2d_fields(pic_info, fname, **kwargs)
         ti = pi / nrho / 3.0
         fdata = [te, ti]
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         pfields_plot.update_fields(ct, fdata, Ay)
 
     # plt.show()
@@ -1068,7 +1106,7 @@ def plot_maximum_energy(run_name, root_dir, pic_info):
     x, z, emax_i = read_2d_fields(pic_info, fname2, **kwargs1)
     emax_i *= pic_info.mime * ieth
     fname3 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname3, **kwargs2)
+    x, z, Ay = read_2d_ay(pic_info, fname3, **kwargs2)
     fdata = [emax_e, emax_i]
     fname = 'emax'
     kwargs_plots = {
@@ -1100,7 +1138,7 @@ def plot_maximum_energy(run_name, root_dir, pic_info):
         kwargs2["current_time"] = (ct + 1) * tratio
         x, z, emax_e = read_2d_fields(pic_info, fname1, **kwargs1)
         x, z, emax_i = read_2d_fields(pic_info, fname2, **kwargs1)
-        x, z, Ay = read_2d_fields(pic_info, fname3, **kwargs2)
+        x, z, Ay = read_2d_ay(pic_info, fname3, **kwargs2)
         emax_e *= ieth
         emax_i *= pic_info.mime * ieth
         fdata = [emax_e, emax_i]
@@ -1267,7 +1305,7 @@ def plot_jdote_fields(run_name, root_dir, pic_info, species):
     fdata_1d = np.asarray(fdata_1d)
     fdata /= j0  # Normalization
     fname2 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
     fname = 'jdotes_' + species
     bottom_panel = True
     xlim = [0, 200]
@@ -1277,6 +1315,8 @@ def plot_jdote_fields(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -1313,7 +1353,7 @@ def plot_jdote_fields(run_name, root_dir, pic_info, species):
         fdata = np.asarray(fdata)
         fdata_1d = np.asarray(fdata_1d)
         fdata /= j0  # Normalization
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         jdote_plot.update_plot_1d(fdata_1d)
         jdote_plot.update_fields(ct, fdata, Ay)
 
@@ -1415,7 +1455,7 @@ def plot_compression_fields(run_name, root_dir, pic_info, species):
     fdata_1d = np.asarray(fdata_1d)
     fdata /= j0  # Normalization
     fname2 = root_dir + 'data/Ay.gda'
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
     fname = 'comp_' + species
     bottom_panel = True
     xlim = [0, 200]
@@ -1425,6 +1465,8 @@ def plot_compression_fields(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -1481,7 +1523,7 @@ def plot_compression_fields(run_name, root_dir, pic_info, species):
         fdata_1d = np.asarray(fdata_1d)
         fdata /= j0  # Normalization
         fname2 = root_dir + 'data/Ay.gda'
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         jdote_plot.update_plot_1d(fdata_1d)
         jdote_plot.update_fields(ct, fdata, Ay)
 
@@ -1571,7 +1613,7 @@ def plot_bulk_internal_energy(run_name, root_dir, pic_info, species):
         internal_ene += data
     internal_ene *= 0.5
     fdata = [bulk_ene / internal_ene, bulk_ene, internal_ene]
-    x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+    x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
 
     fname = 'bulk_internal_' + species
     # Change with different runs
@@ -1587,6 +1629,8 @@ def plot_bulk_internal_energy(run_name, root_dir, pic_info, species):
         'x': x,
         'z': z,
         'Ay': Ay,
+        'pic_info': pic_info,
+        'data_dir': root_dir + 'data/',
         'fdata': fdata,
         'contour_color': contour_color,
         'colormaps': colormaps,
@@ -1625,7 +1669,7 @@ def plot_bulk_internal_energy(run_name, root_dir, pic_info, species):
             internal_ene += data
         internal_ene *= 0.5
         fdata = [bulk_ene / internal_ene, bulk_ene, internal_ene]
-        x, z, Ay = read_2d_fields(pic_info, fname2, **kwargs)
+        x, z, Ay = read_2d_ay(pic_info, fname2, **kwargs)
         bulk_plot.update_fields(ct, fdata, Ay)
 
     # plt.show()
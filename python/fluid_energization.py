@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Fluid energization terms (j.E and compression/shear terms) for all frames.
+
+The fields needed by the registered terms are loaded once per frame, the
+shared intermediates (b-hat, ExB drift, div v, grad v, P_para, P_perp, ...)
+are computed once and cached, and every term is evaluated from them as
+array kernels. Each frame gives the spatial maps and the domain integrals
+of all terms.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+
+import numpy as np
+
+from field_io import read_field_frame
+from shell_functions import mkdir_p
+
+TERMS = {}
+OPT_IN_TERMS = set()
+
+
+def register_term(name, opt_in=False):
+    """Decorator to register the kernel of one energization term
+
+    A kernel takes an EnergizationFrame and returns the spatial map.
+
+    Args:
+        name: name of the term
+        opt_in: whether the term is only calculated when it is requested,
+            e.g., because it needs files that most runs do not have
+    """
+    def decorator(func):
+        TERMS[name] = func
+        if opt_in:
+            OPT_IN_TERMS.add(name)
+        return func
+    return decorator
+
+
+def default_terms():
+    """Names of the terms calculated by default
+    """
+    return sorted(term for term in TERMS if term not in OPT_IN_TERMS)
+
+
+class EnergizationFrame(object):
+    """Fields and shared intermediates of one time frame
+    """
+    def __init__(self, pic_info, data_dir, species, tframe,
+                 smooth_sigma=None):
+        """
+        Args:
+            pic_info: namedtuple for the PIC simulation information.
+            data_dir: directory of the .gda files
+            species: 'e' or 'i'
+            tframe: time frame
+            smooth_sigma: width of the Gaussian filter for the electric
+                field. The field is not smoothed by default.
+        """
+        self.pic_info = pic_info
+        self.data_dir = data_dir
+        self.species = species
+        self.tframe = tframe
+        self.smooth_sigma = smooth_sigma
+        self.cache = {}
+        if species == 'e':
+            self.pmass, self.charge = 1.0, -1.0
+        else:
+            self.pmass, self.charge = pic_info.mime, 1.0
+        smime = math.sqrt(pic_info.mime)
+        # Grid sizes in de, so the gradients are in de^-1
+        self.dxyz = [pic_info.dx_di * smime, pic_info.dy_di * smime,
+                     pic_info.dz_di * smime]
+        self.is_3d = pic_info.ny > 1
+        self.dv = self.dxyz[0] * self.dxyz[2]
+        if self.is_3d:
+            self.dv *= self.dxyz[1]
+
+    def field(self, var):
+        """Field data from the files, read only once
+        """
+        if var not in self.cache:
+            fdata = read_field_frame(self.pic_info, self.data_dir,
+                                     var, self.tframe)
+            fdata = np.array(fdata, dtype=np.float64)
+            if self.smooth_sigma and var[0] == 'e' and len(var) == 2:
+                from scipy.ndimage.filters import gaussian_filter
+                fdata = gaussian_filter(fdata, self.smooth_sigma)
+            self.cache[var] = fdata
+        return self.cache[var]
+
+    def hydro(self, var):
+        """Hydro data of the species, e.g. hydro('vx') reads 'vex' for electrons
+        """
+        return self.field(var[0] + self.species + var[1:])
+
+    def cached(self, name, func):
+        """Intermediate calculated by func, calculated only once
+        """
+        if name not in self.cache:
+            self.cache[name] = func()
+        return self.cache[name]
+
+    def grad(self, fdata):
+        """Gradient [d/dx, d/dy, d/dz] of a field
+        """
+        if self.is_3d:
+            ddz, ddy, ddx = np.gradient(fdata, *self.dxyz[::-1])
+        else:
+            ddz, ddx = np.gradient(fdata, self.dxyz[2], self.dxyz[0])
+            ddy = np.zeros(fdata.shape)
+        return [ddx, ddy, ddz]
+
+    def efield(self):
+        """Electric field"""
+        return [self.field('ex'), self.field('ey'), self.field('ez')]
+
+    def bfield(self):
+        """Magnetic field"""
+        return [self.field('bx'), self.field('by'), self.field('bz')]
+
+    def ib2(self):
+        """1 / B^2"""
+        def func():
+            bx, by, bz = self.bfield()
+            b2 = bx**2 + by**2 + bz**2
+            with np.errstate(divide='ignore'):
+                return np.where(b2 > 0, 1.0 / b2, 0.0)
+        return self.cached('ib2', func)
+
+    def bhat(self):
+        """Unit vector along the magnetic field"""
+        def func():
+            ib = np.sqrt(self.ib2())
+            return [bcomp * ib for bcomp in self.bfield()]
+        return self.cached('bhat', func)
+
+    def vexb(self):
+        """ExB drift velocity"""
+        def func():
+            ex, ey, ez = self.efield()
+            bx, by, bz = self.bfield()
+            ib2 = self.ib2()
+            return [(ey * bz - ez * by) * ib2,
+                    (ez * bx - ex * bz) * ib2,
+                    (ex * by - ey * bx) * ib2]
+        return self.cached('vexb', func)
+
+    def grad_vexb(self):
+        """grad_vexb[i][j] = d_i vexb_j"""
+        def func():
+            gvj = [self.grad(vcomp) for vcomp in self.vexb()]
+            return [[gvj[j][i] for j in range(3)] for i in range(3)]
+        return self.cached('grad_vexb', func)
+
+    def divv_exb(self):
+        """Divergence of the ExB drift"""
+        def func():
+            gv = self.grad_vexb()
+            return gv[0][0] + gv[1][1] + gv[2][2]
+        return self.cached('divv_exb', func)
+
+    def bbsigma(self):
+        """b b : sigma, where sigma is the shear tensor of the ExB drift"""
+        def func():
+            gv = self.grad_vexb()
+            bhat = self.bhat()
+            divv = self.divv_exb()
+            bbs = np.zeros(divv.shape)
+            for i in range(3):
+                for j in range(3):
+                    bbs += 0.5 * (gv[i][j] + gv[j][i]) * bhat[i] * bhat[j]
+            return bbs - divv / 3.0
+        return self.cached('bbsigma', func)
+
+    def ptensor(self):
+        """Pressure tensor p[i][j]"""
+        def func():
+            comps = ['x', 'y', 'z']
+            return [[self.field('p' + self.species + '-' + ci + cj)
+                     for cj in comps] for ci in comps]
+        return self.cached('ptensor', func)
+
+    def pscalar(self):
+        """Scalar pressure"""
+        def func():
+            ptensor = self.ptensor()
+            return (ptensor[0][0] + ptensor[1][1] + ptensor[2][2]) / 3.0
+        return self.cached('pscalar', func)
+
+    def ppara(self):
+        """Parallel pressure"""
+        def func():
+            ptensor = self.ptensor()
+            bhat = self.bhat()
+            ppara = np.zeros(bhat[0].shape)
+            for i in range(3):
+                for j in range(3):
+                    ppara += ptensor[i][j] * bhat[i] * bhat[j]
+            return ppara
+        return self.cached('ppara', func)
+
+    def pperp(self):
+        """Perpendicular pressure"""
+        return self.cached('pperp',
+                           lambda: (self.pscalar() * 3 - self.ppara()) * 0.5)
+
+    def velocity(self):
+        """Bulk velocity of the species"""
+        return self.cached('velocity', lambda: [self.hydro('vx'),
+                                                self.hydro('vy'),
+                                                self.hydro('vz')])
+
+    def vpara_dote(self):
+        """(v.b)(E.b) of the species"""
+        def func():
+            bhat = self.bhat()
+            vel = self.velocity()
+            efield = self.efield()
+            vpara = sum(vel[i] * bhat[i] for i in range(3))
+            epara = sum(efield[i] * bhat[i] for i in range(3))
+            return vpara * epara
+        return self.cached('vpara_dote', func)
+
+
+@register_term('jdote')
+def jdote_term(frame):
+    """j.E of the species"""
+    vel = frame.velocity()
+    efield = frame.efield()
+    vdote = sum(vel[i] * efield[i] for i in range(3))
+    return frame.charge * frame.hydro('n') * vdote
+
+
+@register_term('jpara_dote')
+def jpara_dote_term(frame):
+    """j_para.E_para of the species"""
+    return frame.charge * frame.hydro('n') * frame.vpara_dote()
+
+
+@register_term('jperp_dote')
+def jperp_dote_term(frame):
+    """j_perp.E_perp of the species"""
+    return jdote_term(frame) - jpara_dote_term(frame)
+
+
+@register_term('comp_heating')
+def comp_heating_term(frame):
+    """Compressional heating -p div(v_E)"""
+    return -frame.pscalar() * frame.divv_exb()
+
+
+@register_term('shear_heating')
+def shear_heating_term(frame):
+    """Shear heating (p_perp - p_para) b b : sigma"""
+    return (frame.pperp() - frame.ppara()) * frame.bbsigma()
+
+
+@register_term('ptensor_dvexb')
+def ptensor_dvexb_term(frame):
+    """P : grad(v_E)"""
+    ptensor = frame.ptensor()
+    gv = frame.grad_vexb()
+    pdv = np.zeros(gv[0][0].shape)
+    for i in range(3):
+        for j in range(3):
+            pdv += ptensor[i][j] * gv[i][j]
+    return pdv
+
+
+@register_term('jpolar_dote', opt_in=True)
+def jpolar_dote_term(frame):
+    """Polarization (inertial) term n m (du/dt + v.grad u).v_E
+
+    It needs the bulk four-velocity at the previous and next time steps
+    (u<s><c>_pre.gda and u<s><c>_post.gda), so it is only calculated when
+    it is requested.
+    """
+    vel = frame.velocity()
+    vexb = frame.vexb()
+    idt = 0.5 / frame.pic_info.dtwpe
+    jpolar = np.zeros(vel[0].shape)
+    for icomp, comp in enumerate(['x', 'y', 'z']):
+        ucomp = frame.hydro('u' + comp)
+        dudt = (frame.hydro('u' + comp + '_post') -
+                frame.hydro('u' + comp + '_pre')) * idt
+        gu = frame.grad(ucomp)
+        dudt += vel[0] * gu[0] + vel[1] * gu[1] + vel[2] * gu[2]
+        jpolar += dudt * vexb[icomp]
+    return jpolar * frame.hydro('n') * frame.pmass
+
+
+def calc_energization(pic_info, data_dir, species, tframe, terms=None,
+                      smooth_sigma=None):
+    """Spatial maps and domain integrals of the terms at one frame
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        species: 'e' or 'i'
+        tframe: time frame
+        terms: names of the terms. Default is default_terms().
+        smooth_sigma: width of the Gaussian filter for the electric field
+    Returns:
+        maps: dictionary of the spatial maps
+        integrals: dictionary of the domain integrals
+    """
+    if terms is None:
+        terms = default_terms()
+    frame = EnergizationFrame(pic_info, data_dir, species, tframe,
+                              smooth_sigma)
+    maps = {}
+    integrals = {}
+    for term in terms:
+        maps[term] = TERMS[term](frame)
+        integrals[term] = np.sum(maps[term]) * frame.dv
+    return maps, integrals
+
+
+def calc_energization_frames(pic_info, data_dir, species, tframes,
+                             terms=None, smooth_sigma=None, map_dir=None):
+    """Domain integrals of the terms for multiple frames
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        species: 'e' or 'i'
+        tframes: time frames
+        terms: names of the terms. Default is default_terms().
+        smooth_sigma: width of the Gaussian filter for the electric field
+        map_dir: directory to save the spatial maps. Not saved by default.
+    Returns:
+        integrals: (nframes, nterms) array
+        terms: names of the terms
+    """
+    if terms is None:
+        terms = default_terms()
+    integrals = np.zeros((len(tframes), len(terms)))
+    if map_dir:
+        mkdir_p(map_dir)
+    for iframe, tframe in enumerate(tframes):
+        print("Time frame: %d" % tframe)
+        maps, ints = calc_energization(pic_info, data_dir, species, tframe,
+                                       terms, smooth_sigma)
+        integrals[iframe] = [ints[term] for term in terms]
+        if map_dir:
+            tindex = tframe * pic_info.fields_interval
+            for term in terms:
+                fname = (map_dir + term + '_' + species + '_' +
+                         str(tindex) + '.gda')
+                maps[term].astype(np.float32).tofile(fname)
+    return integrals, terms
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Fluid energization terms')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--species', action="store", default="e",
+                        help='particle species')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    parser.add_argument('--terms', action="store", default='',
+                        help='comma-separated terms. Default is all '
+                        'but jpolar_dote.')
+    parser.add_argument('--smooth_sigma', action="store", default=0,
+                        type=float, help='Gaussian filter width for E')
+    parser.add_argument('--save_maps', action="store_true", default=False,
+                        help='whether to save the spatial maps')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    terms = args.terms.split(',') if args.terms else None
+    fdir = '../data/fluid_energization/' + args.pic_run + '/'
+    mkdir_p(fdir)
+    map_dir = fdir + 'maps/' if args.save_maps else None
+    tframes = range(args.tstart, args.tend + 1)
+    integrals, terms = calc_energization_frames(pic_info,
+                                                args.pic_run_dir + 'data/',
+                                                args.species, tframes, terms,
+                                                args.smooth_sigma, map_dir)
+    fname = fdir + 'integrals_' + args.species + '.dat'
+    integrals.tofile(fname)
+    with open(fdir + 'integrals_' + args.species + '.txt', 'w') as fh:
+        fh.write(' '.join(terms) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+The flux function Ay of 2D runs, computed from Bx and Bz, cached next to the
+fields, and its contour lines for the field line overlays.
+
+With B = curl(Ay y), Bx = -dAy/dz and Bz = dAy/dx. Ay is integrated from
+the fields along x and z with the trapezoidal rule, or, for runs that are
+periodic along x, solved spectrally along x with an FFT. It is saved to
+Ay.gda (or Ay_<tindex>.gda, following the layout of bx) with a FrameWriter
+by calc_ay_frames or the command line, so missing frames can be computed in
+parallel and existing Ay.gda files from the translation of the run are used
+as they are. The plotting functions only read Ay: a frame that is not saved
+is calculated in memory.
+
+The contour lines of each frame are calculated once and saved to
+Ay_contours.h5, so the overlays draw them directly instead of running a
+contour on the full-resolution Ay for every plot. The lines come from
+contourpy, which recent matplotlib versions depend on, or from the contour
+of matplotlib itself when contourpy is not there.
+"""
+from __future__ import print_function
+
+import argparse
+import hashlib
+import math
+import os
+
+import h5py
+import numpy as np
+
+from field_io import gda_file_name, read_field_frame, subregion_2d
+from frame_writer import done_file_name, pending_frames, write_frame
+
+METHODS = ['integrate', 'fft']
+
+
+def cumulative_trapezoid(fdata, delta, axis):
+    """Cumulative integral with the trapezoidal rule, starting from 0
+    """
+    fdata = np.moveaxis(np.asarray(fdata, dtype=np.float64), axis, 0)
+    integral = np.zeros_like(fdata)
+    np.cumsum(0.5 * (fdata[1:] + fdata[:-1]) * delta, axis=0,
+              out=integral[1:])
+    return np.moveaxis(integral, 0, axis)
+
+
+def calc_ay(bx, bz, dx, dz, method='integrate'):
+    """Flux function of 2D fields
+
+    Args:
+        bx, bz: (nz, nx) magnetic field
+        dx, dz: grid sizes
+        method: 'integrate' averages the integrals along the two paths from
+            the corner, along x first and along z first. 'fft' is spectral
+            along x, which assumes that the fields are periodic along x.
+    Returns:
+        ay: (nz, nx) flux function, which is defined up to a constant
+    """
+    if method == 'integrate':
+        ay_xz = (cumulative_trapezoid(bz[:1, :], dx, 1) -
+                 cumulative_trapezoid(bx, dz, 0))
+        ay_zx = (cumulative_trapezoid(bz, dx, 1) -
+                 cumulative_trapezoid(bx[:, :1], dz, 0))
+        return 0.5 * (ay_xz + ay_zx)
+    elif method == 'fft':
+        nz, nx = bz.shape
+        bz_mean = np.mean(bz, axis=1, keepdims=True)
+        bz_hat = np.fft.rfft(bz, axis=1)
+        kx = 2 * math.pi * np.fft.rfftfreq(nx, dx)
+        ay_hat = np.zeros_like(bz_hat)
+        ay_hat[:, 1:] = bz_hat[:, 1:] / (1j * kx[1:])
+        ay = np.fft.irfft(ay_hat, nx, axis=1)
+        # the mean along x is set by Bx, and a net Bz adds a linear part
+        ay += bz_mean * np.arange(nx) * dx
+        ay -= cumulative_trapezoid(np.mean(bx, axis=1), dz, 0)[:, None]
+        return ay
+    raise ValueError("Unknown method: " + method)
+
+
+def ay_file_name(pic_info, data_dir, tframe):
+    """Name of the Ay file of a frame, with the layout of bx
+
+    Returns:
+        fname: file name
+        per_step: whether the file only has this time step
+    """
+    tindex = tframe * pic_info.fields_interval
+    _, per_step = gda_file_name(data_dir, 'bx', tindex)
+    if per_step:
+        return data_dir + 'Ay_' + str(tindex) + '.gda', True
+    return data_dir + 'Ay.gda', False
+
+
+def compute_ay(pic_info, data_dir, method, tframe):
+    """Calculate Ay of one frame from Bx and Bz, without saving it
+    """
+    bx = read_field_frame(pic_info, data_dir, 'bx', tframe)
+    bz = read_field_frame(pic_info, data_dir, 'bz', tframe)
+    if bx.ndim != 2:
+        raise ValueError("Ay is only defined for 2D runs")
+    smime = math.sqrt(pic_info.mime)
+    return calc_ay(bx, bz, pic_info.dx_di * smime, pic_info.dz_di * smime,
+                   method).astype(np.float32)
+
+
+def ay_frame(pic_info, data_dir, method, tframe):
+    """Calculate and save Ay of one frame
+    """
+    ay = compute_ay(pic_info, data_dir, method, tframe)
+    fname, per_step = ay_file_name(pic_info, data_dir, tframe)
+    if per_step:
+        ay.tofile(fname)
+    else:
+        write_frame(fname, ay.shape, pic_info.ntf, tframe, ay)
+
+
+def pending_ay_frames(pic_info, data_dir, tframes):
+    """The frames that do not have Ay yet
+
+    An Ay.gda without the sidecar of the FrameWriter comes from the
+    translation of the run and has all frames.
+    """
+    tframes = list(tframes)
+    if not tframes:
+        return tframes
+    fname, per_step = ay_file_name(pic_info, data_dir, tframes[0])
+    if per_step:
+        return [tframe for tframe in tframes
+                if not os.path.isfile(ay_file_name(pic_info, data_dir,
+                                                   tframe)[0])]
+    if os.path.isfile(fname) and not os.path.isfile(done_file_name(fname)):
+        return []
+    return pending_frames(fname, pic_info.ntf, tframes)
+
+
+def calc_ay_frames(pic_info, data_dir, tframes, method='integrate',
+                   nworkers=None):
+    """Calculate Ay of the frames that do not have it, in parallel
+
+    Returns:
+        failed: dictionary of the error messages of the failed frames
+    """
+    from frame_runner import run_frames
+    tframes = pending_ay_frames(pic_info, data_dir, tframes)
+    _, failed = run_frames(ay_frame, tframes, (pic_info, data_dir, method),
+                           nworkers, raise_on_failure=False)
+    return failed
+
+
+def ay_data(pic_info, data_dir, tframe, method='integrate'):
+    """Ay of one frame, read from the saved file when it has the frame and
+    calculated in memory otherwise
+    """
+    if pending_ay_frames(pic_info, data_dir, [tframe]):
+        return compute_ay(pic_info, data_dir, method, tframe)
+    return read_field_frame(pic_info, data_dir, 'Ay', tframe)
+
+
+def read_2d_ay(pic_info, fname, current_time, xl, xr, zb, zt,
+               method='integrate'):
+    """read_2d_fields for Ay.gda, which calculates Ay in memory when the
+    frame is not saved
+    """
+    data_dir = os.path.join(os.path.dirname(fname), '')
+    ay = ay_data(pic_info, data_dir, current_time, method)
+    return subregion_2d(pic_info, ay, xl, xr, zb, zt)
+
+
+def contour_levels(ay, nlevels):
+    """Evenly spaced levels between the minimum and the maximum of Ay
+    """
+    return np.linspace(np.min(ay), np.max(ay), nlevels)
+
+
+def contour_lines(x, z, ay, levels):
+    """Contour lines of Ay
+
+    Returns:
+        lines: for each level, a list of (npoints, 2) arrays of x and z
+    """
+    ay = np.asarray(ay, dtype=np.float64)
+    try:
+        import contourpy
+    except ImportError:
+        return contour_lines_mpl(x, z, ay, levels)
+    generator = contourpy.contour_generator(x, z, ay)
+    return [list(generator.lines(level)) for level in levels]
+
+
+def contour_lines_mpl(x, z, ay, levels):
+    """contour_lines with the contour of matplotlib, for the versions
+    without contourpy
+    """
+    from matplotlib.figure import Figure
+    ax = Figure().add_subplot(111)
+    contours = ax.contour(x, z, ay, levels=levels)
+    segs = dict(zip(contours.levels, contours.allsegs))
+    return [list(segs.get(level, [])) for level in levels]
+
+
+def contours_key(method, nlevels=10, levels=None):
+    """Name of the cached contour lines for one method and set of levels
+
+    Given levels are identified by a hash of their values, so lines with
+    different levels of the same frame are kept side by side.
+    """
+    if levels is None:
+        return method + '_n' + str(nlevels)
+    levels = np.ascontiguousarray(levels, dtype=np.float64)
+    return method + '_' + hashlib.sha1(levels.tobytes()).hexdigest()[:16]
+
+
+def save_contours(fname, tindex, key, levels, lines):
+    """Save the contour lines of one frame, replacing the old ones
+
+    Args:
+        key: name of the lines from contours_key
+    """
+    with h5py.File(fname, 'a') as fh:
+        gname = "Timestep_" + str(tindex) + '/' + key
+        if gname in fh:
+            del fh[gname]
+        grp = fh.create_group(gname)
+        grp.create_dataset('levels', data=levels)
+        for ilevel, level_lines in enumerate(lines):
+            lengths = [len(line) for line in level_lines]
+            points = (np.concatenate(level_lines) if level_lines
+                      else np.zeros((0, 2)))
+            grp.create_dataset('points_' + str(ilevel), data=points)
+            grp.create_dataset('offsets_' + str(ilevel),
+                               data=np.cumsum([0] + lengths))
+
+
+def load_contours(fname, tindex, key):
+    """Load the contour lines of one frame
+
+    Args:
+        key: name of the lines from contours_key
+    Returns:
+        levels: contour levels, or None when the frame is not saved
+        lines: for each level, a list of (npoints, 2) arrays of x and z
+    """
+    if not os.path.isfile(fname):
+        return None, None
+    with h5py.File(fname, 'r') as fh:
+        gname = "Timestep_" + str(tindex) + '/' + key
+        if gname not in fh:
+            return None, None
+        grp = fh[gname]
+        levels = grp['levels'][:]
+        lines = []
+        for ilevel in range(len(levels)):
+            points = grp['points_' + str(ilevel)][:]
+            offsets = grp['offsets_' + str(ilevel)][:]
+            lines.append([points[offsets[i]:offsets[i+1]]
+                          for i in range(len(offsets) - 1)])
+    return levels, lines
+
+
+def ay_contours(pic_info, data_dir, tframe, nlevels=10, method='integrate',
+                levels=None):
+    """Contour lines of Ay of one frame in di, calculated only the first time
+
+    The lines are cached in data_dir + 'Ay_contours.h5', under a key with
+    the method and the levels. They are still returned when the cache cannot
+    be written.
+
+    Args:
+        nlevels: number of evenly spaced levels over the whole frame
+        levels: contour levels, instead of nlevels evenly spaced ones
+    Returns:
+        levels: contour levels
+        lines: for each level, a list of (npoints, 2) arrays of x and z
+    """
+    fname = data_dir + 'Ay_contours.h5'
+    tindex = tframe * pic_info.fields_interval
+    if levels is not None:
+        levels = np.sort(np.asarray(levels, dtype=np.float64))
+    key = contours_key(method, nlevels, levels)
+    cached_levels, lines = load_contours(fname, tindex, key)
+    if cached_levels is not None:
+        return cached_levels, lines
+    ay = ay_data(pic_info, data_dir, tframe, method)
+    if levels is None:
+        levels = contour_levels(ay, nlevels)
+    lines = contour_lines(pic_info.x_di, pic_info.z_di, ay, levels)
+    try:
+        save_contours(fname, tindex, key, levels, lines)
+    except (IOError, OSError):
+        pass
+    return levels, lines
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Flux function Ay and its contour lines')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--data_sub_dir', action="store", default='data',
+                        help='sub-directory of the .gda files')
+    parser.add_argument('--method', action="store", default='integrate',
+                        choices=METHODS, help='method to calculate Ay')
+    parser.add_argument('--nlevels', action="store", default='10', type=int,
+                        help='number of contour levels. 0 to skip contours')
+    parser.add_argument('--nworkers', action="store", default='0', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    data_dir = os.path.join(args.pic_run_dir, args.data_sub_dir, '')
+    tframes = range(args.tstart, args.tend + 1)
+    failed = calc_ay_frames(pic_info, data_dir, tframes, args.method,
+                            args.nworkers or None)
+    if args.nlevels > 0:
+        for tframe in tframes:
+            if tframe not in failed:
+                ay_contours(pic_info, data_dir, tframe, args.nlevels,
+                            args.method)
+    if failed:
+        raise RuntimeError("Failed frames: %s" % sorted(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Frame-parallel runner for the per-frame analyses.
+
+An analysis is a function called as func(*config, tframe). The config (e.g.,
+(plot_config, args)) is sent to each worker process once, when the worker
+starts, instead of with every frame. An optional initializer runs once in each
+worker to prepare expensive state (e.g., pic_info or interpolators), which the
+analysis gets from worker_state(). The number of workers is chosen from the
+available cores and the memory that one task needs. Failed frames are retried,
+and the progress and throughput are printed as frames finish. Frames that still
+fail raise a RuntimeError at the end, unless the caller handles them.
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import time
+import traceback
+
+WORKER = {}
+
+
+def available_cores():
+    """Number of cores that this process can use
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def available_memory():
+    """Available memory of the node in bytes, None when unknown
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def choose_nworkers(ntasks, mem_per_task=None, max_workers=None,
+                    mem_fraction=0.8):
+    """Number of workers from the cores and the memory per task
+
+    Args:
+        ntasks: number of tasks
+        mem_per_task: memory of one task in bytes. Not limited when None.
+        max_workers: upper limit of the number of workers
+        mem_fraction: fraction of the available memory to use
+    """
+    nworkers = min(available_cores(), max(ntasks, 1))
+    if max_workers:
+        nworkers = min(nworkers, max_workers)
+    if mem_per_task:
+        mem = available_memory()
+        if mem:
+            nworkers = min(nworkers, int(mem * mem_fraction // mem_per_task))
+    return max(nworkers, 1)
+
+
+def worker_state():
+    """State prepared by the initializer in this worker
+    """
+    return WORKER.get('state')
+
+
+def init_worker(func, config, initializer, initargs):
+    """Keep the analysis and its config in the worker process
+    """
+    WORKER['func'] = func
+    WORKER['config'] = config
+    WORKER['state'] = initializer(*initargs) if initializer else None
+
+
+def run_frame(tframe):
+    """Run the analysis for one frame in a worker process
+
+    Returns:
+        (tframe, result, error message or None, wall time)
+    """
+    tstart = time.time()
+    try:
+        result = WORKER['func'](*(tuple(WORKER['config']) + (tframe, )))
+        error = None
+    except Exception:
+        result = None
+        error = traceback.format_exc()
+    return tframe, result, error, time.time() - tstart
+
+
+def run_frames(func, tframes, config=(), nworkers=None, mem_per_task=None,
+               max_workers=None, initializer=None, initargs=(),
+               max_retries=1, verbose=True, raise_on_failure=True):
+    """Run an analysis for multiple frames in parallel
+
+    Args:
+        func: analysis, called as func(*config, tframe)
+        tframes: time frames
+        config: the arguments before tframe
+        nworkers: number of workers. Chosen by choose_nworkers when None.
+        mem_per_task: memory of one task in bytes
+        max_workers: upper limit of the number of workers
+        initializer: function to prepare the state of each worker
+        initargs: arguments of the initializer
+        max_retries: number of retries of a failed frame
+        verbose: whether to print the progress
+        raise_on_failure: whether to raise a RuntimeError when some frames
+            still fail after the retries, instead of returning them in failed
+    Returns:
+        results: dictionary of the results of the finished frames
+        failed: dictionary of the error messages of the failed frames
+    """
+    tframes = list(tframes)
+    if not nworkers:
+        nworkers = choose_nworkers(len(tframes), mem_per_task, max_workers)
+    results = {}
+    failed = {}
+    if not tframes:
+        return results, failed
+    if verbose:
+        print("Running %d frames on %d workers" % (len(tframes), nworkers))
+    attempts = dict.fromkeys(tframes, 0)
+    tstart = time.time()
+    pool = multiprocessing.Pool(nworkers, initializer=init_worker,
+                                initargs=(func, config, initializer, initargs))
+    try:
+        pending = tframes
+        while pending:
+            retry = []
+            for tframe, result, error, twall in \
+                    pool.imap_unordered(run_frame, pending):
+                attempts[tframe] += 1
+                if error is None:
+                    results[tframe] = result
+                    failed.pop(tframe, None)
+                    if verbose:
+                        ndone = len(results)
+                        rate = ndone * 60.0 / (time.time() - tstart)
+                        print("Frame %d done in %0.1f s (%d/%d, %0.2f frames/min)"
+                              % (tframe, twall, ndone, len(tframes), rate))
+                else:
+                    failed[tframe] = error
+                    print("Frame %d failed:\n%s" % (tframe, error))
+                    if attempts[tframe] <= max_retries:
+                        retry.append(tframe)
+            pending = retry
+    finally:
+        pool.close()
+        pool.join()
+    if failed:
+        if raise_on_failure:
+            raise RuntimeError("Failed frames: %s" % sorted(failed))
+        if verbose:
+            print("Failed frames: %s" % sorted(failed))
+    return results, failed
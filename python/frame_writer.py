@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+In-place writes of the frames of .gda files with all frames in one file.
+
+Writing a frame with open(fname, 'a+') + seek + tofile does not work: in
+append mode every write goes to the end of the file, whatever the seek, so
+frames end up in the order they were finished, and concurrent workers
+interleave. FrameWriter instead preallocates the file to nframes frames and
+writes each frame at its exact offset with pwrite (lseek and write on
+python 2, or through a memory map), so workers can write different frames of
+the same file at the same time.
+
+Completed frames are recorded in a sidecar file <fname>.done with one byte
+for each frame, which is cleared before a frame is written and set only after
+the frame data is on disk. Consumers can then skip the frames that are
+already there and recompute the ones that were interrupted.
+"""
+from __future__ import print_function
+
+import os
+
+import numpy as np
+
+
+def done_file_name(fname):
+    """Name of the sidecar file of the completed frames
+    """
+    return fname + '.done'
+
+
+def done_frames(fname, nframes):
+    """Completed frames of a .gda file, in increasing order
+
+    Only the sidecar file is read, so that this can be used while plotting.
+    """
+    flags = np.fromfile(done_file_name(fname), dtype=np.uint8, count=nframes)
+    return np.nonzero(flags)[0].tolist()
+
+
+def extend_file(fd, size):
+    """Extend a file to at least size bytes, never shrinking it
+
+    posix_fallocate also reserves the disk space. Otherwise, the last byte is
+    written, which does not truncate the data written by other processes.
+    """
+    if os.fstat(fd).st_size >= size:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass
+    os.lseek(fd, size - 1, os.SEEK_SET)
+    os.write(fd, b'\0')
+
+
+def write_at(fd, view, offset):
+    """Write a memoryview of bytes at offset, returning the bytes written
+
+    os.pwrite does not exist on python 2, where the file descriptor is
+    positioned with lseek. Each FrameWriter has its own descriptor.
+    """
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, view, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, view.tobytes())
+
+
+def pwrite_all(fd, data, offset):
+    """Write all the bytes of a contiguous array at offset
+    """
+    view = memoryview(data.reshape(-1).view(np.uint8))
+    while len(view):
+        nbytes = write_at(fd, view, offset)
+        view = view[nbytes:]
+        offset += nbytes
+
+
+class FrameWriter(object):
+    """Writer of the frames of one .gda file
+    """
+    def __init__(self, fname, frame_shape, nframes, dtype=np.float32,
+                 sync=True):
+        """
+        Args:
+            fname: file name
+            frame_shape: shape of one frame
+            nframes: number of frames to preallocate
+            dtype: data type in the file
+            sync: whether to flush the data to disk before marking a frame
+                as done
+        """
+        self.fname = fname
+        self.frame_shape = tuple(frame_shape)
+        self.nframes = nframes
+        self.dtype = np.dtype(dtype)
+        self.frame_size = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.sync = sync
+        self.fd = os.open(fname, os.O_RDWR | os.O_CREAT, 0o644)
+        self.done_fd = os.open(done_file_name(fname), os.O_RDWR | os.O_CREAT,
+                               0o644)
+        extend_file(self.fd, self.frame_size * nframes)
+        extend_file(self.done_fd, nframes)
+
+    def close(self):
+        """Close the files
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            os.close(self.done_fd)
+            self.fd = None
+            self.done_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def check_frame(self, tframe):
+        """Check that a frame is in the preallocated range
+        """
+        if tframe < 0 or tframe >= self.nframes:
+            raise IndexError("Frame %d out of range [0, %d)" %
+                             (tframe, self.nframes))
+
+    def set_done(self, tframe, done):
+        """Set or clear the completion flag of a frame
+        """
+        write_at(self.done_fd, memoryview(b'\1' if done else b'\0'), tframe)
+
+    def write(self, tframe, fdata):
+        """Write one frame
+
+        Args:
+            tframe: time frame
+            fdata: data with frame_shape
+        """
+        self.check_frame(tframe)
+        fdata = np.ascontiguousarray(fdata, dtype=self.dtype)
+        if fdata.shape != self.frame_shape:
+            raise ValueError("Frame shape %s instead of %s" %
+                             (fdata.shape, self.frame_shape))
+        self.set_done(tframe, False)
+        pwrite_all(self.fd, fdata, tframe * self.frame_size)
+        self.finish(tframe)
+
+    def frame_array(self, tframe):
+        """Writable memory map of one frame, to write it piece by piece
+
+        finish(tframe) has to be called after the frame is written.
+        """
+        self.check_frame(tframe)
+        self.set_done(tframe, False)
+        return np.memmap(self.fname, dtype=self.dtype, mode='r+',
+                         offset=tframe * self.frame_size,
+                         shape=self.frame_shape, order='C')
+
+    def finish(self, tframe):
+        """Mark a frame as done after its data is on disk
+        """
+        if self.sync:
+            os.fsync(self.fd)
+        self.set_done(tframe, True)
+
+    def done_frames(self):
+        """Completed frames, in increasing order
+        """
+        return done_frames(self.fname, self.nframes)
+
+    def is_done(self, tframe):
+        """Whether a frame is completed
+        """
+        return tframe in self.done_frames()
+
+    def pending_frames(self, tframes):
+        """The frames in tframes that still have to be written
+        """
+        done = set(self.done_frames())
+        return [tframe for tframe in tframes if tframe not in done]
+
+
+def write_frame(fname, frame_shape, nframes, tframe, fdata):
+    """Write one frame of a .gda file with a FrameWriter
+    """
+    with FrameWriter(fname, frame_shape, nframes) as writer:
+        writer.write(tframe, fdata)
+
+
+def pending_frames(fname, nframes, tframes):
+    """The frames of a .gda file that still have to be written
+
+    Frames of a file that existed before the sidecar file are treated as
+    pending. Neither file is created or extended.
+    """
+    if not os.path.isfile(done_file_name(fname)):
+        return list(tframes)
+    done = set(done_frames(fname, nframes))
+    return [tframe for tframe in tframes if tframe not in done]
@@ -28,6 +28,7 @@ import palettable
 import pic_information
 from contour_plots import plot_2d_contour, read_2d_fields
 from energy_conversion import read_data_from_json
+from memory_scheduler import run_tasks
 from particle_distribution import *
 from plasma_params import calc_plasma_parameters
 from runs_name_path import ApJ_long_paper_runs
@@ -544,10 +545,8 @@ def calc_force_charge_efield(root_dir, pic_info, drange=[0.0, 1.0, 0.0, 1.0]):
     dx = pic_info.dx_di
     dz = pic_info.dz_di
     cts = range(ntf)
-    ncores = multiprocessing.cpu_count()
-    Parallel(n_jobs=ncores)(delayed(calc_force_charge_efield_single)(ct,
-                                                                     drange)
-                            for ct in cts)
+    run_tasks(calc_force_charge_efield_single,
+              [(ct, drange) for ct in cts], labels=list(cts))
     force = np.zeros((3, ntf))
     data_dir = '../data/force/'
     for ct in cts:
@@ -4,7 +4,6 @@ Analysis procedures for the paper on high mass-ratio
 import argparse
 import itertools
 import math
-import multiprocessing
 import operator
 import os.path
 
@@ -22,7 +21,7 @@ from scipy.ndimage.filters import median_filter, gaussian_filter
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
 
@@ -7093,10 +7092,7 @@ def analysis_multi_frames(plot_config, args):
             if args.energetic_rho:
                 energetic_rho(plot_config, args.const_va, show_plot=False)
     else:
-        # ncores = multiprocessing.cpu_count()
-        ncores = 16
-        Parallel(n_jobs=ncores)(delayed(process_input)(args, plot_config, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (args, plot_config), max_workers=16)
 
 
 def main():
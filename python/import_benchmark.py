@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark of the compute modules.
+
+Each module is imported in a fresh interpreter, as in a new worker process.
+The benchmark reports the import time and fails when a module takes longer
+than the target or pulls in any of the plotting packages, so that the worker
+startup of the compute paths stays fast.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+
+COMPUTE_MODULES = ['field_io', 'field_pyramid', 'fluid_energization',
+                   'drift_decomposition', 'acc_rate_dist', 'tracer_sort',
+                   'tracer_tag_index', 'traj_batch', 'combine_energy_spectrum',
+                   'pic_to_mhd', 'pic_information', 'frame_runner',
+                   'memory_scheduler', 'run_watcher', 'movie_writer',
+                   'particle_io', 'vdist_service', 'magnetic_curvature',
+                   'field_stats', 'xdmf_export', 'frame_writer',
+                   'energy_bands', 'momentum_dists', 'flux_function']
+PLOTTING_MODULES = ['matplotlib', 'palettable', 'mpl_toolkits', 'evtk',
+                    'pandas', 'color_maps', '_colormap_data', 'colormap']
+
+IMPORT_CODE = """
+import json, sys, time
+tstart = time.time()
+import {module}
+twall = time.time() - tstart
+print(json.dumps({{'time': twall, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def import_time(module, python=sys.executable):
+    """Import a module in a fresh interpreter
+
+    Returns:
+        twall: import time in seconds
+        modules: names of all the modules loaded by the import
+    """
+    output = subprocess.check_output([python, '-c',
+                                      IMPORT_CODE.format(module=module)])
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    return result['time'], result['modules']
+
+
+def plotting_imports(modules):
+    """Plotting packages among the loaded modules
+    """
+    found = set()
+    for name in modules:
+        top = name.split('.')[0]
+        if top in PLOTTING_MODULES:
+            found.add(top)
+    return sorted(found)
+
+
+def run_benchmark(modules, target=1.0, nrepeat=3):
+    """Benchmark the import of the modules
+
+    Args:
+        modules: module names
+        target: largest acceptable import time in seconds
+        nrepeat: number of imports of each module. The fastest is used.
+    Returns:
+        failed: names of the modules that are too slow, import plotting
+            packages or cannot be imported
+    """
+    failed = []
+    print("{:>26} {:>10} {:>8}  {}".format("module", "time (s)", "status",
+                                           "plotting imports"))
+    for module in modules:
+        try:
+            results = [import_time(module) for _ in range(nrepeat)]
+        except subprocess.CalledProcessError:
+            print("{:>26} {:>10} {:>8}".format(module, "-", "error"))
+            failed.append(module)
+            continue
+        twall = min(result[0] for result in results)
+        plotting = plotting_imports(results[0][1])
+        status = "ok"
+        if twall > target or plotting:
+            status = "slow" if twall > target else "plotting"
+            failed.append(module)
+        print("{:>26} {:>10.3f} {:>8}  {}".format(module, twall, status,
+                                                  ', '.join(plotting)))
+    return failed
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Import-time benchmark')
+    parser.add_argument('--modules', action="store",
+                        default=','.join(COMPUTE_MODULES),
+                        help='comma-separated names of the modules')
+    parser.add_argument('--target', action="store", default=1.0, type=float,
+                        help='largest acceptable import time in seconds')
+    parser.add_argument('--nrepeat', action="store", default=3, type=int,
+                        help='number of imports of each module')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    args = get_cmd_args()
+    failed = run_benchmark(args.modules.split(','), args.target, args.nrepeat)
+    if failed:
+        print("Failed: " + ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
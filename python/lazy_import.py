@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Lazy loading of heavy modules.
+
+lazy_import returns a module object whose code runs on the first attribute
+access, so that modules like the colormaps (with the large _colormap_data) are
+only loaded by the code paths that actually use them.
+"""
+from __future__ import print_function
+
+import importlib
+import sys
+
+try:
+    import importlib.util
+    LazyLoader = importlib.util.LazyLoader
+except (ImportError, AttributeError):
+    LazyLoader = None
+
+
+def lazy_import(name):
+    """Import a module lazily
+
+    Args:
+        name: full name of the module
+    Returns:
+        module: the module, loaded on the first attribute access. Without
+            importlib.util.LazyLoader (Python 2), it is imported right away.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if LazyLoader is None:
+        return importlib.import_module(name)
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named " + name)
+    loader = LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Magnetic curvature and vexb dot curvature of 2D and 3D runs.
+
+The unit vector of the magnetic field, the curvature vector
+kappa = (b.grad)b, its magnitude, the radius of curvature and vexb.kappa are
+calculated with one set of finite-difference stencils (the same as
+np.gradient) on preallocated buffers. The fields are processed in slabs along
+z with one halo cell on each side, so 3D frames do not need to fit in memory.
+All requested outputs and their distributions are written in the same pass
+over the fields.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import os
+
+import numpy as np
+
+from field_io import field_shape, gda_file_name, read_field_frame
+from field_stats import Histogram
+from frame_writer import FrameWriter
+from shell_functions import mkdir_p
+
+OUTPUTS = ['bhat_x', 'bhat_y', 'bhat_z', 'kappax', 'kappay', 'kappaz',
+           'kappa', 'curv_radius', 'vexb_kappa']
+# bins of the distributions: (type, min, max, number of bins)
+HISTOGRAMS = {'kappa': ('log', 1E-6, 1E2, 80),
+              'curv_radius': ('log', 1E-2, 1E6, 80),
+              'vexb_kappa': ('symlog', 1E-5, 1E3, 80)}
+ZSLAB = 64
+ENGINES = {}
+
+
+class GradientStencil(object):
+    """Centered differences along one axis, one-sided at the two ends
+
+    The result is the same as np.gradient(fdata, axis=axis) / spacing.
+    """
+    def __init__(self, ndim, axis, spacing):
+        self.axis = axis
+        self.scale_inner = 0.5 / spacing
+        self.scale_edge = 1.0 / spacing
+
+        def index(select):
+            idx = [slice(None)] * ndim
+            idx[axis] = select
+            return tuple(idx)
+
+        self.inner = index(slice(1, -1))
+        self.plus = index(slice(2, None))
+        self.minus = index(slice(None, -2))
+        self.first = index(0)
+        self.second = index(1)
+        self.last = index(-1)
+        self.before_last = index(-2)
+
+    def apply(self, fdata, out):
+        """Derivative of fdata written into out
+        """
+        if fdata.shape[self.axis] < 2:
+            out.fill(0)
+            return out
+        np.subtract(fdata[self.plus], fdata[self.minus], out=out[self.inner])
+        out[self.inner] *= self.scale_inner
+        np.subtract(fdata[self.second], fdata[self.first], out=out[self.first])
+        out[self.first] *= self.scale_edge
+        np.subtract(fdata[self.last], fdata[self.before_last],
+                    out=out[self.last])
+        out[self.last] *= self.scale_edge
+        return out
+
+
+class CurvatureEngine(object):
+    """Magnetic curvature on preallocated buffers
+    """
+    def __init__(self, dx, dy, dz, dtype=np.float32):
+        """
+        Args:
+            dx, dy, dz: grid sizes
+            dtype: data type of the buffers
+        """
+        self.spacing = {'x': dx, 'y': dy, 'z': dz}
+        self.dtype = dtype
+        self.shape = None
+        self.buffers = {}
+        self.stencils = []
+
+    def allocate(self, shape):
+        """Allocate the buffers for data with up to shape[0] rows
+        """
+        shape = tuple(shape)
+        if (self.shape is not None and len(shape) == len(self.shape) and
+                shape[1:] == self.shape[1:] and shape[0] <= self.shape[0]):
+            return
+        self.shape = shape
+        names = ['bx', 'by', 'bz', 'ib', 'tmp1', 'tmp2'] + OUTPUTS[3:]
+        self.buffers = {name: np.zeros(shape, dtype=self.dtype)
+                        for name in names}
+        # data is (nz, nx) in 2D and (nz, ny, nx) in 3D
+        dirs = ['z', 'x'] if len(shape) == 2 else ['z', 'y', 'x']
+        self.stencils = [(GradientStencil(len(shape), axis,
+                                          self.spacing[comp]), comp)
+                         for axis, comp in enumerate(dirs)]
+
+    def compute(self, bx, by, bz, ex=None, ey=None, ez=None):
+        """Calculate the curvature
+
+        Args:
+            bx, by, bz: magnetic field
+            ex, ey, ez: electric field, for vexb_kappa
+        Returns:
+            results: dictionary of the outputs in OUTPUTS. The arrays are
+                views of the buffers, so they are overwritten by the next call.
+        """
+        self.allocate(bx.shape)
+        nrows = bx.shape[0]
+        buf = {name: data[:nrows] for name, data in self.buffers.items()}
+        ib, tmp1, tmp2 = buf['ib'], buf['tmp1'], buf['tmp2']
+        for comp, fdata in zip('xyz', [bx, by, bz]):
+            np.copyto(buf['b' + comp], fdata)
+        np.multiply(buf['bx'], buf['bx'], out=ib)
+        for comp in 'yz':
+            np.multiply(buf['b' + comp], buf['b' + comp], out=tmp1)
+            ib += tmp1
+        np.sqrt(ib, out=ib)
+        np.reciprocal(ib, out=ib)
+        for comp in 'xyz':
+            buf['b' + comp] *= ib
+
+        # kappa_i = b_j d_j b_i
+        for comp in 'xyz':
+            kappa = buf['kappa' + comp]
+            kappa.fill(0)
+            for stencil, dcomp in self.stencils:
+                stencil.apply(buf['b' + comp], tmp1)
+                tmp1 *= buf['b' + dcomp]
+                kappa += tmp1
+        kappa = buf['kappa']
+        np.multiply(buf['kappax'], buf['kappax'], out=kappa)
+        for comp in 'yz':
+            np.multiply(buf['kappa' + comp], buf['kappa' + comp], out=tmp1)
+            kappa += tmp1
+        np.sqrt(kappa, out=kappa)
+        with np.errstate(divide='ignore'):
+            np.reciprocal(kappa, out=buf['curv_radius'])
+
+        if ex is not None:
+            # vexb = (E x b) / B
+            vexb_kappa = buf['vexb_kappa']
+            bx, by, bz = buf['bx'], buf['by'], buf['bz']
+            np.multiply(ey, bz, out=vexb_kappa)
+            np.multiply(ez, by, out=tmp1)
+            vexb_kappa -= tmp1
+            vexb_kappa *= buf['kappax']
+            np.multiply(ez, bx, out=tmp1)
+            np.multiply(ex, bz, out=tmp2)
+            tmp1 -= tmp2
+            tmp1 *= buf['kappay']
+            vexb_kappa += tmp1
+            np.multiply(ex, by, out=tmp1)
+            np.multiply(ey, bx, out=tmp2)
+            tmp1 -= tmp2
+            tmp1 *= buf['kappaz']
+            vexb_kappa += tmp1
+            vexb_kappa *= ib
+
+        results = {name: buf[name] for name in OUTPUTS[3:]}
+        for comp in 'xyz':
+            results['bhat_' + comp] = buf['b' + comp]
+        return results
+
+
+def get_engine(pic_info):
+    """The curvature engine of this process, with the grid sizes in de
+    """
+    smime = math.sqrt(pic_info.mime)
+    spacing = (pic_info.dx_di * smime, pic_info.dy_di * smime,
+               pic_info.dz_di * smime)
+    if spacing not in ENGINES:
+        ENGINES[spacing] = CurvatureEngine(*spacing)
+    return ENGINES[spacing]
+
+
+def hist_file_name(hist_dir, pic_run, var, tframe):
+    """File name of the distribution of var at one frame
+    """
+    return (hist_dir + var + '_dist/' + pic_run + '/' + var + '_dist_' +
+            str(tframe) + '.dat')
+
+
+def save_hist(fname, hist):
+    """Save a distribution with its min, max and number of bins in front
+    """
+    fdata = np.zeros(len(hist.counts) + 3)
+    fdata[:3] = [hist.vmin, hist.vmax, hist.nbins]
+    fdata[3:] = hist.counts
+    mkdir_p(os.path.dirname(fname))
+    fdata.tofile(fname)
+
+
+def curvature_frame(pic_info, pic_run, pic_run_dir, outputs, out_dir, hists,
+                    hist_dir, tframe):
+    """Calculate the curvature at one frame
+
+    The outputs are saved in the same layout as the fields: one file for each
+    time step (<var>_<tindex>.gda) or one file for all frames (<var>.gda),
+    which is written in place with a FrameWriter.
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        pic_run: PIC run name
+        pic_run_dir: PIC run directory
+        outputs: names of the outputs to save, from OUTPUTS
+        out_dir: directory of the outputs
+        hists: names of the outputs whose distributions are saved, from
+            HISTOGRAMS
+        hist_dir: directory of the distributions
+        tframe: time frame
+    Returns:
+        hists: dictionary of the distributions
+    """
+    data_dir = pic_run_dir + 'data/'
+    tindex = tframe * pic_info.fields_interval
+    shape = field_shape(pic_info)
+    var_names = ['bx', 'by', 'bz']
+    if 'vexb_kappa' in outputs or 'vexb_kappa' in hists:
+        var_names += ['ex', 'ey', 'ez']
+    fields = {var: read_field_frame(pic_info, data_dir, var, tframe)
+              for var in var_names}
+    _, per_step = gda_file_name(data_dir, 'bx', tindex)
+    fouts = {}
+    writers = {}
+    if outputs:
+        mkdir_p(out_dir)
+    for var in outputs:
+        if per_step:
+            fname = out_dir + var + '_' + str(tindex) + '.gda'
+            fouts[var] = np.memmap(fname, dtype=np.float32, mode='w+',
+                                   shape=shape)
+        else:
+            fname = out_dir + var + '.gda'
+            nframes = max(pic_info.ntf, tframe + 1)
+            writers[var] = FrameWriter(fname, shape, nframes)
+            fouts[var] = writers[var].frame_array(tframe)
+    fdists = {var: Histogram(*HISTOGRAMS[var]) for var in hists}
+
+    engine = get_engine(pic_info)
+    nz = shape[0]
+    for zstart in range(0, nz, ZSLAB):
+        zend = min(zstart + ZSLAB, nz)
+        # one halo cell on each side for the centered differences
+        zlow, zhigh = max(zstart - 1, 0), min(zend + 1, nz)
+        slab = {var: fields[var][zlow:zhigh] for var in var_names}
+        results = engine.compute(slab['bx'], slab['by'], slab['bz'],
+                                 slab.get('ex'), slab.get('ey'),
+                                 slab.get('ez'))
+        inner = slice(zstart - zlow, zend - zlow)
+        for var in outputs:
+            fouts[var][zstart:zend] = results[var][inner]
+        for var in hists:
+            fdists[var].add(results[var][inner])
+    for fout in fouts.values():
+        fout.flush()
+    for writer in writers.values():
+        writer.finish(tframe)
+        writer.close()
+    for var in hists:
+        save_hist(hist_file_name(hist_dir, pic_run, var, tframe),
+                  fdists[var])
+    return {var: fdists[var].counts for var in hists}
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Magnetic curvature')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--outputs', action="store",
+                        default='kappa,curv_radius,vexb_kappa',
+                        help='comma-separated names of the outputs')
+    parser.add_argument('--out_dir', action="store", default='',
+                        help='directory of the outputs (default: data/)')
+    parser.add_argument('--hists', action="store", default='kappa,vexb_kappa',
+                        help='comma-separated names of the distributions')
+    parser.add_argument('--hist_dir', action="store",
+                        default='../data/curvature/',
+                        help='directory of the distributions')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    parser.add_argument('--nworkers', action="store", default='0', type=int,
+                        help='number of workers (default: automatic)')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from frame_runner import run_frames
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    pic_run_dir = os.path.join(args.pic_run_dir, '')
+    out_dir = os.path.join(args.out_dir, '') if args.out_dir else \
+        pic_run_dir + 'data/'
+    outputs = [var for var in args.outputs.split(',') if var]
+    hists = [var for var in args.hists.split(',') if var]
+    config = (pic_info, args.pic_run, pic_run_dir, outputs, out_dir, hists,
+              args.hist_dir)
+    run_frames(curvature_frame, range(args.tstart, args.tend + 1), config,
+               nworkers=args.nworkers)
+
+
+if __name__ == "__main__":
+    main()
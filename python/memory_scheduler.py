@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Memory-aware scheduling of independent tasks on a process pool.
+
+The number of tasks running at the same time is limited by the memory that
+one task needs. The footprint can be declared. Otherwise, it is measured from
+the peak resident memory of the first tasks, which run alone. The footprint
+is updated as tasks finish from the largest of the most recent tasks, so the
+concurrency shrinks when tasks turn out to be larger and grows again when they
+turn out to be smaller. A new task also waits while the free memory of the
+node is below one footprint. At the end, the peak memory and wall time of
+each task are reported, and a RuntimeError lists the failed tasks.
+"""
+from __future__ import print_function
+
+import multiprocessing
+import resource
+import time
+import traceback
+
+from frame_runner import available_cores, available_memory
+
+GB = 1024.0**3
+
+
+def read_status_kb(key):
+    """Read a memory entry in kB from /proc/self/status, None when unknown
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the peak resident memory of this process (Linux only)
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except IOError:
+        pass
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes
+    """
+    peak = read_status_kb('VmHWM')
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak * 1024
+
+
+def current_rss():
+    """Current resident memory of this process in bytes
+    """
+    rss = read_status_kb('VmRSS')
+    return 0 if rss is None else rss * 1024
+
+
+def run_task(func, args):
+    """Run one task and measure its memory in a worker process
+
+    The memory of the task is the peak resident memory during the task minus
+    the resident memory before it, so that the memory already held by the
+    worker is not counted.
+
+    Returns:
+        (result, error message or None, memory in bytes, wall time)
+    """
+    reset_peak_rss()
+    rss0 = current_rss()
+    tstart = time.time()
+    try:
+        result = func(*args)
+        error = None
+    except Exception:
+        result = None
+        error = traceback.format_exc()
+    twall = time.time() - tstart
+    return result, error, max(peak_rss() - rss0, 0), twall
+
+
+class MemoryScheduler(object):
+    """Run tasks with the concurrency limited by their memory footprint
+    """
+    def __init__(self, max_workers=None, mem_per_task=None, mem_fraction=0.8,
+                 nprobe=1, safety=1.2, window=8, verbose=True):
+        """
+        Args:
+            max_workers: upper limit of the number of workers. Default is
+                the number of available cores.
+            mem_per_task: declared memory of one task in bytes. It is
+                measured from the first tasks when None.
+            mem_fraction: fraction of the available memory to use
+            nprobe: number of tasks running together before the memory of
+                one task is known
+            safety: factor applied to the footprint
+            window: number of the most recent tasks that the measured
+                footprint is from
+            verbose: whether to print the progress
+        """
+        self.max_workers = max_workers if max_workers else available_cores()
+        self.footprint = mem_per_task
+        self.mem_fraction = mem_fraction
+        self.nprobe = nprobe
+        self.safety = safety
+        self.window = window
+        self.verbose = verbose
+        self.reports = []
+
+    def concurrency(self, budget):
+        """Number of tasks that can run together
+        """
+        if self.footprint is None:
+            return min(self.nprobe, self.max_workers)
+        if self.footprint == 0:
+            return self.max_workers
+        ntasks = min(budget / (self.footprint * self.safety),
+                     self.max_workers)
+        return max(1, int(ntasks))
+
+    def can_start(self, nrunning):
+        """Whether the free memory allows one more task now
+        """
+        if nrunning == 0 or self.footprint is None:
+            return True
+        mem = available_memory()
+        return mem is None or mem >= self.footprint * self.safety
+
+    def run(self, func, args_list, labels=None, raise_on_failure=True):
+        """Run func(*args) for all the arguments
+
+        Args:
+            func: task function
+            args_list: list of argument tuples
+            labels: labels of the tasks in the report. Default is the index.
+            raise_on_failure: whether to raise a RuntimeError when some tasks
+                fail, after all the tasks are finished
+        Returns:
+            results: list of the results, None for failed tasks
+        """
+        args_list = [tuple(args) for args in args_list]
+        if labels is None:
+            labels = list(range(len(args_list)))
+        results = [None] * len(args_list)
+        mem = available_memory()
+        budget = mem * self.mem_fraction if mem else float('inf')
+        pool = multiprocessing.Pool(min(self.max_workers,
+                                        max(len(args_list), 1)))
+        queue = list(range(len(args_list)))
+        running = {}
+        try:
+            while queue or running:
+                while (queue and len(running) < self.concurrency(budget) and
+                       self.can_start(len(running))):
+                    itask = queue.pop(0)
+                    running[itask] = (pool.apply_async(run_task,
+                                                       (func, args_list[itask])),
+                                      time.time())
+                for itask in [i for i in running if running[i][0].ready()]:
+                    async_result, _ = running.pop(itask)
+                    result, error, mem_task, twall = async_result.get()
+                    results[itask] = result
+                    self.record(labels[itask], error, mem_task, twall,
+                                len(running))
+                time.sleep(0.1)
+        finally:
+            pool.close()
+            pool.join()
+        if self.verbose:
+            self.summary()
+        failed = [report['label'] for report in self.reports
+                  if report['error'] is not None]
+        if failed and raise_on_failure:
+            raise RuntimeError("Failed tasks: %s" % failed)
+        return results
+
+    def record(self, label, error, mem_task, twall, nrunning):
+        """Record one finished task and update the footprint
+        """
+        self.reports.append({'label': label, 'memory': mem_task,
+                             'wall_time': twall, 'error': error})
+        self.footprint = max(report['memory'] for report in
+                             self.reports[-self.window:])
+        if self.verbose:
+            status = "done" if error is None else "failed:\n" + error
+            print("Task %s %s (%0.2f GB, %0.1f s, %d running)" %
+                  (label, status, mem_task / GB, twall, nrunning))
+
+    def summary(self):
+        """Print the peak memory and wall time of each task
+        """
+        print("{:>12} {:>12} {:>12} {:>8}".format("task", "memory (GB)",
+                                                  "time (s)", "status"))
+        for report in self.reports:
+            status = "ok" if report['error'] is None else "failed"
+            print("{:>12} {:>12.2f} {:>12.1f} {:>8}".format(
+                str(report['label']), report['memory'] / GB,
+                report['wall_time'], status))
+        if self.reports:
+            print("Peak memory per task: %0.2f GB" %
+                  (max(report['memory'] for report in self.reports) / GB))
+            print("Total task time: %0.1f s" %
+                  sum(report['wall_time'] for report in self.reports))
+
+
+def run_tasks(func, args_list, labels=None, raise_on_failure=True, **kwargs):
+    """Run func(*args) for all the arguments with a MemoryScheduler
+
+    Args:
+        func: task function
+        args_list: list of argument tuples
+        labels: labels of the tasks in the report
+        raise_on_failure: whether to raise a RuntimeError when some tasks fail
+        kwargs: arguments of MemoryScheduler
+    """
+    scheduler = MemoryScheduler(**kwargs)
+    return scheduler.run(func, args_list, labels, raise_on_failure)
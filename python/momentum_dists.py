@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Field-aligned momentum distributions, pressure anisotropy and agyrotropy
+deposited directly from the particle dumps.
+
+For each chunk of particles, the magnetic field and the bulk flow of the
+cell of each particle give the parallel and perpendicular momenta and the
+parallel and perpendicular pressure of the particle. In the same pass, the
+particles are added to the global histograms and to the moments of the zone
+they are in, where a zone is a block of nreduce cells along each resolved
+direction. The moments are sums (weights, velocities, momenta and velocity
+times momentum), so the results of the MPI ranks are added in memory, and
+the pressure tensor, the anisotropy and the agyrotropy of each zone are
+calculated from the summed moments at the end.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from energy_bands import coarse_range, rank_layout, reduce_factors
+from field_io import read_field_frame
+from particle_io import (DECODE_CHUNK, cell_indices, decode_particles,
+                         particle_file_name, read_particle_header,
+                         read_particles)
+from vdist_service import hist1d, hist2d
+
+NPBINS = 300
+NEBINS = 60
+NABINS = 20
+COMPS = ['x', 'y', 'z']
+MOMENTS = (['n'] + ['v' + comp for comp in COMPS] +
+           ['u' + comp for comp in COMPS] +
+           ['v' + comp1 + 'u' + comp2 for comp1 in COMPS for comp2 in COMPS])
+ZONE_OUTPUTS = ['nrho', 'ppara', 'pperp', 'anisotropy', 'agyrotropy']
+ENGINE = None
+
+
+def hydro_species(species):
+    """Species name of the hydro fields
+    """
+    return 'e' if species in ['e', 'electron'] else 'i'
+
+
+def species_mass(pic_info, species):
+    """Particle mass in electron mass
+    """
+    return 1.0 if species in ['e', 'electron'] else pic_info.mime
+
+
+def momentum_bins(pmass):
+    """Bin edges of the momentum, energy and anisotropy distributions
+    """
+    smass = math.sqrt(pmass)
+    return {'p': np.logspace(-2, 1, NPBINS + 1) / smass,
+            'ene': np.logspace(-4, 2, NEBINS + 1) / smass,
+            'anisotropy': np.logspace(-1, 1, NABINS + 1)}
+
+
+def zone_means(fdata, reduce):
+    """Mean of a (nz, ny, nx) field over the zones
+    """
+    rx, ry, rz = reduce
+    nz, ny, nx = [max(n // r, 1) for n, r in zip(fdata.shape, [rz, ry, rx])]
+    fdata = fdata[:nz*rz, :ny*ry, :nx*rx]
+    return fdata.reshape((nz, rz, ny, ry, nx, rx)).mean(axis=(1, 3, 5))
+
+
+def pressure_tensor(moments, pmass, zone_volume):
+    """Pressure tensor of each zone from the summed moments
+
+    Returns:
+        ptensor: (3, 3, nz, ny, nx) symmetrized pressure tensor
+    """
+    nptl = moments[MOMENTS.index('n')]
+    inptl = np.zeros_like(nptl)
+    np.divide(1.0, nptl, out=inptl, where=nptl > 0)
+    ptensor = np.zeros((3, 3) + nptl.shape)
+    for i, comp1 in enumerate(COMPS):
+        vsum = moments[MOMENTS.index('v' + comp1)]
+        for j, comp2 in enumerate(COMPS):
+            usum = moments[MOMENTS.index('u' + comp2)]
+            vusum = moments[MOMENTS.index('v' + comp1 + 'u' + comp2)]
+            ptensor[i, j] = vusum - vsum * usum * inptl
+    ptensor = 0.5 * (ptensor + ptensor.transpose((1, 0, 2, 3, 4)))
+    return ptensor * pmass / zone_volume
+
+
+def zone_outputs(moments, bfield, pmass, zone_volume):
+    """Density, pressures, anisotropy and agyrotropy of each zone
+
+    The agyrotropy is sqrt(Q) of Swisdak (2016), which is 0 for gyrotropic
+    distributions.
+
+    Args:
+        moments: (len(MOMENTS), nz, ny, nx) summed moments
+        bfield: (3, nz, ny, nx) mean magnetic field of the zones
+        pmass: particle mass
+        zone_volume: volume of one zone in de^3
+    Returns:
+        outputs: dictionary of the ZONE_OUTPUTS
+    """
+    ptensor = pressure_tensor(moments, pmass, zone_volume)
+    bnorm = np.sqrt(np.sum(bfield**2, axis=0))
+    bhat = np.zeros_like(bfield)
+    np.divide(bfield, bnorm, out=bhat, where=bnorm > 0)
+    ppara = np.einsum('i...,ij...,j...->...', bhat, ptensor, bhat)
+    trace = ptensor[0, 0] + ptensor[1, 1] + ptensor[2, 2]
+    pperp = 0.5 * (trace - ppara)
+    inv2 = (ptensor[0, 0] * ptensor[1, 1] + ptensor[0, 0] * ptensor[2, 2] +
+            ptensor[1, 1] * ptensor[2, 2] - ptensor[0, 1]**2 -
+            ptensor[0, 2]**2 - ptensor[1, 2]**2)
+    denom = (trace - ppara) * (trace + 3 * ppara)
+    # 1 - Q, which is 1 for gyrotropic and empty zones
+    qagy = np.ones_like(trace)
+    np.divide(4 * inv2, denom, out=qagy, where=denom > 0)
+    outputs = {}
+    outputs['nrho'] = moments[MOMENTS.index('n')] / zone_volume
+    outputs['ppara'] = ppara
+    outputs['pperp'] = pperp
+    outputs['anisotropy'] = np.zeros_like(ppara)
+    np.divide(ppara, pperp, out=outputs['anisotropy'], where=pperp > 0)
+    outputs['agyrotropy'] = np.sqrt(np.maximum(1.0 - qagy, 0))
+    return outputs
+
+
+class MomentumDistEngine(object):
+    """Deposition of the momentum distributions and the zone moments of the
+    particles at one time step
+    """
+    def __init__(self, pic_info, run_dir, species, tindex, nreduce=1,
+                 data_dir=None, chunk=DECODE_CHUNK):
+        """
+        Args:
+            pic_info: namedtuple for the PIC simulation information.
+            run_dir: PIC run directory
+            species: 'e' or 'h'
+            tindex: time index of the particle dump
+            nreduce: size of the zones in cells
+            data_dir: directory of the fields. Default is run_dir + 'data/'.
+            chunk: number of particles in one chunk
+        """
+        self.run_dir = run_dir
+        self.species = species
+        self.tindex = tindex
+        self.chunk = chunk
+        self.pmass = species_mass(pic_info, species)
+        self.bins = momentum_bins(self.pmass)
+        if data_dir is None:
+            data_dir = run_dir + 'data/'
+        tframe = tindex // pic_info.fields_interval
+        shape = (pic_info.nz, max(pic_info.ny, 1), pic_info.nx)
+        hs = hydro_species(species)
+        self.fields = {}
+        for var in (['b' + comp for comp in COMPS] +
+                    ['v' + hs + comp for comp in COMPS] +
+                    ['u' + hs + comp for comp in COMPS]):
+            fdata = read_field_frame(pic_info, data_dir, var, tframe)
+            self.fields[var[0] + var[-1]] = fdata.reshape(shape)
+        self.ranks, self.starts, cell_volume = rank_layout(run_dir, tindex,
+                                                           species)
+        self.reduce = reduce_factors(pic_info, nreduce)
+        self.cshape = np.maximum(np.asarray(shape[::-1]) // self.reduce, 1)
+        self.zone_volume = cell_volume * np.prod(self.reduce)
+
+    def new_results(self, lo, hi):
+        """Empty results with the moments of the zones in [lo, hi)
+        """
+        lx, ly, lz = hi - lo
+        return {'pdist': np.zeros((2, NPBINS)),
+                'edist': np.zeros((2, NEBINS)),
+                'adist': np.zeros((NEBINS, NABINS)),
+                'lo': lo,
+                'moments': np.zeros((len(MOMENTS), lz, ly, lx))}
+
+    def deposit_chunk(self, header, cptl, start, lo, results):
+        """Add one chunk of particles to the results
+        """
+        ncells = [int(header['n' + comp]) for comp in COMPS]
+        dptl = decode_particles(header, cptl,
+                                ['ux', 'uy', 'uz', 'gamma', 'ene', 'q'])
+        icells = cell_indices(cptl['icell'], ncells[0] + 2, ncells[1] + 2)
+        gcells = [np.clip(icell, 1, ncell) - 1 + offset
+                  for icell, ncell, offset in zip(icells, ncells, start)]
+        igrid = (gcells[2], gcells[1], gcells[0])
+        weight = np.abs(dptl['q']).astype(np.float64)
+        igamma = 1.0 / dptl['gamma']
+        u = [dptl['u' + comp] for comp in COMPS]
+        v = [ucomp * igamma for ucomp in u]
+        bvec = [self.fields['b' + comp][igrid] for comp in COMPS]
+        bnorm = np.sqrt(bvec[0]**2 + bvec[1]**2 + bvec[2]**2)
+        ib = np.zeros_like(bnorm)
+        np.divide(1.0, bnorm, out=ib, where=bnorm > 0)
+        bhat = [bcomp * ib for bcomp in bvec]
+
+        # momentum and anisotropy distributions in the local field frame
+        usq = u[0]**2 + u[1]**2 + u[2]**2
+        upara = u[0] * bhat[0] + u[1] * bhat[1] + u[2] * bhat[2]
+        uperp2 = np.maximum(usq - upara**2, 0)
+        results['pdist'][0] += hist1d(np.abs(upara), self.bins['p'])
+        results['pdist'][1] += hist1d(np.sqrt(uperp2), self.bins['p'])
+        anisotropy = np.full_like(uperp2, np.inf)
+        np.divide(2 * upara**2, uperp2, out=anisotropy, where=uperp2 > 0)
+        results['adist'] += hist2d(dptl['ene'], anisotropy, self.bins['ene'],
+                                   self.bins['anisotropy'])
+
+        # pressure of each particle in the frame of the bulk flow
+        dv = [vcomp - self.fields['v' + comp][igrid]
+              for vcomp, comp in zip(v, COMPS)]
+        du = [ucomp - self.fields['u' + comp][igrid]
+              for ucomp, comp in zip(u, COMPS)]
+        dvpara = dv[0] * bhat[0] + dv[1] * bhat[1] + dv[2] * bhat[2]
+        dupara = du[0] * bhat[0] + du[1] * bhat[1] + du[2] * bhat[2]
+        dvdu = dv[0] * du[0] + dv[1] * du[1] + dv[2] * du[2]
+        ppara_ptl = dvpara * dupara * weight * self.pmass
+        pperp_ptl = 0.5 * (dvdu * weight * self.pmass - ppara_ptl)
+        ibin = np.searchsorted(self.bins['ene'], dptl['ene'], side='right') - 1
+        valid = (ibin >= 0) & (ibin < NEBINS)
+        for i, pptl in enumerate([ppara_ptl, pperp_ptl]):
+            results['edist'][i] += np.bincount(ibin[valid],
+                                               weights=pptl[valid],
+                                               minlength=NEBINS)
+
+        # moments of the zones
+        moments = results['moments']
+        _, lz, ly, lx = moments.shape
+        izone = np.zeros(weight.shape, dtype=np.intp)
+        for gcell, reduce, ilo, ncoarse in zip(igrid, self.reduce[::-1],
+                                               lo[::-1], [lz, ly, lx]):
+            izone *= ncoarse
+            izone += np.clip(gcell // reduce - ilo, 0, ncoarse - 1)
+        nzone = lz * ly * lx
+        terms = {'n': weight}
+        for i, comp1 in enumerate(COMPS):
+            terms['v' + comp1] = weight * v[i]
+            terms['u' + comp1] = weight * u[i]
+            for j, comp2 in enumerate(COMPS):
+                terms['v' + comp1 + 'u' + comp2] = terms['v' + comp1] * u[j]
+        for imom, mom in enumerate(MOMENTS):
+            moments[imom] += np.bincount(izone, weights=terms[mom],
+                                         minlength=nzone).reshape((lz, ly, lx))
+
+    def deposit_group(self, iranks):
+        """Results of a group of MPI ranks
+
+        Args:
+            iranks: indices of the ranks in self.ranks
+        """
+        ranges = []
+        for irank in iranks:
+            fname = particle_file_name(self.run_dir, self.tindex,
+                                       self.species, self.ranks[irank])
+            header = read_particle_header(fname)
+            ncells = np.asarray([header['n' + comp] for comp in COMPS],
+                                dtype=int)
+            ranges.append(coarse_range(self.starts[irank], ncells,
+                                       self.reduce, self.cshape))
+        los, his = zip(*ranges)
+        lo = np.min(los, axis=0)
+        results = self.new_results(lo, np.max(his, axis=0))
+        for irank in iranks:
+            fname = particle_file_name(self.run_dir, self.tindex,
+                                       self.species, self.ranks[irank])
+            header, ptl = read_particles(fname)
+            for istart in range(0, ptl.shape[0], self.chunk):
+                self.deposit_chunk(header, ptl[istart:istart + self.chunk],
+                                   self.starts[irank], lo, results)
+        return results
+
+    def merge(self, results, group):
+        """Add the results of a group to the results
+        """
+        for key in ['pdist', 'edist', 'adist']:
+            results[key] += group[key]
+        ix, iy, iz = group['lo'] - results['lo']
+        _, lz, ly, lx = group['moments'].shape
+        results['moments'][:, iz:iz+lz, iy:iy+ly, ix:ix+lx] += \
+            group['moments']
+
+    def run(self, nworkers=None):
+        """Results of all the MPI ranks
+
+        The ranks are split into groups that are deposited on a pool of
+        forked workers, which share the fields of the engine.
+
+        Returns:
+            results: dictionary with the global 'pdist', 'edist' and 'adist'
+                and the zone 'moments'
+        """
+        global ENGINE
+        if not nworkers:
+            nworkers = min(multiprocessing.cpu_count(), 16)
+        results = self.new_results(np.zeros(3, dtype=int), self.cshape)
+        ngroups = min(len(self.ranks), nworkers * 4)
+        groups = np.array_split(np.arange(len(self.ranks)), ngroups)
+        if nworkers == 1:
+            for iranks in groups:
+                self.merge(results, self.deposit_group(iranks))
+            return results
+        ENGINE = self
+        pool = multiprocessing.Pool(nworkers)
+        for group in pool.imap_unordered(deposit_group_task, groups):
+            self.merge(results, group)
+        pool.close()
+        pool.join()
+        ENGINE = None
+        return results
+
+    def zone_bfield(self):
+        """Mean magnetic field of the zones
+        """
+        return np.asarray([zone_means(self.fields['b' + comp], self.reduce)
+                           for comp in COMPS])
+
+    def outputs(self, results):
+        """Zone outputs from the results of run
+        """
+        return zone_outputs(results['moments'], self.zone_bfield(),
+                            self.pmass, self.zone_volume)
+
+
+def deposit_group_task(iranks):
+    """MomentumDistEngine.deposit_group of the engine of the forked workers
+    """
+    return ENGINE.deposit_group(iranks)
+
+
+def momentum_dists_dir(run_name):
+    """Directory of the momentum distributions of a run
+    """
+    return '../data/anisotropy_distribution/' + run_name + '/'
+
+
+def save_momentum_dists(fdir, species, tindex, results, outputs):
+    """Save the global distributions and the zone outputs
+
+    The global distributions are saved as pdists_, edists_ and adists_
+    <species>.<tindex>.all, and the zone outputs as
+    <var>_<species>_<tindex>.gda.
+    """
+    if not os.path.isdir(fdir):
+        os.makedirs(fdir)
+    for key in ['pdist', 'edist', 'adist']:
+        fname = fdir + key + 's_' + species + '.' + str(tindex) + '.all'
+        results[key].tofile(fname)
+    for var in ZONE_OUTPUTS:
+        fname = fdir + var + '_' + species + '_' + str(tindex) + '.gda'
+        outputs[var].astype(np.float32).tofile(fname)
+
+
+def load_momentum_dists(fdir, species, tindex):
+    """Load the global distributions
+
+    Returns:
+        dists: dictionary of the 'pdist' (2, NPBINS) of |p_para| and p_perp,
+            the 'edist' (2, NEBINS) of the parallel and perpendicular
+            pressures and the 'adist' (NEBINS, NABINS)
+    """
+    shapes = {'pdist': (2, NPBINS), 'edist': (2, NEBINS),
+              'adist': (NEBINS, NABINS)}
+    dists = {}
+    for key in shapes:
+        fname = fdir + key + 's_' + species + '.' + str(tindex) + '.all'
+        dists[key] = np.fromfile(fname).reshape(shapes[key])
+    return dists
+
+
+def momentum_distributions(pic_info, run_dir, run_name, species, tindex,
+                           nreduce=1, nworkers=None):
+    """Deposit and save the momentum distributions at one time step
+    """
+    engine = MomentumDistEngine(pic_info, run_dir, species, tindex, nreduce)
+    results = engine.run(nworkers)
+    save_momentum_dists(momentum_dists_dir(run_name), species, tindex,
+                        results, engine.outputs(results))
+    return results
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Momentum distributions and pressure anisotropy')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--species', action="store", default='e',
+                        help='particle species')
+    parser.add_argument('--nreduce', action="store", default='1', type=int,
+                        help='size of the zones in cells')
+    parser.add_argument('--nworkers', action="store", default='0', type=int,
+                        help='number of worker processes')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time frame')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    run_dir = os.path.join(args.pic_run_dir, '')
+    for tframe in range(args.tstart, args.tend + 1):
+        print("Time frame: %d" % tframe)
+        tindex = pic_info.particle_interval * tframe
+        momentum_distributions(pic_info, run_dir, args.pic_run, args.species,
+                               tindex, args.nreduce, args.nworkers)
+
+
+if __name__ == "__main__":
+    main()
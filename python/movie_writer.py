@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Write movies directly from rendered RGB frames.
+
+Frames are rendered by a pool of worker processes and streamed into an
+ffmpeg pipe (or an imageio writer when ffmpeg is not available) in frame
+order, so no intermediate image files are needed. The frames that finish out
+of order wait in a reorder buffer, and no new frames are submitted while the
+buffer is full, so the memory usage is bounded even when the encoder is
+slower than the workers.
+"""
+from __future__ import print_function
+
+import multiprocessing
+import shutil
+import subprocess
+
+import numpy as np
+
+
+class MovieWriter(object):
+    """Encode (height, width, 3) uint8 RGB frames into a movie file
+    """
+    def __init__(self, fname, fps=10, crf=18, codec='libx264'):
+        """
+        Args:
+            fname: movie file name
+            fps: frames per second
+            crf: constant rate factor of the encoder (lower is better)
+            codec: video codec of ffmpeg
+        """
+        self.fname = fname
+        self.fps = fps
+        self.crf = crf
+        self.codec = codec
+        self.shape = None
+        self.pipe = None
+        self.writer = None
+        self.nframes = 0
+
+    def open(self, height, width):
+        """Start the encoder when the frame size is known
+        """
+        if shutil.which('ffmpeg'):
+            cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                   '-s', '%dx%d' % (width, height), '-r', str(self.fps),
+                   '-i', '-', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                   '-c:v', self.codec, '-pix_fmt', 'yuv420p',
+                   '-crf', str(self.crf), self.fname]
+            self.pipe = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        else:
+            import imageio
+            self.writer = imageio.get_writer(self.fname, fps=self.fps,
+                                             macro_block_size=1)
+        self.shape = (height, width, 3)
+
+    def write(self, frame):
+        """Append one frame to the movie
+        """
+        frame = np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8)
+        if self.shape is None:
+            self.open(frame.shape[0], frame.shape[1])
+        if frame.shape != self.shape:
+            raise ValueError("Frame shape %s differs from %s" %
+                             (frame.shape, self.shape))
+        if self.pipe is not None:
+            self.pipe.stdin.write(frame.tobytes())
+        else:
+            self.writer.append_data(frame)
+        self.nframes += 1
+
+    def close(self):
+        """Finish the movie
+        """
+        if self.pipe is not None:
+            self.pipe.stdin.close()
+            if self.pipe.wait() != 0:
+                raise RuntimeError("ffmpeg failed to write " + self.fname)
+            self.pipe = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_movie(render_func, tframes, fname, nworkers=4, initializer=None,
+                initargs=(), fps=10, buffer_size=None, crf=18):
+    """Render frames on a process pool and write them into a movie in order
+
+    Args:
+        render_func: function that returns the RGB frame of a time frame
+        tframes: time frames
+        fname: movie file name
+        nworkers: number of worker processes
+        initializer: function to prepare each worker (e.g., the figure)
+        initargs: arguments of the initializer
+        fps: frames per second
+        buffer_size: number of finished frames that can wait for earlier
+            ones. Default is 2 * nworkers.
+        crf: constant rate factor of the encoder
+    Returns:
+        nframes: number of frames in the movie
+    """
+    tframes = list(tframes)
+    nframes = len(tframes)
+    if buffer_size is None:
+        buffer_size = 2 * nworkers
+    window = nworkers + buffer_size
+    pool = multiprocessing.Pool(nworkers, initializer=initializer,
+                                initargs=initargs)
+    pending = {}
+    next_submit = 0
+    try:
+        with MovieWriter(fname, fps, crf) as writer:
+            for next_write in range(nframes):
+                while next_submit < nframes and next_submit - next_write < window:
+                    pending[next_submit] = pool.apply_async(
+                        render_func, (tframes[next_submit], ))
+                    next_submit += 1
+                writer.write(pending.pop(next_write).get())
+                print("Frame %d written (%d/%d)" %
+                      (tframes[next_write], next_write + 1, nframes))
+    finally:
+        pool.close()
+        pool.join()
+    return nframes
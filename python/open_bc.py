@@ -23,6 +23,7 @@ from scipy.interpolate import interp1d
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
+from energy_bands import load_band_densities
 from joblib import Parallel, delayed
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
@@ -171,7 +172,10 @@ def rho_bands_2d(plot_config, show_plot=True):
         rect[1] -= rect[3] + vgap
 
     band_break = 4
-    for iband in range(nbands):
+    nrhos = load_band_densities(pic_info, pic_run_dir, species, tindex,
+                                nreduce=nreduce, nbands=nbands,
+                                nworkers=plot_config.get("nworkers"))
+    for iband, nrho in enumerate(nrhos):
         print("Energy band: %d" % iband)
         if iband < band_break:
             ax = axs[iband]
@@ -179,10 +183,6 @@ def rho_bands_2d(plot_config, show_plot=True):
         else:
             ax = axs[iband+1]
             rect = rects[iband+1]
-        fname = (pic_run_dir + "data-smooth2/n" + species + "_" +
-                 str(iband) + "_" + str(tindex) + ".gda")
-        nrho = np.fromfile(fname, dtype=np.float32)
-        nrho = nrho.reshape((nzr, nxr))
         if iband >= 5:
             nhigh += nrho
         ntot += nrho
@@ -323,6 +323,7 @@ def analysis_multi_frames(plot_config, args):
     else:
         ncores = multiprocessing.cpu_count()
         ncores = 8
+        plot_config["nworkers"] = 1
         Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
                                 for tframe in tframes)
 
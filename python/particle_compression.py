@@ -31,7 +31,11 @@ import palettable
 from contour_plots import read_2d_fields
 from dolointerpolation import MultilinearInterpolator
 from energy_conversion import read_data_from_json
+from momentum_dists import (load_momentum_dists, momentum_bins,
+                            momentum_dists_dir, momentum_distributions,
+                            species_mass)
 from particle_distribution import read_particle_data
+from particle_io import decode_particles
 from shell_functions import mkdir_p
 
 style.use(['seaborn-white', 'seaborn-paper', 'seaborn-ticks'])
@@ -241,29 +245,23 @@ def interp_hydro_particle(pic_info, run_dir, tindex, rank):
     # vz = (vez*ne + viz*ni*mime) * inrho
     # divv = np.gradient(vx, dx, axis=1) + np.gradient(vz, dz, axis=0)
 
-    dxp = ptl['dxyz'][:, 0]
-    dzp = ptl['dxyz'][:, 2]
-    icell = ptl['icell']
     nx = v0.nx + 2
-    ny = v0.ny + 2
     nz = v0.nz + 2
-    iz = icell // (nx * ny)
-    # iy = (icell % (nx * ny)) // nx
-    ix = icell % nx
-    x_ptl = ((ix - 1.0) + (dxp + 1.0) * 0.5) * v0.dx + v0.x0
-    z_ptl = ((iz - 1.0) + (dzp + 1.0) * 0.5) * v0.dz + v0.z0
-    del icell, dxp, dzp, ix, iz
+    dptl = decode_particles(v0, ptl, ['x', 'z', 'ux', 'uy', 'uz', 'gamma'])
+    del ptl
+    x_ptl = dptl['x']
+    z_ptl = dptl['z']
     nptl, = x_ptl.shape
     # x = np.linspace(v0.x0 - v0.dx, v0.x0 + v0.nx * v0.dx, nx)
     # z = np.linspace(v0.z0 - v0.dz, v0.z0 + v0.nz * v0.dz, nz)
     x = np.linspace(v0.x0, v0.x0 + v0.nx * v0.dx, nx - 1)
     z = np.linspace(v0.z0, v0.z0 + v0.nz * v0.dz, nz - 1)
 
-    ux = ptl['u'][:, 0]
-    uy = ptl['u'][:, 1]
-    uz = ptl['u'][:, 2]
-    gamma = np.sqrt(1 + np.sum(ptl['u']**2, axis=1))
-    del ptl
+    ux = dptl['ux']
+    uy = dptl['uy']
+    uz = dptl['uz']
+    gamma = dptl['gamma']
+    del dptl
     ene_ptl = gamma - 1.0
     igamma = 1.0 / gamma
     vxp = ux * igamma
@@ -696,26 +694,23 @@ def interp_particle_compression(pic_info, run_dir, tindex, tindex_pre, tindex_po
 
     # read particle data
     (v0, pheader, ptl) = read_particle_data(fname)
-    dxp = ptl['dxyz'][:, 0]
-    dzp = ptl['dxyz'][:, 2]
-    icell = ptl['icell']
-    uxp = ptl['u'][:, 0]
-    uyp = ptl['u'][:, 1]
-    uzp = ptl['u'][:, 2]
-    q = ptl['q']
     nx = v0.nx + 2
-    ny = v0.ny + 2
     nz = v0.nz + 2
-    iz = icell // (nx * ny)
-    ix = icell % nx
-    x_ptl = ((ix - 1.0) + (dxp + 1.0) * 0.5) * v0.dx + v0.x0
-    z_ptl = ((iz - 1.0) + (dzp + 1.0) * 0.5) * v0.dz + v0.z0
-    gamma = np.sqrt(1 + np.sum(ptl['u']**2, axis=1))
+    dptl = decode_particles(v0, ptl,
+                            ['x', 'z', 'ux', 'uy', 'uz', 'gamma', 'q'])
+    del ptl
+    uxp = dptl['ux']
+    uyp = dptl['uy']
+    uzp = dptl['uz']
+    q = dptl['q']
+    x_ptl = dptl['x']
+    z_ptl = dptl['z']
+    gamma = dptl['gamma']
     igamma = 1.0 / gamma
     vxp = uxp * igamma
     vyp = uyp * igamma
     vzp = uzp * igamma
-    del ptl, icell, dxp, dzp, ix, iz, igamma
+    del dptl, igamma
 
     dx = v0.dx
     dz = v0.dz
@@ -1195,28 +1190,25 @@ def interpolation_single_rank(run_dir, rank, pmass, species, tindex,
 
     # read particle data
     (v0, pheader, ptl) = read_particle_data(fname)
-    dxp = ptl['dxyz'][:, 0]
-    dzp = ptl['dxyz'][:, 2]
-    icell = ptl['icell']
-    uxp = ptl['u'][:, 0]
-    uyp = ptl['u'][:, 1]
-    uzp = ptl['u'][:, 2]
-    q = ptl['q']
     nx = v0.nx + 2
-    ny = v0.ny + 2
     nz = v0.nz + 2
-    iz = icell // (nx * ny)
-    ix = icell % nx
-    x_ptl = ((ix - 1.0) + (dxp + 1.0) * 0.5) * v0.dx + v0.x0
-    z_ptl = ((iz - 1.0) + (dzp + 1.0) * 0.5) * v0.dz + v0.z0
-    gamma = np.sqrt(1 + np.sum(ptl['u']**2, axis=1))
+    dptl = decode_particles(v0, ptl,
+                            ['x', 'z', 'ux', 'uy', 'uz', 'gamma', 'q'])
+    del ptl
+    uxp = dptl['ux']
+    uyp = dptl['uy']
+    uzp = dptl['uz']
+    q = dptl['q']
+    x_ptl = dptl['x']
+    z_ptl = dptl['z']
+    gamma = dptl['gamma']
     igamma = 1.0 / gamma
     vxp = uxp * igamma
     vyp = uyp * igamma
     vzp = uzp * igamma
     weight = abs(q[0])
     coord = np.vstack((x_ptl, z_ptl))
-    del ptl, icell, dxp, dzp, ix, iz, igamma, q
+    del dptl, igamma, q
 
     ex_ptl = fitting_functions['f_ex'](coord)
     ey_ptl = fitting_functions['f_ey'](coord)
@@ -1822,288 +1814,19 @@ def interp_particle_compression_single(run_dir, run_name, tindex,
     hists.tofile(fname)
 
 
-def momentum_dist_single_rank(run_dir, rank, pmass, species, tindex,
-                              fitting_functions):
-    """
-    """
-    # if rank % 50 == 0:
-    #     print("Rank: %d" % rank)
-    print("Rank: %d" % rank)
-    particle_dir = run_dir + 'particle/T.' + str(tindex) + '/'
-    eparticle_name = particle_dir + 'eparticle.' + str(tindex)
-    hparticle_name = particle_dir + 'hparticle.' + str(tindex)
-    if species == 'e':
-        charge = -1.0
-        fname = eparticle_name + '.' + str(rank)
-        pmass = 1.0
-    else:
-        charge = 1.0
-        fname = hparticle_name + '.' + str(rank)
-        pmass = pic_info.mime
-
-    # read particle data
-    (v0, pheader, ptl) = read_particle_data(fname)
-    dxp = ptl['dxyz'][:, 0]
-    dzp = ptl['dxyz'][:, 2]
-    icell = ptl['icell']
-    uxp = ptl['u'][:, 0]
-    uyp = ptl['u'][:, 1]
-    uzp = ptl['u'][:, 2]
-    q = ptl['q']
-    nx = v0.nx + 2
-    ny = v0.ny + 2
-    nz = v0.nz + 2
-    iz = icell // (nx * ny)
-    ix = icell % nx
-    x_ptl = ((ix - 1.0) + (dxp + 1.0) * 0.5) * v0.dx + v0.x0
-    z_ptl = ((iz - 1.0) + (dzp + 1.0) * 0.5) * v0.dz + v0.z0
-    gamma = np.sqrt(1 + np.sum(ptl['u']**2, axis=1))
-    igamma = 1.0 / gamma
-    vxp = uxp * igamma
-    vyp = uyp * igamma
-    vzp = uzp * igamma
-    weight = abs(q[0])
-    coord = np.vstack((x_ptl, z_ptl))
-    del ptl, icell, dxp, dzp, ix, iz, q, igamma
-
-    bx_ptl = fitting_functions['f_bx'](coord)
-    by_ptl = fitting_functions['f_by'](coord)
-    bz_ptl = fitting_functions['f_bz'](coord)
-    ib_ptl = div0(1.0, np.sqrt(bx_ptl**2 + by_ptl**2 + bz_ptl**2))
-    bx2 = bx_ptl**2
-    by2 = by_ptl**2
-    bz2 = bz_ptl**2
-    bxy = bx_ptl * by_ptl
-    bxz = bx_ptl * bz_ptl
-    byz = by_ptl * bz_ptl
-    ib2_ptl = div0(1.0, bx2 + by2 + bz2)
-    upara = np.abs((uxp * bx_ptl + uyp * by_ptl + uzp * bz_ptl) * ib_ptl)
-    uperp = np.sqrt(np.abs(uxp**2 + uyp**2 + uzp**2 - upara**2))
-    anisotropy = np.squeeze(2 * upara**2 / uperp**2)
-
-    vx_ptl = fitting_functions['f_vx'](coord)
-    vy_ptl = fitting_functions['f_vy'](coord)
-    vz_ptl = fitting_functions['f_vz'](coord)
-    ux_ptl = fitting_functions['f_ux'](coord)
-    uy_ptl = fitting_functions['f_uy'](coord)
-    uz_ptl = fitting_functions['f_uz'](coord)
-
-    pxx = (vxp - vx_ptl) * (uxp - ux_ptl) * pmass
-    pyy = (vyp - vy_ptl) * (uyp - uy_ptl) * pmass
-    pzz = (vzp - vz_ptl) * (uzp - uz_ptl) * pmass
-    pxy = (vxp - vx_ptl) * (uyp - uy_ptl) * pmass
-    pxz = (vxp - vx_ptl) * (uzp - uz_ptl) * pmass
-    pyz = (vyp - vy_ptl) * (uzp - uz_ptl) * pmass
-    pyx = (vyp - vy_ptl) * (uxp - ux_ptl) * pmass
-    pzx = (vzp - vz_ptl) * (uxp - ux_ptl) * pmass
-    pzy = (vzp - vz_ptl) * (uyp - uy_ptl) * pmass
-    pxx *= weight
-    pyy *= weight
-    pzz *= weight
-    pxy *= weight
-    pxz *= weight
-    pyz *= weight
-    pyx *= weight
-    pzx *= weight
-    pzy *= weight
-
-    del vxp, vyp, vzp, uxp, uyp, uzp
-    del vx_ptl, vy_ptl, vz_ptl
-    del ux_ptl, uy_ptl, uz_ptl
-
-    del bx_ptl, by_ptl, bz_ptl, ib_ptl
-
-    pscalar = (pxx + pyy + pzz) / 3.0
-    ppara_ptl = pxx * bx2 + pyy * by2 + pzz * bz2 + \
-                (pxy + pyx) * bxy + (pxz + pzx) * bxz + (pyz + pzy) * byz
-    ppara_ptl *= ib2_ptl
-    pperp_ptl = 0.5 * (pscalar * 3 - ppara_ptl)
-
-    del pxx, pyy, pzz, pxy, pxz, pyz, pyx, pzx, pzy
-
-    # get the distribution and save the data
-    npbins = 300
-    pbins = np.logspace(-2, 1, npbins + 1) / math.sqrt(pmass)
-    hists1D = np.zeros((2, npbins))
-    hists1D[0, :], bin_edges = np.histogram(upara, bins=pbins)
-    hists1D[1, :], bin_edges = np.histogram(uperp, bins=pbins)
-
-    nebins = 60
-    nabins = 20
-    ebins = np.logspace(-4, 2, nebins + 1) / math.sqrt(pmass)
-    abins = np.logspace(-1, 1, nabins + 1)
-    hists2D = np.zeros((nebins, nabins))
-    hists2D, ebin_edges, abin_edges = np.histogram2d(gamma-1, anisotropy,
-                                                     bins=[ebins, abins])
-
-    ppara = upara**2 / gamma
-    pperp = 0.5 * uperp**2 / gamma
-    hists1D_a = np.zeros((2, nebins))
-    hists1D_a[0, :], ebin_edges = np.histogram(gamma-1, bins=ebins,
-                                               weights=np.squeeze(ppara_ptl))
-    hists1D_a[1, :], ebin_edges = np.histogram(gamma-1, bins=ebins,
-                                               weights=np.squeeze(pperp_ptl))
-
-    del pscalar, ppara_ptl, pperp_ptl, ib2_ptl
-    del upara, uperp, anisotropy
-    del x_ptl, z_ptl, gamma, bin_edges, ebin_edges, abin_edges
-    del coord
-    del fitting_functions
-
-    return (hists1D, hists1D_a, hists2D)
-
-
-def calc_momemtum_distribution(run_dir, run_name, tindex,tindex_pre,
+def calc_momemtum_distribution(run_dir, run_name, tindex, tindex_pre,
                                tindex_post, species='e', use_shifted_eb=False):
-    """Use single field files to interpolate compression effects
+    """Momentum and anisotropy distributions of all MPI ranks
+
+    The particles are deposited by momentum_dists.MomentumDistEngine, which
+    uses the fields at the cell of each particle, so tindex_pre, tindex_post
+    and use_shifted_eb are not used. The ranks are processed one after another
+    because this function runs for multiple frames in parallel.
     """
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    if species == 'e':
-        pmass = 1.0
-        charge = -1.0
-    else:
-        pmass = pic_info.mime
-        charge = 1.0
-    mime = pic_info.mime
-    smime = math.sqrt(mime)
-    current_time = tindex / pic_info.fields_interval
-    dv = pic_info.dx_di * pic_info.dz_di * pic_info.mime
-
-    particle_dir = run_dir + 'particle/T.' + str(tindex) + '/'
-    eparticle_name = particle_dir + 'eparticle.' + str(tindex)
-    hparticle_name = particle_dir + 'hparticle.' + str(tindex)
-    if species == 'e':
-        fname = eparticle_name + '.0'
-    else:
-        fname = hparticle_name + '.0'
-    # read particle data
-    (v0, pheader, ptl) = read_particle_data(fname)
-    dx = v0.dx
-    dz = v0.dz
-    dxh = dx * 0.5
-    dzh = dz * 0.5
-    nx_pic = pic_info.nx
-    nz_pic = pic_info.nz
-    lx_pic = pic_info.lx_di * smime
-    lz_pic = pic_info.lz_di * smime
-    x1 = np.linspace(-dxh, lx_pic + dxh, nx_pic + 2)
-    x2 = np.linspace(-dx, lx_pic, nx_pic + 2)
-    z1 = np.linspace(-dzh - 0.5 * lz_pic, 0.5 * lz_pic + dzh, nz_pic + 2)
-    z2 = np.linspace(-dz - 0.5 * lz_pic, 0.5 * lz_pic, nz_pic + 2)
-    points_x, points_z = np.broadcast_arrays(x2[1:-1].reshape(-1,1), z2[1:-1])
-    coord = np.vstack((points_x.flatten(), points_z.flatten()))
-    orders = [nx_pic, nz_pic]
-    smin_h = [x2[1], z2[1]]         # for hydro, Ey
-    smax_h = [x2[-2], z2[-2]]
-    smin_ex_bz = [x1[1], z2[1]]     # for Ex, Bz
-    smax_ex_bz = [x1[-2], z2[-2]]
-    smin_ez_bx = [x2[1], z1[1]]     # for Ez, Bx
-    smax_ez_bx = [x2[-2], z1[-2]]
-    smin_by = [x1[1], z1[1]]        # for By
-    smax_by = [x1[-2], z1[-2]]
-    del points_x, points_z
-
-    ng = 3
-    kernel = np.ones((ng, ng)) / float(ng * ng)
-
-    fitting_functions = {}
-
-    kwargs = {"current_time": current_time, "xl": 0, "xr": pic_info.lx_di,
-              "zb": -0.5 * pic_info.lz_di, "zt": 0.5 * pic_info.lz_di}
-    # read electric and magnetic fields
-    nx = pic_info.nx
-    nz = pic_info.nz
-    fname = run_dir + "data/bx.gda"
-    x, z, bx = read_2d_fields(pic_info, fname, **kwargs)
-
-    fname = run_dir + "data/by.gda"
-    x, z, by = read_2d_fields(pic_info, fname, **kwargs)
-
-    fname = run_dir + "data/bz.gda"
-    x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
-
-    if use_shifted_eb:  # shifted electric and magnetic fields at hydro positions
-        fitting_functions['f_bx'] = MultilinearInterpolator(smin_h, smax_h, orders)
-        fitting_functions['f_by'] = MultilinearInterpolator(smin_h, smax_h, orders)
-        fitting_functions['f_bz'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    else:
-        fitting_functions['f_bx'] = MultilinearInterpolator(smin_ez_bx, smax_ez_bx, orders)
-        fitting_functions['f_by'] = MultilinearInterpolator(smin_by, smax_by, orders)
-        fitting_functions['f_bz'] = MultilinearInterpolator(smin_ex_bz, smax_ex_bz, orders)
-
-    fitting_functions['f_bx'].set_values(np.atleast_2d(np.transpose(bx).flatten()))
-    fitting_functions['f_by'].set_values(np.atleast_2d(np.transpose(by).flatten()))
-    fitting_functions['f_bz'].set_values(np.atleast_2d(np.transpose(bz).flatten()))
-
-    if not use_shifted_eb:
-        # interpolate EMF to hydro positions
-        bx = np.transpose(fitting_functions['f_bx'](coord).reshape(nx, nz))
-        by = np.transpose(fitting_functions['f_by'](coord).reshape(nx, nz))
-        bz = np.transpose(fitting_functions['f_bz'](coord).reshape(nx, nz))
-
-    del bx, by, bz
-
-    kwargs = {"current_time": current_time, "xl": 0, "xr": pic_info.lx_di,
-              "zb": -0.5 * pic_info.lz_di, "zt": 0.5 * pic_info.lz_di}
-    fname = run_dir + "data/v" + species + "x.gda"
-    x, z, vx_pic = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/v" + species + "y.gda"
-    x, z, vy_pic = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/v" + species + "z.gda"
-    x, z, vz_pic = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/u" + species + "x.gda"
-    x, z, ux_pic = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/u" + species + "y.gda"
-    x, z, uy_pic = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/u" + species + "z.gda"
-    x, z, uz_pic = read_2d_fields(pic_info, fname, **kwargs)
-
-    fitting_functions['f_vx'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_vy'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_vz'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_ux'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_uy'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_uz'] = MultilinearInterpolator(smin_h, smax_h, orders)
-    fitting_functions['f_vx'].set_values(np.atleast_2d(np.transpose(vx_pic).flatten()))
-    fitting_functions['f_vy'].set_values(np.atleast_2d(np.transpose(vy_pic).flatten()))
-    fitting_functions['f_vz'].set_values(np.atleast_2d(np.transpose(vz_pic).flatten()))
-    fitting_functions['f_ux'].set_values(np.atleast_2d(np.transpose(ux_pic).flatten()))
-    fitting_functions['f_uy'].set_values(np.atleast_2d(np.transpose(uy_pic).flatten()))
-    fitting_functions['f_uz'].set_values(np.atleast_2d(np.transpose(uz_pic).flatten()))
-
-    del vx_pic, vy_pic, vz_pic
-    del ux_pic, uy_pic, uz_pic
-
-    # get the distribution and save the data
-    npbins = 300
-    nebins = 60
-    nabins = 20
-    pbins = np.logspace(-2, 1, npbins) / math.sqrt(pmass)
-    ebins = np.logspace(-4, 2, nebins) / math.sqrt(pmass)
-    abins = np.logspace(-1, 1, nabins)
-    hists1D = np.zeros((2, npbins))
-    hists1D_a = np.zeros((2, nebins))
-    hists2D = np.zeros((nebins, nabins))
-
-    fdir = '../data/anisotropy_distribution/' + run_name + '/'
-    mkdir_p(fdir)
-
-    nprocs = pic_info.topology_x * pic_info.topology_y * pic_info.topology_z
-    ranks = range(nprocs)
-
-    for rank in ranks:
-        hists1, hists1a, hists2 = momentum_dist_single_rank(
-                run_dir, rank, pmass, species, tindex, fitting_functions)
-        hists1D += hists1
-        hists1D_a += hists1a
-        hists2D += hists2
-    fname = fdir + 'pdists_' + species + '.' + str(tindex) + '.all'
-    hists1D.tofile(fname)
-    fname = fdir + 'edists_' + species + '.' + str(tindex) + '.all'
-    hists1D_a.tofile(fname)
-    fname = fdir + 'adists_' + species + '.' + str(tindex) + '.all'
-    hists2D.tofile(fname)
+    momentum_distributions(pic_info, run_dir, run_name, species, tindex,
+                           nworkers=1)
 
 
 def combine_files(nprocs, run_dir, tindex, data_dir, var_name, species='e'):
@@ -2499,9 +2222,8 @@ def plot_compression_heating(run_name, tindex, species):
 def plot_momentum_distribution(run_name, tindex, species):
     """
     """
-    nbins = 300
     drange = [[1, 1.1], [0, 1]]
-    pbins = np.logspace(-2, 1, nbins + 1)
+    pbins = momentum_bins(species_mass(pic_info, species))['p']
 
     # normalized with thermal energy
     if (species == 'e'):
@@ -2513,14 +2235,9 @@ def plot_momentum_distribution(run_name, tindex, species):
     pth = math.sqrt(gama**2 - 1)
     pbins /= pth
 
-    fdir = '../data/momentum_distribution/' + run_name + '/'
-    fname = fdir + 'pdists_' + species + '.' + str(tindex) + '.all'
-    fdata = np.fromfile(fname)
-    sz, = fdata.shape
-    nvar = sz / nbins
-    fdata = fdata.reshape((nvar, nbins))
-    ppara_dist = fdata[0, :]
-    pperp_dist = fdata[1, :]
+    dists = load_momentum_dists(momentum_dists_dir(run_name), species, tindex)
+    ppara_dist = dists['pdist'][0, :]
+    pperp_dist = dists['pdist'][1, :]
     if species == 'e':
         charge = r'$-e$'
     else:
@@ -2554,10 +2271,10 @@ def plot_momentum_distribution(run_name, tindex, species):
 def plot_anisotropy_distribution_2d(run_name, tindex, species):
     """
     """
-    nebins = 60
-    nabins = 20
-    ebins = np.logspace(-4, 2, nebins) / math.sqrt(pmass)
-    abins = np.logspace(-1, 1, nabins)
+    bins = momentum_bins(species_mass(pic_info, species))
+    ebins = bins['ene']
+    abins = bins['anisotropy']
+    nebins = len(ebins) - 1
 
     # normalized with thermal energy
     if (species == 'e'):
@@ -2568,10 +2285,8 @@ def plot_anisotropy_distribution_2d(run_name, tindex, species):
     eth = gama - 1.0
     ebins /= eth
 
-    fdir = '../data/momentum_distribution/' + run_name + '/'
-    fname = fdir + 'adists_' + species + '.' + str(tindex) + '.all'
-    fdata = np.fromfile(fname)
-    fdata = fdata.reshape((nebins, nabins))
+    dists = load_momentum_dists(momentum_dists_dir(run_name), species, tindex)
+    fdata = dists['adist']
     if species == 'e':
         charge = r'$-e$'
     else:
@@ -2600,13 +2315,11 @@ def plot_anisotropy_distribution_2d(run_name, tindex, species):
 def plot_anisotropy_distribution_1d(run_name, tindex, species):
     """
     """
-    nebins = 60
-    nabins = 20
-    ebins = np.logspace(-4, 2, nebins) / math.sqrt(pmass)
-    abins = np.logspace(-1, 1, nabins)
-
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
+    bins = momentum_bins(species_mass(pic_info, species))
+    ebins = bins['ene'][:-1]
+    abins = bins['anisotropy']
     pint = pic_info.particle_interval
     ntp = pic_info.ntp
 
@@ -2637,14 +2350,12 @@ def plot_anisotropy_distribution_1d(run_name, tindex, species):
     colors = colors_Set1_9[:5] + colors_Set1_9[6:] # remove yellow color
     ax1.set_prop_cycle('color', colors)
 
-    fdir = '../data/anisotropy_distribution/' + run_name + '/'
+    fdir = momentum_dists_dir(run_name)
 
     for tframe in range(4, 5):
         tindex = pint * tframe
         color = plt.cm.Reds_r((tframe - 2) / float(nt), 1)
-        fname = fdir + 'edists_' + species + '.' + str(tindex) + '.all'
-        fdata1 = np.fromfile(fname)
-        fdata1 = fdata1.reshape((2, nebins))
+        fdata1 = load_momentum_dists(fdir, species, tindex)['edist']
         if tframe == 3:
         # if tframe == 3 or tframe == 5:
             ax1.semilogx(ebins, div0(fdata1[0, :], fdata1[1, :]), linewidth=4,
@@ -24,14 +24,17 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from mpl_toolkits.mplot3d import Axes3D
 from scipy import interpolate, signal
 
-import color_maps as cm
-import colormap.colormaps as cmaps
 import pic_information
 from contour_plots import plot_2d_contour, read_2d_fields
 from energy_conversion import read_data_from_json
+from lazy_import import lazy_import
+from particle_io import decode_particles
 from shell_functions import mkdir_p
 from spectrum_fitting import get_energy_distribution
 
+cm = lazy_import('color_maps')
+cmaps = lazy_import('colormap.colormaps')
+
 # import particle_spectrum_vdist as psv
 
 rc('font', **{'family': 'serif', 'serif': ['Computer Modern']})
@@ -170,37 +173,13 @@ def calc_velocity_distribution(v0,
         corners: the corners of the box in di.
         nbins: number of bins in each dimension.
     """
-    dx = ptl['dxyz'][:, 0]
-    dy = ptl['dxyz'][:, 1]
-    dz = ptl['dxyz'][:, 2]
-    icell = ptl['icell']
-    ux = ptl['u'][:, 0] * ptl_mass
-    uy = ptl['u'][:, 1] * ptl_mass
-    uz = ptl['u'][:, 2] * ptl_mass
-
-    nx = v0.nx + 2
-    ny = v0.ny + 2
-    nz = v0.nz + 2
-    iz = icell // (nx * ny)
-    iy = (icell - iz * nx * ny) // nx
-    ix = icell - iz * nx * ny - iy * nx
-
-    z = v0.z0 + ((iz - 1.0) + (dz + 1.0) * 0.5) * v0.dz
-    y = v0.y0 + ((iy - 1.0) + (dy + 1.0) * 0.5) * v0.dy
-    x = v0.x0 + ((ix - 1.0) + (dx + 1.0) * 0.5) * v0.dx
-
-    # de -> di
+    # di -> de
     smime = math.sqrt(pic_info.mime)
-    x /= smime
-    y /= smime
-    z /= smime
-
-    mask = ((x >= corners[0][0]) & (x <= corners[0][1]) &
-            (y >= corners[1][0]) & (y <= corners[1][1]) &
-            (z >= corners[2][0]) & (z <= corners[2][1]))
-    ux_d = ux[mask]
-    uy_d = uy[mask]
-    uz_d = uz[mask]
+    box = np.asarray(corners) * smime
+    dptl = decode_particles(v0, ptl, ['ux', 'uy', 'uz'], box=box)
+    ux_d = dptl['ux'] * ptl_mass
+    uy_d = dptl['uy'] * ptl_mass
+    uz_d = dptl['uz'] * ptl_mass
 
     # Assumes that magnetic field is along the z-direction
     upara = uz_d
@@ -569,9 +548,28 @@ def generate_spectrum_vdist_config(fname, **kwargs):
 def get_spectrum_vdist(pic_info,
                        fdir='../',
                        config_name='config_files/vdist_config.dat',
+                       use_mpi=False,
+                       run_dir=None,
                        **kwargs):
     """Get particle spectra and velocity distributions
+
+    By default, the distributions are calculated by the resident
+    vdist_service and returned. With use_mpi, the MPI tool is launched
+    and the distributions are written into files instead.
+
+    Args:
+        fdir: directory where the MPI tool runs, e.g. pic_analysis/ of a run
+        run_dir: PIC run directory for vdist_service. Default is the parent
+            of fdir, which is the root path of the MPI tool.
+    Returns:
+        fvel, fene: velocity and energy distributions, or None with use_mpi
     """
+    if not use_mpi:
+        from vdist_service import get_vdist_service
+        if run_dir is None:
+            run_dir = fdir + '../'
+        service = get_vdist_service(pic_info, run_dir, kwargs['species'])
+        return service.distributions(**kwargs)
     fname = fdir + config_name
     generate_spectrum_vdist_config(fname, **kwargs)
     # cmd = './particle_spectrum_vdist_box ' + config_name
@@ -589,6 +587,7 @@ def get_spectrum_vdist(pic_info,
     p1.wait()
     # with cd('../'):
     #     psv.particle_spectrum_vdist_box()
+    return None, None
 
 
 def read_velocity_distribution(species,
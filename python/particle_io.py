@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Plotting-free reading of the VPIC particle dumps.
+
+Each particle file particle/T.<tindex>/<s>particle.<tindex>.<rank> has a
+23-byte boilerplate, the v0 header of the MPI domain, an array header and the
+particles. The headers have a fixed size, so they are read as one structured
+record, and the particles are read as one structured array.
+decode_particles turns the particle records into float32 positions, momenta,
+Lorentz factors and kinetic energies.
+"""
+from __future__ import print_function
+
+import os
+
+import numpy as np
+
+HEADER_DTYPE = np.dtype([('boilerplate', 'V23'),
+                         ('version', np.int32), ('type', np.int32),
+                         ('nt', np.int32), ('nx', np.int32),
+                         ('ny', np.int32), ('nz', np.int32),
+                         ('dt', np.float32), ('dx', np.float32),
+                         ('dy', np.float32), ('dz', np.float32),
+                         ('x0', np.float32), ('y0', np.float32),
+                         ('z0', np.float32), ('cvac', np.float32),
+                         ('eps0', np.float32), ('damp', np.float32),
+                         ('rank', np.int32), ('ndom', np.int32),
+                         ('spid', np.int32), ('spqm', np.float32),
+                         ('size', np.int32), ('ndim', np.int32),
+                         ('dim', np.int32)])
+PARTICLE_DTYPE = np.dtype([('dxyz', np.float32, 3), ('icell', np.int32),
+                           ('u', np.float32, 3), ('q', np.float32)])
+POSITIONS = ['x', 'y', 'z']
+MOMENTA = ['ux', 'uy', 'uz']
+DECODED = POSITIONS + MOMENTA + ['gamma', 'ene', 'q']
+DECODE_CHUNK = 1 << 20
+
+
+def particle_species_name(species):
+    """Prefix of the particle files of a species
+    """
+    return 'e' if species in ['e', 'electron'] else 'h'
+
+
+def particle_dir(run_dir, tindex):
+    """Directory of the particle dumps at one time step
+    """
+    return run_dir + 'particle/T.' + str(tindex) + '/'
+
+
+def particle_file_name(run_dir, tindex, species, rank):
+    """File name of the particles of one MPI rank
+    """
+    return (particle_dir(run_dir, tindex) +
+            particle_species_name(species) + 'particle.' + str(tindex) +
+            '.' + str(rank))
+
+
+def particle_ranks(run_dir, tindex, species):
+    """MPI ranks that have particle files at one time step
+    """
+    prefix = particle_species_name(species) + 'particle.' + str(tindex) + '.'
+    ranks = []
+    for fname in os.listdir(particle_dir(run_dir, tindex)):
+        if fname.startswith(prefix) and fname[len(prefix):].isdigit():
+            ranks.append(int(fname[len(prefix):]))
+    return sorted(ranks)
+
+
+def read_particle_header(fname):
+    """Read the headers of a particle file
+
+    Returns:
+        header: record with the fields of HEADER_DTYPE
+    """
+    return np.fromfile(fname, dtype=HEADER_DTYPE, count=1)[0]
+
+
+def read_particles(fname):
+    """Read the headers and the particles of a particle file
+
+    Returns:
+        header: record with the fields of HEADER_DTYPE
+        ptl: structured array with the fields of PARTICLE_DTYPE
+    """
+    with open(fname, 'rb') as fh:
+        header = np.fromfile(fh, dtype=HEADER_DTYPE, count=1)[0]
+        ptl = np.fromfile(fh, dtype=PARTICLE_DTYPE, count=header['dim'])
+    return header, ptl
+
+
+def domain_bounds(header):
+    """Bounds of the MPI domain in de
+
+    Returns:
+        bounds: (3, 2) array of the lower and upper bounds along x, y, z
+    """
+    bounds = np.zeros((3, 2))
+    for i, comp in enumerate(['x', 'y', 'z']):
+        bounds[i, 0] = header[comp + '0']
+        bounds[i, 1] = header[comp + '0'] + header['n' + comp] * header['d' + comp]
+    return bounds
+
+
+def grid_params(header):
+    """Grid parameters of an MPI domain
+
+    Args:
+        header: record with the fields of HEADER_DTYPE or the v0 namedtuple
+            of particle_distribution.read_particle_header
+    Returns:
+        grid: dictionary of nx, ny, nz, x0, y0, z0, dx, dy, dz
+    """
+    keys = ['nx', 'ny', 'nz', 'x0', 'y0', 'z0', 'dx', 'dy', 'dz']
+    if hasattr(header, '_fields'):
+        return dict((key, getattr(header, key)) for key in keys)
+    return dict((key, header[key].item()) for key in keys)
+
+
+def cell_indices(icell, nx, ny):
+    """Cell indices along x, y, z from the flat cell index
+
+    Args:
+        icell: flat cell index
+        nx, ny: number of cells along x and y, including the ghost cells
+    """
+    iyz, ix = np.divmod(icell, nx)
+    iz, iy = np.divmod(iyz, ny)
+    return ix, iy, iz
+
+
+def particle_positions(header, ptl):
+    """Positions of the particles in de
+
+    The cell index includes one ghost cell on each side.
+    """
+    dptl = decode_particles(header, ptl, ['x', 'y', 'z'])
+    return dptl['x'], dptl['y'], dptl['z']
+
+
+def decode_chunk(grid, cptl, outputs, box, erange):
+    """Decode one chunk of particles
+
+    Returns:
+        cvals: dictionary of the decoded quantities of the chunk
+        mask: selected particles, or None when all of them are selected
+    """
+    cvals = {}
+    mask = None
+    if box is not None or any(var in outputs for var in POSITIONS):
+        icells = cell_indices(cptl['icell'], grid['nx'] + 2, grid['ny'] + 2)
+        for i, var in enumerate(POSITIONS):
+            if var not in outputs and box is None:
+                continue
+            # x0 + ((ix - 1) + (dx + 1) * 0.5) * dx, in place
+            pos = cptl['dxyz'][:, i] + np.float32(1.0)
+            pos *= np.float32(0.5)
+            pos += icells[i]
+            pos -= np.float32(1.0)
+            pos *= np.float32(grid['d' + var])
+            pos += np.float32(grid[var + '0'])
+            cvals[var] = pos
+            if box is not None:
+                inbox = pos >= box[i][0]
+                inbox &= pos <= box[i][1]
+                mask = inbox if mask is None else mask & inbox
+    u = cptl['u']
+    for i, var in enumerate(MOMENTA):
+        cvals[var] = u[:, i]
+    if erange is not None or 'gamma' in outputs or 'ene' in outputs:
+        usq = np.einsum('ij,ij->i', u, u)
+        gamma = usq + np.float32(1.0)
+        np.sqrt(gamma, out=gamma)
+        # gamma - 1 without the cancellation at small energies
+        ene = usq
+        ene /= gamma + np.float32(1.0)
+        cvals['gamma'] = gamma
+        cvals['ene'] = ene
+        if erange is not None:
+            inrange = ene >= erange[0]
+            inrange &= ene <= erange[1]
+            mask = inrange if mask is None else mask & inrange
+    cvals['q'] = cptl['q']
+    return cvals, mask
+
+
+def decode_particles(header, ptl, outputs=DECODED, box=None, erange=None,
+                     chunk=DECODE_CHUNK):
+    """Decode particle records to positions, momenta and energies
+
+    The records are decoded chunk by chunk with in-place operations, so the
+    only full-length arrays are the float32 outputs. The particles can be
+    selected by position and energy while they are decoded.
+
+    Args:
+        header: record with the fields of HEADER_DTYPE or the v0 namedtuple
+            of particle_distribution.read_particle_header
+        ptl: structured array with the fields of PARTICLE_DTYPE
+        outputs: decoded quantities, from DECODED
+        box: (3, 2) bounds in de of the selected particles
+        erange: range of the kinetic energy gamma - 1 of the selected particles
+        chunk: number of particles in one chunk
+    Returns:
+        dptl: dictionary of float32 arrays of the selected particles
+    """
+    for var in outputs:
+        if var not in DECODED:
+            raise ValueError("Unknown particle quantity: " + var)
+    grid = grid_params(header)
+    nptl = ptl.shape[0]
+    dptl = dict((var, np.empty(nptl, dtype=np.float32)) for var in outputs)
+    nsel = 0
+    for istart in range(0, nptl, chunk):
+        cptl = ptl[istart:istart + chunk]
+        cvals, mask = decode_chunk(grid, cptl, outputs, box, erange)
+        ncptl = cptl.shape[0] if mask is None else np.count_nonzero(mask)
+        for var in outputs:
+            out = dptl[var][nsel:nsel + ncptl]
+            if mask is None:
+                out[...] = cvals[var]
+            else:
+                np.compress(mask, cvals[var], out=out)
+        nsel += ncptl
+    if nsel < nptl:
+        for var in outputs:
+            dptl[var].resize(nsel, refcheck=False)
+    return dptl
@@ -8,6 +8,7 @@ unique name for your PIC run. The JSON file will be saved in "../data/pic_info/"
 import collections
 import errno
 import math
+import os
 import os.path
 import struct
 import sys
@@ -37,7 +38,7 @@ def get_pic_info(base_directory, run_name):
     deck_file = get_main_source_filename(base_directory)
     fields_interval, particle_interval, trace_interval = \
             get_output_intervals(dtwpe, dtwce, dtwpi, dtwci, base_directory, deck_file)
-    ntf = get_fields_frames(base_directory, fields_interval)
+    ntf = get_fields_frames(base_directory, fields_interval, pic_initial_info)
     dt_fields = fields_interval * dtwci
     dt_particles = particle_interval * dtwci
     ntp = ntf / (particle_interval / fields_interval)
@@ -146,69 +147,165 @@ def read_pic_energies(dte_wci, dte_wpe, base_directory):
     return pic_ene
 
 
-def get_fields_frames(base_directory, fields_interval):
+RUN_SCAN_CACHE = '.run_scan.json'
+RUN_SCAN_DIRS = ['fields', 'fields/0', 'field_hdf5', 'hydro', 'hydro_hdf5',
+                 'particle', 'spectrum', 'tracer', 'data']
+
+
+def time_indices(entries):
+    """Time indices of the entries named T.<tindex>
+    """
+    tindices = []
+    for name in entries:
+        if name.startswith('T.'):
+            try:
+                tindices.append(int(name[2:]))
+            except ValueError:
+                pass
+    return sorted(tindices)
+
+
+def gda_time_indices(entries, var):
+    """Time indices of the files named <var>_<tindex>.gda
+    """
+    tindices = []
+    prefix = var + '_'
+    for name in entries:
+        if name.startswith(prefix) and name.endswith('.gda'):
+            try:
+                tindices.append(int(name[len(prefix):-4]))
+            except ValueError:
+                pass
+    return sorted(tindices)
+
+
+def scan_directory(dir_name):
+    """List a directory once
+
+    Returns:
+        entries: names of the entries, empty when the directory does not exist
+        sizes: sizes of the files in the entries
+    """
+    entries = []
+    sizes = {}
+    try:
+        if hasattr(os, 'scandir'):
+            for entry in os.scandir(dir_name):
+                entries.append(entry.name)
+                if entry.is_file():
+                    sizes[entry.name] = entry.stat().st_size
+        else:  # Python 2
+            for name in os.listdir(dir_name):
+                entries.append(name)
+                fname = os.path.join(dir_name, name)
+                if os.path.isfile(fname):
+                    sizes[name] = os.path.getsize(fname)
+    except OSError:
+        pass
+    return entries, sizes
+
+
+def get_mtime(path):
+    """Modification time of a path, None when it does not exist
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def scan_run(base_directory, use_cache=True):
+    """Scan the output directories of a run once
+
+    Each output directory is listed only once. The result is cached in a JSON
+    file in the run directory, and the cache is used until the modification
+    time of any of the scanned directories or the info file changes. data/
+    is listed every time, since appending frames to its files does not
+    change its modification time, and its files are part of the key.
+
+    Args:
+        base_directory: the base directory for different runs.
+        use_cache: whether to use and save the cache
+    Returns:
+        run_scan: dictionary with the available time indices of the fields,
+            hydro, particles, spectra and tracers, and the sizes of the files
+            in data/
+    """
+    base_directory = os.path.join(base_directory, '')
+    mtimes = {}
+    for dname in RUN_SCAN_DIRS + ['info']:
+        mtimes[dname] = get_mtime(base_directory + dname)
+    _, data_sizes = scan_directory(base_directory + 'data')
+    fname_cache = base_directory + RUN_SCAN_CACHE
+    if use_cache and os.path.isfile(fname_cache):
+        try:
+            with open(fname_cache, 'r') as f:
+                run_scan = json.load(f)
+            if (run_scan['mtimes'] == mtimes and
+                    run_scan['data_sizes'] == data_sizes):
+                return run_scan
+        except (IOError, ValueError, KeyError):
+            pass
+    run_scan = {'mtimes': mtimes}
+    for dname in RUN_SCAN_DIRS:
+        entries, sizes = scan_directory(base_directory + dname)
+        if dname == 'data':
+            run_scan['data_sizes'] = sizes
+            run_scan['data_bx'] = sorted(set(gda_time_indices(entries, 'bx') +
+                                             gda_time_indices(entries, 'Bx')))
+        else:
+            run_scan[dname] = time_indices(entries)
+    if use_cache:
+        try:
+            with open(fname_cache, 'w') as f:
+                json.dump(run_scan, f)
+        except IOError:
+            pass
+    return run_scan
+
+
+def count_consecutive_frames(tindices, interval):
+    """Number of consecutive frames 0, interval, 2*interval, ...
+
+    The first frame is always counted, as in the original probing.
+    """
+    tindices = set(tindices)
+    ntf = 1
+    while ntf * interval in tindices:
+        ntf += 1
+    return ntf
+
+
+def get_fields_frames(base_directory, fields_interval, pic_initial_info=None):
     """Get the total number of time frames for fields.
 
     Args:
         base_directory: the base directory for different runs.
         fields_interval: time interval to dump fields
+        pic_initial_info: namedtuple from read_pic_info. It is read when
+            not given.
     Returns:
         ntf: the total number of output time frames for fields.
     """
-    pic_initial_info = read_pic_info(base_directory)
+    if pic_initial_info is None:
+        pic_initial_info = read_pic_info(base_directory)
     nx = pic_initial_info.nx
     ny = pic_initial_info.ny
     nz = pic_initial_info.nz
-    fname_fields = base_directory + '/fields/T.1'
-    fname_fields_sub_dir = base_directory + '/fields/0/T.1'
-    fname_fields_h5 = base_directory + '/field_hdf5/T.0'
-    fname_ex = base_directory + '/data/ex.gda'
-    fname_Ex = base_directory + '/data/Ex.gda'
-    fname_bx = base_directory + '/data/bx_0.gda'
-    fname_Bx = base_directory + '/data/Bx_0.gda'
-    if os.path.isfile(fname_bx) or os.path.isfile(fname_Bx):
-        current_time = 0
-        ntf = 0
-        is_exist = True
-        while (is_exist):
-            ntf += 1
-            current_time += fields_interval
-            fname1 = base_directory + '/data/bx_' + str(current_time) + '.gda'
-            fname2 = base_directory + '/data/Bx_' + str(current_time) + '.gda'
-            is_exist = os.path.isfile(fname1) or os.path.isfile(fname2)
-    elif os.path.isfile(fname_ex):
-        file_size = os.path.getsize(fname_ex)
-        ntf = int(file_size / (nx * ny * nz * 4))
-    elif os.path.isfile(fname_Ex):
-        file_size = os.path.getsize(fname_Ex)
-        ntf = int(file_size / (nx * ny * nz * 4))
-    elif os.path.isdir(fname_fields):
-        current_time = 0
-        ntf = 0
-        is_exist = True
-        while (is_exist):
-            ntf += 1
-            current_time += fields_interval
-            fname = base_directory + '/fields/T.' + str(current_time)
-            is_exist = os.path.isdir(fname)
-    elif os.path.isdir(fname_fields_sub_dir):
-        current_time = 0
-        ntf = 0
-        is_exist = True
-        while (is_exist):
-            ntf += 1
-            current_time += fields_interval
-            fname = base_directory + '/fields/0/T.' + str(current_time)
-            is_exist = os.path.isdir(fname)
-    elif os.path.isdir(fname_fields_h5):
-        current_time = 0
-        ntf = 0
-        is_exist = True
-        while (is_exist):
-            ntf += 1
-            current_time += fields_interval
-            fname = base_directory + '/field_hdf5/T.' + str(current_time)
-            is_exist = os.path.isdir(fname)
+    run_scan = scan_run(base_directory)
+    data_sizes = run_scan['data_sizes']
+    if 0 in run_scan['data_bx']:
+        ntf = count_consecutive_frames(run_scan['data_bx'], fields_interval)
+    elif 'ex.gda' in data_sizes:
+        ntf = int(data_sizes['ex.gda'] / (nx * ny * nz * 4))
+    elif 'Ex.gda' in data_sizes:
+        ntf = int(data_sizes['Ex.gda'] / (nx * ny * nz * 4))
+    elif 1 in run_scan['fields']:
+        ntf = count_consecutive_frames(run_scan['fields'], fields_interval)
+    elif 1 in run_scan['fields/0']:
+        ntf = count_consecutive_frames(run_scan['fields/0'], fields_interval)
+    elif 0 in run_scan['field_hdf5']:
+        ntf = count_consecutive_frames(run_scan['field_hdf5'], fields_interval)
     else:
         print('Cannot find the files to calculate the total frames of fields.')
         return
@@ -364,27 +461,33 @@ def read_pic_info(base_directory):
     fname = base_directory + '/info'
     with open(fname) as f:
         content = f.readlines()
-    f.close()
     nlines = len(content)
     current_line = 0
-    sigmae_c, current_line = get_variable_value('sigma', current_line, content)
-    ti_te, current_line = get_variable_value('Ti/Te', current_line, content)
-    te, current_line = get_variable_value('Te', current_line, content, match_name=True)
-    ti, current_line = get_variable_value('Ti', current_line, content, match_name=True)
-    wpe_wce, current_line = get_variable_value('wpe/wce', current_line, content)
-    mime, current_line = get_variable_value('mi/me', current_line, content)
-    lx, current_line = get_variable_value('Lx/di', current_line, content)
-    ly, current_line = get_variable_value('Ly/di', current_line, content)
-    lz, current_line = get_variable_value('Lz/di', current_line, content)
-    nx, current_line = get_variable_value('nx', current_line, content, int)
-    ny, current_line = get_variable_value('ny', current_line, content, int)
-    nz, current_line = get_variable_value('nz', current_line, content, int)
-    courant, current_line = get_variable_value('courant', current_line, content)
-    nproc, current_line = get_variable_value('nproc', current_line, content, int)
-    nppc, current_line = get_variable_value('nppc', current_line, content, int)
-    b0, current_line = get_variable_value('b0', current_line, content)
-    ne, current_line = get_variable_value('Ne', current_line, content)
-    dtwpe, current_line = get_variable_value('dt*wpe', current_line, content)
+    info = parse_info(content)
+
+    def get_value(variable_name, current_line, content, data_type=float,
+                  match_name=False):
+        return get_variable_value_info(info, variable_name, current_line,
+                                       content, data_type, match_name)
+
+    sigmae_c, current_line = get_value('sigma', current_line, content)
+    ti_te, current_line = get_value('Ti/Te', current_line, content)
+    te, current_line = get_value('Te', current_line, content, match_name=True)
+    ti, current_line = get_value('Ti', current_line, content, match_name=True)
+    wpe_wce, current_line = get_value('wpe/wce', current_line, content)
+    mime, current_line = get_value('mi/me', current_line, content)
+    lx, current_line = get_value('Lx/di', current_line, content)
+    ly, current_line = get_value('Ly/di', current_line, content)
+    lz, current_line = get_value('Lz/di', current_line, content)
+    nx, current_line = get_value('nx', current_line, content, int)
+    ny, current_line = get_value('ny', current_line, content, int)
+    nz, current_line = get_value('nz', current_line, content, int)
+    courant, current_line = get_value('courant', current_line, content)
+    nproc, current_line = get_value('nproc', current_line, content, int)
+    nppc, current_line = get_value('nppc', current_line, content, int)
+    b0, current_line = get_value('b0', current_line, content)
+    ne, current_line = get_value('Ne', current_line, content)
+    dtwpe, current_line = get_value('dt*wpe', current_line, content)
     try:
         dtwce, current_line = get_variable_value_h('dt*wce', content)
     except:
@@ -393,71 +496,71 @@ def read_pic_info(base_directory):
         dtwci, current_line = get_variable_value_h('dt*wci', content)
     except:
         dtwci = dtwce / mime
-    energy_interval, current_line = get_variable_value('energies_interval',
-                                                       current_line, content)
-    dxde, current_line = get_variable_value('dx/de', current_line, content)
-    dyde, current_line = get_variable_value('dy/de', current_line, content)
-    dzde, current_line = get_variable_value('dz/de', current_line, content)
+    energy_interval, current_line = get_value('energies_interval',
+                                              current_line, content)
+    dxde, current_line = get_value('dx/de', current_line, content)
+    dyde, current_line = get_value('dy/de', current_line, content)
+    dzde, current_line = get_value('dz/de', current_line, content)
     dxdi = dxde / math.sqrt(mime)
     dydi = dyde / math.sqrt(mime)
     dzdi = dzde / math.sqrt(mime)
     x = np.arange(nx) * dxdi
     y = (np.arange(ny) - ny / 2.0 + 0.5) * dydi
     z = (np.arange(nz) - nz / 2.0 + 0.5) * dzdi
-    dx_rhoi, current_line = get_variable_value('dx/rhoi', current_line, content)
-    dx_rhoe, current_line = get_variable_value('dx/rhoe', current_line, content)
-    dx_debye, current_line = get_variable_value('dx/debye', current_line, content)
-    n0, current_line = get_variable_value('n0', current_line, content)
+    dx_rhoi, current_line = get_value('dx/rhoi', current_line, content)
+    dx_rhoe, current_line = get_value('dx/rhoe', current_line, content)
+    dx_debye, current_line = get_value('dx/debye', current_line, content)
+    n0, current_line = get_value('n0', current_line, content)
     if any('vthi/c' in s for s in content):
-        vthi, current_line = get_variable_value('vthi/c', current_line,
-                                                content)
-        vthe, current_line = get_variable_value('vthe/c', current_line,
-                                                content)
+        vthi, current_line = get_value('vthi/c', current_line,
+                                       content)
+        vthe, current_line = get_value('vthe/c', current_line,
+                                       content)
     else:  # highly relativistic cases
         vthe = 1.0
         vthi = 1.0
-    restart_interval, current_line = get_variable_value('restart_interval',
-                                                        current_line, content, int)
-    fields_interval_info, current_line = get_variable_value('fields_interval',
-                                                            current_line, content, int)
-    ehydro_interval, current_line = get_variable_value('ehydro_interval',
-                                                       current_line, content, int)
-    Hhydro_interval, current_line = get_variable_value('Hhydro_interval',
-                                                       current_line, content, int)
-    eparticle_interval, current_line = get_variable_value('eparticle_interval',
-                                                          current_line, content, int)
-    Hparticle_interval, current_line = get_variable_value('Hparticle_interval',
-                                                          current_line, content, int)
-    quota_check_interval, current_line = get_variable_value('quota_check_interval',
-                                                            current_line, content, int)
-    particle_tracing, current_line = get_variable_value('particle_tracing',
-                                                        current_line, content, int)
-    tracer_interval, current_line = get_variable_value('tracer_interval',
-                                                       current_line, content, int)
-    tracer_pass1_interval, current_line = get_variable_value('tracer_pass1_interval',
-                                                             current_line, content, int)
-    tracer_pass2_interval, current_line = get_variable_value('tracer_pass2_interval',
-                                                             current_line, content, int)
-    ntracer, current_line = get_variable_value('Ntracer', current_line, content, int)
-    emf_at_tracer, current_line = get_variable_value('emf_at_tracer',
-                                                     current_line, content, int)
-    hydro_at_tracer, current_line = get_variable_value('hydro_at_tracer',
-                                                       current_line, content, int)
-    dump_traj_directly, current_line = get_variable_value('dump_traj_directly',
-                                                          current_line, content, int)
-    num_tracer_fields_add, current_line = get_variable_value('num_tracer_fields_add',
-                                                             current_line, content, int)
-    emax_band, current_line = get_variable_value('emax_band', current_line, content)
-    emin_band, current_line = get_variable_value('emin_band', current_line, content)
-    nbands, current_line = get_variable_value('nbands', current_line, content, int)
-    emax_spect, current_line = get_variable_value('emax_spect', current_line, content)
-    emin_spect, current_line = get_variable_value('emin_spect', current_line, content)
-    nbins_spect, current_line = get_variable_value('nbins', current_line, content, int)
-    nx_zone, current_line = get_variable_value('nx_zone', current_line, content, int)
-    ny_zone, current_line = get_variable_value('ny_zone', current_line, content, int)
-    nz_zone, current_line = get_variable_value('nz_zone', current_line, content, int)
-    stride_particle_dump, current_line = get_variable_value('stride_particle_dump',
-                                                            current_line, content, int)
+    restart_interval, current_line = get_value('restart_interval',
+                                               current_line, content, int)
+    fields_interval_info, current_line = get_value('fields_interval',
+                                                   current_line, content, int)
+    ehydro_interval, current_line = get_value('ehydro_interval',
+                                              current_line, content, int)
+    Hhydro_interval, current_line = get_value('Hhydro_interval',
+                                              current_line, content, int)
+    eparticle_interval, current_line = get_value('eparticle_interval',
+                                                 current_line, content, int)
+    Hparticle_interval, current_line = get_value('Hparticle_interval',
+                                                 current_line, content, int)
+    quota_check_interval, current_line = get_value('quota_check_interval',
+                                                   current_line, content, int)
+    particle_tracing, current_line = get_value('particle_tracing',
+                                               current_line, content, int)
+    tracer_interval, current_line = get_value('tracer_interval',
+                                              current_line, content, int)
+    tracer_pass1_interval, current_line = get_value('tracer_pass1_interval',
+                                                    current_line, content, int)
+    tracer_pass2_interval, current_line = get_value('tracer_pass2_interval',
+                                                    current_line, content, int)
+    ntracer, current_line = get_value('Ntracer', current_line, content, int)
+    emf_at_tracer, current_line = get_value('emf_at_tracer',
+                                            current_line, content, int)
+    hydro_at_tracer, current_line = get_value('hydro_at_tracer',
+                                              current_line, content, int)
+    dump_traj_directly, current_line = get_value('dump_traj_directly',
+                                                 current_line, content, int)
+    num_tracer_fields_add, current_line = get_value('num_tracer_fields_add',
+                                                    current_line, content, int)
+    emax_band, current_line = get_value('emax_band', current_line, content)
+    emin_band, current_line = get_value('emin_band', current_line, content)
+    nbands, current_line = get_value('nbands', current_line, content, int)
+    emax_spect, current_line = get_value('emax_spect', current_line, content)
+    emin_spect, current_line = get_value('emin_spect', current_line, content)
+    nbins_spect, current_line = get_value('nbins', current_line, content, int)
+    nx_zone, current_line = get_value('nx_zone', current_line, content, int)
+    ny_zone, current_line = get_value('ny_zone', current_line, content, int)
+    nz_zone, current_line = get_value('nz_zone', current_line, content, int)
+    stride_particle_dump, current_line = get_value('stride_particle_dump',
+                                                   current_line, content, int)
 
     pic_init_info = collections.namedtuple('pic_init_info',
                                            ['sigmae_c', 'ti_te', 'Ti', 'Te',
@@ -528,6 +631,56 @@ def read_pic_info(base_directory):
     return pic_info
 
 
+def parse_info(content):
+    """Parse the content of the information file in one pass
+
+    Args:
+        content: the lines of the information file.
+    Returns:
+        info: dictionary from each variable name to the list of its values
+            and line numbers, in the order of the lines
+    """
+    info = {}
+    for line_number, single_line in enumerate(content):
+        if "=" in single_line:
+            line_splits = single_line.split("=")
+        elif ":" in single_line:
+            line_splits = single_line.split(":")
+        else:
+            continue
+        name = line_splits[0].strip()
+        try:
+            value = float(line_splits[1])
+        except (ValueError, IndexError):
+            continue
+        info.setdefault(name, []).append((value, line_number))
+    return info
+
+
+def get_variable_value_info(info, variable_name, current_line, content,
+                            data_type=float, match_name=False):
+    """
+    Get the value of one variable using the parsed information file.
+
+    The variables are looked up by name in the dictionary from parse_info,
+    which gives the first line named variable_name from current_line on.
+    The content is only scanned as in get_variable_value when there is no
+    such line.
+
+    Args:
+        info: dictionary from parse_info.
+        other arguments are the same as get_variable_value.
+    Returns:
+        variable_value: the value of the variable.
+        line_number: current line number after the operations.
+    """
+    for variable_value, line_number in info.get(variable_name, []):
+        if line_number >= current_line:
+            return (data_type(variable_value), line_number)
+    return get_variable_value(variable_name, current_line, content,
+                              data_type, match_name)
+
+
 def get_variable_value(variable_name, current_line, content,
                        data_type=float, match_name=False):
     """
@@ -7,128 +7,177 @@ cells at the each side of the simulation domain.
 import argparse
 import collections
 import math
-import multiprocessing
-import os.path
+import os
 import struct
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
-from joblib import Parallel, delayed
-from matplotlib import rc
-from matplotlib.colors import LogNorm
-from matplotlib.ticker import MaxNLocator
-from mpl_toolkits.axes_grid1 import make_axes_locatable
-from mpl_toolkits.mplot3d import Axes3D
 
 import pic_information
-from contour_plots import read_2d_fields
+from field_io import field_shape, read_field_frame
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from shell_functions import mkdir_p
 
+NGHOST = 2
+NVARS = 8
+BOUNDARIES = ['periodic', 'reflect', 'copy']
+ZSLAB = 64
 
-def transfer_pic_to_mhd(run_dir, run_name, tframe):
+
+def mhd_shape(pic_info):
+    """Shape of the MHD data with the ghost cells
+
+    The y and z directions are switched, so the data is (nz+4, nx+4, 8) in 2D
+    and (ny+4, nz+4, nx+4, 8) in 3D, with x the fastest.
+    """
+    shape = field_shape(pic_info)
+    if len(shape) == 2:
+        nz, nx = shape
+        return (nz + 2*NGHOST, nx + 2*NGHOST, NVARS)
+    nz, ny, nx = shape
+    return (ny + 2*NGHOST, nz + 2*NGHOST, nx + 2*NGHOST, NVARS)
+
+
+def pic_view(mhd_data, ivar, zstart, zend):
+    """View of one variable of the MHD data in the PIC order, (nz, [ny,] nx)
+
+    The MHD z direction is -y of PIC, so y is reversed in 3D.
+    """
+    fdata = mhd_data[..., ivar]
+    if fdata.ndim == 2:
+        return fdata[NGHOST+zstart:NGHOST+zend, NGHOST:-NGHOST]
+    fdata = fdata[NGHOST:-NGHOST, NGHOST+zstart:NGHOST+zend, NGHOST:-NGHOST]
+    return fdata[::-1].transpose(1, 0, 2)
+
+
+def fill_ghost_cells(mhd_data, axis, boundary):
+    """Fill the ghost cells along one axis of the MHD data
+
+    Args:
+        mhd_data: MHD data with the ghost cells
+        axis: axis of the MHD data
+        boundary: 'periodic' (with the grid points at the two ends
+            shared, as in the PIC fields), 'reflect' (mirrored about the last
+            grid point, e.g. for conducting boundaries for fields and
+            reflective boundaries for particles) or 'copy' (zero gradient)
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError("Unknown boundary condition: " + boundary)
+    n = mhd_data.shape[axis] - 2 * NGHOST
+
+    def index(select):
+        idx = [slice(None)] * mhd_data.ndim
+        idx[axis] = select
+        return tuple(idx)
+
+    low, high = index(slice(0, 2)), index(slice(n+2, n+4))
+    if boundary == 'periodic':
+        mhd_data[low] = mhd_data[index(slice(n-1, n+1))]
+        mhd_data[high] = mhd_data[index(slice(3, 5))]
+    elif boundary == 'reflect':
+        mhd_data[low] = mhd_data[index(slice(3, 1, -1))]
+        mhd_data[high] = mhd_data[index(slice(n+1, n-1, -1))]
+    else:
+        mhd_data[low] = mhd_data[index(slice(2, 3))]
+        mhd_data[high] = mhd_data[index(slice(n+1, n+2))]
+
+
+def mhd_file_name(run_dir, tframe):
+    """File name of the MHD data at one frame
+    """
+    return run_dir + 'bin_data/mhd_data_' + str(tframe).zfill(4)
+
+
+def transfer_pic_to_mhd(run_dir, run_name, boundaries, tframe):
     """Transfer the required fields
 
+    The single-fluid velocity, the magnetic field and their magnitudes are
+    calculated slab by slab directly into the memory-mapped output, which is
+    renamed to its final name when it is complete.
+
     Args:
         run_dir: simulation directory
         run_name: name of the simulation run
+        boundaries: boundary conditions along x, y and z of PIC, from
+            BOUNDARIES. y is ignored in 2D.
         tframe: time frame
-        boundary_x: boundary condition along x-direction
-                    0 for periodic; 1 for others
-        boundary_z: boundary condition along z-direction
     """
     print("Time frame: %d" % tframe)
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    lx_di = pic_info.lx_di
-    lz_di = pic_info.lz_di
-    kwargs = {"current_time": tframe, "xl": 0, "xr": lx_di,
-              "zb": -0.5 * lz_di, "zt": 0.5 * lz_di}
-    fname = run_dir + "data/bx.gda"
-    x, z, bx = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/by.gda"
-    x, z, by = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/bz.gda"
-    x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
-    nx, = x.shape
-    nz, = z.shape
-    mhd_data = np.zeros((nz+4, nx+4, 8), dtype=np.float32)
-
-    # We need to switch y and z directions
-    absB = np.sqrt(bx**2 + by**2 + bz**2)
-    mhd_data[2:nz+2, 2:nx+2, 4] = bx
-    mhd_data[2:nz+2, 2:nx+2, 5] = bz
-    mhd_data[2:nz+2, 2:nx+2, 6] = -by
-    mhd_data[2:nz+2, 2:nx+2, 7] = absB
-
-    del bx, by, bz, absB
-
     mime = pic_info.mime
+    data_dir = run_dir + "data/"
+    var_names = ['bx', 'by', 'bz', 'ne', 'vex', 'vey', 'vez',
+                 'ni', 'vix', 'viy', 'viz']
+    fields = {var: read_field_frame(pic_info, data_dir, var, tframe)
+              for var in var_names}
+    shape = field_shape(pic_info)
+    fname = mhd_file_name(run_dir, tframe)
+    mkdir_p(os.path.dirname(fname))
+    mhd_data = np.memmap(fname + '.tmp', dtype=np.float32, mode='w+',
+                         shape=mhd_shape(pic_info))
+    nz = shape[0]
+    slab_shape = (min(ZSLAB, nz), ) + shape[1:]
+    rho = np.zeros(slab_shape, dtype=np.float32)
+    tmp1 = np.zeros(slab_shape, dtype=np.float32)
+    tmp2 = np.zeros(slab_shape, dtype=np.float32)
+    for zstart in range(0, nz, ZSLAB):
+        zend = min(zstart + ZSLAB, nz)
+        nrows = zend - zstart
+        slab = {var: fields[var][zstart:zend] for var in var_names}
+        buf_rho, buf1, buf2 = rho[:nrows], tmp1[:nrows], tmp2[:nrows]
+        out = [pic_view(mhd_data, ivar, zstart, zend)
+               for ivar in range(NVARS)]
 
-    # Electron
-    fname = run_dir + "data/ne.gda"
-    x, z, ne = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/vex.gda"
-    x, z, vex = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/vey.gda"
-    x, z, vey = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/vez.gda"
-    x, z, vez = read_2d_fields(pic_info, fname, **kwargs)
-
-    vx = ne * vex
-    vy = ne * vey
-    vz = ne * vez
-
-    del vex, vey, vez
-
-    # Ion
-    fname = run_dir + "data/ni.gda"
-    x, z, ni = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/vix.gda"
-    x, z, vix = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/viy.gda"
-    x, z, viy = read_2d_fields(pic_info, fname, **kwargs)
-    fname = run_dir + "data/viz.gda"
-    x, z, viz = read_2d_fields(pic_info, fname, **kwargs)
-
-    imass = 1.0 / (ne + ni * mime)
-    vx = (vx + ni * mime * vix) * imass
-    vy = (vy + ni * mime * viy) * imass
-    vz = (vz + ni * mime * viz) * imass
-
-    del vix, viy, viz, ne, ni, imass
-
-    absV = np.sqrt(vx**2 + vy**2 + vz**2)
-    mhd_data[2:nz+2, 2:nx+2, 0] = vx
-    mhd_data[2:nz+2, 2:nx+2, 1] = vz
-    mhd_data[2:nz+2, 2:nx+2, 2] = -vy
-    mhd_data[2:nz+2, 2:nx+2, 3] = absV
-
-    del vx, vy, vz, absV
-
-    # Assuming periodic boundary along x for fields and particles
-    # Assuming conducting boundary along z for fields and reflective for particles
-    mhd_data[:, 0:2, :] = mhd_data[:, nx-1:nx+1, :]
-    mhd_data[:, nx+2:, :] = mhd_data[:, 3:5, :]
-    mhd_data[0:2, :, :] = mhd_data[3:1:-1, :, :]
-    mhd_data[nz+2:, :, :] = mhd_data[nz+1:nz-1:-1, :, :]
+        # We need to switch y and z directions
+        np.copyto(out[4], slab['bx'])
+        np.copyto(out[5], slab['bz'])
+        np.negative(slab['by'], out=out[6])
 
-    fpath = run_dir + 'bin_data/'
-    mkdir_p(fpath)
-    fname = fpath + 'mhd_data_' + str(tframe).zfill(4)
-    print(mhd_data.shape)
-    print(np.isfortran(mhd_data))
-    mhd_data.tofile(fname)
+        # Single-fluid velocity
+        np.multiply(slab['ni'], mime, out=buf_rho)
+        buf_rho += slab['ne']
+        np.reciprocal(buf_rho, out=buf_rho)
+        for ivar, comp in [(0, 'x'), (1, 'z'), (2, 'y')]:
+            np.multiply(slab['ne'], slab['ve' + comp], out=buf1)
+            np.multiply(slab['ni'], slab['vi' + comp], out=buf2)
+            buf2 *= mime
+            buf1 += buf2
+            buf1 *= buf_rho
+            if comp == 'y':
+                np.negative(buf1, out=out[ivar])
+            else:
+                np.copyto(out[ivar], buf1)
 
+        # Magnitudes
+        for ivar, comps in [(3, [0, 1, 2]), (7, [4, 5, 6])]:
+            np.multiply(out[comps[0]], out[comps[0]], out=buf1)
+            for icomp in comps[1:]:
+                np.multiply(out[icomp], out[icomp], out=buf2)
+                buf1 += buf2
+            np.sqrt(buf1, out=out[ivar])
 
-def save_mhd_config(run_name):
+    # The MHD axes are (y, x) in 2D and (z, y, x) in 3D, with MHD y for PIC
+    # z and MHD z for PIC y
+    bc_x, bc_y, bc_z = boundaries
+    axes_bcs = [(1, bc_x), (0, bc_z)] if len(shape) == 2 else \
+        [(2, bc_x), (1, bc_z), (0, bc_y)]
+    for axis, boundary in axes_bcs:
+        fill_ghost_cells(mhd_data, axis, boundary)
+    mhd_data.flush()
+    del mhd_data
+    os.rename(fname + '.tmp', fname)
+
+
+def save_mhd_config(run_dir, run_name, boundaries):
     """Save MHD configuration
 
     Need to switch y and z directions
 
     Args:
+        run_dir: simulation directory
         run_name: simulation run name
+        boundaries: boundary conditions along x, y and z of PIC
     """
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
@@ -138,7 +187,7 @@ def save_mhd_config(run_name):
     smime = math.sqrt(pic_info.mime)
     lx = pic_info.lx_di * smime
     ly = pic_info.lz_di * smime
-    lz = 0.0
+    lz = pic_info.ly_di * smime if pic_info.ny > 1 else 0.0
     nx = pic_info.nx
     ny = pic_info.nz
     nz = pic_info.ny
@@ -156,10 +205,10 @@ def save_mhd_config(run_name):
         double_data[2] = 0.0
     double_data[3] = 0.0
     double_data[4] = -0.5 * ly
-    double_data[5] = 0.0 
+    double_data[5] = -0.5 * lz
     double_data[6] = lx
     double_data[7] = 0.5 * ly
-    double_data[8] = 0.0
+    double_data[8] = 0.5 * lz
     double_data[9]  = lx
     double_data[10] = ly
     double_data[11] = lz
@@ -174,9 +223,11 @@ def save_mhd_config(run_name):
     int_data[7] = pic_info.topology_z
     int_data[8] = pic_info.topology_y
     int_data[9] = 9
-    int_data[10] = 0 # Periodic boundary condition as default
-    int_data[11] = 0
-    int_data[12] = 0
+    # 0 for periodic boundary conditions, 1 for the others
+    bc_x, bc_y, bc_z = boundaries
+    int_data[10] = 0 if bc_x == 'periodic' else 1
+    int_data[11] = 0 if bc_z == 'periodic' else 1
+    int_data[12] = 0 if bc_y == 'periodic' else 1
 
     int_data[13] = 0
 
@@ -202,10 +253,21 @@ def get_cmd_args():
                         help='run directory')
     parser.add_argument('--run_name', action="store", default=default_run_name,
                         help='run name')
-    parser.add_argument('--tframe_fields', action="store", default='30', type=int,
-                        help='Time frame for fields')
-    parser.add_argument('--multi_frames', action="store_true", default=False,
-                        help='whether analyzing multiple frames')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time frame')
+    parser.add_argument('--tend', action="store", default='-1', type=int,
+                        help='ending time frame (default: the last frame)')
+    parser.add_argument('--bc_x', action="store", default='periodic',
+                        choices=BOUNDARIES,
+                        help='boundary condition of the ghost cells along x')
+    parser.add_argument('--bc_y', action="store", default='periodic',
+                        choices=BOUNDARIES,
+                        help='boundary condition of the ghost cells along y')
+    parser.add_argument('--bc_z', action="store", default='reflect',
+                        choices=BOUNDARIES,
+                        help='boundary condition of the ghost cells along z')
+    parser.add_argument('--nworkers', action="store", default='10', type=int,
+                        help='number of workers')
     return parser.parse_args()
 
 
@@ -214,16 +276,17 @@ if __name__ == "__main__":
     run_name = args.run_name
     run_dir = args.run_dir
     species = args.species
-    tframe_fields = args.tframe_fields
-    multi_frames = args.multi_frames
     picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    save_mhd_config(run_name)
-    # transfer_pic_to_mhd(run_dir, run_name, 0)
-    ncores = multiprocessing.cpu_count()
-    ncores = 10
-    cts = range(pic_info.ntf)
-    def processInput(job_id):
-        time_frame = job_id
-        transfer_pic_to_mhd(run_dir, run_name, time_frame)
-    Parallel(n_jobs=ncores)(delayed(processInput)(ct) for ct in cts)
+    boundaries = (args.bc_x, args.bc_y, args.bc_z)
+    save_mhd_config(run_dir, run_name, boundaries)
+    tend = args.tend if args.tend >= 0 else pic_info.ntf - 1
+    cts = range(args.tstart, tend + 1)
+    results, failed = run_frames(transfer_pic_to_mhd, cts,
+                                 (run_dir, run_name, boundaries),
+                                 max_workers=args.nworkers,
+                                 raise_on_failure=False)
+    for tframe in sorted(results):
+        print("Saved " + mhd_file_name(run_dir, tframe))
+    if failed:
+        raise RuntimeError("Failed frames: %s" % sorted(failed))
@@ -8,7 +8,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 import os
 
 import h5py
@@ -22,10 +21,14 @@ from scipy import signal
 
 import fitting_funcs
 import pic_information
+from acc_rate_dist import AccRateDistFile
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from field_io import read_field_frame
+from frame_runner import run_frames
 from json_functions import read_data_from_json
+from magnetic_curvature import curvature_frame, get_engine
 from shell_functions import mkdir_p
+from tracer_tag_index import TracerTagIndex, save_trajectories
 
 plt.style.use("seaborn-deep")
 mpl.rc('text', usetex=True)
@@ -1193,100 +1196,18 @@ def particle_energization(plot_config, show_plot=True):
 
 def calc_vexb_kappa(plot_config):
     """Get the vexb dot magnetic curvature for the 2D simulations
+
+    vexb_kappa is saved in vexb_kappa/ of the run, and the distributions of
+    the curvature and vexb_kappa are saved in ../data/power_law_index/.
     """
     tframe = plot_config["tframe"]
-    species = plot_config["species"]
     pic_run = plot_config["pic_run"]
     pic_run_dir = plot_config["pic_run_dir"]
     picinfo_fname = '../data/pic_info/pic_info_' + pic_run + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    pic_topox = pic_info.topology_x
-    pic_topoy = pic_info.topology_y
-    pic_topoz = pic_info.topology_z
-    nx, ny, nz = pic_info.nx, pic_info.ny, pic_info.nz
-    xmin, xmax = 0, pic_info.lx_di
-    ymin, ymax = -pic_info.ly_di * 0.5, pic_info.ly_di * 0.5
-    zmin, zmax = -pic_info.lz_di * 0.5, pic_info.lz_di * 0.5
-    smime = math.sqrt(pic_info.mime)
-    dx_de = pic_info.dx_di * smime
-    dy_de = pic_info.dy_di * smime
-    dz_de = pic_info.dz_di * smime
-    kwargs = {"current_time": tframe,
-              "xl": 0, "xr": pic_info.lx_di,
-              "zb": -pic_info.lz_di, "zt": pic_info.lz_di}
-    fname = pic_run_dir + "data/bx.gda"
-    x, z, bx = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/by.gda"
-    x, z, by = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/bz.gda"
-    x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ex.gda"
-    x, z, ex = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ey.gda"
-    x, z, ey = read_2d_fields(pic_info, fname, **kwargs)
-    fname = pic_run_dir + "data/ez.gda"
-    x, z, ez = read_2d_fields(pic_info, fname, **kwargs)
-    ib = 1.0/np.sqrt(bx**2 + by**2 + bz**2)
-    bx = bx * ib
-    by = by * ib
-    bz = bz * ib
-    kappax = (bx * np.gradient(bx, axis=1) / dx_de +
-              bz * np.gradient(bx, axis=0) / dz_de)
-    kappay = (bx * np.gradient(by, axis=1) / dx_de +
-              bz * np.gradient(by, axis=0) / dz_de)
-    kappaz = (bx * np.gradient(bz, axis=1) / dx_de +
-              bz * np.gradient(bz, axis=0) / dz_de)
-    kappa = np.sqrt(kappax**2 + kappay**2 + kappaz**2)
-    kmin, kmax = 1E-6, 1E2
-    nbins = 80
-    kbins = np.logspace(math.log10(kmin), math.log10(kmax), nbins+1)
-    kdist, _ = np.histogram(kappa, bins=kbins)
-    fdata = np.zeros(nbins + 3)
-    fdata[0] = kmin
-    fdata[1] = kmax
-    fdata[2] = nbins
-    fdata[3:] = kdist
-    fdir = '../data/power_law_index/kappa_dist/' + pic_run + '/'
-    mkdir_p(fdir)
-    fname = fdir + 'kappa_dist_' + str(tframe) + '.dat'
-    fdata.tofile(fname)
-
-    vexb_x = (ey * bz - ez * by) * ib
-    vexb_y = (ez * bx - ex * bz) * ib
-    vexb_z = (ex * by - ey * bx) * ib
-    vexb_kappa = vexb_x * kappax + vexb_y * kappay + vexb_z * kappaz
-    vkmin, vkmax = 1E-5, 1E3
-    nbins = 80
-    vkbins = np.zeros(2*nbins+3)
-    fbins = np.logspace(math.log10(vkmin), math.log10(vkmax), nbins+1)
-    vkbins[:nbins+1] = -fbins[::-1]
-    vkbins[nbins+2:]= fbins
-    vkdist, _ = np.histogram(vexb_kappa, bins=vkbins)
-    fdata = np.zeros(2*nbins + 5)
-    fdata[0] = vkmin
-    fdata[1] = vkmax
-    fdata[2] = nbins
-    fdata[3:] = vkdist
-    fdir = '../data/power_law_index/vexb_kappa_dist/' + pic_run + '/'
-    mkdir_p(fdir)
-    fname = fdir + 'vexb_kappa_dist_' + str(tframe) + '.dat'
-    fdata.tofile(fname)
-    # fbins_mid = 0.5 * (fbins[1:] + fbins[:-1])
-    # vkdist = vkdist / np.diff(vkbins)
-    # plt.loglog(fbins_mid, vkdist[nbins+2:])
-    # plt.loglog(fbins_mid[::-1], vkdist[:nbins])
-    # plt.show()
-
-    fdir = pic_run_dir + "vexb_kappa/"
-    mkdir_p(fdir)
-    tindex = tframe * pic_info.fields_interval
-    fname = fdir + 'vexb_kappa_' + str(tindex) + '.h5'
-    with h5py.File(fname, 'a') as fh:
-        dname = "Timestep_" + str(tindex)
-        if dname in fh:
-            fh[dname].write_direct(vexb_kappa)
-        else:
-            grp = fh.create_dataset(dname, (nz, nx), data=vexb_kappa)
+    curvature_frame(pic_info, pic_run, pic_run_dir, ['vexb_kappa'],
+                    pic_run_dir + "vexb_kappa/", ['kappa', 'vexb_kappa'],
+                    '../data/power_law_index/', tframe)
 
 
 def calc_curvature_radius(plot_config):
@@ -1319,17 +1240,8 @@ def calc_curvature_radius(plot_config):
     x, z, bz = read_2d_fields(pic_info, fname, **kwargs)
     fname = pic_run_dir + "data/Ay.gda"
     x, z, Ay = read_2d_fields(pic_info, fname, **kwargs)
-    ib = 1.0/np.sqrt(bx**2 + by**2 + bz**2)
-    bx = bx * ib
-    by = by * ib
-    bz = bz * ib
-    kappax = (bx * np.gradient(bx, axis=1) / dx_de +
-              bz * np.gradient(bx, axis=0) / dz_de)
-    kappay = (bx * np.gradient(by, axis=1) / dx_de +
-              bz * np.gradient(by, axis=0) / dz_de)
-    kappaz = (bx * np.gradient(bz, axis=1) / dx_de +
-              bz * np.gradient(bz, axis=0) / dz_de)
-    curv_radius = 1.0 / np.sqrt(kappax**2 + kappay**2 + kappaz**2)
+    curvature = get_engine(pic_info).compute(bx, by, bz)
+    curv_radius = np.copy(curvature["curv_radius"])
     fig = plt.figure(figsize=[12, 5])
     rect0 = [0.08, 0.55, 0.62, 0.4]
     hgap, vgap = 0.03, 0.05
@@ -1458,7 +1370,6 @@ def plot_vexb_kappa(plot_config, show_plot=True):
     pic_run_dir = plot_config["pic_run_dir"]
     picinfo_fname = '../data/pic_info/pic_info_' + pic_run + '.json'
     pic_info = read_data_from_json(picinfo_fname)
-    tindex = tframe * pic_info.fields_interval
     fdir = '../data/power_law_index/vexb_kappa_dist/' + pic_run + '/'
     fname = fdir + 'vexb_kappa_dist_' + str(tframe) + '.dat'
     fdata = np.fromfile(fname)
@@ -1530,12 +1441,9 @@ def plot_vexb_kappa(plot_config, show_plot=True):
     rect[1] -= rect[3] + 0.07
     xmin, xmax = 0, pic_info.lx_di
     zmin, zmax = -pic_info.lz_di * 0.5, pic_info.lz_di * 0.5
-    fname = pic_run_dir + "vexb_kappa/vexb_kappa_" + str(tindex) + ".h5"
-    with h5py.File(fname, 'r') as fh:
-        dname = "Timestep_" + str(tindex)
-        dset = fh[dname]
-        vexb_kappa = np.zeros(dset.shape, dset.dtype)
-        dset.read_direct(vexb_kappa)
+    vexb_kappa = np.array(read_field_frame(pic_info,
+                                           pic_run_dir + "vexb_kappa/",
+                                           "vexb_kappa", tframe))
     nz, nx = vexb_kappa.shape
     x = np.linspace(xmin, xmax, nx, endpoint=False)
     z = np.linspace(zmin, zmax, nz, endpoint=False)
@@ -1912,13 +1820,11 @@ def acc_esc_rate(plot_config, show_plot=True):
     """
     species = plot_config["species"]
     pic_run = plot_config["pic_run"]
-    pic_run_dir = plot_config["pic_run_dir"]
     tframe = plot_config["tframe"]
     picinfo_fname = '../data/pic_info/pic_info_' + pic_run + '.json'
     pic_info = read_data_from_json(picinfo_fname)
     alpha_min = plot_config["vkappa_threshold"]
     mime = pic_info.mime
-    ntp = len(os.listdir(pic_run_dir + "particle/"))
     spect_params = get_spect_params(pic_run)
     pindex = spect_params["power_index"]
     emin, emax = spect_params["energy_range"]
@@ -1962,35 +1868,26 @@ def acc_esc_rate(plot_config, show_plot=True):
     # alpha_min /= bg**2 + 1.0  # consider guide field
 
     fpath = "../data/particle_interp/" + pic_run + "/"
-    tindex = pic_info.particle_interval
-    fname = fpath + "acc_rate_dist_" + species + "_" + str(tindex) + ".gda"
-    fdata = np.fromfile(fname, dtype=np.float64)
-    nvar = int(fdata[2])   # number of variables
+    fname = fpath + "acc_rate_dist_" + species + ".h5"
+    dist_file = AccRateDistFile(fname)
+    tindices = sorted(dist_file.tindices)
+    ntp = len(tindices)
+    nvar = len(dist_file.var_names)
+    icurv = dist_file.var_names.index('curv_dote')
 
     nhigh_acc_t = np.zeros(ntp)
     nhigh_esc_t = np.zeros(ntp)
     arate_acc_t = np.zeros([nvar, ntp])
     arate_esc_t = np.zeros([nvar, ntp])
 
-    for tframe in range(1, ntp):
+    for tframe, tindex in enumerate(tindices):
         print("Time frame: %d" % tframe)
-        tindex = tframe * pic_info.particle_interval
-        fname = fpath + "acc_rate_dist_" + species + "_" + str(tindex) + ".gda"
-        fdata = np.fromfile(fname, dtype=np.float64)
-        nalpha = int(fdata[0]) # number of bins of the rates
-        nbins = int(fdata[1])  # number of bins in energy
-        nvar = int(fdata[2])   # number of variables
-        ebins = fdata[3:nbins+3]  # energy bins
-        ebins /= temp  # normalize by initial temperature
-        alpha_bins = fdata[nbins+3:nbins+nalpha+3]  # acceleration rates bins
+        nalpha, nbins, nvar, ebins, alpha_bins, fdist = \
+            dist_file.read_frame(tindex)
+        ebins = ebins / temp  # normalize by initial temperature
         alpha_bins_mid = 0.5 * (alpha_bins[1:] + alpha_bins[:-1])
-        # variables: 0-Epara, 1-Eperp, 2-compression, 3-shear, 4-curvature,
-        #   5-gradient, 6-para_drift, 7-mu, 8-polar_time, 9-polar_spatial,
-        #   10-inertial_time, 11-inertial_spatial, 12-polar_fluid_time,
-        #   13-polar_fluid_spatial, 14-polar_time_v, 15-polar_spatial_v,
-        #   16-ptensor
-        # fdist = fdata[nbins+nalpha+3:].reshape((nvar, nbins, (nalpha+1)*4))
-        fdist = fdata[nbins+nalpha+3:].reshape((nvar, nbins, (nalpha+1)*6))
+        # variables: acc_rate_dist.VAR_NAMES, with 0-Epara and 1-Eperp
+        # fdist: (nvar, nbins, (nalpha+1)*6)
 
         es, _ = find_nearest(ebins, emin)
         ee, _ = find_nearest(ebins, emax)
@@ -2000,8 +1897,8 @@ def acc_esc_rate(plot_config, show_plot=True):
         nptl_bins = fdist_high[:, :nalpha0*2]
         dene_bins = fdist_high[:, nalpha0*2:nalpha0*4]
         alpha_bins = div0(dene_bins, nptl_bins)
-        fnptl = nptl_bins[4]
-        fdene = dene_bins[4]
+        fnptl = nptl_bins[icurv]
+        fdene = dene_bins[icurv]
         pos_range = np.arange(nalpha0+1, nalpha0*2-1)
         neg_range = np.arange(nalpha0-2, 0, -1)
         fnptl_pos = fnptl[pos_range]
@@ -2034,8 +1931,11 @@ def acc_esc_rate(plot_config, show_plot=True):
     print("sigmai_c: %f" % sigmai_c)
     print("sigmai_h: %f" % sigmai_h)
 
-    dtwpe_particle = pic_info.particle_interval * pic_info.dtwpe
-    tparticles = np.arange(0, ntp) * dtwpe_particle
+    if ntp > 1:
+        dtwpe_particle = (tindices[1] - tindices[0]) * pic_info.dtwpe
+    else:
+        dtwpe_particle = pic_info.particle_interval * pic_info.dtwpe
+    tparticles = np.asarray(tindices) * pic_info.dtwpe
     tmin, tmax = tparticles[0], tparticles[-1]
     nhigh_tot = nhigh_acc_t + nhigh_esc_t
     dndt_inj = np.gradient(nhigh_tot, dtwpe_particle)
@@ -2058,7 +1958,7 @@ def acc_esc_rate(plot_config, show_plot=True):
     # ctmp = npre + dndt_inj * dtwpe_particle - nhigh_acc_t
     # esc_rate = div0(-btmp - np.sqrt(btmp**2 - 4 * atmp * ctmp), npre) / (dtwpe_particle)
     acc_rate = div0(arate_acc_t[0, :] + arate_acc_t[1, :], nhigh_acc_t)
-    acc_rate1 = div0(arate_acc_t[4, :], nhigh_acc_t)
+    acc_rate1 = div0(arate_acc_t[icurv, :], nhigh_acc_t)
     acc_rate_esc = div0(arate_esc_t[0, :] + arate_esc_t[1, :], nhigh_esc_t)
     acc_rate_esc_mid = np.copy(acc_rate_esc)
     acc_rate_esc_mid[1:] = 0.5 * (acc_rate_esc[1:] + acc_rate_esc[:-1])
@@ -3697,7 +3597,6 @@ def get_trajectory(plot_config, show_plot=True):
         for dset in group:
             dset = str(dset)
             ptl[str(dset)] = read_var(group, dset, nptl)
-    nkeys = len(ptl.keys())
     gamma_final = np.sqrt(1 + ptl["Ux"]**2 + ptl["Uy"]**2 + ptl["Uz"]**2)
     gamma_max = np.max(gamma_final)
     nptl = 200
@@ -3715,33 +3614,22 @@ def get_trajectory(plot_config, show_plot=True):
     ptl_selected = np.sort(ptl_selected, axis=1)
     tags = ptl["q"][ptl_selected]
 
-    ptls = np.zeros([nbands, nptl, nframes, nkeys], dtype=np.float32)
-
-    for tframe in range(nframes):
-        print("Time frame %d of %d" % (tframe, nframes))
-        tindex = tframe * pic_info.tracer_interval
-        fname = tracer_dir + 'T.' + str(tindex) + '/' + sname + '_tracer_qtag_sorted.h5p'
-        with h5py.File(fname, 'r') as fh:
-            gname = 'Step#' + str(tindex)
-            group = fh[gname]
-            for dset_name in group:
-                dset = group[dset_name]
-                dset.read_direct(ptl[dset_name])
-        for ikey, key in enumerate(ptl.keys()):
-            for iband in range(nbands):
-                ptls[iband, :, tframe, ikey] = ptl[key][ptl_selected[iband, :]]
+    # Only the selected tags are read from each time step. The index is
+    # kept with the trajectories, not in the tracer directory.
+    fname_index = ('../data/power_law_index/trajectory/' + pic_run + '/' +
+                   sname + '_tag_index.h5')
+    tag_index = TracerTagIndex(tracer_dir, sname, fname_index)
+    tindices = np.arange(nframes) * pic_info.tracer_interval
+    ptls, _ = tag_index.read_trajectories(tags.flatten(), tindices,
+                                          list(ptl.keys()))
     for iband in range(nbands):
         fdir = '../data/power_law_index/trajectory/' + pic_run + '/'
         mkdir_p(fdir)
         fname = fdir + sname + '_traj_band' + str(iband) + '.h5'
-        with h5py.File(fname, 'w') as fh:
-            for iptl in range(nptl):
-                print("Particle " + str(iptl))
-                tag = 'Particle#' + str(tags[iband, iptl])
-                grp = fh.create_group(tag)
-                for ikey, key in enumerate(ptl.keys()):
-                    grp.create_dataset(key, (nframes, ),
-                                       data=ptls[iband, iptl, :, ikey])
+        ptls_band = {}
+        for key in ptls:
+            ptls_band[key] = ptls[key][:, iband*nptl:(iband+1)*nptl]
+        save_trajectories(fname, ptls_band, tags[iband, :])
 
 
 def plot_trajectory_band(plot_config, show_plot=True):
@@ -4167,10 +4055,7 @@ def analysis_multi_frames(plot_config, args):
             elif args.plot_vexb_kappa:
                 plot_vexb_kappa(plot_config, show_plot=False)
     else:
-        ncores = multiprocessing.cpu_count()
-        ncores = 18
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (plot_config, args), max_workers=18)
 
 
 def main():
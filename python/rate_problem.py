@@ -8,7 +8,6 @@ import argparse
 import itertools
 import json
 import math
-import multiprocessing
 import os
 
 import h5py
@@ -25,7 +24,7 @@ from scipy.ndimage.filters import median_filter, gaussian_filter
 import fitting_funcs
 import pic_information
 from contour_plots import read_2d_fields
-from joblib import Parallel, delayed
+from frame_runner import run_frames
 from json_functions import read_data_from_json
 from pic_information import get_variable_value
 from shell_functions import mkdir_p
@@ -2883,7 +2882,6 @@ def analysis_multi_frames(plot_config, args):
     """Analysis for multiple time frames
     """
     tframes = range(plot_config["tstart"], plot_config["tend"] + 1)
-    nframes = len(tframes)
     if args.time_loop:
         for tframe in tframes:
             print("Time frame: %d" % tframe)
@@ -2909,12 +2907,7 @@ def analysis_multi_frames(plot_config, args):
             elif args.inflow_pressure:
                 inflow_pressure(plot_config, show_plot=False)
     else:
-        ncores = multiprocessing.cpu_count()
-        ncores = 36
-        if ncores > nframes:
-            ncores = nframes
-        Parallel(n_jobs=ncores)(delayed(process_input)(plot_config, args, tframe)
-                                for tframe in tframes)
+        run_frames(process_input, tframes, (plot_config, args), max_workers=36)
 
 
 def main():
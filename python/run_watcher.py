@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Watch a running VPIC simulation and run the per-frame analyses on new dumps.
+
+The run directory is polled through pic_information.scan_run, which only
+lists the output directories again when their modification times change. A
+dump T.<tindex> is complete when a later dump exists in the same directory,
+or when its listing has not changed for settle_time seconds. The registered
+analyses of complete dumps are run on a bounded pool of worker processes, and
+the finished ones are recorded in a JSON file, so the watcher can be stopped
+and restarted at any time without repeating work.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import traceback
+
+import numpy as np
+
+import pic_information
+from field_io import read_field_frame
+from json_functions import read_data_from_json
+from shell_functions import mkdir_p
+
+ANALYSES = {}
+
+
+def register_analysis(name, source, data_vars=None):
+    """Register a per-frame analysis
+
+    The analysis is called as func(run_config, tindex) in a worker process.
+
+    Args:
+        name: name of the analysis
+        source: the output that the analysis needs, 'fields', 'hydro',
+            'particle', 'hydro_spectrum' (the spectrum-<s>hydro files in the
+            hydro dumps) or 'data' (the .gda files)
+        data_vars: the .gda variables that the analysis reads, when source
+            is 'data'. A frame is only analyzed when all of them have it.
+    """
+    def decorator(func):
+        ANALYSES[name] = (source, func, data_vars or ['bx'])
+        return func
+    return decorator
+
+
+def energization_vars():
+    """The .gda variables read by the fluid energization terms
+    """
+    data_vars = [field + comp for field in ['e', 'b'] for comp in 'xyz']
+    for species in ['e', 'i']:
+        data_vars.append('n' + species)
+        data_vars += ['v' + species + comp for comp in 'xyz']
+        data_vars += ['p' + species + '-' + ci + cj
+                      for ci in 'xyz' for cj in 'xyz']
+    return data_vars
+
+
+def get_pic_info(run_config):
+    """Read the PIC information of the run
+    """
+    picinfo_fname = '../data/pic_info/pic_info_' + run_config["pic_run"] + '.json'
+    return read_data_from_json(picinfo_fname)
+
+
+def spectrum_file_name(run_dir, tindex, species='e', rank=0):
+    """File name of the energy spectrum of one MPI rank in a hydro dump
+    """
+    return (run_dir + 'hydro/T.' + str(tindex) + '/spectrum-' + species +
+            'hydro.' + str(tindex) + '.' + str(rank))
+
+
+def spectrum_time_indices(run_dir, hydro_tindices):
+    """Time indices of the hydro dumps that have the energy spectra
+    """
+    return [tindex for tindex in hydro_tindices
+            if os.path.isfile(spectrum_file_name(run_dir, tindex))]
+
+
+@register_analysis('spectrum', 'hydro_spectrum')
+def combine_spectrum(run_config, tindex):
+    """Combine the particle energy spectra of all MPI ranks
+
+    The spectra are saved with the frame number of the spectrum dumps, which
+    are written with the electron hydro dumps.
+    """
+    from combine_energy_spectrum import combine_energy_spectrum
+    pic_info = get_pic_info(run_config)
+    tframe = tindex // pic_info.ehydro_interval
+    for species in ['e', 'h']:
+        combine_energy_spectrum(run_config["pic_run_dir"], run_config["pic_run"],
+                                tframe, species, tindex)
+
+
+@register_analysis('energization', 'data', energization_vars())
+def energization(run_config, tindex):
+    """Fluid energization terms of both species
+    """
+    import fluid_energization
+    pic_info = get_pic_info(run_config)
+    tframe = tindex // pic_info.fields_interval
+    data_dir = run_config["pic_run_dir"] + 'data/'
+    fdir = '../data/fluid_energization/' + run_config["pic_run"] + '/'
+    mkdir_p(fdir)
+    terms = fluid_energization.default_terms()
+    for species in ['e', 'i']:
+        _, integrals = fluid_energization.calc_energization(pic_info,
+                                                            data_dir,
+                                                            species, tframe,
+                                                            terms)
+        integrals = {term: float(integrals[term]) for term in integrals}
+        fname = fdir + 'energization_' + species + '_' + str(tframe) + '.json'
+        with open(fname, 'w') as f:
+            json.dump(integrals, f)
+
+
+@register_analysis('reconnection_flux', 'data', ['Ay'])
+def reconnection_flux(run_config, tindex):
+    """Reconnected flux from the range of Ay near the midplane
+
+    The reconnection rate is the time derivative of the saved fluxes.
+    """
+    pic_info = get_pic_info(run_config)
+    tframe = tindex // pic_info.fields_interval
+    data_dir = run_config["pic_run_dir"] + 'data/'
+    ay = read_field_frame(pic_info, data_dir, 'Ay', tframe)
+    nz = ay.shape[0]
+    ay_mid = np.asarray(ay[nz//2-1:nz//2+1])
+    fdir = '../data/rate/' + run_config["pic_run"] + '/'
+    mkdir_p(fdir)
+    phi = np.asarray([np.max(ay_mid) - np.min(ay_mid)])
+    phi.tofile(fdir + 'phi_' + str(tframe) + '.dat')
+
+
+@register_analysis('quick_look', 'data', ['jy'])
+def quick_look(run_config, tindex):
+    """Quick-look image of the out-of-plane current density
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    pic_info = get_pic_info(run_config)
+    tframe = tindex // pic_info.fields_interval
+    data_dir = run_config["pic_run_dir"] + 'data/'
+    jy = np.asarray(read_field_frame(pic_info, data_dir, 'jy', tframe))
+    if jy.ndim == 3:
+        jy = jy[:, jy.shape[1]//2, :]
+    fig = plt.figure(figsize=[8, 4])
+    ax = fig.add_axes([0.1, 0.15, 0.75, 0.75])
+    extent = [0, pic_info.lx_di, -0.5 * pic_info.lz_di, 0.5 * pic_info.lz_di]
+    img = ax.imshow(jy, extent=extent, aspect='auto', origin='lower',
+                    cmap=plt.cm.coolwarm, vmin=-0.1, vmax=0.1)
+    fig.colorbar(img, ax=ax)
+    ax.set_title(r'$j_y$, $t\Omega_{ci}=%0.1f$' % (tframe * pic_info.dt_fields))
+    fdir = '../img/quick_look/' + run_config["pic_run"] + '/'
+    mkdir_p(fdir)
+    fig.savefig(fdir + 'jy_' + str(tframe) + '.png', dpi=100)
+    plt.close(fig)
+
+
+def data_time_indices(run_scan, pic_info, var='bx'):
+    """Time indices of the complete frames of one variable in the .gda files
+
+    Args:
+        run_scan: the scan from pic_information.scan_run
+        pic_info: namedtuple for the PIC simulation information.
+        var: variable name
+    """
+    var_names = ['bx', 'Bx'] if var == 'bx' else [var]
+    data_sizes = run_scan['data_sizes']
+    for name in var_names:
+        tindices = pic_information.gda_time_indices(data_sizes, name)
+        if tindices:
+            return tindices
+    frame_size = pic_info.nx * max(pic_info.ny, 1) * pic_info.nz * 4
+    for name in var_names:
+        if name + '.gda' in data_sizes:
+            nframes = data_sizes[name + '.gda'] // frame_size
+            return [tframe * pic_info.fields_interval
+                    for tframe in range(nframes)]
+    return []
+
+
+class DoneLog(object):
+    """Record of the analyses that are done or have failed
+    """
+    def __init__(self, fname):
+        self.fname = fname
+        self.done = {}
+        self.failed = {}
+        if os.path.isfile(fname):
+            with open(fname, 'r') as f:
+                log = json.load(f)
+            self.done = {name: set(tindices)
+                         for name, tindices in log['done'].items()}
+            self.failed = log['failed']
+
+    def is_done(self, name, tindex):
+        """Whether an analysis is done for a time index
+        """
+        return tindex in self.done.get(name, set())
+
+    def nfailures(self, name, tindex):
+        """Number of failed attempts of an analysis for a time index
+        """
+        return self.failed.get(name, {}).get(str(tindex), 0)
+
+    def mark(self, name, tindex, success):
+        """Record the result of one analysis and save the log
+        """
+        if success:
+            self.done.setdefault(name, set()).add(tindex)
+            self.failed.get(name, {}).pop(str(tindex), None)
+        else:
+            failed = self.failed.setdefault(name, {})
+            failed[str(tindex)] = failed.get(str(tindex), 0) + 1
+        log = {'done': {name: sorted(tindices)
+                        for name, tindices in self.done.items()},
+               'failed': self.failed}
+        fname_tmp = self.fname + '.tmp'
+        with open(fname_tmp, 'w') as f:
+            json.dump(log, f)
+        try:
+            os.rename(fname_tmp, self.fname)
+        except OSError:
+            # os.rename does not overwrite on Windows, and os.replace is
+            # not on python 2
+            os.remove(self.fname)
+            os.rename(fname_tmp, self.fname)
+
+
+def run_analysis(name, run_config, tindex):
+    """Run one analysis in a worker process
+
+    Returns:
+        (name, tindex, error message or None, wall time)
+    """
+    tstart = time.time()
+    try:
+        ANALYSES[name][1](run_config, tindex)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return name, tindex, error, time.time() - tstart
+
+
+class RunWatcher(object):
+    """Find the complete dumps of a run and the analyses that need to run
+    """
+    def __init__(self, run_config, analyses, settle_time=60.0):
+        """
+        Args:
+            run_config: dictionary with pic_run and pic_run_dir
+            analyses: names of the registered analyses to run
+            settle_time: time in seconds that the listing of the latest dump
+                should stay unchanged before it is treated as complete
+        """
+        self.run_config = run_config
+        self.analyses = analyses
+        self.settle_time = settle_time
+        self.pic_info = get_pic_info(run_config)
+        self.latest = {}
+
+    def latest_settled(self, source, tindex):
+        """Whether the latest dump of a source has stopped changing
+        """
+        dir_name = (self.run_config["pic_run_dir"] + source + '/T.' +
+                    str(tindex))
+        entries, sizes = pic_information.scan_directory(dir_name)
+        listing = (tindex, len(entries), sum(sizes.values()))
+        now = time.time()
+        if self.latest.get(source, (None, 0))[0] != listing:
+            self.latest[source] = (listing, now)
+            return False
+        return now - self.latest[source][1] >= self.settle_time
+
+    def complete_dumps(self, run_scan, source, data_vars=None):
+        """Time indices of the complete dumps of one source
+
+        For the .gda files, these are the frames that all of data_vars have.
+        """
+        if source == 'data':
+            tindices = None
+            for var in data_vars or ['bx']:
+                var_tindices = set(data_time_indices(run_scan, self.pic_info,
+                                                     var))
+                tindices = (var_tindices if tindices is None else
+                            tindices & var_tindices)
+            return sorted(tindices)
+        if source == 'hydro_spectrum':
+            tindices = self.complete_dumps(run_scan, 'hydro')
+            return spectrum_time_indices(self.run_config["pic_run_dir"],
+                                         tindices)
+        tindices = run_scan[source]
+        if tindices and not self.latest_settled(source, tindices[-1]):
+            tindices = tindices[:-1]
+        return tindices
+
+    def pending_tasks(self, done_log, max_retries):
+        """Analyses of complete dumps that are not done yet
+
+        Returns:
+            tasks: list of (name, tindex), ordered by time
+        """
+        run_scan = pic_information.scan_run(self.run_config["pic_run_dir"])
+        dumps = {}
+        tasks = []
+        for name in self.analyses:
+            source, _, data_vars = ANALYSES[name]
+            key = (source, tuple(data_vars)) if source == 'data' else source
+            if key not in dumps:
+                dumps[key] = self.complete_dumps(run_scan, source, data_vars)
+            for tindex in dumps[key]:
+                if done_log.is_done(name, tindex):
+                    continue
+                if done_log.nfailures(name, tindex) > max_retries:
+                    continue
+                tasks.append((tindex, name))
+        return [(name, tindex) for tindex, name in sorted(tasks)]
+
+
+def watch_run(run_config, analyses, nworkers=4, poll_interval=60.0,
+              settle_time=60.0, max_retries=2, once=False):
+    """Keep running the analyses while new dumps appear
+
+    Args:
+        run_config: dictionary with pic_run and pic_run_dir
+        analyses: names of the registered analyses to run
+        nworkers: number of worker processes
+        poll_interval: time in seconds between two scans of the run
+        settle_time: see RunWatcher
+        max_retries: number of retries of a failed analysis
+        once: exit when all the complete dumps are analyzed
+    """
+    fdir = '../data/watcher/' + run_config["pic_run"] + '/'
+    mkdir_p(fdir)
+    done_log = DoneLog(fdir + 'done.json')
+    watcher = RunWatcher(run_config, analyses, settle_time)
+    pool = multiprocessing.Pool(nworkers)
+    running = {}
+    try:
+        while True:
+            for key in [key for key in running if running[key].ready()]:
+                name, tindex, error, twall = running.pop(key).get()
+                done_log.mark(name, tindex, error is None)
+                if error is None:
+                    print("Done %s at %d in %0.1f s" % (name, tindex, twall))
+                else:
+                    print("Failed %s at %d:\n%s" % (name, tindex, error))
+            tasks = [task for task in
+                     watcher.pending_tasks(done_log, max_retries)
+                     if task not in running]
+            # Keep the queue short, so new dumps are not behind a long backlog
+            for task in tasks[:2*nworkers-len(running)]:
+                running[task] = pool.apply_async(run_analysis,
+                                                 (task[0], run_config, task[1]))
+            if once and not running and not tasks:
+                break
+            time.sleep(poll_interval if not running else
+                       min(poll_interval, 1.0))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Watch a running PIC simulation')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--analyses', action="store",
+                        default=','.join(sorted(ANALYSES)),
+                        help='comma-separated names of the analyses')
+    parser.add_argument('--nworkers', action="store", default=4, type=int,
+                        help='number of worker processes')
+    parser.add_argument('--poll_interval', action="store", default=60.0,
+                        type=float, help='time between scans in seconds')
+    parser.add_argument('--settle_time', action="store", default=60.0,
+                        type=float,
+                        help='time the latest dump should stay unchanged')
+    parser.add_argument('--max_retries', action="store", default=2, type=int,
+                        help='number of retries of failed analyses')
+    parser.add_argument('--once', action="store_true", default=False,
+                        help='exit when all complete dumps are analyzed')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    args = get_cmd_args()
+    run_config = {"pic_run": args.pic_run,
+                  "pic_run_dir": os.path.join(args.pic_run_dir, '')}
+    analyses = args.analyses.split(',')
+    for name in analyses:
+        if name not in ANALYSES:
+            raise ValueError("Unknown analysis: " + name)
+    watch_run(run_config, analyses, args.nworkers, args.poll_interval,
+              args.settle_time, args.max_retries, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ from scipy.ndimage.filters import gaussian_filter, median_filter
 from contour_plots import read_2d_fields
 from dolointerpolation import MultilinearInterpolator
 from energy_conversion import read_data_from_json
+from frame_writer import pending_frames, write_frame
 
 
 def smooth_interp_emf(run_dir, pic_info, eb_field_name, tframe, coords):
@@ -63,10 +64,7 @@ def smooth_interp_emf(run_dir, pic_info, eb_field_name, tframe, coords):
         sigma = 3
         fdata = gaussian_filter(fdata, sigma)
     fname = run_dir + "data/" + eb_field_name + ".gda"
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        fdata.tofile(f)
+    write_frame(fname, (nz, nx), pic_info.ntf, tframe, fdata)
 
 
 def smooth_emf(run_dir, pic_info, emf_name, tframe, coords):
@@ -88,10 +86,8 @@ def smooth_emf(run_dir, pic_info, emf_name, tframe, coords):
     fdata = median_filter(fdata, sigma)
     # fname = run_dir + "data/" + emf_name + ".gda"
     fname = run_dir + "data1/" + emf_name + ".gda"
-    with open(fname, 'a+') as f:
-        offset = size_one_frame * tframe
-        f.seek(offset, os.SEEK_SET)
-        fdata.tofile(f)
+    write_frame(fname, (pic_info.nz, pic_info.nx), pic_info.ntf, tframe,
+                fdata)
 
 
 def check_exb(run_dir, pic_info, tframe):
@@ -100,7 +96,6 @@ def check_exb(run_dir, pic_info, tframe):
     """
     kwargs = {"current_time": tframe, "xl": 0, "xr": pic_info.lx_di,
               "zb": -0.5 * pic_info.lz_di, "zt": 0.5 * pic_info.lz_di}
-    size_one_frame = pic_info.nx * pic_info.nz * 4
     fname = run_dir + "data1/vexb_x.gda"
     x, z, vexbx1 = read_2d_fields(pic_info, fname, **kwargs)
     fname = run_dir + "data1/vexb_y.gda"
@@ -219,10 +214,11 @@ if __name__ == "__main__":
         picinfo_fname = '../data/pic_info/pic_info_' + run_name + '.json'
         pic_info = read_data_from_json(picinfo_fname)
         coords = get_coordinates(pic_info)
-        tframes = range(pic_info.ntf)
         efield_name = run_efield["efield_name"]
         print("Run name and electric field name: %s %s" % (run_name, efield_name))
         run_dir = runs_root_dir + run_name + '/'
+        fname = run_dir + "data1/" + efield_name + ".gda"
+        tframes = pending_frames(fname, pic_info.ntf, range(pic_info.ntf))
         for tframe in tframes:
             # smooth_interp_emf(run_dir, pic_info, efield_name, tframe, coords)
             smooth_emf(run_dir, pic_info, efield_name, tframe, coords)
@@ -3,7 +3,6 @@ Analysis procedures to deal with reduced particle tracer
 """
 import collections
 import math
-import multiprocessing
 import os.path
 import struct
 
@@ -11,7 +10,6 @@ import h5py
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import numpy as np
-from joblib import Parallel, delayed
 from matplotlib import rc
 from matplotlib.colors import LogNorm
 from matplotlib.ticker import MaxNLocator
@@ -19,6 +17,7 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from mpl_toolkits.mplot3d import Axes3D
 
 import pic_information
+import tracer_sort
 from particle_emf import read_var
 from shell_functions import *
 
@@ -87,107 +86,12 @@ def sort_tracer_data(pic_info,
                      species,
                      root_path='../../'):
     """Sort tracer data
+
+    The sorting is done by tracer_sort, which uses a counting sort over
+    MPI ranks and processes large time steps in chunks.
     """
-    fpath = root_path + 'tracer/T.' + str(ct) + '/'
-    fname_reduced = fpath + species + '_tracer_reduced.h5p'
-    with h5py.File(fname_reduced, 'r') as fh:
-        key = 'Step#' + str(ct)
-        group = fh[key]
-        dset = group['q']
-        sz, = dset.shape
-        dX = read_var(group, 'dX', sz)
-        dY = read_var(group, 'dY', sz)
-        dZ = read_var(group, 'dZ', sz)
-        Ux = read_var(group, 'Ux', sz)
-        Uy = read_var(group, 'Uy', sz)
-        Uz = read_var(group, 'Uz', sz)
-        icell = read_var(group, 'i', sz)
-        q = read_var(group, 'q', sz)
-
-    grid_size_mpi = meta_data['grid_size_mpi']
-    grid_dims = meta_data['grid_dims']
-    grid_size = meta_data['grid_size']
-
-    tpx = pic_info.topology_x
-    tpy = pic_info.topology_y
-    tpz = pic_info.topology_z
-    xmin, ymin, zmin = pmin
-    dx_mpi, dy_mpi, dz_mpi = grid_size_mpi
-    dx, dy, dz = grid_size
-    nx, ny, nz = grid_dims
-    ix = (dX - xmin) // dx_mpi
-    iy = (dY - ymin) // dy_mpi
-    iz = (dZ - zmin) // dz_mpi
-    ix[ix > tpx - 1] = tpx - 1
-    iy[iy > tpy - 1] = tpy - 1
-    iz[iz > tpz - 1] = tpz - 1
-    mpi_rank = ix + iy * tpx + iz * tpx * tpy
-    mpi_rank = mpi_rank.astype(np.int32)
-    nx1 = nx + 2
-    ny1 = ny + 2
-    nz1 = nz + 2
-    izp = icell / (nx1 * ny1)
-    iyp = (icell % (nx1 * ny1)) / nx1
-    ixp = icell - izp * nx1 * ny1 - iyp * nx1
-    idx = 1 / dx
-    idy = 1 / dy
-    idz = 1 / dz
-    dX = ((dX - ix * dx_mpi - xmin) * idx - ixp + 1) * 2 - 1
-    dY = ((dY - iy * dy_mpi - ymin) * idy - iyp + 1) * 2 - 1
-    dZ = ((dZ - iz * dz_mpi - zmin) * idz - izp + 1) * 2 - 1
-    dX = dX.astype(np.float32)
-    dY = dX.astype(np.float32)
-    dZ = dX.astype(np.float32)
-
-    dX[(dX < -1) & (ixp == nx)] = 1.0
-    dX[(dX > 1) & (ixp == 1)] = -1.0
-    dY[(dY < -1) & (iyp == ny)] = 1.0
-    dY[(dY > 1) & (iyp == 1)] = -1.0
-    dZ[(dZ < -1) & (izp == nz)] = 1.0
-    dZ[(dZ > 1) & (izp == 1)] = -1.0
-
-    sort_index = np.argsort(mpi_rank)
-    dX = dX[sort_index]
-    dY = dY[sort_index]
-    dZ = dZ[sort_index]
-    Ux = Ux[sort_index]
-    Uy = Uy[sort_index]
-    Uz = Uz[sort_index]
-    icell = icell[sort_index]
-    q = q[sort_index]
-
-    ncpu = tpx * tpy * tpz
-    elements, repeats = np.unique(mpi_rank, return_counts=True)
-    repeats = repeats.astype(np.int32)
-
-    fname = fpath + 'grid_metadata_' + species + '_tracer_reduced.h5p'
-    with h5py.File(fname, 'w') as fh:
-        gname = 'Step#' + str(ct)
-        grp = fh.create_group(gname)
-        grp.create_dataset('dx', (1, ), data=grid_size[0])
-        grp.create_dataset('dy', (1, ), data=grid_size[1])
-        grp.create_dataset('dz', (1, ), data=grid_size[2])
-        grp.create_dataset('nx', (1, ), data=grid_dims[0])
-        grp.create_dataset('ny', (1, ), data=grid_dims[1])
-        grp.create_dataset('nz', (1, ), data=grid_dims[2])
-        grp.create_dataset('x0', (ncpu, ), data=meta_data['x0'])
-        grp.create_dataset('y0', (ncpu, ), data=meta_data['y0'])
-        grp.create_dataset('z0', (ncpu, ), data=meta_data['z0'])
-        grp.create_dataset('np_local', (ncpu, ), data=repeats)
-
-    nptl, = dX.shape
-    fname_reduced_sorted = fpath + species + '_tracer_reduced_sorted.h5p'
-    with h5py.File(fname_reduced_sorted, 'w') as fh:
-        gname = 'Step#' + str(ct)
-        grp = fh.create_group(gname)
-        grp.create_dataset('dX', (nptl, ), data=dX)
-        grp.create_dataset('dY', (nptl, ), data=dY)
-        grp.create_dataset('dZ', (nptl, ), data=dZ)
-        grp.create_dataset('Ux', (nptl, ), data=Ux)
-        grp.create_dataset('Uy', (nptl, ), data=Uy)
-        grp.create_dataset('Uz', (nptl, ), data=Uz)
-        grp.create_dataset('i', (nptl, ), data=icell)
-        grp.create_dataset('q', (nptl, ), data=q)
+    tracer_sort.sort_tracer_data(pic_info, meta_data, ct, species,
+                                 root_path, pmin=pmin)
 
 
 if __name__ == "__main__":
@@ -200,9 +104,5 @@ if __name__ == "__main__":
     pmin = [xmin, ymin, zmin]
     cts = range(4394, 16615, 13)
 
-    def processInput(ct):
-        print ct
-        sort_tracer_data(pic_info, pmin, meta_data, ct, 'electron', root_dir)
-
-    num_cores = multiprocessing.cpu_count()
-    Parallel(n_jobs=num_cores)(delayed(processInput)(ct) for ct in cts)
+    tracer_sort.sort_tracer_steps(pic_info, cts, 'electron', root_dir,
+                                  pmin=pmin)
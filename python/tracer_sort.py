@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Sort reduced tracer data by MPI rank so that the sorted files can be read
+by the particle-based analysis codes like the original VPIC particle dumps.
+
+Since the MPI rank IDs are small dense integers, the particles are sorted
+with a counting sort: the particle numbers of all ranks are counted first,
+and then each particle is scattered directly to its final position. All the
+datasets are moved together as one structured array, and large time steps
+are processed in chunks, so the memory usage is bounded by the chunk size.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+
+import h5py
+import numpy as np
+
+from memory_scheduler import run_tasks
+from particle_io import cell_indices
+
+DSET_NAMES = ['dX', 'dY', 'dZ', 'Ux', 'Uy', 'Uz', 'i', 'q']
+
+
+def read_var_single(group, dset_name):
+    """Read only a single data point from a HDF5 group
+    """
+    dset = group[dset_name]
+    return dset[0]
+
+
+def get_meta_data(fname):
+    """Get tracer meta data
+
+    Args:
+        fname: file name of the grid meta data of the original tracers
+    """
+    with h5py.File(fname, 'r') as fh:
+        group = fh['Step#0']
+        meta_data = {}
+        for var in ['np_local', 'x0', 'y0', 'z0']:
+            meta_data[var] = group[var][:]
+        dx = read_var_single(group, 'dx')
+        dy = read_var_single(group, 'dy')
+        dz = read_var_single(group, 'dz')
+        nx = read_var_single(group, 'nx')
+        ny = read_var_single(group, 'ny')
+        nz = read_var_single(group, 'nz')
+    meta_data['grid_size_mpi'] = [nx * dx, ny * dy, nz * dz]
+    meta_data['grid_size'] = [dx, dy, dz]
+    meta_data['grid_dims'] = [nx, ny, nz]
+    return meta_data
+
+
+def get_sort_params(pic_info, meta_data, pmin=None):
+    """Parameters to calculate MPI ranks and local positions of tracers
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        meta_data: tracer meta data
+        pmin: the lower corner of the domain. Default is from meta_data.
+    """
+    params = dict(meta_data)
+    if pmin is None:
+        pmin = [np.min(meta_data['x0']),
+                np.min(meta_data['y0']),
+                np.min(meta_data['z0'])]
+    params['pmin'] = pmin
+    params['topology'] = [pic_info.topology_x,
+                          pic_info.topology_y,
+                          pic_info.topology_z]
+    return params
+
+
+def get_mpi_rank(ptl, params):
+    """Get the MPI rank of each particle
+
+    Args:
+        ptl: structured array of the particle data
+        params: parameters from get_sort_params
+    """
+    tpx, tpy, tpz = params['topology']
+    mpi_rank = np.zeros(ptl.shape, dtype=np.int64)
+    for pos, pmin, dmpi, tp, stride in zip(['dX', 'dY', 'dZ'], params['pmin'],
+                                           params['grid_size_mpi'],
+                                           params['topology'],
+                                           [1, tpx, tpx * tpy]):
+        irank = ((ptl[pos] - pmin) // dmpi).astype(np.int64)
+        np.clip(irank, 0, tp - 1, out=irank)
+        irank *= stride
+        mpi_rank += irank
+    return mpi_rank
+
+
+def to_local_positions(ptl, mpi_rank, params):
+    """Transfer global positions to positions relative to the cell centers
+
+    The positions are changed in place to be in [-1, 1] within the cell
+    given by the cell index.
+
+    Args:
+        ptl: structured array of the particle data
+        mpi_rank: MPI rank of each particle
+        params: parameters from get_sort_params
+    """
+    tpx, tpy, tpz = params['topology']
+    nx, ny, nz = params['grid_dims']
+    nx1 = nx + 2
+    ny1 = ny + 2
+    ixp, iyp, izp = cell_indices(ptl['i'].astype(np.int64), nx1, ny1)
+    irank = [mpi_rank % tpx,
+             (mpi_rank // tpx) % tpy,
+             mpi_rank // (tpx * tpy)]
+    for pos, pmin, dmpi, dcell, irk, icp, ncell in \
+            zip(['dX', 'dY', 'dZ'], params['pmin'], params['grid_size_mpi'],
+                params['grid_size'], irank, [ixp, iyp, izp], [nx, ny, nz]):
+        dpos = ((ptl[pos] - irk * dmpi - pmin) / dcell - icp + 1) * 2 - 1
+        dpos[(dpos < -1) & (icp == ncell)] = 1.0
+        dpos[(dpos > 1) & (icp == 1)] = -1.0
+        ptl[pos] = dpos
+
+
+def read_chunk(group, dtype, istart, iend):
+    """Read a chunk of all datasets into one structured array
+    """
+    ptl = np.zeros(iend - istart, dtype=dtype)
+    for name in dtype.names:
+        ptl[name] = group[name][istart:iend]
+    return ptl
+
+
+def rank_dtype(ncpu):
+    """Smallest integer type for the ranks
+
+    numpy's stable sort is a radix sort for integers of 16 bits or fewer,
+    so the per-chunk sort is linear in this case.
+    """
+    if ncpu <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+def sort_tracer_step(fname_in, fname_out, fname_meta, tindex, params,
+                     chunk_size=2**24, local_positions=True):
+    """Sort the tracers at one time step by MPI rank
+
+    Args:
+        fname_in: file name of the reduced tracers
+        fname_out: file name of the sorted tracers
+        fname_meta: file name of the grid meta data of the sorted tracers
+        tindex: time index of the step
+        params: parameters from get_sort_params
+        chunk_size: number of particles to process each time
+        local_positions: whether to transfer positions to be relative to cells
+    """
+    fname_tmp = fname_out + '.tmp'
+    try:
+        sort_tracer_chunks(fname_in, fname_out, fname_meta, fname_tmp, tindex,
+                           params, chunk_size, local_positions)
+    finally:
+        if os.path.isfile(fname_tmp):
+            os.remove(fname_tmp)
+
+
+def sort_tracer_chunks(fname_in, fname_out, fname_meta, fname_tmp, tindex,
+                       params, chunk_size, local_positions):
+    """sort_tracer_step in chunks, with the sorted tracers kept in the
+    memory-mapped file fname_tmp when they do not fit in one chunk
+    """
+    tpx, tpy, tpz = params['topology']
+    ncpu = tpx * tpy * tpz
+    rtype = rank_dtype(ncpu)
+    gname = 'Step#' + str(tindex)
+    with h5py.File(fname_in, 'r') as fh_in, \
+            h5py.File(fname_out, 'w') as fh_out, \
+            h5py.File(fname_meta, 'w') as fh_meta:
+        group = fh_in[gname]
+        dset_names = [name for name in DSET_NAMES if name in group]
+        dtype_in = np.dtype([(name, group[name].dtype) for name in dset_names])
+        dtype_pos = np.dtype([(name, dtype_in[name]) for name in
+                              ['dX', 'dY', 'dZ']])
+        if local_positions:
+            dtype = np.dtype([(name, np.float32 if name in ['dX', 'dY', 'dZ']
+                               else dtype_in[name]) for name in dset_names])
+        else:
+            dtype = dtype_in
+        nptl, = group[dset_names[0]].shape
+
+        # Pass 1: count the particles of each rank
+        counts = np.zeros(ncpu, dtype=np.int64)
+        for istart in range(0, nptl, chunk_size):
+            iend = min(istart + chunk_size, nptl)
+            pos = read_chunk(group, dtype_pos, istart, iend)
+            counts += np.bincount(get_mpi_rank(pos, params), minlength=ncpu)
+        cursor = np.zeros(ncpu, dtype=np.int64)
+        cursor[1:] = np.cumsum(counts)[:-1]
+
+        # Pass 2: scatter each chunk to its final positions
+        if nptl <= chunk_size:
+            sorted_ptl = np.zeros(nptl, dtype=dtype)
+        else:
+            sorted_ptl = np.memmap(fname_tmp, dtype=dtype, mode='w+',
+                                   shape=(nptl, ))
+        for istart in range(0, nptl, chunk_size):
+            iend = min(istart + chunk_size, nptl)
+            ptl = read_chunk(group, dtype_in, istart, iend)
+            mpi_rank = get_mpi_rank(ptl, params)
+            if local_positions:
+                to_local_positions(ptl, mpi_rank, params)
+            mpi_rank = mpi_rank.astype(rtype)
+            order = np.argsort(mpi_rank, kind='stable')
+            srank = mpi_rank[order]
+            ccounts = np.bincount(srank, minlength=ncpu)
+            cstarts = np.cumsum(ccounts) - ccounts
+            dest = (cursor[srank] + np.arange(iend - istart) -
+                    cstarts[srank])
+            sorted_ptl[dest] = ptl[order].astype(dtype)
+            cursor += ccounts
+
+        grp = fh_out.create_group(gname)
+        dsets = {}
+        for name in dtype.names:
+            dsets[name] = grp.create_dataset(name, (nptl, ), dtype=dtype[name])
+        for istart in range(0, nptl, chunk_size):
+            iend = min(istart + chunk_size, nptl)
+            chunk = np.asarray(sorted_ptl[istart:iend])
+            for name in dtype.names:
+                dsets[name].write_direct(np.ascontiguousarray(chunk[name]),
+                                         dest_sel=np.s_[istart:iend])
+
+        grid_size = params['grid_size']
+        grid_dims = params['grid_dims']
+        grp = fh_meta.create_group(gname)
+        for var, val in zip(['dx', 'dy', 'dz', 'nx', 'ny', 'nz'],
+                            grid_size + grid_dims):
+            grp.create_dataset(var, (1, ), data=val)
+        for var in ['x0', 'y0', 'z0']:
+            grp.create_dataset(var, (ncpu, ), data=params[var])
+        grp.create_dataset('np_local', (ncpu, ), data=counts.astype(np.int32))
+
+
+def sort_tracer_data(pic_info, meta_data, tindex, species,
+                     root_path='../../', chunk_size=2**24, pmin=None):
+    """Sort the reduced tracer data at one time step
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        meta_data: tracer meta data
+        tindex: time index
+        species: particle species
+        root_path: the root path of the PIC run
+        chunk_size: number of particles to process each time
+        pmin: the lower corner of the domain. Default is from meta_data.
+    """
+    params = get_sort_params(pic_info, meta_data, pmin)
+    sort_tracer_index(params, tindex, species, root_path, chunk_size)
+
+
+def sort_tracer_index(params, tindex, species, root_path='../../',
+                      chunk_size=2**24):
+    """Sort the reduced tracer data at one time step with the parameters
+    from get_sort_params, which can be sent to worker processes
+
+    Args:
+        params: parameters from get_sort_params
+        tindex: time index
+        species: particle species
+        root_path: the root path of the PIC run
+        chunk_size: number of particles to process each time
+    """
+    fpath = root_path + 'tracer/T.' + str(tindex) + '/'
+    fname_in = fpath + species + '_tracer_reduced.h5p'
+    fname_out = fpath + species + '_tracer_reduced_sorted.h5p'
+    fname_meta = fpath + 'grid_metadata_' + species + '_tracer_reduced.h5p'
+    sort_tracer_step(fname_in, fname_out, fname_meta, tindex, params,
+                     chunk_size)
+
+
+def sort_tracer_steps(pic_info, tindices, species, root_path='../../',
+                      chunk_size=2**24, ncores=None, pmin=None):
+    """Sort the reduced tracer data at multiple time steps in parallel
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        tindices: time indices
+        species: particle species
+        root_path: the root path of the PIC run
+        chunk_size: number of particles to process each time
+        ncores: maximum number of processes. Default is the number of cores.
+            The number of processes is also limited by the memory of one
+            time step, which is measured from the first step.
+        pmin: the lower corner of the domain. Default is from meta_data.
+    """
+    fname = root_path + 'tracer/T.0/grid_metadata_' + species + '_tracer.h5p'
+    params = get_sort_params(pic_info, get_meta_data(fname), pmin)
+    run_tasks(sort_tracer_index,
+              [(params, tindex, species, root_path, chunk_size)
+               for tindex in tindices],
+              labels=list(tindices), max_workers=ncores)
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Sort reduced tracers by MPI rank')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--species', action="store", default="electron",
+                        help='particle species')
+    parser.add_argument('--tstart', action="store", default='0', type=int,
+                        help='starting time index')
+    parser.add_argument('--tend', action="store", default='0', type=int,
+                        help='ending time index')
+    parser.add_argument('--tinterval', action="store", default='1', type=int,
+                        help='interval of time index')
+    parser.add_argument('--chunk_size', action="store", default=2**24,
+                        type=int, help='number of particles in each chunk')
+    parser.add_argument('--ncores', action="store", default='0', type=int,
+                        help='number of processes')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    tindices = range(args.tstart, args.tend + 1, args.tinterval)
+    sort_tracer_steps(pic_info, tindices, args.species,
+                      os.path.join(args.pic_run_dir, ''),
+                      args.chunk_size, args.ncores)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Tag index over tracer files that are already sorted by tag
+(*_tracer_qtag_sorted.h5p), and routines to extract the full time history of
+a list of tags without reading whole time steps.
+
+For each tracer file, the index keeps every block_size-th tag (the first tag
+of each block) and the number of particles. A list of tags is located by a
+binary search over these fence tags, then by a binary search within the few
+blocks of the tag dataset that are actually needed. The data of the selected
+particles is then read with point/hyperslab selections.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+
+import h5py
+import numpy as np
+
+from shell_functions import mkdir_p
+
+BLOCK_SIZE = 4096
+
+
+def get_tracer_frames(tracer_dir):
+    """Get the time indices of all tracer directories (T.<tindex>)
+
+    Args:
+        tracer_dir: tracer directory
+    """
+    tframes = []
+    for entry in os.listdir(tracer_dir):
+        if entry.startswith('T.'):
+            tframes.append(int(entry.split(".")[-1]))
+    return np.sort(np.asarray(tframes, dtype=int))
+
+
+def tracer_file_name(tracer_dir, tindex, sname):
+    """File name of tag-sorted tracer file at one time step
+    """
+    return (tracer_dir + 'T.' + str(tindex) + '/' + sname +
+            '_tracer_qtag_sorted.h5p')
+
+
+def build_fence(dset, block_size=BLOCK_SIZE, chunk_size=2**24):
+    """Get the first tag of each block of a sorted tag dataset
+
+    The tags are read in chunks, so the memory usage does not depend on
+    the number of particles.
+
+    Args:
+        dset: HDF5 dataset of the sorted tags
+        block_size: number of particles in each block
+        chunk_size: number of particles to read each time
+    """
+    nptl, = dset.shape
+    chunk_size = max(block_size, (chunk_size // block_size) * block_size)
+    fences = []
+    for istart in range(0, nptl, chunk_size):
+        iend = min(istart + chunk_size, nptl)
+        tags = dset[istart:iend]
+        fences.append(tags[::block_size])
+    if fences:
+        return np.concatenate(fences)
+    return np.zeros(0, dtype=dset.dtype)
+
+
+def build_tag_index(tracer_dir, sname, fname_index, block_size=BLOCK_SIZE,
+                    tkey='q'):
+    """Build the tag index for all tag-sorted tracer files of one species
+
+    Time steps that are already in the index file are skipped, so the index
+    can be updated when new tracer files are available.
+
+    Args:
+        tracer_dir: tracer directory
+        sname: species name
+        fname_index: file name of the index, e.g. next to the analysis
+            output, so nothing is written into the tracer directory
+        block_size: number of particles in each block
+        tkey: dataset name of the tags
+    """
+    mkdir_p(os.path.dirname(os.path.abspath(fname_index)))
+    tframes = get_tracer_frames(tracer_dir)
+    with h5py.File(fname_index, 'a') as fh_index:
+        for tindex in tframes:
+            gname = 'Step#' + str(tindex)
+            if gname in fh_index:
+                continue
+            fname = tracer_file_name(tracer_dir, tindex, sname)
+            if not os.path.isfile(fname):
+                continue
+            print("Indexing %s" % fname)
+            with h5py.File(fname, 'r') as fh:
+                dset = fh[gname][tkey]
+                nptl, = dset.shape
+                fence = build_fence(dset, block_size)
+            grp = fh_index.create_group(gname)
+            grp.create_dataset('fence', fence.shape, data=fence)
+            grp.attrs['nptl'] = nptl
+            grp.attrs['block_size'] = block_size
+    return fname_index
+
+
+def coalesce_blocks(iblocks, max_gap=1):
+    """Merge sorted block indices into contiguous ranges
+
+    Args:
+        iblocks: sorted unique block indices
+        max_gap: blocks separated by no more than max_gap are merged
+    Returns:
+        list of (first_block, last_block) pairs
+    """
+    ranges = []
+    if len(iblocks) == 0:
+        return ranges
+    bstart = bend = iblocks[0]
+    for iblock in iblocks[1:]:
+        if iblock - bend <= max_gap:
+            bend = iblock
+        else:
+            ranges.append((bstart, bend))
+            bstart = bend = iblock
+    ranges.append((bstart, bend))
+    return ranges
+
+
+def read_rows(dset, rows, dense_fraction=0.05):
+    """Read selected rows of a 1D dataset
+
+    Sparse selections use point selection. When the rows are dense enough
+    in their range, one hyperslab is read instead, which is much faster.
+
+    Args:
+        dset: HDF5 dataset
+        rows: sorted unique rows
+        dense_fraction: minimum fraction of selected rows in the range
+            to read a hyperslab
+    """
+    if len(rows) == 0:
+        return np.zeros(0, dtype=dset.dtype)
+    rmin, rmax = rows[0], rows[-1]
+    if len(rows) >= dense_fraction * (rmax - rmin + 1):
+        return dset[rmin:rmax+1][rows - rmin]
+    return dset[rows]
+
+
+class TracerTagIndex(object):
+    """Tag index for tag-sorted tracer files of one species
+    """
+    def __init__(self, tracer_dir, sname, fname_index, tkey='q'):
+        """
+        Args:
+            tracer_dir: tracer directory
+            sname: species name
+            fname_index: file name of the index, which is built or updated
+                here (see build_tag_index)
+            tkey: dataset name of the tags
+        """
+        self.tracer_dir = tracer_dir
+        self.sname = sname
+        self.tkey = tkey
+        self.fname_index = build_tag_index(tracer_dir, sname, fname_index,
+                                           tkey=tkey)
+        self.fences = {}
+        self.nptls = {}
+        self.block_sizes = {}
+        with h5py.File(self.fname_index, 'r') as fh:
+            for gname in fh:
+                tindex = int(gname.split('#')[-1])
+                grp = fh[gname]
+                self.fences[tindex] = grp['fence'][:]
+                self.nptls[tindex] = int(grp.attrs['nptl'])
+                self.block_sizes[tindex] = int(grp.attrs['block_size'])
+        self.tframes = np.sort(np.asarray(list(self.fences.keys()), dtype=int))
+
+    def locate(self, group, tindex, tags):
+        """Get the row of each tag in one tracer file
+
+        Args:
+            group: the opened HDF5 group of this time step
+            tindex: time index
+            tags: sorted tags
+        Returns:
+            rows: row of each tag, -1 for the tags not in this file
+        """
+        fence = self.fences[tindex]
+        nptl = self.nptls[tindex]
+        block_size = self.block_sizes[tindex]
+        dset = group[self.tkey]
+        rows = np.full(len(tags), -1, dtype=np.int64)
+        iblocks = np.searchsorted(fence, tags, side='right') - 1
+        valid = iblocks >= 0
+        for bstart, bend in coalesce_blocks(np.unique(iblocks[valid])):
+            istart = bstart * block_size
+            iend = min((bend + 1) * block_size, nptl)
+            block_tags = dset[istart:iend]
+            cond = np.logical_and(iblocks >= bstart, iblocks <= bend)
+            itags, = np.where(cond)
+            irows = np.searchsorted(block_tags, tags[itags])
+            irows[irows >= len(block_tags)] = len(block_tags) - 1
+            found = block_tags[irows] == tags[itags]
+            rows[itags[found]] = irows[found] + istart
+        return rows
+
+    def read_tags(self, tindex, tags, dset_names=None):
+        """Read the data of a list of tags at one time step
+
+        Args:
+            tindex: time index
+            tags: tags of the particles
+            dset_names: datasets to read. Default is all of them.
+        Returns:
+            ptl: dictionary of the particle data, NaN for missing particles
+            rows: row of each tag, -1 for the tags not in this file
+        """
+        tags = np.asarray(tags)
+        stags, inverse = np.unique(tags, return_inverse=True)
+        fname = tracer_file_name(self.tracer_dir, tindex, self.sname)
+        with h5py.File(fname, 'r') as fh:
+            group = fh['Step#' + str(tindex)]
+            if dset_names is None:
+                dset_names = [str(dname) for dname in group]
+            srows = self.locate(group, tindex, stags)
+            found = srows >= 0
+            frows = srows[found]
+            ptl = {}
+            for dname in dset_names:
+                fdata = np.full(len(stags), np.nan, dtype=np.float32)
+                fdata[found] = read_rows(group[dname], frows)
+                ptl[dname] = fdata[inverse]
+        rows = srows[inverse]
+        return ptl, rows
+
+    def read_trajectories(self, tags, tframes=None, dset_names=None):
+        """Read the full time history of a list of tags
+
+        Args:
+            tags: tags of the particles
+            tframes: time indices. Default is all the indexed ones.
+            dset_names: datasets to read. Default is all of them.
+        Returns:
+            ptls: dictionary of (nframes, ntags) arrays
+            tframes: time indices
+        """
+        if tframes is None:
+            tframes = self.tframes
+        nframes = len(tframes)
+        ntags = len(tags)
+        ptls = {}
+        for tframe, tindex in enumerate(tframes):
+            print("Time frame %d of %d" % (tframe, nframes))
+            ptl, _ = self.read_tags(tindex, tags, dset_names)
+            for dname in ptl:
+                if dname not in ptls:
+                    ptls[dname] = np.zeros([nframes, ntags], dtype=np.float32)
+                ptls[dname][tframe, :] = ptl[dname]
+        return ptls, tframes
+
+
+def save_trajectories(fname, ptls, tags):
+    """Save trajectories in the 'Particle#<tag>' layout used by other modules
+
+    Args:
+        fname: output file name
+        ptls: dictionary of (nframes, ntags) arrays
+        tags: tags of the particles
+    """
+    with h5py.File(fname, 'w') as fh:
+        for iptl, tag in enumerate(tags):
+            grp = fh.create_group('Particle#' + str(tag))
+            for key in ptls:
+                nframes = ptls[key].shape[0]
+                grp.create_dataset(key, (nframes, ), data=ptls[key][:, iptl])
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Tag index for tracers')
+    parser.add_argument('--tracer_dir', action="store", required=True,
+                        help='tracer directory')
+    parser.add_argument('--species', action="store", default="electron",
+                        help='particle species')
+    parser.add_argument('--index_file', action="store", required=True,
+                        help='file name of the tag index')
+    parser.add_argument('--block_size', action="store", default=BLOCK_SIZE,
+                        type=int, help='number of particles in each block')
+    parser.add_argument('--tags_file', action="store", default='',
+                        help='text file of tags whose trajectories to extract')
+    parser.add_argument('--output', action="store", default='',
+                        help='output file name of the trajectories')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    args = get_cmd_args()
+    tracer_dir = os.path.join(args.tracer_dir, '')
+    build_tag_index(tracer_dir, args.species, args.index_file,
+                    block_size=args.block_size)
+    if args.tags_file and args.output:
+        # Integer tags, so the groups are 'Particle#123' and not '#123.0'
+        tags = np.loadtxt(args.tags_file, dtype=np.int64, ndmin=1)
+        tag_index = TracerTagIndex(tracer_dir, args.species, args.index_file)
+        ptls, _ = tag_index.read_trajectories(tags)
+        mkdir_p(os.path.dirname(os.path.abspath(args.output)))
+        save_trajectories(args.output, ptls, tags)
+
+
+if __name__ == "__main__":
+    main()
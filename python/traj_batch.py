@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Batch loader for the legacy per-particle trajectory files in traj/.
+
+Each trajectory file has 13 float32 variables at each time step. Thousands
+of these files are packed into one (particle, variable, time) array file
+with an index, so that all the trajectories can be memory-mapped at once and
+the derived quantities can be calculated for all particles together.
+"""
+from __future__ import print_function
+
+import argparse
+import math
+import os
+
+import numpy as np
+import simplejson as json
+
+VAR_NAMES = ['t', 'x', 'y', 'z', 'ux', 'uy', 'uz',
+             'ex', 'ey', 'ez', 'bx', 'by', 'bz']
+NVAR = len(VAR_NAMES)
+
+
+def get_file_names(root_dir='../../'):
+    """Get the file names and sizes in the traj folder
+
+    The folder is listed only once, and the file sizes come with the listing.
+
+    Args:
+        root_dir: the root directory of the PIC run
+    Returns:
+        traj_files: dictionary with the sorted file names and the file
+            sizes of electrons ('e') and ions ('i')
+    """
+    traj_path = root_dir + 'traj/'
+    entries = []
+    for entry in os.scandir(traj_path):
+        if entry.is_file():
+            entries.append((entry.name, entry.stat().st_size))
+    entries.sort()
+    traj_files = {'e': ([], []), 'i': ([], [])}
+    for fname, fsize in entries:
+        species = 'e' if fname.startswith('e') else 'i'
+        traj_files[species][0].append(fname)
+        traj_files[species][1].append(fsize)
+    return traj_files
+
+
+def index_file_name(fname_packed):
+    """File name of the index for a packed trajectory file
+    """
+    return os.path.splitext(fname_packed)[0] + '.json'
+
+
+def pack_trajectories(species, fname_packed, root_dir='../../'):
+    """Pack all trajectory files of one species into one array file
+
+    The packed array has shape (nptl, nvar, nstep_max). Trajectories that
+    are shorter than nstep_max are padded with NaN.
+
+    Args:
+        species: 'e' or 'i'
+        fname_packed: the file name of the packed trajectories
+        root_dir: the root directory of the PIC run
+    """
+    fnames, fsizes = get_file_names(root_dir)[species]
+    nptl = len(fnames)
+    itemsize = np.dtype(np.float32).itemsize
+    nsteps = [fsize // (NVAR * itemsize) for fsize in fsizes]
+    nstep_max = max(nsteps) if nsteps else 0
+    traj = np.memmap(fname_packed, dtype=np.float32, mode='w+',
+                     shape=(max(nptl, 1), NVAR, max(nstep_max, 1)))
+    for iptl, (fname, nstep) in enumerate(zip(fnames, nsteps)):
+        if iptl % 1000 == 0:
+            print("Packing trajectory %d of %d" % (iptl, nptl))
+        fdata = np.fromfile(root_dir + 'traj/' + fname, dtype=np.float32,
+                            count=nstep * NVAR)
+        traj[iptl, :, :nstep] = fdata.reshape((nstep, NVAR)).T
+        traj[iptl, :, nstep:] = np.nan
+    traj.flush()
+    del traj
+    index = {'species': species,
+             'file_names': fnames,
+             'nsteps': nsteps,
+             'nptl': nptl,
+             'nvar': NVAR,
+             'nstep_max': nstep_max,
+             'var_names': VAR_NAMES}
+    with open(index_file_name(fname_packed), 'w') as f:
+        json.dump(index, f)
+
+
+def load_trajectories(fname_packed, mode='r'):
+    """Memory-map the packed trajectories
+
+    Args:
+        fname_packed: the file name of the packed trajectories
+        mode: memmap mode
+    Returns:
+        traj: (nptl, nvar, nstep_max) array
+        index: the index of the packed file
+    """
+    with open(index_file_name(fname_packed), 'r') as f:
+        index = json.load(f)
+    shape = (max(index['nptl'], 1), index['nvar'], max(index['nstep_max'], 1))
+    traj = np.memmap(fname_packed, dtype=np.float32, mode=mode, shape=shape)
+    return traj, index
+
+
+def unwrap_periodic(pos, length):
+    """Remove the jumps of periodic boundary crossings for all particles
+
+    Args:
+        pos: (nptl, nstep) positions
+        length: the box size along this direction
+    """
+    dpos = np.diff(pos, axis=1)
+    offsets = np.zeros(pos.shape, dtype=pos.dtype)
+    shifts = np.where(dpos < -0.4 * length, length, 0.0)
+    shifts += np.where(dpos > 0.4 * length, -length, 0.0)
+    np.cumsum(shifts, axis=1, out=offsets[:, 1:])
+    return pos + offsets
+
+
+def calc_derived_quantities(traj, pic_info, species, iptls=None):
+    """Calculate the derived quantities of many trajectories at once
+
+    Args:
+        traj: (nptl, nvar, nstep) array of trajectories
+        pic_info: namedtuple for the PIC simulation information.
+        species: 'e' or 'i'
+        iptls: indices of the particles to use. Default is all particles.
+    Returns:
+        ptl: dictionary of (nptl, nstep) arrays
+    """
+    if iptls is not None:
+        traj = traj[iptls]
+    charge = -1.0 if species == 'e' else 1.0
+    smime = math.sqrt(pic_info.mime)
+    ptl = {}
+    for ivar, var in enumerate(VAR_NAMES):
+        ptl[var] = np.asarray(traj[:, ivar, :], dtype=np.float64)
+    ptl['t'] *= pic_info.dtwci / pic_info.dtwpe
+    ptl['px'] = ptl['x'] / smime  # Change de to di
+    ptl['py'] = unwrap_periodic(ptl['y'] / smime, pic_info.ly_di)
+    ptl['pz'] = ptl['z'] / smime
+    ptl['pxb'] = unwrap_periodic(ptl['px'], pic_info.lx_di)
+    ux, uy, uz = ptl['ux'], ptl['uy'], ptl['uz']
+    ex, ey, ez = ptl['ex'], ptl['ey'], ptl['ez']
+    bx, by, bz = ptl['bx'], ptl['by'], ptl['bz']
+    gamma = np.sqrt(1.0 + ux**2 + uy**2 + uz**2)
+    igamma = 1.0 / gamma
+    ptl['gamma'] = gamma
+    ptl['jdote_x'] = ux * ex * charge * igamma
+    ptl['jdote_y'] = uy * ey * charge * igamma
+    ptl['jdote_z'] = uz * ez * charge * igamma
+    ptl['jdote'] = ptl['jdote_x'] + ptl['jdote_y'] + ptl['jdote_z']
+
+    # Work done by the parallel electric field and the drift velocities
+    ib2 = 1.0 / (bx**2 + by**2 + bz**2)
+    ib = np.sqrt(ib2)
+    edotb = (ex * bx + ey * by + ez * bz) * ib
+    udotb = (ux * bx + uy * by + uz * bz) * ib
+    ptl['jdote_para'] = charge * edotb * udotb * igamma
+    ptl['jdote_perp'] = ptl['jdote'] - ptl['jdote_para']
+    ptl['vexb_x'] = (ey * bz - ez * by) * ib2
+    ptl['vexb_y'] = (ez * bx - ex * bz) * ib2
+    ptl['vexb_z'] = (ex * by - ey * bx) * ib2
+    ptl['upara'] = udotb
+    ptl['uperp'] = np.sqrt(np.maximum(ux**2 + uy**2 + uz**2 - udotb**2, 0))
+
+    dt = np.zeros(ptl['t'].shape)
+    dt[:, :-1] = np.diff(ptl['t'], axis=1)
+    dt[np.isnan(dt)] = 0.0
+    for var in ['jdote_x', 'jdote_y', 'jdote_z', 'jdote_para', 'jdote_perp']:
+        work = np.nan_to_num(ptl[var] * dt)
+        ptl[var + '_cum'] = np.cumsum(work, axis=1)
+    ptl['jdote_tot_cum'] = (ptl['jdote_x_cum'] + ptl['jdote_y_cum'] +
+                            ptl['jdote_z_cum'])
+    return ptl
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Pack trajectory files')
+    parser.add_argument('--root_dir', action="store", default='../../',
+                        help='root directory of the PIC run')
+    parser.add_argument('--species', action="store", default="e",
+                        help='particle species (e or i)')
+    parser.add_argument('--fname', action="store", default='',
+                        help='file name of the packed trajectories')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    args = get_cmd_args()
+    root_dir = os.path.join(args.root_dir, '')
+    fname = args.fname
+    if not fname:
+        fname = root_dir + 'traj_packed_' + args.species + '.dat'
+    pack_trajectories(args.species, fname, root_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+In-process service for the particle velocity and energy distributions in a
+box, for the interactive box selection in vdist_visule and visualizer.
+
+The service stays resident: the headers of all particle files at a time step
+are read once and kept as a spatial index of the MPI domains, and a pool of
+worker processes is kept alive. For each box, only the files of the domains
+that overlap the box are read, the histograms of each file are calculated on
+the workers, and the summed arrays are returned directly, without writing a
+configuration file or launching an MPI job.
+
+As for the MPI tool, the parallel and perpendicular velocities are relative to
+the local magnetic field of each particle, taken at its nearest grid point.
+The direction of the mean magnetic field in the box can be used instead.
+"""
+from __future__ import print_function
+
+import collections
+import math
+import multiprocessing
+
+import numpy as np
+
+from field_io import read_field_frame
+from particle_io import (decode_particles, domain_bounds, particle_file_name,
+                         particle_ranks, read_particle_header, read_particles)
+
+SERVICES = {}
+
+fvelocity = collections.namedtuple("fvelocity", [
+    'species', 'tframe', 'center', 'sizes', 'vmin', 'vmax', 'nbins',
+    'vbins_short', 'vbins_long', 'vbins_log', 'fvel_para_perp', 'fvel_xy',
+    'fvel_xz', 'fvel_yz', 'fvel_para', 'fvel_perp', 'fvel_para_log',
+    'fvel_perp_log', 'vmin_2d', 'vmax_2d', 'vmin_1d', 'vmax_1d'
+])
+fenergy = collections.namedtuple("fenergy",
+                                 ['species', 'elin', 'flin', 'elog', 'flog'])
+
+
+def velocity_bins(nbins, vmin, vmax):
+    """Bin edges of the velocity distributions
+
+    Returns:
+        edges: dictionary with the 'long' bins in [-vmax, vmax] (2*nbins),
+            the 'short' bins in [0, vmax] (nbins) and the 'log' bins in
+            [vmin, vmax] (nbins)
+    """
+    if vmin <= 0:
+        vmin = vmax * 1E-3
+    return {'long': np.linspace(-vmax, vmax, 2 * nbins + 1),
+            'short': np.linspace(0, vmax, nbins + 1),
+            'log': np.logspace(math.log10(vmin), math.log10(vmax), nbins + 1)}
+
+
+def energy_bins(nbins, emin, emax):
+    """Bin edges of the linear and logarithmic energy spectra
+    """
+    return {'lin': np.linspace(0, emax, nbins + 1),
+            'log': np.logspace(math.log10(emin), math.log10(emax), nbins + 1)}
+
+
+def bin_index(data, edges):
+    """Bin index of the data, -1 when out of range
+    """
+    ibin = np.searchsorted(edges, data, side='right') - 1
+    ibin[ibin >= len(edges) - 1] = -1
+    return ibin
+
+
+def hist1d(data, edges):
+    """1D histogram with bincount
+    """
+    ibin = bin_index(data, edges)
+    return np.bincount(ibin[ibin >= 0], minlength=len(edges) - 1)
+
+
+def hist2d(data1, data2, edges1, edges2):
+    """2D histogram with bincount, with data1 along the first axis
+    """
+    n1, n2 = len(edges1) - 1, len(edges2) - 1
+    i1 = bin_index(data1, edges1)
+    i2 = bin_index(data2, edges2)
+    valid = np.logical_and(i1 >= 0, i2 >= 0)
+    iflat = i1[valid] * n2 + i2[valid]
+    return np.bincount(iflat, minlength=n1 * n2).reshape(n1, n2)
+
+
+def box_histograms(ux, uy, uz, ene, bhat, vbins, ebins):
+    """Histograms of the momenta and energies of particles
+
+    Args:
+        ux, uy, uz: momenta in the units of the velocity bins
+        ene: energies
+        bhat: unit vector of the magnetic field
+        vbins: velocity bin edges from velocity_bins
+        ebins: energy bin edges from energy_bins
+    Returns:
+        hists: dictionary of the histograms
+    """
+    usq = ux**2 + uy**2 + uz**2
+    upara = ux * bhat[0] + uy * bhat[1] + uz * bhat[2]
+    uperp = np.sqrt(np.maximum(usq - upara**2, 0))
+    hists = {}
+    hists['fvel_para_perp'] = hist2d(uperp, upara, vbins['short'],
+                                     vbins['long'])
+    hists['fvel_xy'] = hist2d(uy, ux, vbins['long'], vbins['long'])
+    hists['fvel_xz'] = hist2d(uz, ux, vbins['long'], vbins['long'])
+    hists['fvel_yz'] = hist2d(uz, uy, vbins['long'], vbins['long'])
+    hists['fvel_para'] = hist1d(upara, vbins['long'])
+    hists['fvel_perp'] = hist1d(uperp, vbins['short'])
+    hists['fvel_para_log'] = hist1d(np.abs(upara), vbins['log'])
+    hists['fvel_perp_log'] = hist1d(uperp, vbins['log'])
+    hists['flin'] = hist1d(ene, ebins['lin'])
+    hists['flog'] = hist1d(ene, ebins['log'])
+    return hists
+
+
+def local_bfield_direction(bfield, coords, dptl):
+    """Unit vectors of the magnetic field at the grid points nearest to the
+    particles
+
+    Args:
+        bfield: (3, ...) magnetic field from VdistService.box_bfield
+        coords: grid coordinates and particle position of each axis of bfield
+        dptl: decoded particles with the positions
+    Returns:
+        bhat: (3, nptl) unit vectors
+    """
+    index = [slice(None)]
+    for grid, pos in coords:
+        if len(grid) > 1:
+            igrid = np.rint((dptl[pos] - grid[0]) / (grid[1] - grid[0]))
+            igrid = np.clip(igrid.astype(np.int64), 0, len(grid) - 1)
+        else:
+            igrid = np.zeros(len(dptl[pos]), dtype=np.int64)
+        index.append(igrid)
+    bvec = bfield[tuple(index)]
+    bnorm = np.sqrt(np.sum(bvec**2, axis=0))
+    return bvec / np.maximum(bnorm, np.finfo(bvec.dtype).tiny)
+
+
+def rank_histograms(fname, box, bhat, vbins, ebins, uscale=1.0, bgrid=None):
+    """Histograms of the particles of one file that are in a box
+
+    Args:
+        fname: particle file name
+        box: (3, 2) bounds of the box in de
+        bhat: unit vector of the magnetic field, not used with bgrid
+        vbins: velocity bin edges from velocity_bins
+        ebins: energy bin edges from energy_bins
+        uscale: factor from the momenta to the units of the velocity bins
+        bgrid: (bfield, coords) from VdistService.box_bfield, for the local
+            magnetic field of each particle
+    Returns:
+        hists: dictionary of the histograms
+    """
+    header, ptl = read_particles(fname)
+    outputs = ['ux', 'uy', 'uz', 'ene']
+    if bgrid is not None:
+        outputs += [pos for _, pos in bgrid[1]]
+    dptl = decode_particles(header, ptl, outputs, box=box)
+    del ptl
+    if bgrid is not None:
+        bhat = local_bfield_direction(bgrid[0], bgrid[1], dptl)
+    return box_histograms(dptl['ux'] * uscale, dptl['uy'] * uscale,
+                          dptl['uz'] * uscale, dptl['ene'], bhat, vbins,
+                          ebins)
+
+
+def rank_histograms_args(args):
+    """rank_histograms with packed arguments, for Pool.imap_unordered
+    """
+    return rank_histograms(*args)
+
+
+def bin_centers(edges):
+    """Centers of the bins
+    """
+    return 0.5 * (edges[1:] + edges[:-1])
+
+
+class VdistService(object):
+    """Resident service for the particle distributions of boxes
+    """
+    def __init__(self, pic_info, run_dir, species='e', nworkers=None):
+        """
+        Args:
+            pic_info: namedtuple for the PIC simulation information.
+            run_dir: PIC run directory
+            species: 'e' or 'h'
+            nworkers: number of worker processes. Default is the number of
+                cores, at most 16.
+        """
+        self.pic_info = pic_info
+        self.run_dir = run_dir
+        self.species = species
+        self.smime = math.sqrt(pic_info.mime)
+        if not nworkers:
+            nworkers = min(multiprocessing.cpu_count(), 16)
+        self.pool = multiprocessing.Pool(nworkers)
+        self.indices = {}
+
+    def close(self):
+        """Stop the worker processes
+        """
+        self.pool.close()
+        self.pool.join()
+
+    def rank_index(self, tindex):
+        """Spatial index of the MPI domains at one time step
+
+        The headers are only read the first time.
+
+        Returns:
+            ranks: (nranks, ) MPI ranks
+            bounds: (nranks, 3, 2) bounds of the domains in de
+        """
+        if tindex not in self.indices:
+            ranks = particle_ranks(self.run_dir, tindex, self.species)
+            bounds = np.zeros((len(ranks), 3, 2))
+            for i, rank in enumerate(ranks):
+                fname = particle_file_name(self.run_dir, tindex,
+                                           self.species, rank)
+                bounds[i] = domain_bounds(read_particle_header(fname))
+            self.indices[tindex] = (np.asarray(ranks), bounds)
+        return self.indices[tindex]
+
+    def ranks_in_box(self, tindex, box):
+        """MPI ranks whose domains overlap a box in de
+        """
+        ranks, bounds = self.rank_index(tindex)
+        box = np.asarray(box)
+        overlap = np.all(np.logical_and(bounds[:, :, 0] <= box[:, 1],
+                                        bounds[:, :, 1] >= box[:, 0]), axis=1)
+        return ranks[overlap]
+
+    def box_bfield(self, tindex, box):
+        """Magnetic field on the grid points in a box
+
+        Returns:
+            bfield: (3, ...) bx, by and bz in the box, with the axes of the
+                field frames
+            coords: for each axis of the frames, the grid coordinates in de
+                and the name of the particle position along it
+        """
+        pic_info = self.pic_info
+        tframe = tindex // pic_info.fields_interval
+        data_dir = self.run_dir + 'data/'
+        box_di = np.asarray(box) / self.smime
+        fields = []
+        slices = []
+        coords = []
+        for var in ['bx', 'by', 'bz']:
+            fdata = read_field_frame(pic_info, data_dir, var, tframe)
+            if not slices:
+                axes = [(pic_info.z_di, 2, 'z'), (pic_info.x_di, 0, 'x')]
+                if fdata.ndim == 3:
+                    axes.insert(1, (pic_info.y_di, 1, 'y'))
+                for grid, iaxis, pos in axes:
+                    grid = np.asarray(grid)
+                    i0, i1 = np.searchsorted(grid, box_di[iaxis])
+                    i0 = min(i0, len(grid) - 1)
+                    i1 = max(i1, i0 + 1)
+                    slices.append(slice(i0, i1))
+                    coords.append((grid[i0:i1] * self.smime, pos))
+            fields.append(np.asarray(fdata[tuple(slices)], dtype=np.float32))
+        return np.stack(fields), coords
+
+    def mean_bfield_direction(self, tindex, box):
+        """Direction of the mean magnetic field in a box
+        """
+        bfield, _ = self.box_bfield(tindex, box)
+        bmean = bfield.reshape(3, -1).mean(axis=1)
+        return bmean / np.linalg.norm(bmean)
+
+    def histograms(self, tindex, box, nbins, vmin, vmax, bhat=None,
+                   bfield='local', nbins_ene=600, emin=1E-4, emax=100.0):
+        """Summed histograms of the particles in a box
+
+        Args:
+            tindex: time index of the particle dump
+            box: (3, 2) bounds of the box in de
+            nbins: number of short velocity bins
+            vmin, vmax: range of the velocity bins. As for the MPI tool,
+                they are for sqrt(mi/me)*u for ions.
+            bhat: fixed direction of the magnetic field, instead of bfield
+            bfield: 'local' for the magnetic field at the grid point nearest
+                to each particle, as for the MPI tool, or 'mean' for the
+                direction of the mean magnetic field in the box
+            nbins_ene: number of energy bins
+            emin, emax: range of the energy bins
+        Returns:
+            hists: dictionary of the histograms, all zeros when no domain
+                overlaps the box
+            vbins: velocity bin edges
+            ebins: energy bin edges
+        """
+        bgrid = None
+        if bhat is None:
+            if bfield == 'local':
+                bgrid = self.box_bfield(tindex, box)
+                bhat = np.zeros(3)
+            elif bfield == 'mean':
+                bhat = self.mean_bfield_direction(tindex, box)
+            else:
+                raise ValueError("Unknown magnetic field: " + str(bfield))
+        vbins = velocity_bins(nbins, vmin, vmax)
+        ebins = energy_bins(nbins_ene, emin, emax)
+        uscale = 1.0 if self.species == 'e' else self.smime
+        tasks = []
+        for rank in self.ranks_in_box(tindex, box):
+            fname = particle_file_name(self.run_dir, tindex, self.species, rank)
+            tasks.append((fname, box, bhat, vbins, ebins, uscale, bgrid))
+        empty = np.zeros(0)
+        hists = box_histograms(empty, empty, empty, empty, bhat, vbins, ebins)
+        hists = {key: hists[key].astype(np.float64) for key in hists}
+        for hists_rank in self.pool.imap_unordered(rank_histograms_args, tasks):
+            for key in hists:
+                hists[key] += hists_rank[key]
+        return hists, vbins, ebins
+
+    def distributions(self, center, sizes, nbins, vmin, vmax, tframe,
+                      species=None, **kwargs):
+        """Velocity and energy distributions with the arguments of
+        particle_distribution.get_spectrum_vdist
+
+        Args:
+            center: center of the box in de
+            sizes: sizes of the box in cells
+            nbins: number of short velocity bins
+            vmin, vmax: range of the velocity bins
+            tframe: time frame of the particle dump
+            species: ignored, the service is for one species
+        Returns:
+            fvel: velocity distributions, as from
+                particle_distribution.read_velocity_distribution
+            fene: energy spectra, as from
+                particle_distribution.read_energy_distribution
+        """
+        pic_info = self.pic_info
+        tindex = tframe * pic_info.particle_interval
+        center = np.asarray(center, dtype=np.float64)
+        dxyz = np.asarray([pic_info.dx_di, pic_info.dy_di,
+                           pic_info.dz_di]) * self.smime
+        hsize = np.asarray(sizes) * dxyz * 0.5
+        box = np.stack([center - hsize, center + hsize], axis=1)
+        hists, vbins, ebins = self.histograms(tindex, box, nbins, vmin, vmax,
+                                              **kwargs)
+        vbins_short = bin_centers(vbins['short'])
+        vbins_long = bin_centers(vbins['long'])
+        if self.species != 'e':
+            # As in read_velocity_distribution, the bins of the ions are
+            # for sqrt(m_i) * u
+            vbins_short /= self.smime
+            vbins_long /= self.smime
+            vmin /= self.smime
+            vmax /= self.smime
+        # Add small number to the distributions to avoid zeros
+        delta = 0.01
+        fvel_2d = [hists[key] + delta for key in
+                   ['fvel_para_perp', 'fvel_xy', 'fvel_xz', 'fvel_yz']]
+        fvel_1d = [hists[key] + delta for key in ['fvel_para', 'fvel_perp']]
+        fvel = fvelocity(species=self.species, tframe=tframe, center=center,
+                         sizes=np.asarray(sizes), vmin=vmin, vmax=vmax,
+                         nbins=nbins,
+                         vbins_short=vbins_short, vbins_long=vbins_long,
+                         vbins_log=bin_centers(vbins['log']),
+                         fvel_para_perp=fvel_2d[0], fvel_xy=fvel_2d[1],
+                         fvel_xz=fvel_2d[2], fvel_yz=fvel_2d[3],
+                         fvel_para=fvel_1d[0], fvel_perp=fvel_1d[1],
+                         fvel_para_log=hists['fvel_para_log'],
+                         fvel_perp_log=hists['fvel_perp_log'],
+                         vmin_2d=min(np.min(f) for f in fvel_2d),
+                         vmax_2d=max(np.max(f) for f in fvel_2d),
+                         vmin_1d=min(np.min(f) for f in fvel_1d),
+                         vmax_1d=max(np.max(f) for f in fvel_1d))
+        # Spectra per unit energy, with flog normalized as in
+        # read_energy_distribution
+        fnorm = pic_info.nx * pic_info.ny + pic_info.nz * pic_info.nppc
+        fene = fenergy(species=self.species,
+                       elin=bin_centers(ebins['lin']),
+                       flin=hists['flin'] / np.diff(ebins['lin']),
+                       elog=bin_centers(ebins['log']),
+                       flog=hists['flog'] / np.diff(ebins['log']) / fnorm)
+        return fvel, fene
+
+
+def get_vdist_service(pic_info, run_dir, species='e', nworkers=None):
+    """The resident service of a run and species, started on first use
+    """
+    key = (run_dir, species)
+    if key not in SERVICES:
+        SERVICES[key] = VdistService(pic_info, run_dir, species, nworkers)
+    return SERVICES[key]
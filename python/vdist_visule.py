@@ -18,7 +18,8 @@ from mpl_toolkits.mplot3d import Axes3D
 from scipy import signal
 
 import pic_information
-from contour_plots import plot_2d_contour, read_2d_fields
+from contour_plots import (plot_2d_contour, plot_ay_contours, read_2d_ay,
+                           read_2d_fields)
 from json_module import *
 from particle_distribution import *
 from spectrum_fitting import fit_thermal_core, get_normalized_energy
@@ -74,8 +75,12 @@ class EspectrumVdist(object):
     def get_dists_info(self):
         """Get the distribution information
         """
-        get_spectrum_vdist(self.pic_info, self.analysis_dir, **self.kwargs_dist)
-        self.read_distributions()
+        self.fvel, self.fene = get_spectrum_vdist(self.pic_info,
+                                                  self.analysis_dir,
+                                                  run_dir=self.root_dir,
+                                                  **self.kwargs_dist)
+        if self.fvel is None:
+            self.read_distributions()
         self.vbins_short = self.fvel.vbins_short
         self.vbins_long = self.fvel.vbins_long
         self.elin = self.fene.elin
@@ -144,7 +149,7 @@ class EspectrumVdist(object):
         ng = 5
         kernel = np.ones((ng, ng)) / float(ng * ng)
         self.fdata1 = signal.convolve2d(data, kernel)
-        self.x1, self.z1, self.Ay1 = read_2d_fields(self.pic_info, fname_Ay,
+        self.x1, self.z1, self.Ay1 = read_2d_ay(self.pic_info, fname_Ay,
                                                     **kwargs)
         self.nx1, = self.x1.shape
         self.nz1, = self.z1.shape
@@ -191,16 +196,9 @@ class EspectrumVdist(object):
         self.cbar = self.fig_dist.colorbar(self.im1, cax=self.cax)
         self.cbar.ax.tick_params(labelsize=16)
         self.cbar.set_ticks(np.linspace(self.field_lims[0], self.field_lims[1], 5))
-        self.Ay_max = np.max(self.Ay1)
-        self.Ay_min = np.min(self.Ay1)
-        self.levels = np.linspace(self.Ay_min, self.Ay_max, 10)
-        self.xz_axis.contour(
-            self.x1[0:nx1:xst],
-            self.z1[0:nz1:zst],
-            self.Ay1[0:nz1:zst, 0:nx1:xst],
-            colors=self.color_Ay,
-            linewidths=0.5,
-            levels=self.levels)
+        plot_ay_contours(self.xz_axis, self.pic_info,
+                         self.root_dir + 'data/', self.ct_field,
+                         colors=self.color_Ay, linewidths=0.5)
         self.xz_axis.tick_params(labelsize=16)
         self.xz_axis.set_xlabel(r'$x/d_i$', fontdict=font, fontsize=20)
         self.xz_axis.set_ylabel(r'$z/d_i$', fontdict=font, fontsize=20)
@@ -25,7 +25,7 @@ import colormap.colormaps as cmaps
 import pic_information
 from contour_plots import plot_2d_contour, read_2d_fields
 from energy_conversion import read_jdote_data, read_data_from_json
-from particle_distribution import get_particle_distribution, set_mpi_ranks
+from particle_distribution import get_spectrum_vdist
 
 rc('font', **{'family': 'serif', 'serif': ['Computer Modern']})
 mpl.rc('text', usetex=True)
@@ -153,18 +153,53 @@ class viewer_2d(object):
 
             xpos = event.xdata
             ypos = event.ydata
-            particle_interval = self.pic_info.particle_interval
-            pos = [xpos, 0.0, ypos]
+            smime = math.sqrt(self.pic_info.mime)
+            pos = np.asarray([xpos, 0.0, ypos]) * smime
             if event.button == 1:
-                sizes = np.ones(3) * 8
-                corners, mpi_ranks = set_mpi_ranks(self.pic_info, pos, sizes)
-                ct = self.slider.val * particle_interval
+                kwargs = {
+                    'center': pos,
+                    'sizes': np.ones(3) * 8,
+                    'nbins': 64,
+                    'vmin': 0,
+                    'vmax': 1.0,
+                    'tframe': self.slider.val,
+                    'species': 'e'
+                }
                 print self.slider.val
-                get_particle_distribution(self.base_directory, self.pic_info,
-                        ct, corners, mpi_ranks)
+                fvel, fene = get_spectrum_vdist(self.pic_info,
+                        run_dir=self.base_directory, **kwargs)
+                self.plot_vdist_2d(fvel)
 
         plt.draw()
 
+    def plot_vdist_2d(self, fvel):
+        """Plot the 2D velocity distributions of the selected box
+        """
+        vmax = fvel.vmax
+        extent = [-vmax, vmax, -vmax, vmax]
+        xs, ys = 0.08, 0.17
+        w1, h1 = 0.24, 0.72
+        gap = 0.08
+        fig = plt.figure(figsize=(12, 4))
+        fdata = [fvel.fvel_xy, fvel.fvel_xz, fvel.fvel_yz]
+        labels = [(r'$u_x$', r'$u_y$'), (r'$u_x$', r'$u_z$'),
+                  (r'$u_y$', r'$u_z$')]
+        for fvel_2d, (xlabel, ylabel) in zip(fdata, labels):
+            ax = fig.add_axes([xs, ys, w1, h1])
+            ax.imshow(
+                np.log10(fvel_2d),
+                cmap=plt.cm.get_cmap('hot'),
+                extent=extent,
+                aspect='auto',
+                origin='lower',
+                vmin=0.0,
+                vmax=math.log10(fvel.vmax_2d))
+            ax.set_xlabel(xlabel, fontdict=font, fontsize=20)
+            ax.set_ylabel(ylabel, fontdict=font, fontsize=20)
+            ax.tick_params(labelsize=16)
+            xs += w1 + gap
+        fig.show()
+
 
 class DiscreteSlider(Slider):
     """A matplotlib slider widget with discrete steps."""
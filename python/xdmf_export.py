@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Export of the fields for ParaView and VisIt.
+
+The XDMF file is generated from pic_info: the grid dimensions, origin and
+grid sizes (in de) and the times of the frames (in 1/wpe). Its data items
+point directly at the existing .gda files (with a byte offset for the
+one-file-for-all-frames layout) or HDF5 datasets, so a 3D run can be opened
+without any conversion or copy of the data. When a copy is needed anyway,
+e.g. for tools that only read VTK, the frames are converted to VTK image
+files by a pool of workers.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+
+import numpy as np
+from lxml import etree
+
+from field_io import field_shape, gda_file_name, read_field_frame
+from pic_information import gda_time_indices
+from shell_functions import mkdir_p
+
+ENDIAN = "Little"
+# each field is (name, components)
+FIELDS = [("E", ["ex", "ey", "ez"]),
+          ("B", ["bx", "by", "bz"]),
+          ("j", ["jx", "jy", "jz"]),
+          ("ue", ["uex", "uey", "uez"]),
+          ("ui", ["uix", "uiy", "uiz"]),
+          ("absJ", ["absJ"]),
+          ("ne", ["ne"]),
+          ("ni", ["ni"])]
+ATTRIBUTE_TYPES = {1: "Scalar", 3: "Vector", 6: "Tensor6", 9: "Tensor"}
+
+
+def grid_geometry(pic_info, nreduce=1):
+    """Grid of the fields in de, in the (z, y, x) order of XDMF
+
+    The y direction is dropped in 2D runs.
+
+    Returns:
+        dims: number of grid points
+        origin: coordinates of the first grid point
+        spacing: grid sizes
+    """
+    smime = np.sqrt(pic_info.mime)
+    dims = field_shape(pic_info, nreduce)
+    origin = [pic_info.z_di[0] * smime, pic_info.y_di[0] * smime,
+              pic_info.x_di[0] * smime]
+    spacing = [pic_info.dz_di * smime * nreduce,
+               pic_info.dy_di * smime * nreduce,
+               pic_info.dx_di * smime * nreduce]
+    if len(dims) == 2:
+        origin = origin[::2]
+        spacing = spacing[::2]
+    return list(dims), origin, spacing
+
+
+def field_times(pic_info, tframes):
+    """Times of the frames in 1/wpe
+    """
+    dt_fields = pic_info.fields_interval * pic_info.dtwpe
+    return [tframe * dt_fields for tframe in tframes]
+
+
+def available_frames(pic_info, data_dir, var, nreduce=1):
+    """Time frames of a field that exist in data_dir
+
+    Args:
+        nreduce: reduction factor of the data
+    """
+    frame_size = int(np.prod(field_shape(pic_info, nreduce))) * 4
+    fname = data_dir + var + '.gda'
+    if os.path.isfile(fname):
+        return list(range(os.path.getsize(fname) // frame_size))
+    tindices = gda_time_indices(os.listdir(data_dir), var)
+    return [tindex // pic_info.fields_interval for tindex in tindices
+            if tindex % pic_info.fields_interval == 0]
+
+
+def to_text(values):
+    """Values as the text of an XML data item
+    """
+    return ' '.join(str(value) for value in values)
+
+
+def data_item(parent, pic_info, data_dir, var, tframe, dims, xmf_dir,
+              h5_template=None):
+    """Data item that points at the data of a field at one frame
+
+    Args:
+        parent: parent XML element
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the .gda files
+        var: variable name
+        tframe: time frame
+        dims: dimensions of the data
+        xmf_dir: directory of the XDMF file, for the relative paths
+        h5_template: HDF5 dataset path like
+            'field_hdf5/T.{tindex}/fields_{tindex}.h5:/Timestep_{tindex}/{var}',
+            relative to data_dir. The .gda files are used when None.
+    """
+    tindex = tframe * pic_info.fields_interval
+    attrib = {'DataType': "Float", 'Precision': "4",
+              'Dimensions': to_text(dims)}
+    if h5_template:
+        attrib['Format'] = "HDF"
+        item = etree.SubElement(parent, "DataItem", attrib=attrib)
+        fpath = h5_template.format(tindex=tindex, tframe=tframe, var=var)
+        fname, dset = fpath.split(':', 1)
+        item.text = os.path.relpath(data_dir + fname, xmf_dir) + ':' + dset
+        return item
+    fname, per_step = gda_file_name(data_dir, var, tindex)
+    attrib['Format'] = "Binary"
+    attrib['Endian'] = ENDIAN
+    if not per_step:
+        attrib['Seek'] = str(tframe * int(np.prod(dims)) * 4)
+    item = etree.SubElement(parent, "DataItem", attrib=attrib)
+    item.text = os.path.relpath(fname, xmf_dir)
+    return item
+
+
+def build_xdmf(pic_info, data_dir, tframes, xmf_dir, fields=FIELDS,
+               nreduce=1, h5_template=None):
+    """XDMF tree of the fields at multiple frames
+
+    Args:
+        pic_info: namedtuple for the PIC simulation information.
+        data_dir: directory of the data
+        tframes: time frames
+        xmf_dir: directory of the XDMF file
+        fields: list of (name, components)
+        nreduce: reduction factor of the data
+        h5_template: HDF5 dataset path (see data_item)
+    Returns:
+        root: root XML element
+    """
+    dims, origin, spacing = grid_geometry(pic_info, nreduce)
+    ndim = len(dims)
+    xmlns_xi = {'xi': "http://www.w3.org/2001/XInclude"}
+    root = etree.Element("Xdmf", nsmap=xmlns_xi, Version="2.0")
+    domain = etree.SubElement(root, "Domain")
+    etree.SubElement(domain, "Topology",
+                     attrib={'name': "topo",
+                             'TopologyType': str(ndim) + "DCoRectMesh",
+                             'Dimensions': to_text(dims)})
+    geometry = etree.SubElement(domain, "Geometry",
+                                attrib={'name': "geo",
+                                        'Type': ("ORIGIN_DXDYDZ" if ndim == 3
+                                                 else "ORIGIN_DXDY")})
+    geometry.append(etree.Comment(" Origin "))
+    item = etree.SubElement(geometry, "DataItem",
+                            attrib={'Format': "XML", 'Dimensions': str(ndim)})
+    item.text = to_text(origin)
+    geometry.append(etree.Comment(" DxDyDz "))
+    item = etree.SubElement(geometry, "DataItem",
+                            attrib={'Format': "XML", 'Dimensions': str(ndim)})
+    item.text = to_text(spacing)
+    grid = etree.SubElement(domain, "Grid",
+                            attrib={'Name': "TimeSeries",
+                                    'GridType': "Collection",
+                                    'CollectionType': "Temporal"})
+    time = etree.SubElement(grid, "Time", TimeType="List")
+    item = etree.SubElement(time, "DataItem",
+                            attrib={'Format': "XML", 'NumberType': "Float",
+                                    'Dimensions': str(len(tframes))})
+    item.text = to_text(field_times(pic_info, tframes))
+
+    for tframe in tframes:
+        grid2 = etree.SubElement(grid, "Grid",
+                                 attrib={'Name': "T" + str(tframe),
+                                         'GridType': "Uniform"})
+        etree.SubElement(grid2, "Topology",
+                         Reference="/Xdmf/Domain/Topology[1]")
+        etree.SubElement(grid2, "Geometry",
+                         Reference="/Xdmf/Domain/Geometry[1]")
+        for name, comps in fields:
+            ncomps = len(comps)
+            att = etree.SubElement(grid2, "Attribute",
+                                   attrib={'Name': name,
+                                           'AttributeType':
+                                           ATTRIBUTE_TYPES[ncomps],
+                                           'Center': "Node"})
+            if ncomps == 1:
+                data_item(att, pic_info, data_dir, comps[0], tframe, dims,
+                          xmf_dir, h5_template)
+                continue
+            func = "JOIN(" + ', '.join('$' + str(i)
+                                       for i in range(ncomps)) + ")"
+            vec = etree.SubElement(att, "DataItem",
+                                   attrib={'ItemType': "Function",
+                                           'Dimensions': to_text(dims +
+                                                                 [ncomps]),
+                                           'Function': func})
+            for var in comps:
+                data_item(vec, pic_info, data_dir, var, tframe, dims,
+                          xmf_dir, h5_template)
+    return root
+
+
+def write_xdmf(fname, root):
+    """Write the XDMF tree into a file
+    """
+    header = '<?xml version="1.0"?>\n'
+    header += '<!DOCTYPE Xdmf SYSTEM "Xdmf.dtd" []>\n'
+    xmf = header + etree.tostring(root, pretty_print=True, encoding='unicode')
+    mkdir_p(os.path.dirname(os.path.abspath(fname)))
+    with open(fname, 'wb') as fh:
+        fh.write(xmf.encode("utf-8"))
+
+
+def write_vtk_frame(pic_info, data_dir, fields, vtk_dir, nreduce, tframe):
+    """Convert the fields at one frame into a VTK image file
+
+    The time frame is the last argument, as for frame_runner.run_frames.
+    """
+    from evtk.hl import imageToVTK
+    dims, origin, spacing = grid_geometry(pic_info, nreduce)
+    if len(dims) == 2:
+        origin = [origin[0], 0.0, origin[1]]
+        spacing = [spacing[0], 1.0, spacing[1]]
+    point_data = {}
+    for name, comps in fields:
+        data = [read_field_frame(pic_info, data_dir, var, tframe, nreduce)
+                for var in comps]
+        # VTK data is (nx, ny, nz) with x the fastest, as the transposed array
+        data = [fdata[:, np.newaxis, :] if fdata.ndim == 2 else fdata
+                for fdata in data]
+        data = [np.asfortranarray(fdata.T) for fdata in data]
+        point_data[name] = data[0] if len(data) == 1 else tuple(data)
+    tindex = tframe * pic_info.fields_interval
+    mkdir_p(vtk_dir)
+    fname = vtk_dir + 'fields_' + str(tindex)
+    imageToVTK(fname, origin=tuple(origin[::-1]), spacing=tuple(spacing[::-1]),
+               pointData=point_data)
+    return fname
+
+
+def parse_fields(fields_str):
+    """Parse fields as name=comp1:comp2:comp3 or name, comma-separated
+    """
+    fields = []
+    for item in fields_str.split(','):
+        if not item:
+            continue
+        if '=' in item:
+            name, comps = item.split('=')
+            fields.append((name, comps.split(':')))
+        else:
+            fields.append((item, [item]))
+    return fields
+
+
+def get_cmd_args():
+    """Get command line arguments
+    """
+    parser = argparse.ArgumentParser(description='XDMF/VTK export')
+    parser.add_argument('--pic_run', action="store", required=True,
+                        help='PIC run name')
+    parser.add_argument('--pic_run_dir', action="store", required=True,
+                        help='PIC run directory')
+    parser.add_argument('--data_sub_dir', action="store", default='data',
+                        help='sub-directory of the data')
+    parser.add_argument('--nreduce', action="store", default='1', type=int,
+                        help='reduction factor of the data')
+    parser.add_argument('--fields', action="store",
+                        default=','.join(name + '=' + ':'.join(comps)
+                                         if len(comps) > 1 else name
+                                         for name, comps in FIELDS),
+                        help='fields as name=comp1:comp2:comp3 or name')
+    parser.add_argument('--h5_template', action="store", default='',
+                        help='HDF5 dataset path relative to the data ' +
+                        'directory, with {tindex} and {var}')
+    parser.add_argument('--tstart', action="store", default='-1', type=int,
+                        help='starting time frame (default: all frames)')
+    parser.add_argument('--tend', action="store", default='-1', type=int,
+                        help='ending time frame')
+    parser.add_argument('--fname', action="store", default='',
+                        help='XDMF file (default: <data_dir>/<pic_run>.xmf)')
+    parser.add_argument('--vtk', action="store_true", default=False,
+                        help='whether to convert the frames to VTK instead')
+    return parser.parse_args()
+
+
+def main():
+    """business logic for when running this module as the primary one!"""
+    from frame_runner import run_frames
+    from json_functions import read_data_from_json
+    args = get_cmd_args()
+    picinfo_fname = '../data/pic_info/pic_info_' + args.pic_run + '.json'
+    pic_info = read_data_from_json(picinfo_fname)
+    data_dir = os.path.join(args.pic_run_dir, args.data_sub_dir, '')
+    fields = parse_fields(args.fields)
+    if args.tstart < 0:
+        tframes = available_frames(pic_info, data_dir, fields[0][1][0],
+                                   args.nreduce)
+    else:
+        tframes = list(range(args.tstart, args.tend + 1))
+    if args.vtk:
+        vtk_dir = os.path.join(args.pic_run_dir, 'vtk', '')
+        run_frames(write_vtk_frame, tframes,
+                   (pic_info, data_dir, fields, vtk_dir, args.nreduce))
+        return
+    fname = args.fname or data_dir + args.pic_run + '.xmf'
+    xmf_dir = os.path.dirname(os.path.abspath(fname))
+    root = build_xdmf(pic_info, os.path.abspath(data_dir) + '/', tframes,
+                      xmf_dir, fields, args.nreduce, args.h5_template)
+    write_xdmf(fname, root)
+
+
+if __name__ == "__main__":
+    main()